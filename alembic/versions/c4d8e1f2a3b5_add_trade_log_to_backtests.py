@@ -0,0 +1,27 @@
+"""add trade_log to backtests
+
+Revision ID: c4d8e1f2a3b5
+Revises: b7e3f2c1a9d8
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d8e1f2a3b5'
+down_revision: Union[str, None] = 'b7e3f2c1a9d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Compressed per-trade log captured at run time (NULL for older backtests)
+    op.add_column('backtests', sa.Column('trade_log', sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('backtests', 'trade_log')
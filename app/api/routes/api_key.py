@@ -8,6 +8,8 @@ from app.core.crypto import encrypt_value, decrypt_value
 from app.dependencies.auth import get_db, get_current_active_user
 from app.models.user import User
 import app.core.binance_client as binance_client_module
+from app.core.binance_client_pool import api_key_version, get_binance_client_pool
+from app.core.credential_cache import publish_api_key_change
 from typing import Dict, cast
 import logging
 import os
@@ -57,6 +59,8 @@ async def create_api_key(api_key_in: ApiKeyCreate, db: AsyncSession = Depends(ge
     db.add(new_api_key)
     await db.commit()
     await db.refresh(new_api_key)
+    # Id'si yeniden kullanılmış olabilir: worker'lardaki eski kimlik bilgilerini düşür
+    await publish_api_key_change(cast(int, new_api_key.id))
     return ApiKeyResponse.model_validate_orm(new_api_key)
 
 @router.get("/me", response_model=ApiKeyResponse)
@@ -85,8 +89,11 @@ async def delete_my_api_key(db: AsyncSession = Depends(get_db), current_user: Us
         await db.delete(bot)
 
     # Sonra API anahtarını sil
+    api_key_id = cast(int, api_key.id)
     await db.delete(api_key)
     await db.commit()
+    get_binance_client_pool().invalidate(api_key_id)
+    await publish_api_key_change(api_key_id)
     return None
 
 @router.get("/balance")
@@ -110,14 +117,16 @@ async def get_balance(db: AsyncSession = Depends(get_db), current_user: User = D
 
         logger.info(f"API anahtarları başarıyla çözüldü")
 
-        # Binance client oluştur (ortama göre testnet/mainnet)
+        # Binance client oluştur (ortama göre testnet/mainnet); anahtar başına havuzda tutulur
         live_trading = os.getenv("LIVE_TRADING_ENABLED", "false").lower() in ["1", "true", "yes"]
-        binance_client = binance_client_module.BinanceClientWrapper(
-            api_key_plain,
-            secret_key_plain,
-            testnet=(not live_trading)
-        )
-        logger.info("Binance client oluşturuldu")
+        binance_client = get_binance_client_pool().get(
+            cast(int, api_key.id), api_key_version(api_key),
+            lambda: binance_client_module.BinanceClientWrapper(
+                api_key_plain,
+                secret_key_plain,
+                testnet=(not live_trading)
+            ))
+        logger.info("Binance client hazır")
 
         # Spot ve Futures bakiyelerini al
         logger.info("Spot bakiye çekiliyor...")
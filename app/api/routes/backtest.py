@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException, Depends, Response
+from fastapi.responses import StreamingResponse
 from typing import Dict, Any, List
 from pydantic import BaseModel
 import os
@@ -8,7 +9,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy import desc
 
-from app.services.backtest_service import BacktestService
+from app.services.backtest_service import BacktestService, SWEEP_RANK_METRICS, SWEEP_SYNC_MAX_COMBINATIONS
+from app.services import backtest_jobs
+from app.services.trade_log_codec import TRADE_LOG_COLUMNS, TRADE_LOG_DEFAULTS
+from app.core.backtest_tasks import run_backtest_job
+from app.core.celery_app import celery_app
 from app.dependencies.auth import get_current_user, get_db
 from app.models.backtest import Backtest
 from app.schemas.backtest import BacktestSummary, BacktestDetail
@@ -23,6 +28,55 @@ class BacktestRequest(BaseModel):
     market_type: str = "spot"  # Default to spot
     parameters: Dict[str, Any]
 
+class BacktestSweepRequest(BaseModel):
+    symbol: str
+    interval: str
+    start_date: str
+    end_date: str
+    market_type: str = "spot"
+    parameters: Dict[str, Any] = {}  # Base parameters shared by every combination
+    grid: Dict[str, Any]  # e.g. {"ema_fast": [8, 12], "stop_loss": {"start": 0.5, "stop": 1.0, "step": 0.25}}
+    rank_by: str = "sharpe"
+    top_k: int = 3
+
+# Verilmişse kontrol edilen parametre aralıkları: (alt, üst, tam sayı mı)
+PARAMETER_BOUNDS = {
+    'leverage': (1, 125, True),
+    'ema_fast': (1, 500, True),
+    'ema_slow': (1, 500, True),
+    'rsi_period': (1, 500, True),
+    'stop_loss': (0, 100, False),
+    'take_profit': (0, 100, False),
+    'trailing_stop': (0, 100, False),
+    'risk_per_trade': (0, 100, False),
+}
+
+def _validate_parameters(parameters: Dict[str, Any]) -> Dict[str, Any]:
+    validated_parameters = dict(parameters or {})
+    for name, (low, high, integer) in PARAMETER_BOUNDS.items():
+        value = validated_parameters.get(name)
+        if value is None:
+            continue
+        try:
+            value = int(value) if integer else float(value)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=422, detail=f"{name} sayısal bir değer olmalıdır")
+        if not low <= value <= high:
+            raise HTTPException(status_code=422, detail=f"{name} {low} ile {high} arasında olmalıdır")
+        validated_parameters[name] = value
+
+    max_daily_trades = validated_parameters.get('max_daily_trades', 5)
+    try:
+        max_daily_trades = int(max_daily_trades)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=422, detail="max_daily_trades 1 ile 50 arasında bir tam sayı olmalıdır")
+
+    if not 1 <= max_daily_trades <= 50:
+        raise HTTPException(status_code=422, detail="max_daily_trades 1 ile 50 arasında olmalıdır")
+
+    validated_parameters['max_daily_trades'] = max_daily_trades
+    return validated_parameters
+
 @router.post("/run")
 async def run_backtest(request: BacktestRequest, current_user = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """
@@ -34,17 +88,7 @@ async def run_backtest(request: BacktestRequest, current_user = Depends(get_curr
         # Create backtest service instance with user context
         backtest_service = BacktestService(user_id=current_user.id, db_session=db)
 
-        validated_parameters = dict(request.parameters or {})
-        max_daily_trades = validated_parameters.get('max_daily_trades', 5)
-        try:
-            max_daily_trades = int(max_daily_trades)
-        except (TypeError, ValueError):
-            raise HTTPException(status_code=422, detail="max_daily_trades 1 ile 50 arasında bir tam sayı olmalıdır")
-
-        if not 1 <= max_daily_trades <= 50:
-            raise HTTPException(status_code=422, detail="max_daily_trades 1 ile 50 arasında olmalıdır")
-
-        validated_parameters['max_daily_trades'] = max_daily_trades
+        validated_parameters = _validate_parameters(request.parameters)
 
         # Run the backtest
         results = await backtest_service.run_backtest(
@@ -73,6 +117,160 @@ async def run_backtest(request: BacktestRequest, current_user = Depends(get_curr
             detail=f"Backtest failed: {str(e)}"
         )
 
+@router.post("/sweep")
+async def run_backtest_sweep(request: BacktestSweepRequest, current_user = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """
+    Run a parameter sweep on a single data load and return a ranked metrics table.
+    Only the top_k combinations are saved as backtests. The sweep runs inside
+    the request, so the grid is limited to SWEEP_SYNC_MAX_COMBINATIONS.
+    """
+    if request.rank_by not in SWEEP_RANK_METRICS:
+        raise HTTPException(status_code=422, detail=f"rank_by şunlardan biri olmalıdır: {', '.join(SWEEP_RANK_METRICS)}")
+    if not 0 <= request.top_k <= 20:
+        raise HTTPException(status_code=422, detail="top_k 0 ile 20 arasında olmalıdır")
+
+    base_parameters = _validate_parameters(request.parameters)
+    try:
+        combinations = BacktestService.expand_parameter_grid(request.grid, SWEEP_SYNC_MAX_COMBINATIONS)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    # Every combination must pass the same checks as a single /run request
+    for combo in combinations:
+        _validate_parameters({**base_parameters, **combo})
+
+    try:
+        print(f"🧪 Starting parameter sweep for {current_user.email}")
+        backtest_service = BacktestService(user_id=current_user.id, db_session=db)
+
+        try:
+            sweep = await backtest_service.run_parameter_sweep(
+                symbol=request.symbol,
+                interval=request.interval,
+                start_date=request.start_date,
+                end_date=request.end_date,
+                base_parameters=base_parameters,
+                grid=request.grid,
+                market_type=request.market_type,
+                rank_by=request.rank_by,
+                top_k=request.top_k,
+                max_combinations=SWEEP_SYNC_MAX_COMBINATIONS
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+        # Persist only the best combinations
+        top_results = sweep.pop('top_results', [])
+        for row, result in zip(sweep['results'], top_results):
+            backtest_id = await backtest_service.save_backtest_result(result)
+            if backtest_id:
+                row['id'] = backtest_id
+
+        return {
+            "status": "success",
+            "data": sweep
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Backtest sweep error: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Backtest sweep failed: {str(e)}"
+        )
+
+@router.post("/jobs", status_code=202)
+def submit_backtest_job(request: BacktestRequest, current_user = Depends(get_current_user)):
+    """
+    Queue a backtest as a background job and return its id immediately.
+    Poll /jobs/{job_id} for progress and /jobs/{job_id}/result for the result.
+    """
+    validated_parameters = _validate_parameters(request.parameters)
+    job_request = request.dict()
+    job_request['parameters'] = validated_parameters
+
+    try:
+        job = backtest_jobs.create_job(current_user.id, job_request)
+    except backtest_jobs.BacktestJobLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except Exception as e:
+        print(f"❌ Backtest job store error: {e}")
+        raise HTTPException(status_code=503, detail="Backtest kuyruğu şu anda kullanılamıyor")
+
+    try:
+        task = run_backtest_job.apply_async(args=[job['id']])
+        job = backtest_jobs.update_job(job['id'], task_id=task.id) or job
+    except Exception as e:
+        print(f"❌ Backtest job enqueue error: {e}")
+        backtest_jobs.finish_job(job['id'], backtest_jobs.JOB_FAILED, error="Kuyruğa eklenemedi")
+        raise HTTPException(status_code=503, detail="Backtest kuyruğu şu anda kullanılamıyor")
+
+    print(f"📨 Backtest job {job['id']} queued for {current_user.email}")
+    return {
+        "status": "success",
+        "data": _job_payload(job)
+    }
+
+def _job_payload(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: job.get(key) for key in (
+        'id', 'status', 'progress', 'stage', 'backtest_id', 'error', 'created_at', 'updated_at', 'request'
+    )}
+
+def _get_user_job_or_404(job_id: str, user_id: int) -> Dict[str, Any]:
+    try:
+        job = backtest_jobs.get_user_job(job_id, user_id)
+    except Exception as e:
+        print(f"❌ Backtest job store error: {e}")
+        raise HTTPException(status_code=503, detail="Backtest kuyruğu şu anda kullanılamıyor")
+    if job is None:
+        raise HTTPException(status_code=404, detail="Backtest job bulunamadı")
+    return job
+
+@router.get("/jobs/{job_id}")
+def get_backtest_job(job_id: str, current_user = Depends(get_current_user)):
+    """
+    Status and progress (0..1) of a backtest job
+    """
+    job = _get_user_job_or_404(job_id, current_user.id)
+    return {
+        "status": "success",
+        "data": _job_payload(job)
+    }
+
+@router.get("/jobs/{job_id}/result")
+def get_backtest_job_result(job_id: str, current_user = Depends(get_current_user)):
+    """
+    Result of a completed backtest job (same shape as /run)
+    """
+    job = _get_user_job_or_404(job_id, current_user.id)
+    if job['status'] != backtest_jobs.JOB_COMPLETED:
+        raise HTTPException(status_code=409, detail=f"Backtest job henüz tamamlanmadı (durum: {job['status']})")
+
+    results = backtest_jobs.get_job_result(job_id)
+    if results is None:
+        raise HTTPException(status_code=404, detail="Backtest sonucu süresi doldu")
+    return {
+        "status": "success",
+        "data": results
+    }
+
+@router.post("/jobs/{job_id}/cancel")
+def cancel_backtest_job(job_id: str, current_user = Depends(get_current_user)):
+    """
+    Cancel a queued or running backtest job
+    """
+    job = _get_user_job_or_404(job_id, current_user.id)
+    job = backtest_jobs.request_cancel(job_id) or job
+    if job.get('status') == backtest_jobs.JOB_CANCELLED and job.get('task_id'):
+        try:
+            celery_app.control.revoke(job['task_id'])
+        except Exception as e:
+            print(f"⚠️ Backtest job revoke failed: {e}")
+    return {
+        "status": "success",
+        "data": _job_payload(job)
+    }
+
 @router.get("/cache/info")
 async def get_cache_info(current_user = Depends(get_current_user)):
     """
@@ -107,6 +305,7 @@ async def clear_cache(current_user = Depends(get_current_user)):
     try:
         backtest_service = BacktestService()
         backtest_service.cache.clear_cache()
+        backtest_service.kline_store.clear()
 
         return {
             "status": "success",
@@ -295,54 +494,44 @@ async def download_backtest_monthly_csv(backtest_id: int, current_user = Depends
 async def download_backtest_trades_csv(backtest_id: int, current_user = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     """
     Belirli bir backtest için trade-by-trade CSV indir.
-    Bu, aynı parametrelerle simülasyonu yeniden çalıştırarak trade log üretir.
+    Trade log backtest çalışırken kaydedilir ve doğrudan depodan okunur; eski kayıtlarda
+    aynı parametrelerle simülasyon yeniden çalıştırılır.
     Kolonlar: date, side, entry_time, exit_time, entry_price, exit_price, units, pnl_usdt, pnl_pct, fees_entry, fees_exit, capital_after, leverage, exit_reason
     """
     try:
         backtest_service = BacktestService()
         detail = await backtest_service.get_backtest_detail(backtest_id, current_user.id, db)
 
-        trade_log = await backtest_service.generate_trade_log(
-            symbol=detail['symbol'],
-            interval=detail['interval'],
-            start_date=detail['start_date'],
-            end_date=detail['end_date'],
-            parameters=detail['parameters'],
-            market_type=str(detail.get('market_type', 'spot')).lower()
-        )
+        trade_log = await backtest_service.get_backtest_trade_log(backtest_id, current_user.id, db)
+        if trade_log is None:
+            print(f"🔄 No stored trade log for backtest {backtest_id}, re-simulating")
+            trade_log = await backtest_service.generate_trade_log(
+                symbol=detail['symbol'],
+                interval=detail['interval'],
+                start_date=detail['start_date'],
+                end_date=detail['end_date'],
+                parameters=detail['parameters'],
+                market_type=str(detail.get('market_type', 'spot')).lower()
+            )
+
+        def iter_csv(chunk_rows: int = 500):
+            output = io.StringIO()
+            writer = csv.writer(output)
+            writer.writerow(TRADE_LOG_COLUMNS)
+            for i, row in enumerate(trade_log, start=1):
+                writer.writerow([row.get(name, TRADE_LOG_DEFAULTS.get(name)) for name in TRADE_LOG_COLUMNS])
+                if i % chunk_rows == 0:
+                    yield output.getvalue()
+                    output.seek(0)
+                    output.truncate(0)
+            yield output.getvalue()
 
-        output = io.StringIO()
-        writer = csv.writer(output)
-        headers_row = [
-            "date", "side", "entry_time", "exit_time", "entry_price", "exit_price",
-            "units", "pnl_usdt", "pnl_pct", "fees_entry", "fees_exit", "capital_after", "leverage", "exit_reason"
-        ]
-        writer.writerow(headers_row)
-        for row in trade_log:
-            writer.writerow([
-                row.get("date"),
-                row.get("side", "LONG"),
-                row.get("entry_time"),
-                row.get("exit_time"),
-                row.get("entry_price", 0),
-                row.get("exit_price", 0),
-                row.get("units", 0),
-                row.get("pnl_usdt", 0),
-                row.get("pnl_pct", 0),
-                row.get("fees_entry", 0),
-                row.get("fees_exit", 0),
-                row.get("capital_after", 0),
-                row.get("leverage", 1),
-                row.get("exit_reason", "EOD")
-            ])
-
-        csv_data = output.getvalue()
         symbol = str(detail.get('symbol', 'SYMBOL'))
         safe_symbol = ''.join([c if c.isalnum() else '_' for c in symbol])
         headers = {
             "Content-Disposition": f"attachment; filename=backtest_{backtest_id}_{safe_symbol}_trades.csv"
         }
-        return Response(content=csv_data, media_type="text/csv", headers=headers)
+        return StreamingResponse(iter_csv(), media_type="text/csv", headers=headers)
 
     except HTTPException:
         raise
@@ -0,0 +1,99 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from celery.exceptions import SoftTimeLimitExceeded
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.celery_app import celery_app
+from app.services.backtest_jobs import (
+    BACKTEST_TASK_TIME_LIMIT,
+    JOB_CANCELLED,
+    JOB_COMPLETED,
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    BacktestJobCancelled,
+    JobProgressReporter,
+    finish_job,
+    get_job,
+    is_cancel_requested,
+    set_progress,
+    update_job,
+)
+
+logger = logging.getLogger(__name__)
+
+BACKTEST_TASK_SOFT_TIME_LIMIT = int(os.getenv("BACKTEST_TASK_SOFT_TIME_LIMIT", "1740"))
+
+
+async def _execute_backtest_job(job_id: str, job: Dict[str, Any]) -> Dict[str, Any]:
+    # Lazy import: keeps the Celery beat/bot worker startup free of pandas/ta; their
+    # DATABASE_URL is the sync one, which the async engine in app.database rejects
+    from app.database import DATABASE_URL
+    from app.services.backtest_service import BacktestService
+
+    request = job['request']
+    # Her görev kendi event loop'unda çalışır; havuzlanmış bağlantılar loop'lar arasında paylaşılamaz
+    engine = create_async_engine(DATABASE_URL, poolclass=NullPool)
+    session_factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        async with session_factory() as db:
+            service = BacktestService(user_id=job['user_id'], db_session=db)
+            set_progress(job_id, 0.05, 'loading_data')
+            results = await service.run_backtest(
+                symbol=request['symbol'],
+                interval=request['interval'],
+                start_date=request['start_date'],
+                end_date=request['end_date'],
+                parameters=request.get('parameters') or {},
+                market_type=request.get('market_type', 'spot'),
+                progress_callback=JobProgressReporter(job_id),
+                log_trades=False
+            )
+            if is_cancel_requested(job_id):
+                raise BacktestJobCancelled(job_id)
+
+            set_progress(job_id, 0.97, 'saving')
+            backtest_id = await service.save_backtest_result(results)
+            if backtest_id:
+                results['id'] = backtest_id
+            return results
+    finally:
+        await engine.dispose()
+
+
+@celery_app.task(name='app.core.backtest_tasks.run_backtest_job',
+                 time_limit=BACKTEST_TASK_TIME_LIMIT, soft_time_limit=BACKTEST_TASK_SOFT_TIME_LIMIT)
+def run_backtest_job(job_id: str) -> Optional[str]:
+    """Kuyruktaki bir backtest job'unu çalıştırır; durum ve ilerleme Redis'te tutulur."""
+    job = get_job(job_id)
+    if job is None:
+        logger.warning(f"Backtest job {job_id} not found (expired?)")
+        return None
+    if job.get('status') != JOB_QUEUED or is_cancel_requested(job_id):
+        if job.get('status') == JOB_QUEUED:
+            finish_job(job_id, JOB_CANCELLED)
+        return job.get('status')
+
+    # started_at lets the job store fail a job whose worker was killed before finishing
+    update_job(job_id, status=JOB_RUNNING, stage='starting', started_at=time.time())
+    try:
+        results = asyncio.run(_execute_backtest_job(job_id, job))
+    except BacktestJobCancelled:
+        logger.info(f"Backtest job {job_id} cancelled")
+        finish_job(job_id, JOB_CANCELLED)
+        return JOB_CANCELLED
+    except SoftTimeLimitExceeded:
+        finish_job(job_id, JOB_FAILED, error="Backtest zaman sınırını aştı")
+        return JOB_FAILED
+    except Exception as e:
+        logger.error(f"Backtest job {job_id} failed: {e}")
+        finish_job(job_id, JOB_FAILED, error=str(e))
+        return JOB_FAILED
+
+    finish_job(job_id, JOB_COMPLETED, result=results, backtest_id=results.get('id'))
+    return JOB_COMPLETED
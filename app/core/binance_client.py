@@ -8,12 +8,33 @@ import time
 import random
 from decimal import Decimal, InvalidOperation
 
+from app.core.binance_rate_limiter import get_binance_rate_limiter
+
 logger = logging.getLogger(__name__)
 
 # Retry & rate limit configuration via environment
 RETRY_MAX_ATTEMPTS = int(os.getenv("BINANCE_RETRY_MAX_ATTEMPTS", "3"))
 RETRY_BACKOFF_BASE = float(os.getenv("BINANCE_RETRY_BACKOFF_BASE", "0.5"))
-WEIGHT_THRESHOLD = int(os.getenv("BINANCE_WEIGHT_THRESHOLD", "1100"))
+
+# python-binance çağrılarının istek ağırlıkları (IP başına REQUEST_WEIGHT); listede olmayanlar 1 sayılır
+ENDPOINT_WEIGHTS: Dict[str, int] = {
+    'get_account': 20,
+    'get_exchange_info': 20,
+    'get_symbol_info': 20,
+    'get_klines': 2,
+    'get_symbol_ticker': 2,
+    'get_server_time': 1,
+    'futures_klines': 5,
+    'futures_account': 5,
+    'futures_position_information': 5,
+    'futures_get_position_mode': 30,
+    'futures_exchange_info': 1,
+}
+
+
+def endpoint_class(name: str) -> str:
+    """Ağırlığın düşüleceği limit sınıfı (futures_account_transfer bir sapi/spot uç noktasıdır)"""
+    return 'futures' if name.startswith('futures_') and name != 'futures_account_transfer' else 'spot'
 
 class BinanceClientWrapper:
     """Binance API ile etkileşim için wrapper sınıf"""
@@ -25,16 +46,26 @@ class BinanceClientWrapper:
             api_secret: Binance API secret anahtarı
             testnet: Test ağı kullanılıp kullanılmayacağı
         """
+        self.time_synced_at: Optional[float] = None
         try:
             self.client = Client(
                 api_key=api_key,
                 api_secret=api_secret,
-                testnet=testnet
+                testnet=testnet,
+                # Kurulumdaki ping rate limiter'a uğramadan gider; gerekmiyor
+                ping=False
             )
         except Exception as e:
             logger.error(f"Binance client oluşturulurken hata: {e}")
             raise
 
+    def close(self) -> None:
+        """HTTP oturumunu kapatır (havuzdan çıkarılan client'lar için)"""
+        try:
+            self.client.session.close()
+        except Exception:
+            pass
+
     def validate_api_credentials(self) -> Dict[str, Any]:
         """
         API kimlik bilgilerinin geçerliliğini kontrol eder
@@ -43,7 +74,7 @@ class BinanceClientWrapper:
             Dict: {"valid": bool, "error": str|None, "account_info": dict|None}
         """
         try:
-            account_info = self.client.get_account()
+            account_info = self._call(self.client.get_account)
             return {
                 "valid": True,
                 "error": None,
@@ -71,16 +102,49 @@ class BinanceClientWrapper:
     # Utilities & Retry
     # -------------------------------
 
+    def _call(self, func, *args, **kwargs):
+        """Paylaşılan ağırlık bütçesinden pay alarak tek bir API çağrısı yap."""
+        name = getattr(func, '__name__', '')
+        weight_class = endpoint_class(name)
+        limiter = get_binance_rate_limiter()
+        limiter.acquire_sync(weight_class, ENDPOINT_WEIGHTS.get(name, 1))
+        try:
+            result = func(*args, **kwargs)
+        except BinanceAPIException as e:
+            limiter.observe_sync(weight_class, e.status_code, getattr(e.response, 'headers', None))
+            raise
+        response = getattr(self.client, 'response', None)
+        if response is not None:
+            limiter.observe_sync(weight_class, response.status_code, response.headers)
+        return result
+
+    def sync_time(self) -> bool:
+        """Sunucu saat farkını ölçüp imzalı isteklerde kullanılmak üzere saklar."""
+        try:
+            started = time.time() * 1000
+            server_time = self._call(self.client.get_server_time)['serverTime']
+            # Gidiş-dönüşün ortasını yerel zaman kabul et
+            local = (started + time.time() * 1000) / 2
+            self.client.timestamp_offset = int(server_time - local)
+            self.time_synced_at = time.monotonic()
+            return True
+        except Exception as e:
+            logger.warning(f"Sunucu saati senkronize edilemedi: {e}")
+            return False
+
     def _retry(self, func, *args, **kwargs):
         """Basit retry/backoff yardımcı fonksiyon."""
         max_attempts = kwargs.pop('_max_attempts', RETRY_MAX_ATTEMPTS)
         backoff_base = kwargs.pop('_backoff_base', RETRY_BACKOFF_BASE)
         for attempt in range(1, max_attempts + 1):
             try:
-                return func(*args, **kwargs)
+                return self._call(func, *args, **kwargs)
             except BinanceAPIException as e:
                 # Rate limit veya saat senkronizasyonu gibi geçici hatalarda backoff uygula
                 if e.code in (-1003, -1015, -1021):
+                    if e.code == -1021:
+                        # Zaman damgası kaymış: saat farkını yeniden ölç
+                        self.sync_time()
                     # jitter'lı backoff
                     delay = backoff_base * attempt
                     delay = delay * (0.8 + 0.4 * random.random())
@@ -96,14 +160,10 @@ class BinanceClientWrapper:
         return None
 
     @staticmethod
-    def _respect_rate_limit_from_response(resp: requests.Response) -> None:
-        """Binance weight başlıklarına göre nazik bekleme uygula."""
-        try:
-            weight = resp.headers.get('X-MBX-USED-WEIGHT-1m') or resp.headers.get('X-MBX-USED-WEIGHT')
-            if weight is not None:
-                used = int(str(weight).split(',')[0])  # bazı durumlarda virgüllü gelebilir
-                if used >= WEIGHT_THRESHOLD:
-                    time.sleep(0.5)
+    def _respect_rate_limit_from_response(resp: requests.Response, weight_class: str = 'spot') -> None:
+        """Binance weight başlıklarını ve 418/429 yanıtlarını paylaşılan limitleyiciye bildir."""
+        try:
+            get_binance_rate_limiter().observe_sync(weight_class, resp.status_code, resp.headers)
         except Exception:
             # Başlık yoksa veya parse edilemediyse bekleme uygulama
             pass
@@ -111,7 +171,7 @@ class BinanceClientWrapper:
     def get_account_info(self) -> Optional[Dict[str, Any]]:
         """Hesap bilgilerini döndürür"""
         try:
-            return self.client.get_account()
+            return self._call(self.client.get_account)
         except Exception as e:
             logger.error(f"Hesap bilgileri alınamadı: {e}")
             return None
@@ -138,10 +198,31 @@ class BinanceClientWrapper:
             logger.error(f"{symbol} historik veriler alınamadı: {e}")
             return None
 
+    def get_futures_price(self, symbol: str) -> Optional[float]:
+        """Futures sembolünün güncel fiyatını döndürür"""
+        try:
+            ticker = self._retry(self.client.futures_symbol_ticker, symbol=symbol)
+            return float(ticker['price']) if ticker else None
+        except Exception as e:
+            logger.error(f"{symbol} futures fiyatı alınamadı: {e}")
+            return None
+
+    def get_futures_klines(self, symbol: str, interval: str, limit: int = 100) -> Optional[List[Any]]:
+        """Futures candlestick verilerini döndürür"""
+        try:
+            return cast(List[Any], self._retry(self.client.futures_klines,
+                symbol=symbol,
+                interval=interval,
+                limit=limit
+            ))
+        except Exception as e:
+            logger.error(f"{symbol} futures historik veriler alınamadı: {e}")
+            return None
+
     def get_symbol_filters_spot(self, symbol: str) -> Optional[Dict[str, Any]]:
         """Spot için sembol filtrelerini döndürür (LOT_SIZE, MIN_NOTIONAL vb.)"""
         try:
-            info = self.client.get_symbol_info(symbol)
+            info = self._call(self.client.get_symbol_info, symbol)
             if not info:
                 return None
             filters = {f['filterType']: f for f in info.get('filters', [])}
@@ -153,7 +234,7 @@ class BinanceClientWrapper:
     def get_symbol_filters_futures(self, symbol: str) -> Optional[Dict[str, Any]]:
         """Futures için sembol filtrelerini döndürür (LOT_SIZE, MIN_NOTIONAL vb.)"""
         try:
-            info = self.client.futures_exchange_info()
+            info = self._call(self.client.futures_exchange_info)
             for s in info.get('symbols', []):
                 if s.get('symbol') == symbol:
                     filters = {f['filterType']: f for f in s.get('filters', [])}
@@ -307,7 +388,7 @@ class BinanceClientWrapper:
     def get_balance(self, asset: str = "USDT") -> Optional[float]:
         """Belirtilen varlığın bakiyesini döndürür"""
         try:
-            account = self.client.get_account()
+            account = self._call(self.client.get_account)
             for balance in account['balances']:
                 if balance['asset'] == asset:
                     return float(balance['free'])
@@ -319,7 +400,7 @@ class BinanceClientWrapper:
     def get_all_symbols(self) -> Optional[list]:
         """Tüm aktif sembolleri döndürür"""
         try:
-            exchange_info = self.client.get_exchange_info()
+            exchange_info = self._call(self.client.get_exchange_info)
             symbols = []
             for symbol_info in exchange_info['symbols']:
                 if symbol_info['status'] == 'TRADING':
@@ -345,9 +426,10 @@ class BinanceClientWrapper:
             else:  # Mainnet
                 url = "https://api.binance.com/api/v3/exchangeInfo"
 
+            get_binance_rate_limiter().acquire_sync('spot', ENDPOINT_WEIGHTS['get_exchange_info'])
             response = requests.get(url, timeout=10)
+            BinanceClientWrapper._respect_rate_limit_from_response(response, 'spot')
             if response.status_code == 200:
-                BinanceClientWrapper._respect_rate_limit_from_response(response)
                 data = response.json()
                 symbols = []
                 for symbol_info in data['symbols']:
@@ -369,7 +451,7 @@ class BinanceClientWrapper:
     def get_futures_symbols(self) -> Optional[list]:
         """Futures sembolleri döndürür"""
         try:
-            exchange_info = self.client.futures_exchange_info()
+            exchange_info = self._call(self.client.futures_exchange_info)
             symbols = []
             for symbol_info in exchange_info['symbols']:
                 if symbol_info['status'] == 'TRADING':
@@ -395,9 +477,10 @@ class BinanceClientWrapper:
             else:  # Mainnet
                 url = "https://fapi.binance.com/fapi/v1/exchangeInfo"
 
+            get_binance_rate_limiter().acquire_sync('futures', ENDPOINT_WEIGHTS['futures_exchange_info'])
             response = requests.get(url, timeout=10)
+            BinanceClientWrapper._respect_rate_limit_from_response(response, 'futures')
             if response.status_code == 200:
-                BinanceClientWrapper._respect_rate_limit_from_response(response)
                 data = response.json()
                 symbols = []
                 for symbol_info in data['symbols']:
@@ -447,7 +530,7 @@ class BinanceClientWrapper:
     def get_futures_balance(self, asset: str = "USDT") -> Optional[float]:
         """Futures bakiyesini döndürür"""
         try:
-            account = self.client.futures_account()
+            account = self._call(self.client.futures_account)
             for balance in account['assets']:
                 if balance['asset'] == asset:
                     return float(balance['availableBalance'])
@@ -0,0 +1,115 @@
+"""Per-process pool of long-lived Binance client wrappers.
+
+Building a ``BinanceClientWrapper`` opens a new HTTP session and pings the
+server, which used to happen on every bot run. Workers keep one wrapper per
+API key instead, so connections stay open and the measured server time
+offset is reused. Entries are keyed by API key id and a version derived
+from the stored ciphertexts: a rotated key gets a fresh client, and its old
+one is closed. Clients unused for ``BINANCE_CLIENT_IDLE_SECONDS`` are
+closed on the next checkout, and workers drop a key's client as soon as
+the API announces its deletion (see ``credential_cache``).
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+from app.core.binance_client import BinanceClientWrapper
+
+BINANCE_CLIENT_IDLE_SECONDS = float(os.getenv("BINANCE_CLIENT_IDLE_SECONDS", "900"))
+BINANCE_CLIENT_POOL_SIZE = int(os.getenv("BINANCE_CLIENT_POOL_SIZE", "256"))
+# How often a pooled client re-measures the server time offset
+BINANCE_TIME_SYNC_SECONDS = float(os.getenv("BINANCE_TIME_SYNC_SECONDS", "1800"))
+
+
+def api_key_version(api_key: Any) -> str:
+    """Changes whenever the stored key pair is re-encrypted (Fernet tokens never repeat)"""
+    digest = hashlib.sha256()
+    digest.update(str(api_key.encrypted_api_key).encode())
+    digest.update(b"\0")
+    digest.update(str(api_key.encrypted_secret_key).encode())
+    return digest.hexdigest()[:16]
+
+
+class BinanceClientPool:
+    """LRU of (wrapper, last used) per API key id"""
+
+    def __init__(self, idle_seconds: float = BINANCE_CLIENT_IDLE_SECONDS, max_size: int = BINANCE_CLIENT_POOL_SIZE,
+                 time_sync_seconds: float = BINANCE_TIME_SYNC_SECONDS):
+        self.idle_seconds = idle_seconds
+        self.max_size = max(1, max_size)
+        self.time_sync_seconds = time_sync_seconds
+        self._entries: "OrderedDict[int, Tuple[str, BinanceClientWrapper, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, api_key_id: int, version: str,
+            factory: Callable[[], BinanceClientWrapper]) -> BinanceClientWrapper:
+        """Pooled client for this key version, built with ``factory`` when missing"""
+        now = time.monotonic()
+        stale = []
+        with self._lock:
+            stale.extend(self._evict_idle(now))
+            entry = self._entries.pop(api_key_id, None)
+            if entry is not None and entry[0] != version:
+                stale.append(entry[1])
+                entry = None
+            client = entry[1] if entry is not None else None
+        for old in stale:
+            old.close()
+
+        if client is None:
+            # Built outside the lock: client creation talks to Binance
+            client = factory()
+        if self.time_sync_seconds > 0 and (
+                client.time_synced_at is None or now - client.time_synced_at >= self.time_sync_seconds):
+            client.sync_time()
+
+        with self._lock:
+            replaced = self._entries.pop(api_key_id, None)
+            self._entries[api_key_id] = (version, client, now)
+            overflow = []
+            while len(self._entries) > self.max_size:
+                overflow.append(self._entries.popitem(last=False)[1][1])
+        if replaced is not None and replaced[1] is not client:
+            overflow.append(replaced[1])
+        for old in overflow:
+            old.close()
+        return client
+
+    def invalidate(self, api_key_id: int) -> bool:
+        """Drop the client of a deleted or rotated key"""
+        with self._lock:
+            entry = self._entries.pop(api_key_id, None)
+        if entry is None:
+            return False
+        entry[1].close()
+        return True
+
+    def clear(self):
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for _, client, _ in entries:
+            client.close()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict_idle(self, now: float):
+        if self.idle_seconds <= 0:
+            return []
+        expired = [key for key, (_, _, used) in self._entries.items() if now - used >= self.idle_seconds]
+        return [self._entries.pop(key)[1] for key in expired]
+
+
+_pool: Optional[BinanceClientPool] = None
+
+
+def get_binance_client_pool() -> BinanceClientPool:
+    """Process singleton (each Celery worker process has its own pool)"""
+    global _pool
+    if _pool is None:
+        _pool = BinanceClientPool()
+    return _pool
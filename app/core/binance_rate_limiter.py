@@ -0,0 +1,247 @@
+"""Process-wide Binance request weight limiter.
+
+Every caller (API workers, Celery workers, backtest downloads) takes weight
+from one token bucket per (IP scope, endpoint class) kept in Redis. Refill
+and withdrawal run inside a Lua script on the Redis clock, so the bucket is
+updated atomically no matter how many processes share it. Binance counts
+weight per calendar minute, so the burst plus one minute of refill never
+exceeds the configured share of the limit. ``X-MBX-USED-WEIGHT-1M`` headers
+and 418/429 responses feed back into the same bucket.
+
+If Redis is unreachable each process falls back to an in-memory bucket.
+"""
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from app.core.redis_client import get_redis_sync
+
+logger = logging.getLogger(__name__)
+
+# Per-IP REQUEST_WEIGHT limits (per minute) by endpoint class
+BINANCE_WEIGHT_LIMITS: Dict[str, int] = {
+    'spot': int(os.getenv("BINANCE_SPOT_WEIGHT_LIMIT", "6000")),
+    'futures': int(os.getenv("BINANCE_FUTURES_WEIGHT_LIMIT", "2400")),
+}
+# Share of the limit we allow ourselves, and how much of it may be spent in one burst
+BINANCE_WEIGHT_BUDGET_FRACTION = float(os.getenv("BINANCE_WEIGHT_BUDGET_FRACTION", "0.9"))
+BINANCE_WEIGHT_BURST_FRACTION = float(os.getenv("BINANCE_WEIGHT_BURST_FRACTION", "0.2"))
+# Identifies the egress IP the bucket belongs to (hosts behind one NAT share it)
+BINANCE_RATE_LIMIT_SCOPE = os.getenv("BINANCE_RATE_LIMIT_SCOPE", "default")
+
+_KEY_PREFIX = "binance:weight"
+_MAX_SLEEP = 5.0
+# After a Redis error, stay on the local bucket this long before retrying Redis
+_REDIS_RETRY_AFTER = 30.0
+
+# ARGV: capacity, refill per ms, weight -> ms to wait (0 = granted)
+_ACQUIRE_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local weight = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts', 'blocked_until')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+local blocked = tonumber(state[3]) or 0
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if blocked > now then
+  wait = blocked - now
+elseif tokens >= weight then
+  tokens = tokens - weight
+else
+  wait = math.ceil((weight - tokens) / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now, 'blocked_until', blocked)
+redis.call('PEXPIRE', KEYS[1], 300000)
+return wait
+"""
+
+# ARGV: capacity, refill per ms, minute budget, used weight (-1 = unknown), block ms
+_OBSERVE_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local budget = tonumber(ARGV[3])
+local used = tonumber(ARGV[4])
+local block_ms = tonumber(ARGV[5])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts', 'blocked_until')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+local blocked = tonumber(state[3]) or 0
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+if used >= 0 then
+  tokens = math.min(tokens, budget - used)
+end
+if block_ms > 0 then
+  blocked = math.max(blocked, now + block_ms)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now, 'blocked_until', blocked)
+redis.call('PEXPIRE', KEYS[1], 300000)
+return 0
+"""
+
+
+def bucket_params(limit: int) -> Tuple[float, float, float]:
+    """(minute budget, burst capacity, refill per ms) for a per-minute weight limit"""
+    budget = limit * BINANCE_WEIGHT_BUDGET_FRACTION
+    capacity = budget * BINANCE_WEIGHT_BURST_FRACTION
+    return budget, capacity, (budget - capacity) / 60_000.0
+
+
+def used_weight_from_headers(headers: Mapping[str, Any]) -> Optional[int]:
+    for name in ('X-MBX-USED-WEIGHT-1M', 'X-MBX-USED-WEIGHT-1m', 'x-mbx-used-weight-1m', 'X-MBX-USED-WEIGHT'):
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return int(str(value).split(',')[0])  # bazı durumlarda virgüllü gelebilir
+            except ValueError:
+                return None
+    return None
+
+
+class _LocalBucket:
+    """In-process equivalent of the Lua scripts, used while Redis is down"""
+
+    def __init__(self, budget: float, capacity: float, rate: float):
+        self.budget = budget
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.ts = time.monotonic() * 1000
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self) -> float:
+        now = time.monotonic() * 1000
+        self.tokens = min(self.capacity, self.tokens + max(0.0, now - self.ts) * self.rate)
+        self.ts = now
+        return now
+
+    def acquire(self, weight: float) -> int:
+        with self._lock:
+            now = self._refill()
+            if self.blocked_until > now:
+                return int(self.blocked_until - now) + 1
+            if self.tokens >= weight:
+                self.tokens -= weight
+                return 0
+            return int((weight - self.tokens) / self.rate) + 1
+
+    def observe(self, used: Optional[int], block_ms: int):
+        with self._lock:
+            now = self._refill()
+            if used is not None:
+                self.tokens = min(self.tokens, self.budget - used)
+            if block_ms > 0:
+                self.blocked_until = max(self.blocked_until, now + block_ms)
+
+
+class BinanceRateLimiter:
+    """Shared weight budget for one egress IP"""
+
+    def __init__(self, scope: str = BINANCE_RATE_LIMIT_SCOPE, redis_client: Any = None):
+        self.scope = scope
+        self._redis = redis_client
+        self._scripts: Dict[str, Any] = {}
+        self._local: Dict[str, _LocalBucket] = {}
+        self._redis_down_until = 0.0
+
+    def _key(self, endpoint_class: str) -> str:
+        return f"{_KEY_PREFIX}:{self.scope}:{endpoint_class}"
+
+    def _params(self, endpoint_class: str) -> Tuple[float, float, float]:
+        return bucket_params(BINANCE_WEIGHT_LIMITS[endpoint_class])
+
+    def _local_bucket(self, endpoint_class: str) -> _LocalBucket:
+        if endpoint_class not in self._local:
+            self._local[endpoint_class] = _LocalBucket(*self._params(endpoint_class))
+        return self._local[endpoint_class]
+
+    def _script(self, name: str, source: str):
+        if time.monotonic() < self._redis_down_until:
+            raise ConnectionError("Redis marked unavailable")
+        if name not in self._scripts:
+            client = self._redis if self._redis is not None else get_redis_sync()
+            self._scripts[name] = client.register_script(source)
+        return self._scripts[name]
+
+    def _redis_unavailable(self, error: Exception):
+        if time.monotonic() >= self._redis_down_until:
+            logger.warning(f"Redis rate limiter unavailable, using local bucket: {error}")
+            self._redis_down_until = time.monotonic() + _REDIS_RETRY_AFTER
+
+    def try_acquire(self, endpoint_class: str, weight: int) -> float:
+        """Take ``weight`` if available; otherwise return the seconds to wait"""
+        budget, capacity, rate = self._params(endpoint_class)
+        weight = min(weight, capacity)
+        try:
+            wait_ms = int(self._script('acquire', _ACQUIRE_LUA)(
+                keys=[self._key(endpoint_class)], args=[capacity, rate, weight]))
+        except Exception as e:
+            self._redis_unavailable(e)
+            wait_ms = self._local_bucket(endpoint_class).acquire(weight)
+        return wait_ms / 1000.0
+
+    def acquire_sync(self, endpoint_class: str, weight: int):
+        """Block until ``weight`` can be spent on ``endpoint_class``"""
+        while True:
+            wait = self.try_acquire(endpoint_class, weight)
+            if wait <= 0:
+                return
+            time.sleep(min(wait, _MAX_SLEEP))
+
+    async def acquire(self, endpoint_class: str, weight: int):
+        while True:
+            wait = await asyncio.to_thread(self.try_acquire, endpoint_class, weight)
+            if wait <= 0:
+                return
+            await asyncio.sleep(min(wait, _MAX_SLEEP))
+
+    def observe_sync(self, endpoint_class: str, status_code: Optional[int] = None,
+                     headers: Optional[Mapping[str, Any]] = None):
+        """Sync the bucket with what Binance reported for a response"""
+        used = used_weight_from_headers(headers or {})
+        block_ms = 0
+        if status_code in (418, 429):
+            try:
+                retry_after = float((headers or {}).get('Retry-After') or (headers or {}).get('retry-after') or 0)
+            except (TypeError, ValueError):
+                retry_after = 0
+            # Back off for as long as Binance asks, at least until the weight window rolls over
+            block_ms = int(max(retry_after, 60 - time.time() % 60) * 1000)
+            logger.warning(f"Binance rate limit ({status_code}) on {endpoint_class}, pausing {block_ms / 1000:.0f}s")
+        budget, capacity, rate = self._params(endpoint_class)
+        # Tokens never exceed the burst capacity, so low usage cannot change the bucket
+        if used is not None and budget - used >= capacity:
+            used = None
+        if used is None and not block_ms:
+            return
+        try:
+            self._script('observe', _OBSERVE_LUA)(
+                keys=[self._key(endpoint_class)],
+                args=[capacity, rate, budget, -1 if used is None else used, block_ms])
+        except Exception as e:
+            self._redis_unavailable(e)
+            self._local_bucket(endpoint_class).observe(used, block_ms)
+
+    async def observe(self, endpoint_class: str, status_code: Optional[int] = None,
+                      headers: Optional[Mapping[str, Any]] = None):
+        await asyncio.to_thread(self.observe_sync, endpoint_class, status_code, headers)
+
+
+_limiter: Optional[BinanceRateLimiter] = None
+
+
+def get_binance_rate_limiter() -> BinanceRateLimiter:
+    """Process singleton (all processes share the Redis bucket)"""
+    global _limiter
+    if _limiter is None:
+        _limiter = BinanceRateLimiter()
+    return _limiter
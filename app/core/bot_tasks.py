@@ -8,13 +8,21 @@ import asyncio
 from app.core.crypto import decrypt_value
 from app.models.api_key import ApiKey
 from app.core.binance_client import BinanceClientWrapper
+from app.core.binance_client_pool import api_key_version, get_binance_client_pool
+from app.core.credential_cache import Credentials, get_credential_cache
+from app.core.kline_store import INTERVAL_MS
+from app.core.market_stream import market_of, normalize_symbol, read_stream_snapshot
+from app.services.streaming_indicators import (
+    IndicatorState, advance_state, fill_missing, indicator_state_key, seeded_state,
+    load_state as load_indicator_state, save_state as save_indicator_state,
+)
 from app.models.trade import Trade
 from datetime import datetime
 from datetime import date
 import requests
 from app.core.email import send_trade_notification
 from app.models.user import User
-from typing import Any, Optional, List, cast
+from typing import Any, Callable, Dict, Iterable, Optional, List, Set, Tuple, cast
 import logging
 from sqlalchemy import select
 from sqlalchemy.exc import OperationalError
@@ -40,6 +48,154 @@ def get_binance_client(api_key: str, api_secret: str) -> BinanceClientWrapper:
     testnet = not live_trading
     return BinanceClientWrapper(api_key, api_secret, testnet=testnet)
 
+# Botların EMA/RSI kararını verdiği mum aralığı
+BOT_EVALUATION_INTERVAL = os.getenv("BOT_EVALUATION_INTERVAL", "1m")
+# Açıkken dakikalık tetikleme botları (sembol, pozisyon tipi, interval) gruplarında değerlendirir
+BOT_GROUPED_EVALUATION = os.getenv("BOT_GROUPED_EVALUATION", "true").lower() in ["1", "true", "yes"]
+# Soğuk gösterge durumunun tohumlandığı mum sayısı (akış penceresi ve REST limiti 1000 ile uyumlu)
+INDICATOR_SEED_CANDLES = int(os.getenv("INDICATOR_SEED_CANDLES", "500"))
+# Durum sıcakken çekilen mum sayısı: son kapanan mumlar ve canlı mum
+INDICATOR_UPDATE_CANDLES = 3
+
+# (ema_fast, ema_slow, rsi_period)
+Periods = Tuple[int, int, int]
+
+_market_data_client: Optional[BinanceClientWrapper] = None
+
+
+def get_market_data_client() -> BinanceClientWrapper:
+    """Public piyasa verisi için anahtarsız client (süreç başına tek)"""
+    global _market_data_client
+    if _market_data_client is None:
+        _market_data_client = get_binance_client(cast(Any, None), cast(Any, None))
+    return _market_data_client
+
+
+def _ema_params(bot_config: BotConfig) -> Dict[str, int]:
+    return {
+        'ema_fast': getattr(bot_config, 'custom_ema_fast', 8) or 8,
+        'ema_slow': getattr(bot_config, 'custom_ema_slow', 21) or 21,
+        'rsi_period': getattr(bot_config, 'custom_rsi_period', 7) or 7,
+        'rsi_oversold': getattr(bot_config, 'custom_rsi_oversold', 35) or 35,
+        'rsi_overbought': getattr(bot_config, 'custom_rsi_overbought', 65) or 65,
+    }
+
+
+def _indicator_periods(params: Dict[str, int]) -> Periods:
+    """Gösterge durumunu belirleyen periyotlar (eşikler durumu değiştirmez)"""
+    return (params['ema_fast'], params['ema_slow'], params['rsi_period'])
+
+
+def _seed_limit(periods: Iterable[Periods]) -> int:
+    """Soğuk durumun tohumlanacağı geçmiş (backtest EMA'sı ile aynı değere yakınsaması için uzun)"""
+    return min(max([INDICATOR_SEED_CANDLES] + [max(p) + 2 for p in periods]), 1000)
+
+
+def _ema_side(params: Dict[str, int], ema_fast_val: float, ema_slow_val: float, rsi: float) -> Optional[str]:
+    if ema_fast_val > ema_slow_val and rsi < params['rsi_overbought']:
+        return "BUY"
+    if ema_fast_val < ema_slow_val and rsi > params['rsi_oversold']:
+        return "SELL"
+    return None
+
+
+def ema_signal_from_state(params: Dict[str, int], state: IndicatorState,
+                          live_close: float) -> Tuple[Optional[str], float, float, float]:
+    """(BUY/SELL/None, EMA fast, EMA slow, RSI); canlı mum ``live_close`` ile kapanmış gibi değerlendirilir"""
+    values = fill_missing(state.peek(live_close), live_close)
+    ema_fast_val, ema_slow_val, rsi = values['EMA_fast'], values['EMA_slow'], values['RSI']
+    return _ema_side(params, ema_fast_val, ema_slow_val, rsi), ema_fast_val, ema_slow_val, rsi
+
+
+def evaluate_ema_signal(params: Dict[str, int], closes: List[float]) -> Tuple[Optional[str], float, float, float]:
+    """``ema_signal_from_state`` için durumu verilen kapanışlardan kurar (son kapanış canlı mumdur)"""
+    state = seeded_state(_indicator_periods(params), closes[:-1])
+    return ema_signal_from_state(params, state, float(closes[-1]))
+
+
+def fetch_market_snapshot(client: BinanceClientWrapper, symbol: str, position_type: str, interval: str,
+                          limit: int) -> Dict[str, Any]:
+    """Bir sembol için son fiyat, kapanışlar ve açılış zamanları (iki public istek)"""
+    if position_type == "futures":
+        price = client.get_futures_price(symbol)
+        klines = client.get_futures_klines(symbol=symbol, interval=interval, limit=limit)
+    else:
+        price = client.get_current_price(symbol)
+        klines = client.get_historical_klines(symbol=symbol, interval=interval, limit=limit)
+    if price is None:
+        raise Exception("Fiyat alınamadı")
+    if not klines:
+        raise Exception("Kline verisi alınamadı")
+    return {'price': float(price), 'closes': [float(k[4]) for k in klines], 'open_times': [int(k[0]) for k in klines]}
+
+
+def fetch_live_price(client: BinanceClientWrapper, symbol: str, position_type: Optional[str]) -> float:
+    """Anlık fiyat: önce akış servisi, yoksa REST"""
+    snapshot = read_stream_snapshot(symbol, position_type, BOT_EVALUATION_INTERVAL, 1)
+    if snapshot is not None:
+        return float(snapshot['price'])
+    if position_type == "futures":
+        ticker = cast(Any, client.client).futures_symbol_ticker(symbol=symbol)
+        return float(ticker['price'])
+    current_price = client.get_current_price(symbol)
+    if current_price is None:
+        raise Exception("Fiyat alınamadı")
+    return float(current_price)
+
+
+def load_live_indicators(symbol: str, position_type: Optional[str], interval: str, periods: Set[Periods],
+                         fetch: Callable[[int], Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[Periods, IndicatorState]]:
+    """Piyasa verisi ve periyot başına güncel gösterge durumu.
+
+    Durumlar Redis'te (piyasa, sembol, interval, periyotlar) başına tutulur;
+    sıcakken yalnızca son birkaç mum okunur ve her yeni kapanan mum O(1)
+    ile işlenir. Durum yoksa ya da arada mum kaçırılmışsa uzun geçmişle
+    yeniden tohumlanır. Önce akış servisinin verisine, yoksa ``fetch``'e
+    (REST) bakılır.
+    """
+    keys = {p: indicator_state_key(market_of(position_type), normalize_symbol(symbol), interval, p) for p in periods}
+    states = {p: load_indicator_state(key) for p, key in keys.items()}
+    seed_limit = _seed_limit(periods)
+    limit = INDICATOR_UPDATE_CANDLES if all(s is not None for s in states.values()) else seed_limit
+    step = INTERVAL_MS.get(interval, 0)
+    while True:
+        market = read_stream_snapshot(symbol, position_type, interval, limit) or fetch(limit)
+        advanced: Dict[Periods, IndicatorState] = {}
+        for p, state in states.items():
+            advanced[p], rebuilt = advance_state(state, p, market['open_times'], market['closes'], step)
+            if rebuilt and limit < seed_limit:
+                break
+        else:
+            break
+        # Kısa veriden kurulan durum eksik kalır; geçmişin tamamı istenir
+        limit = seed_limit
+    for p, state in advanced.items():
+        save_indicator_state(keys[p], state)
+    return market, advanced
+
+
+def group_bot_configs(bot_configs: List[BotConfig]) -> Dict[Tuple[str, str, str], List[int]]:
+    """Aynı piyasa verisini kullanan botlar: (sembol, pozisyon tipi, interval) -> bot id'leri"""
+    groups: Dict[Tuple[str, str, str], List[int]] = {}
+    for bot_config in bot_configs:
+        key = (cast(str, bot_config.symbol), cast(Optional[str], bot_config.position_type) or "spot",
+               BOT_EVALUATION_INTERVAL)
+        groups.setdefault(key, []).append(cast(int, bot_config.id))
+    return groups
+
+
+def _load_credentials(session, api_key_id: Optional[int]) -> Optional[Credentials]:
+    """ApiKey satırını okuyup iki anahtarı çözer; satır yoksa None"""
+    api_key = session.query(ApiKey).filter(ApiKey.id == api_key_id).first()
+    if not api_key:
+        return None
+    return Credentials(
+        cast(int, api_key.id), api_key_version(api_key),
+        decrypt_value(cast(str, api_key.encrypted_api_key)),
+        decrypt_value(cast(str, api_key.encrypted_secret_key)),
+    )
+
+
 def _handle_fund_transfer(client: BinanceClientWrapper, bot_config: BotConfig):
     """Pozisyon türüne göre fon transferi yapar"""
     if not cast(bool, bot_config.auto_transfer_funds):
@@ -110,20 +266,108 @@ def reactivate_bots_after_reset():
 
 @celery_app.task(name='app.core.bot_tasks.run_bot_task_for_all')
 def run_bot_task_for_all():
-    """Tüm aktif botlar için run_bot_task tetikler."""
+    """Tüm aktif botları tetikler.
+
+    Gruplu modda aynı (sembol, pozisyon tipi, interval) botları tek görevde
+    değerlendirilir; Binance ağırlığı bot sayısıyla değil sembol sayısıyla artar.
+    """
     with SyncSessionLocal() as session:
         bot_configs = session.query(BotConfig).filter(BotConfig.is_active.is_(True)).all()
+        if not BOT_GROUPED_EVALUATION:
+            for bot_config in bot_configs:
+                # Her bot için task başlat
+                cast(Any, run_bot_task).delay(bot_config.id)
+            return f"Started tasks for {len(bot_configs)} active bots"
+        groups = group_bot_configs(bot_configs)
+    for (symbol, position_type, interval), bot_ids in groups.items():
+        cast(Any, run_bot_group_task).delay(symbol, position_type, interval, bot_ids)
+    return f"Started {len(groups)} group tasks for {len(bot_configs)} active bots"
+
+@celery_app.task(name='app.core.bot_tasks.run_bot_group_task')
+def run_bot_group_task(symbol: str, position_type: str, interval: str, bot_ids: List[int]):
+    """Bir sembol grubunun piyasa verisini bir kez çekip tüm botların kararını verir."""
+    return _run_bot_group(symbol, position_type, interval, bot_ids)
+
+def _run_bot_group(symbol: str, position_type: str, interval: str, bot_ids: List[int],
+                   client: Optional[BinanceClientWrapper] = None):
+    with SyncSessionLocal() as session:
+        bot_configs: List[BotConfig] = session.query(BotConfig).filter(
+            BotConfig.id.in_(bot_ids), BotConfig.is_active.is_(True)).all()
+        if not bot_configs:
+            return "No active bots in group"
+
+        ema_bots = [b for b in bot_configs if getattr(b, 'strategy', 'simple') == "ema"]
+        market: Optional[Dict[str, Any]] = None
+        market_error: Optional[str] = None
+        states: Dict[Periods, IndicatorState] = {}
+        if ema_bots:
+            # Gösterge durumu aynı periyotları kullanan botlar arasında paylaşılır
+            periods = {_indicator_periods(_ema_params(b)) for b in ema_bots}
+            try:
+                market, states = load_live_indicators(
+                    symbol, position_type, interval, periods,
+                    lambda limit: fetch_market_snapshot(client or get_market_data_client(), symbol, position_type,
+                                                        interval, limit))
+            except Exception as e:
+                market_error = str(e)
+
+        # bot id -> (durum, hata mesajı); sinyal verenler emir için kendi görevine gider
+        statuses: Dict[int, Tuple[str, Optional[str]]] = {}
+        signals: Dict[int, Dict[str, float]] = {}
         for bot_config in bot_configs:
-            # Her bot için task başlat
-            cast(Any, run_bot_task).delay(bot_config.id)
-        return f"Started tasks for {len(bot_configs)} active bots"
+            bot_id = cast(int, bot_config.id)
+            strategy = getattr(bot_config, 'strategy', 'simple')
+            if strategy == "simple":
+                statuses[bot_id] = ("waiting (simple disabled in prod)", None)
+                continue
+            if strategy != "ema":
+                statuses[bot_id] = ("error", f"Unknown strategy: {strategy}")
+                continue
+            params = _ema_params(bot_config)
+            if market is None:
+                statuses[bot_id] = ("error (price fetch)", market_error)
+                continue
+            state = states[_indicator_periods(params)]
+            if state.candles + 1 < max(params['ema_slow'], params['rsi_period']):
+                statuses[bot_id] = ("error (price fetch)", "Yeterli veri yok")
+                continue
+            side, ema_fast_val, ema_slow_val, rsi = ema_signal_from_state(params, state, market['closes'][-1])
+            if side is None:
+                statuses[bot_id] = ("waiting (no signal)", None)
+            else:
+                signals[bot_id] = {'EMA_fast': ema_fast_val, 'EMA_slow': ema_slow_val, 'RSI': rsi}
+
+        # Emir görevindeki bir botun durum satırı kilitliyse ona dokunma
+        now = datetime.utcnow()
+        bot_states = session.query(BotState).filter(BotState.id.in_(list(statuses))).with_for_update(skip_locked=True).all()
+        for bot_state in bot_states:
+            status, error = statuses[cast(int, bot_state.id)]
+            cast(Any, bot_state).status = status
+            cast(Any, bot_state).last_run_at = now
+            cast(Any, bot_state).last_updated_at = now
+            if error is not None:
+                cast(Any, bot_state).last_error_message = error
+        session.commit()
+
+    # Emirler bot başına ayrı görevde; paylaşılan veri ve göstergeler yeniden hesaplanmaz
+    for bot_id, indicators in signals.items():
+        cast(Any, run_bot_task).delay(bot_id, market, indicators)
+    return f"{symbol} {position_type} {interval}: {len(bot_configs)} bots evaluated, {len(signals)} signals"
 
 @celery_app.task
-def run_bot_task(bot_config_id: int):
-    """Gerçek trade mantığı ile bot task'ı."""
-    return _run_bot(bot_config_id)
+def run_bot_task(bot_config_id: int, market: Optional[Dict[str, Any]] = None,
+                 indicators: Optional[Dict[str, float]] = None):
+    """Gerçek trade mantığı ile bot task'ı.
+
+    ``market`` (price, closes) ve ``indicators`` (EMA_fast, EMA_slow, RSI)
+    grup görevinden gelir; verilirse kline verisi yeniden çekilmez ve
+    göstergeler yeniden hesaplanmaz. Görev kuyrukta beklemiş olabileceği
+    için emir fiyatı her zaman yeniden okunur.
+    """
+    return _run_bot(bot_config_id, market, indicators)
 
-def _run_bot(bot_config_id: int):
+def _run_bot(bot_config_id: int, market: Optional[Dict[str, Any]] = None,
+             indicators: Optional[Dict[str, float]] = None):
     with SyncSessionLocal() as session:
         # BotConfig ve ilişkili ApiKey'i çek
         bot_config = session.query(BotConfig).filter(BotConfig.id == bot_config_id).first()
@@ -143,15 +387,11 @@ def _run_bot(bot_config_id: int):
             logger.info(f"Bot {bot_config_id} is locked by another worker; skipping run")
             return "Skipped (locked)"
 
-        # ApiKey'i çek
-        api_key = session.query(ApiKey).filter(ApiKey.id == bot_config.api_key_id).first()
-        if not api_key:
-            return "API key not found"
-
-        # Şifreleri çöz
+        # ApiKey'i çek ve şifreleri çöz (worker belleğinde kısa süre önbelleklenir)
+        api_key_id = cast(Optional[int], bot_config.api_key_id)
         try:
-            api_key_plain = decrypt_value(cast(str, api_key.encrypted_api_key))
-            secret_key_plain = decrypt_value(cast(str, api_key.encrypted_secret_key))
+            credentials = get_credential_cache().get(
+                cast(int, api_key_id), lambda: _load_credentials(session, api_key_id)) if api_key_id is not None else None
         except Exception as e:
             # Üretimde sessiz demo yok; botu error durumuna al
             bot_state = session.query(BotState).filter(BotState.id == bot_config_id).first()
@@ -161,11 +401,18 @@ def _run_bot(bot_config_id: int):
                 cast(Any, bot_state).last_updated_at = datetime.utcnow()
                 session.commit()
             return f"API key decrypt failed: {e}"
+        if credentials is None:
+            return "API key not found"
+        api_key_plain = credentials.api_key
+        secret_key_plain = credentials.secret_key
 
         # Binance client başlat
         if api_key_plain and secret_key_plain:
             try:
-                client = get_binance_client(api_key_plain, secret_key_plain)
+                # Worker süreci boyunca anahtar başına tek client (oturum ve saat farkı yeniden kullanılır)
+                client = get_binance_client_pool().get(
+                    credentials.api_key_id, credentials.version,
+                    lambda: get_binance_client(api_key_plain, secret_key_plain))
                 demo_mode = False
             except Exception as e:
                 bot_state = session.query(BotState).filter(BotState.id == bot_config_id).first()
@@ -210,15 +457,23 @@ def _run_bot(bot_config_id: int):
 
         # Örnek: Fiyat verisi çek
         symbol = bot_config.symbol
+        states: Dict[Periods, IndicatorState] = {}
+        fetched_here = market is None
         try:
-            if cast(str, bot_config.position_type) == "futures":
-                ticker = cast(Any, cast(Any, client).client).futures_symbol_ticker(symbol=symbol)
-                price = float(ticker['price'])
+            if market is None and getattr(bot_config, 'strategy', 'simple') == "ema":
+                # Grup görevi veri vermediyse: akış servisi ya da REST, göstergeler Redis'teki durumdan
+                market, states = load_live_indicators(
+                    cast(str, symbol), cast(Optional[str], bot_config.position_type), BOT_EVALUATION_INTERVAL,
+                    {_indicator_periods(_ema_params(bot_config))},
+                    lambda limit: fetch_market_snapshot(cast(Any, client), cast(str, symbol),
+                                                        cast(Optional[str], bot_config.position_type) or "spot",
+                                                        BOT_EVALUATION_INTERVAL, limit))
+            if market is not None and fetched_here:
+                price = float(market['price'])
             else:
-                current_price = cast(Any, client).get_current_price(cast(str, symbol))
-                if current_price is None:
-                    raise Exception("Fiyat alınamadı")
-                price = float(current_price)
+                # Grup görevinin fiyatı kuyrukta beklerken eskimiş olabilir; SL/TP ve PnL güncel fiyattan
+                price = fetch_live_price(cast(Any, client), cast(str, symbol),
+                                         cast(Optional[str], bot_config.position_type))
         except Exception as e:
             bot_state = session.query(BotState).filter(BotState.id == bot_config_id).first()
             if bot_state:
@@ -250,11 +505,9 @@ def _run_bot(bot_config_id: int):
 
         elif strategy == "ema":
             # Kullanıcının özel parametrelerini kullan
-            ema_fast = getattr(bot_config, 'custom_ema_fast', 8) or 8
-            ema_slow = getattr(bot_config, 'custom_ema_slow', 21) or 21
-            rsi_period = getattr(bot_config, 'custom_rsi_period', 7) or 7
-            rsi_oversold = getattr(bot_config, 'custom_rsi_oversold', 35) or 35
-            rsi_overbought = getattr(bot_config, 'custom_rsi_overbought', 65) or 65
+            ema_params = _ema_params(bot_config)
+            ema_slow = ema_params['ema_slow']
+            rsi_period = ema_params['rsi_period']
 
             # Risk yönetimi parametreleri
             stop_loss = float(getattr(bot_config, 'custom_stop_loss', 0.5) or 0.5)
@@ -262,58 +515,29 @@ def _run_bot(bot_config_id: int):
             trailing_stop = float(getattr(bot_config, 'custom_trailing_stop', 0.3) or 0.3)
 
             try:
-                if not demo_mode:
-                    if cast(str, bot_config.position_type) == "futures":
-                        klines = cast(Any, cast(Any, client).client).futures_klines(symbol=cast(str, symbol), interval='1m', limit=max(ema_slow, rsi_period)+1)
-                    else:
-                        klines = cast(Any, client).get_historical_klines(symbol=cast(str, symbol), interval='1m', limit=max(ema_slow, rsi_period)+1)
-                    closes = [float(k[4]) for k in klines]
-                    if len(closes) < max(ema_slow, rsi_period):
+                if indicators is not None:
+                    # Grup görevinin hesapladığı değerler
+                    ema_fast_val, ema_slow_val, rsi = indicators['EMA_fast'], indicators['EMA_slow'], indicators['RSI']
+                    side_or_none = _ema_side(ema_params, ema_fast_val, ema_slow_val, rsi)
+                elif market is not None and not demo_mode:
+                    closes = [float(c) for c in market['closes']]
+                    periods = _indicator_periods(ema_params)
+                    state = states.get(periods) or seeded_state(periods, closes[:-1])
+                    if state.candles + 1 < max(ema_slow, rsi_period):
                         raise Exception("Yeterli veri yok")
+                    side_or_none, ema_fast_val, ema_slow_val, rsi = ema_signal_from_state(ema_params, state, closes[-1])
                 else:
                     raise Exception("Demo mode")
             except Exception:
                 # Demo amaçlı fake klines data oluştur
                 import random
                 closes = [random.uniform(50.0, 150.0) for _ in range(max(ema_slow, rsi_period) + 1)]
-
-            # EMA hesapla
-            def calculate_ema(prices, period):
-                k = 2 / (period + 1)
-                ema = prices[0]
-                for price_val in prices[1:]:
-                    ema = price_val * k + ema * (1 - k)
-                return ema
-
-            ema_fast_val = calculate_ema(closes[-ema_fast:], ema_fast)
-            ema_slow_val = calculate_ema(closes[-ema_slow:], ema_slow)
-
-            # RSI hesapla (basit versiyonu)
-            def calculate_rsi(prices, period):
-                if len(prices) < period + 1:
-                    return 50  # Varsayılan değer
-
-                deltas = [prices[i] - prices[i-1] for i in range(1, len(prices))]
-                gains = [d if d > 0 else 0 for d in deltas]
-                losses = [-d if d < 0 else 0 for d in deltas]
-
-                avg_gain = sum(gains[-period:]) / period
-                avg_loss = sum(losses[-period:]) / period
-
-                if avg_loss == 0:
-                    return 100
-                rs = avg_gain / avg_loss
-                rsi = 100 - (100 / (1 + rs))
-                return rsi
-
-            rsi = calculate_rsi(closes, rsi_period)
+                side_or_none, ema_fast_val, ema_slow_val, rsi = evaluate_ema_signal(ema_params, closes)
 
             # Trading sinyali
             side: str
-            if ema_fast_val > ema_slow_val and rsi < rsi_overbought:
-                side = "BUY"
-            elif ema_fast_val < ema_slow_val and rsi > rsi_oversold:
-                side = "SELL"
+            if side_or_none is not None:
+                side = side_or_none
             else:
             # Sinyal yok, bekle
                 bot_state = session.query(BotState).filter(BotState.id == bot_config_id).first()
@@ -1,14 +1,190 @@
 import os
 import json
+import shutil
+import threading
+import time
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Dict, List, Optional
 import hashlib
 
+from app.core.cache_index import CacheIndex, get_cache_index
+from app.core.file_lock import LOCK_DIR_NAME, FileLock
+from app.core.memory_cache import KlineMemoryCache, get_kline_memory_cache
+
+# Columnar cache layout: <cache_key>/<column>.npy plus <cache_key>_meta.json
+CACHE_FORMAT = "npy"
+# Entries ending today/yesterday are refreshed after this long
+RECENT_CACHE_TTL = timedelta(hours=24)
+# Disk quota for cached ranges; least recently used entries are evicted beyond it (0 = unlimited)
+DATA_CACHE_MAX_MB = float(os.getenv("DATA_CACHE_MAX_MB", "2048"))
+# How long a process waits for another one filling the same range before downloading itself
+CACHE_FILL_LOCK_TIMEOUT = float(os.getenv("CACHE_FILL_LOCK_TIMEOUT", "300"))
+
+
+def _typed_column(series: pd.Series) -> np.ndarray:
+    """Column as a typed array: datetimes as datetime64[ns], everything else numeric"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        values = pd.DatetimeIndex(series)
+        if values.tz is not None:
+            values = values.tz_convert('UTC').tz_localize(None)
+        return values.to_numpy(dtype='datetime64[ns]')
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_integer_dtype(series):
+        return series.to_numpy(dtype=np.int64)
+    if pd.api.types.is_float_dtype(series):
+        return series.to_numpy(dtype=np.float64)
+    # Binance returns several fields as strings; store them as numbers like read_csv did
+    numeric = pd.to_numeric(series, errors='coerce')
+    if pd.api.types.is_integer_dtype(numeric):
+        return numeric.to_numpy(dtype=np.int64)
+    return numeric.to_numpy(dtype=np.float64)
+
+
+def write_column_dir(path: str, df: pd.DataFrame) -> Dict[str, str]:
+    """Write ``df`` as one typed .npy file per column into ``path``, replacing it.
+
+    Files are written to a temporary sibling directory that is swapped in at
+    the end (see ``replace_dir``), so readers never see a half-written file.
+    Returns column -> dtype.
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    dtypes: Dict[str, str] = {}
+    for name in df.columns:
+        values = _typed_column(df[name])
+        np.save(os.path.join(tmp_path, f"{name}.npy"), values, allow_pickle=False)
+        dtypes[str(name)] = values.dtype.str
+
+    replace_dir(tmp_path, path)
+    return dtypes
+
+
+class ColumnDirWriter:
+    """Build a ``write_column_dir`` directory from batches of rows.
+
+    Each column is appended to a raw file and only gets its ``.npy`` header
+    in ``commit``, once the row count is known, so the total size is not
+    limited by memory. Names and dtypes are fixed by the first batch; later
+    batches are cast to them. The directory is swapped in with ``replace_dir``.
+    """
+
+    COPY_BUFFER_BYTES = 16 * 1024 * 1024
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        self.rows = 0
+        self.dtypes: Dict[str, np.dtype] = {}
+        self._files: Dict[str, Any] = {}
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+        os.makedirs(self.tmp_path)
+
+    def append(self, columns):
+        """Append a DataFrame or a mapping of column name -> equally long arrays"""
+        if not self.dtypes:
+            for name in columns.keys():
+                values = columns[name]
+                values = _typed_column(values) if isinstance(values, pd.Series) else np.asarray(values)
+                self.dtypes[str(name)] = values.dtype
+                self._files[str(name)] = open(os.path.join(self.tmp_path, f"{name}.raw"), 'wb')
+
+        length = None
+        for name, dtype in self.dtypes.items():
+            values = columns[name]
+            values = _typed_column(values) if isinstance(values, pd.Series) else np.asarray(values)
+            values = np.ascontiguousarray(values, dtype=dtype)
+            if length is None:
+                length = len(values)
+            elif len(values) != length:
+                raise ValueError(f"Column {name} has {len(values)} rows, expected {length}")
+            values.tofile(self._files[name])
+        self.rows += length or 0
+
+    def commit(self) -> Dict[str, str]:
+        """Finish every column file and replace ``path``; returns column -> dtype"""
+        for name, dtype in self.dtypes.items():
+            raw_path = os.path.join(self.tmp_path, f"{name}.raw")
+            self._files[name].close()
+            with open(os.path.join(self.tmp_path, f"{name}.npy"), 'wb') as out, open(raw_path, 'rb') as raw:
+                np.lib.format.write_array_header_1_0(out, {
+                    'descr': np.lib.format.dtype_to_descr(dtype),
+                    'fortran_order': False,
+                    'shape': (self.rows,),
+                })
+                shutil.copyfileobj(raw, out, self.COPY_BUFFER_BYTES)
+            os.remove(raw_path)
+        self._files.clear()
+        replace_dir(self.tmp_path, self.path)
+        return {name: dtype.str for name, dtype in self.dtypes.items()}
+
+    def abort(self):
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+
+
+def replace_dir(tmp_path: str, path: str):
+    """Move a fully written directory to ``path``, replacing what is there.
+
+    Not atomic when ``path`` already exists: a non-empty directory can't be
+    renamed over, so the old one is moved aside first and ``path`` is
+    missing between the two renames. Readers that don't hold the entry's
+    fill lock must retry on ``FileNotFoundError``.
+    """
+    try:
+        os.replace(tmp_path, path)
+    except OSError:
+        # A directory can't be replaced while non-empty: move the old one aside first
+        old_path = f"{path}.old-{os.getpid()}-{threading.get_ident()}"
+        os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+
+def write_json_atomic(path: str, data: dict):
+    """Write JSON through a temp file + rename so readers never see a partial file"""
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def cache_expiry(cached_at: datetime, end_date: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    """When a cached range stops being valid; None for historical ranges, which never expire"""
+    now = now or datetime.now()
+    end_dt = datetime.strptime(end_date, "%Y-%m-%d")
+    if (now.date() - end_dt.date()).days <= 1:  # Recent data: the last candles may still change
+        return cached_at + RECENT_CACHE_TTL
+    return None
+
+
+def _entry_size(path: str) -> int:
+    """Bytes used by a cache entry (column directory or single file)"""
+    try:
+        if os.path.isdir(path):
+            return sum(entry.stat().st_size for entry in os.scandir(path))
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
 class DataCache:
-    def __init__(self, cache_dir: str = "cache/data"):
+    def __init__(self, cache_dir: str = "cache/data", memory: Optional[KlineMemoryCache] = None,
+                 max_bytes: Optional[int] = None):
         self.cache_dir = cache_dir
+        # Per-process memory tier in front of the .npy files
+        self.memory = memory if memory is not None else get_kline_memory_cache()
+        self.max_bytes = int(DATA_CACHE_MAX_MB * 1024 * 1024) if max_bytes is None else int(max_bytes)
         os.makedirs(cache_dir, exist_ok=True)
+        # Entry index (coverage, size, last access) so lookups never scan the directory
+        self.index: CacheIndex = get_cache_index(cache_dir)
+        if self.index.created:
+            self.index.created = False
+            self.rebuild_index()
 
     def _get_cache_key(self, symbol: str, interval: str, start_date: str, end_date: str, market_type: str = "spot") -> str:
         """Generate a unique cache key for the data including market type (spot/futures)"""
@@ -16,74 +192,187 @@ class DataCache:
         return hashlib.md5(data_string.encode()).hexdigest()
 
     def _get_cache_path(self, cache_key: str) -> str:
-        """Get the full path for a cache file"""
+        """Get the full path for a cache entry (directory of per-column .npy files)"""
+        return os.path.join(self.cache_dir, cache_key)
+
+    def _get_legacy_csv_path(self, cache_key: str) -> str:
+        """Path of the pre-columnar CSV cache file"""
         return os.path.join(self.cache_dir, f"{cache_key}.csv")
 
     def _get_metadata_path(self, cache_key: str) -> str:
         """Get the full path for metadata file"""
         return os.path.join(self.cache_dir, f"{cache_key}_meta.json")
 
-    def is_cached(self, symbol: str, interval: str, start_date: str, end_date: str, market_type: str = "spot") -> bool:
-        """Check if data is already cached"""
-        cache_key = self._get_cache_key(symbol, interval, start_date, end_date, market_type)
-        cache_path = self._get_cache_path(cache_key)
-        metadata_path = self._get_metadata_path(cache_key)
-
-        print(f"🔍 Cache check for: {symbol} {interval} {start_date} to {end_date}")
-        print(f"🔑 Cache key: {cache_key}")
-        print(f"📁 Cache path: {cache_path}")
-        print(f"📄 Metadata path: {metadata_path}")
-        print(f"📂 Cache file exists: {os.path.exists(cache_path)}")
-        print(f"📋 Metadata file exists: {os.path.exists(metadata_path)}")
-
-        if not os.path.exists(cache_path) or not os.path.exists(metadata_path):
-            print(f"❌ Cache files missing")
-            return False
-
+    def _read_metadata(self, cache_key: str) -> Optional[dict]:
         try:
-            with open(metadata_path, 'r') as f:
-                metadata = json.load(f)
+            with open(self._get_metadata_path(cache_key), 'r') as f:
+                return json.load(f)
+        except Exception:
+            return None
 
-            print(f"📊 Cached metadata: {metadata}")
+    def _lock(self, cache_key: str) -> FileLock:
+        return FileLock(os.path.join(self.cache_dir, LOCK_DIR_NAME, f"{cache_key}.lock"),
+                        timeout=CACHE_FILL_LOCK_TIMEOUT)
 
-            # Check if cache is less than 24 hours old for recent data
-            cache_time = datetime.fromisoformat(metadata['cached_at'])
-            now = datetime.now()
+    def fill_lock(self, symbol: str, interval: str, start_date: str, end_date: str,
+                  market_type: str = "spot") -> FileLock:
+        """Cross-process single-flight lock for filling one range.
 
-            print(f"🕐 Cache time: {cache_time}")
-            print(f"🕐 Current time: {now}")
-            print(f"⏰ Cache age: {(now - cache_time).total_seconds() / 3600:.2f} hours")
+        Holders should re-check the cache after acquiring it: another
+        process may have downloaded the range in the meantime.
+        """
+        return self._lock(self._get_cache_key(symbol, interval, start_date, end_date, market_type))
 
-            # If end_date is today or recent, check cache age
-            end_dt = datetime.strptime(end_date, "%Y-%m-%d")
-            days_from_now = (now.date() - end_dt.date()).days
-            print(f"📅 End date: {end_dt.date()}")
-            print(f"📅 Days from now: {days_from_now}")
+    def _index_entry(self, cache_key: str, metadata: dict, symbol: Optional[str] = None,
+                     interval: Optional[str] = None, start_date: Optional[str] = None,
+                     end_date: Optional[str] = None, market_type: Optional[str] = None) -> Optional[dict]:
+        """Add an entry to the index from its metadata file contents"""
+        cache_path = self._get_cache_path(cache_key)
+        csv_path = self._get_legacy_csv_path(cache_key)
+        data_path = cache_path if os.path.isdir(cache_path) else csv_path
+        try:
+            entry = {
+                'cache_key': cache_key,
+                'symbol': metadata.get('symbol') or symbol,
+                'interval': metadata.get('interval') or interval,
+                'start_date': metadata.get('start_date') or start_date,
+                'end_date': metadata.get('end_date') or end_date,
+                'market_type': (metadata.get('market_type') or market_type or 'spot').lower(),
+                'rows': int(metadata.get('rows') or 0),
+                'size_bytes': _entry_size(data_path),
+                'cached_at': metadata['cached_at'],
+                'format': metadata.get('format') or ('csv' if data_path == csv_path else CACHE_FORMAT),
+                'columns': metadata.get('columns') or {},
+            }
+            if not all(entry[k] for k in ('symbol', 'interval', 'start_date', 'end_date')):
+                return None
+            self.index.upsert(entry)
+            return self.index.get(cache_key)
+        except Exception as e:
+            print(f"❌ Cache index update failed for {cache_key}: {e}")
+            return None
 
-            if days_from_now <= 1:  # Recent data
-                cache_valid = (now - cache_time).total_seconds() < 24 * 3600  # 24 hours in seconds
-                print(f"🔄 Recent data - cache valid (< 24h): {cache_valid}")
-                return cache_valid
-            else:  # Historical data never expires
-                print(f"📚 Historical data - cache valid: True")
-                return True
+    def rebuild_index(self) -> int:
+        """Index every entry already on disk; returns the number indexed"""
+        indexed = 0
+        for file in os.listdir(self.cache_dir):
+            if not file.endswith('_meta.json'):
+                continue
+            cache_key = file[:-len('_meta.json')]
+            metadata = self._read_metadata(cache_key)
+            data_exists = os.path.isdir(self._get_cache_path(cache_key)) or os.path.exists(self._get_legacy_csv_path(cache_key))
+            if metadata and data_exists and self._index_entry(cache_key, metadata) is not None:
+                indexed += 1
+        if indexed:
+            print(f"📇 Cache index rebuilt: {indexed} entries")
+        return indexed
+
+    def _lookup(self, symbol: str, interval: str, start_date: str, end_date: str,
+                market_type: str = "spot") -> Optional[dict]:
+        """Index entry of a valid (fresh) cached range, or None"""
+        cache_key = self._get_cache_key(symbol, interval, start_date, end_date, market_type)
+        entry = self.index.get(cache_key)
+        if entry is None:
+            # Written by something that bypassed the index (e.g. an older version)
+            if not os.path.exists(self._get_metadata_path(cache_key)):
+                return None
+            metadata = self._read_metadata(cache_key)
+            data_exists = os.path.isdir(self._get_cache_path(cache_key)) or os.path.exists(self._get_legacy_csv_path(cache_key))
+            if not metadata or not data_exists:
+                return None
+            entry = self._index_entry(cache_key, metadata, symbol, interval, start_date, end_date, market_type)
+            if entry is None:
+                return None
 
+        try:
+            cache_time = datetime.fromisoformat(entry['cached_at'])
         except Exception as e:
             print(f"❌ Cache metadata error: {e}")
-            return False
+            return None
+
+        expires_at = cache_expiry(cache_time, end_date)
+        if expires_at is not None and datetime.now() >= expires_at:  # Recent data older than 24h
+            print(f"🔄 Recent data cache expired: {symbol} {interval} {start_date} to {end_date}")
+            return None
+        return entry
 
-    def get_cached_data(self, symbol: str, interval: str, start_date: str, end_date: str, market_type: str = "spot") -> Optional[pd.DataFrame]:
-        """Get cached data if available"""
-        if not self.is_cached(symbol, interval, start_date, end_date, market_type):
+    def is_cached(self, symbol: str, interval: str, start_date: str, end_date: str, market_type: str = "spot") -> bool:
+        """Check if data is already cached (answered from the index)"""
+        cached = self._lookup(symbol, interval, start_date, end_date, market_type) is not None
+        print(f"🔍 Cache check for: {symbol} {interval} {start_date} to {end_date} [{market_type}]: {cached}")
+        return cached
+
+    def get_cached_columns(self, symbol: str, interval: str, start_date: str, end_date: str,
+                           market_type: str = "spot", columns: Optional[List[str]] = None,
+                           mmap: bool = True) -> Optional[Dict[str, np.ndarray]]:
+        """Typed column arrays of a cached entry, memory-mapped read-only by default.
+
+        Only the requested ``columns`` are opened, so a backtest touching
+        OHLCV never reads the other Binance fields. Legacy CSV entries are
+        migrated to the columnar layout on first access.
+        """
+        entry = self._lookup(symbol, interval, start_date, end_date, market_type)
+        if entry is None:
             return None
 
+        cache_key = entry['cache_key']
         try:
-            cache_key = self._get_cache_key(symbol, interval, start_date, end_date, market_type)
+            if entry['format'] != CACHE_FORMAT:
+                if not self._migrate_csv_entry(cache_key):
+                    return None
+                entry = self.index.get(cache_key) or entry
+
+            available = list(entry['columns'].keys())
+            names = [c for c in (columns or available) if c in available]
             cache_path = self._get_cache_path(cache_key)
 
-            df = pd.read_csv(cache_path)
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
+            def load():
+                return {
+                    name: np.load(os.path.join(cache_path, f"{name}.npy"), mmap_mode='r' if mmap else None,
+                                  allow_pickle=False)
+                    for name in names
+                }
+
+            try:
+                arrays = load()
+            except FileNotFoundError:
+                # The entry may be mid-swap by a concurrent writer; try once more
+                time.sleep(0.05)
+                arrays = load()
+            self.index.touch(cache_key)
+            return arrays
+        except FileNotFoundError as e:
+            # Files removed behind the index's back
+            print(f"⚠️ Cache entry missing on disk, dropping from index: {e}")
+            self.index.remove(cache_key)
+            return None
+        except Exception as e:
+            print(f"Error reading cached columns: {e}")
+            return None
+
+    def get_cached_data(self, symbol: str, interval: str, start_date: str, end_date: str,
+                        market_type: str = "spot", columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """Get cached data if available (optionally only some columns)"""
+        cache_key = self._get_cache_key(symbol, interval, start_date, end_date, market_type)
+        memory_key = self._memory_key(cache_key)
+        arrays = self.memory.get(memory_key, columns)
+        if arrays is not None:
+            print(f"⚡ Memory cache hit: {symbol} {interval}")
+            self.index.touch(cache_key)
+        else:
+            arrays = self.get_cached_columns(symbol, interval, start_date, end_date, market_type, columns)
+            if arrays is None:
+                return None
+            entry = self.index.get(cache_key) or {}
+            try:
+                cached_at = datetime.fromisoformat(entry['cached_at'])
+                self.memory.put(memory_key, arrays, expires_at=cache_expiry(cached_at, end_date),
+                                complete=columns is None)
+            except Exception as e:
+                print(f"⚠️ Memory cache fill skipped: {e}")
 
+        try:
+            df = pd.DataFrame(arrays)
             print(f"✅ Cache hit: {symbol} {interval} ({len(df)} rows)")
             return df
 
@@ -91,15 +380,22 @@ class DataCache:
             print(f"Error reading cached data: {e}")
             return None
 
+    def _memory_key(self, cache_key: str) -> tuple:
+        return ('data', os.path.abspath(self.cache_dir), cache_key)
+
+    def _write_columns(self, cache_key: str, df: pd.DataFrame) -> Dict[str, str]:
+        """Write every column as a typed .npy file; returns column -> dtype"""
+        return write_column_dir(self._get_cache_path(cache_key), df)
+
     def cache_data(self, df: pd.DataFrame, symbol: str, interval: str, start_date: str, end_date: str, market_type: str = "spot"):
         """Cache the dataframe"""
         try:
             cache_key = self._get_cache_key(symbol, interval, start_date, end_date, market_type)
-            cache_path = self._get_cache_path(cache_key)
             metadata_path = self._get_metadata_path(cache_key)
 
             # Save data
-            df.to_csv(cache_path, index=False)
+            self.memory.invalidate(self._memory_key(cache_key))
+            dtypes = self._write_columns(cache_key, df)
 
             # Save metadata
             metadata = {
@@ -110,82 +406,138 @@ class DataCache:
                 'market_type': market_type.lower(),
                 'cached_at': datetime.now().isoformat(),
                 'rows': len(df),
-                'cache_key': cache_key
+                'cache_key': cache_key,
+                'format': CACHE_FORMAT,
+                'columns': dtypes
             }
 
-            with open(metadata_path, 'w') as f:
-                json.dump(metadata, f, indent=2)
+            write_json_atomic(metadata_path, metadata)
+            self._index_entry(cache_key, metadata)
 
             print(f"✅ Data cached: {symbol} {interval} ({len(df)} rows)")
+            self.enforce_quota(keep=cache_key)
 
         except Exception as e:
             print(f"Error caching data: {e}")
 
+    def _migrate_csv_entry(self, cache_key: str) -> bool:
+        """Convert one legacy CSV entry in place, keeping its original cached_at"""
+        with self._lock(cache_key):
+            # Another process may have migrated it while we waited
+            if not os.path.exists(self._get_legacy_csv_path(cache_key)):
+                return os.path.isdir(self._get_cache_path(cache_key))
+            return self._migrate_csv_entry_locked(cache_key)
+
+    def _migrate_csv_entry_locked(self, cache_key: str) -> bool:
+        csv_path = self._get_legacy_csv_path(cache_key)
+        metadata = self._read_metadata(cache_key)
+        if not os.path.exists(csv_path) or metadata is None:
+            return False
+        indexed = self.index.get(cache_key) or {}
+        for field in ('start_date', 'end_date', 'market_type'):
+            if field not in metadata and indexed.get(field):
+                metadata[field] = indexed[field]
+
+        try:
+            df = pd.read_csv(csv_path)
+            df['timestamp'] = pd.to_datetime(df['timestamp'])
+            if 'close_time' in df.columns and df['close_time'].dtype == object:
+                df['close_time'] = pd.to_datetime(df['close_time'])
+
+            metadata['columns'] = self._write_columns(cache_key, df)
+            metadata['format'] = CACHE_FORMAT
+            metadata['rows'] = len(df)
+            write_json_atomic(self._get_metadata_path(cache_key), metadata)
+            os.remove(csv_path)
+            self._index_entry(cache_key, metadata)
+
+            print(f"🔁 Migrated CSV cache entry {cache_key} ({len(df)} rows)")
+            return True
+        except Exception as e:
+            print(f"❌ CSV cache migration failed for {cache_key}: {e}")
+            return False
+
+    def migrate_csv_cache(self) -> int:
+        """Convert all legacy CSV entries to the columnar layout; returns how many were migrated"""
+        migrated = 0
+        for file in sorted(os.listdir(self.cache_dir)):
+            if file.endswith('.csv') and self._migrate_csv_entry(file[:-len('.csv')]):
+                migrated += 1
+        print(f"✅ CSV cache migration finished: {migrated} entries")
+        return migrated
+
+    def _remove_entry(self, cache_key: str):
+        shutil.rmtree(self._get_cache_path(cache_key), ignore_errors=True)
+        for path in (self._get_legacy_csv_path(cache_key), self._get_metadata_path(cache_key)):
+            if os.path.exists(path):
+                os.remove(path)
+        self.index.remove(cache_key)
+        self.memory.invalidate(self._memory_key(cache_key))
+
+    def enforce_quota(self, keep: Optional[str] = None) -> int:
+        """Evict entries until the cache fits in ``max_bytes``; returns how many were removed.
+
+        Expired recent ranges go first (they would be re-downloaded anyway),
+        then the least recently used ones. ``keep`` is never evicted.
+        """
+        if self.max_bytes <= 0 or self.index.total_size() <= self.max_bytes:
+            return 0
+
+        removed = 0
+        now = datetime.now()
+        yesterday = (now - timedelta(days=1)).strftime("%Y-%m-%d")
+        for entry in self.index.recent_entries(yesterday):
+            expires_at = cache_expiry(datetime.fromisoformat(entry['cached_at']), entry['end_date'], now)
+            if entry['cache_key'] != keep and expires_at is not None and now >= expires_at:
+                self._remove_entry(entry['cache_key'])
+                removed += 1
+
+        while self.index.total_size() > self.max_bytes:
+            candidates = [e for e in self.index.least_recently_used(limit=2) if e['cache_key'] != keep]
+            if not candidates:
+                break
+            victim = candidates[0]
+            print(f"🧹 Evicting cached range {victim['symbol']} {victim['interval']} "
+                  f"{victim['start_date']} to {victim['end_date']} ({victim['size_bytes'] / (1024 * 1024):.1f} MB)")
+            self._remove_entry(victim['cache_key'])
+            removed += 1
+        return removed
+
     def clear_cache(self):
         """Clear all cached data"""
+        self.memory.clear()
+        self.index.clear()
         try:
             for file in os.listdir(self.cache_dir):
-                if file.endswith(('.csv', '.json')):
-                    os.remove(os.path.join(self.cache_dir, file))
+                path = os.path.join(self.cache_dir, file)
+                if file == LOCK_DIR_NAME:
+                    continue  # Lock files may be held by running fills
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                elif file.endswith(('.csv', '.json')):
+                    os.remove(path)
             print("✅ Cache cleared")
         except Exception as e:
             print(f"Error clearing cache: {e}")
 
     def get_cache_info(self) -> dict:
-        """Get information about cached data"""
+        """Get information about cached data (answered from the index, no directory scan)"""
         info = {
             'total_files': 0,
-            'cached_symbols': set(),
+            'cached_symbols': [],
             'total_size_mb': 0,
+            'quota_mb': round(self.max_bytes / (1024 * 1024), 2),
             'cache_entries': []
         }
 
         try:
-            print(f"🔍 Checking cache directory: {self.cache_dir}")
-
-            if not os.path.exists(self.cache_dir):
-                print(f"⚠️ Cache directory does not exist: {self.cache_dir}")
-                return info
-
-            files = os.listdir(self.cache_dir)
-            print(f"📁 Found {len(files)} files in cache directory")
-
-            for file in files:
-                print(f"📄 Processing file: {file}")
-
-                if file.endswith('_meta.json'):
-                    info['total_files'] += 1
-                    file_path = os.path.join(self.cache_dir, file)
-
-                    try:
-                        with open(file_path, 'r') as f:
-                            metadata = json.load(f)
-                            info['cached_symbols'].add(metadata['symbol'])
-                            info['cache_entries'].append(metadata)
-                            print(f"✅ Loaded metadata for {metadata['symbol']} {metadata['interval']}")
-                    except Exception as meta_error:
-                        print(f"❌ Error reading metadata file {file}: {meta_error}")
-
-                # Calculate total size
-                file_path = os.path.join(self.cache_dir, file)
-                try:
-                    file_size = os.path.getsize(file_path) / (1024 * 1024)
-                    info['total_size_mb'] += file_size
-                except Exception as size_error:
-                    print(f"❌ Error getting size for {file}: {size_error}")
-
-            info['cached_symbols'] = list(info['cached_symbols'])
-            info['total_size_mb'] = round(info['total_size_mb'], 2)
-
-            print(f"📊 Cache info summary:")
-            print(f"   Total files: {info['total_files']}")
-            print(f"   Cached symbols: {info['cached_symbols']}")
-            print(f"   Total size: {info['total_size_mb']} MB")
-            print(f"   Cache entries: {len(info['cache_entries'])}")
-
+            summary = self.index.summary()
+            info['total_files'] = summary['entries']
+            info['cached_symbols'] = summary['symbols']
+            info['total_size_mb'] = round(summary['size_bytes'] / (1024 * 1024), 2)
+            info['cache_entries'] = self.index.entries()
         except Exception as e:
             print(f"❌ Error getting cache info: {e}")
-            import traceback
-            traceback.print_exc()
 
+        info['memory'] = self.memory.get_cache_info()
         return info
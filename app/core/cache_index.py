@@ -0,0 +1,128 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+INDEX_FILENAME = "index.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    cache_key TEXT PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    market_type TEXT NOT NULL,
+    rows INTEGER NOT NULL DEFAULT 0,
+    size_bytes INTEGER NOT NULL DEFAULT 0,
+    cached_at TEXT NOT NULL,
+    format TEXT,
+    columns TEXT,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_entries_last_access ON entries (last_access);
+CREATE INDEX IF NOT EXISTS ix_entries_end_date ON entries (end_date);
+"""
+
+ENTRY_FIELDS = ('cache_key', 'symbol', 'interval', 'start_date', 'end_date', 'market_type',
+                'rows', 'size_bytes', 'cached_at', 'format', 'columns', 'last_access')
+
+# last_access is only rewritten when it is older than this, so hot entries don't write on every hit
+TOUCH_RESOLUTION_SECONDS = 60.0
+
+
+class CacheIndex:
+    """SQLite index of DataCache entries (coverage, size, last access).
+
+    Replaces directory scans and per-entry metadata reads for lookups, info
+    queries and quota eviction. Safe to share between processes.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.path = os.path.join(cache_dir, INDEX_FILENAME)
+        self.created = not os.path.exists(self.path)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread, never reused across fork()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _entry(row: sqlite3.Row) -> Dict[str, Any]:
+        entry = dict(row)
+        entry['columns'] = json.loads(entry['columns'] or '{}')
+        return entry
+
+    def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT * FROM entries WHERE cache_key = ?", (cache_key,)).fetchone()
+        return self._entry(row) if row is not None else None
+
+    def upsert(self, entry: Dict[str, Any]):
+        values = dict(entry)
+        values.setdefault('last_access', time.time())
+        values.setdefault('format', None)
+        values['columns'] = json.dumps(values.get('columns') or {})
+        self._connect().execute(
+            f"INSERT OR REPLACE INTO entries ({', '.join(ENTRY_FIELDS)}) "
+            f"VALUES ({', '.join(':' + name for name in ENTRY_FIELDS)})",
+            {name: values.get(name) for name in ENTRY_FIELDS},
+        )
+
+    def touch(self, cache_key: str):
+        now = time.time()
+        self._connect().execute(
+            "UPDATE entries SET last_access = ? WHERE cache_key = ? AND last_access < ?",
+            (now, cache_key, now - TOUCH_RESOLUTION_SECONDS),
+        )
+
+    def remove(self, cache_key: str):
+        self._connect().execute("DELETE FROM entries WHERE cache_key = ?", (cache_key,))
+
+    def clear(self):
+        self._connect().execute("DELETE FROM entries")
+
+    def total_size(self) -> int:
+        return int(self._connect().execute("SELECT COALESCE(SUM(size_bytes), 0) FROM entries").fetchone()[0])
+
+    def summary(self) -> Dict[str, Any]:
+        conn = self._connect()
+        count, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM entries").fetchone()
+        symbols = [row[0] for row in conn.execute("SELECT DISTINCT symbol FROM entries ORDER BY symbol")]
+        return {'entries': int(count), 'size_bytes': int(size), 'symbols': symbols}
+
+    def entries(self) -> List[Dict[str, Any]]:
+        return [self._entry(row) for row in self._connect().execute("SELECT * FROM entries ORDER BY last_access DESC")]
+
+    def recent_entries(self, since_end_date: str) -> List[Dict[str, Any]]:
+        """Entries whose range ends on/after ``since_end_date`` (the ones that can expire)"""
+        return [self._entry(row) for row in self._connect().execute(
+            "SELECT * FROM entries WHERE end_date >= ?", (since_end_date,))]
+
+    def least_recently_used(self, limit: int = 32) -> List[Dict[str, Any]]:
+        return [self._entry(row) for row in self._connect().execute(
+            "SELECT * FROM entries ORDER BY last_access ASC LIMIT ?", (limit,))]
+
+
+_indexes: Dict[str, CacheIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_cache_index(cache_dir: str) -> CacheIndex:
+    """One shared index per cache directory within the process"""
+    path = os.path.abspath(cache_dir)
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = CacheIndex(path)
+        return _indexes[path]
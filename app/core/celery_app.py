@@ -5,12 +5,14 @@ import logging
 
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
+# Uzun süren backtest'ler ayrı kuyrukta; dakikalık bot görevlerini bekletmesinler
+BACKTEST_QUEUE = os.getenv("BACKTEST_QUEUE", "backtests")
 
 celery_app = Celery(
     "tradebot",
     broker=CELERY_BROKER_URL,
     backend=CELERY_RESULT_BACKEND,
-    include=['app.core.bot_tasks', 'app.core.cache_warmup_tasks']
+    include=['app.core.bot_tasks', 'app.core.cache_warmup_tasks', 'app.core.backtest_tasks']
 )
 
 # Güvenli görev ayarları
@@ -20,6 +22,7 @@ celery_app.conf.update(
     task_reject_on_worker_lost=True,
     task_time_limit=int(os.getenv("CELERY_TASK_TIME_LIMIT", "180")),
     task_soft_time_limit=int(os.getenv("CELERY_TASK_SOFT_TIME_LIMIT", "150")),
+    task_routes={'app.core.backtest_tasks.*': {'queue': BACKTEST_QUEUE}},
 )
 
 # Celery Beat schedule ayarları
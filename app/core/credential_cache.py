@@ -0,0 +1,154 @@
+"""Worker-side cache of decrypted Binance API credentials.
+
+Bot runs used to query the ``ApiKey`` row and Fernet-decrypt both secrets
+every minute. Workers now keep the decrypted pair in process memory for
+``CREDENTIAL_CACHE_TTL_SECONDS``. Nothing is written to Redis or disk, and
+the values never appear in a repr.
+
+When an API key is created or deleted, the API publishes its id on
+``API_KEY_INVALIDATION_CHANNEL``. A listener thread in each worker then
+drops the cached credentials and the pooled Binance client for that id.
+Invalidations sent while the listener is disconnected are lost, so the
+whole cache is cleared every time it (re)subscribes. The TTL bounds
+staleness if Redis is down entirely.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.redis_client import get_redis_async, get_redis_sync
+
+logger = logging.getLogger(__name__)
+
+CREDENTIAL_CACHE_TTL_SECONDS = float(os.getenv("CREDENTIAL_CACHE_TTL_SECONDS", "300"))
+API_KEY_INVALIDATION_CHANNEL = "api_keys:invalidate"
+_LISTENER_RETRY_SECONDS = 5.0
+
+
+class Credentials:
+    """Decrypted key pair of one ``ApiKey`` row"""
+
+    __slots__ = ('api_key_id', 'version', 'api_key', 'secret_key')
+
+    def __init__(self, api_key_id: int, version: str, api_key: str, secret_key: str):
+        self.api_key_id = api_key_id
+        self.version = version
+        self.api_key = api_key
+        self.secret_key = secret_key
+
+    def __repr__(self) -> str:
+        return f"Credentials(api_key_id={self.api_key_id}, version={self.version!r})"
+
+
+class CredentialCache:
+    """TTL map api_key_id -> Credentials, invalidated over Redis pub/sub"""
+
+    def __init__(self, ttl_seconds: float = CREDENTIAL_CACHE_TTL_SECONDS, redis_client: Any = None,
+                 listen: bool = True):
+        self.ttl_seconds = ttl_seconds
+        self._redis = redis_client
+        self._listen = listen
+        self._entries: Dict[int, Tuple[Credentials, float]] = {}
+        self._lock = threading.Lock()
+        self._listener: Optional[threading.Thread] = None
+        self._pid = os.getpid()
+
+    def get(self, api_key_id: int, loader: Callable[[], Optional[Credentials]]) -> Optional[Credentials]:
+        """Cached credentials, or ``loader()`` (query + decrypt) on a miss; ``None`` is not cached"""
+        self._check_fork()
+        self._ensure_listener()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(api_key_id)
+            if entry is not None and entry[1] > now:
+                return entry[0]
+        credentials = loader()
+        if credentials is not None and self.ttl_seconds > 0:
+            with self._lock:
+                self._entries[api_key_id] = (credentials, now + self.ttl_seconds)
+        return credentials
+
+    def invalidate(self, api_key_id: int):
+        with self._lock:
+            self._entries.pop(api_key_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _check_fork(self):
+        # A forked worker child must not reuse the parent's entries or listener thread
+        if os.getpid() != self._pid:
+            self._pid = os.getpid()
+            self._entries = {}
+            self._lock = threading.Lock()
+            self._listener = None
+
+    def _ensure_listener(self):
+        if not self._listen or (self._listener is not None and self._listener.is_alive()):
+            return
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(target=self._run_listener, name="credential-cache-invalidation",
+                                              daemon=True)
+            self._listener.start()
+
+    def _run_listener(self):
+        while True:
+            pubsub = None
+            try:
+                client = self._redis if self._redis is not None else get_redis_sync()
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(API_KEY_INVALIDATION_CHANNEL)
+                # Anything published before this point may have been missed
+                self.clear()
+                for message in pubsub.listen():
+                    if message.get('type') == 'message':
+                        self._handle_message(message.get('data'))
+            except Exception as e:
+                logger.warning(f"Credential invalidation listener disconnected: {e}")
+                self.clear()
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+            time.sleep(_LISTENER_RETRY_SECONDS)
+
+    def _handle_message(self, data: Any):
+        try:
+            api_key_id = int(data)
+        except (TypeError, ValueError):
+            return
+        self.invalidate(api_key_id)
+        # Imported here: the pool module pulls in python-binance
+        from app.core.binance_client_pool import get_binance_client_pool
+        get_binance_client_pool().invalidate(api_key_id)
+
+
+_cache: Optional[CredentialCache] = None
+
+
+def get_credential_cache() -> CredentialCache:
+    """Process singleton"""
+    global _cache
+    if _cache is None:
+        _cache = CredentialCache()
+    return _cache
+
+
+async def publish_api_key_change(api_key_id: int) -> bool:
+    """Tell every worker to forget the credentials and client of this key"""
+    try:
+        await get_redis_async().publish(API_KEY_INVALIDATION_CHANNEL, str(api_key_id))
+        return True
+    except Exception as e:
+        logger.warning(f"API key invalidation publish failed for {api_key_id}: {e}")
+        return False
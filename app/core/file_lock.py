@@ -0,0 +1,100 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, callers just proceed
+    fcntl = None  # type: ignore[assignment]
+
+LOCK_DIR_NAME = ".locks"
+
+logger = logging.getLogger(__name__)
+
+
+class FileLockTimeout(TimeoutError):
+    """Another holder kept the lock past ``timeout``"""
+
+
+class FileLock:
+    """Exclusive cross-process lock on ``<path>`` using ``flock``.
+
+    Every ``FileLock`` opens its own file description, so two instances
+    exclude each other whether they live in different processes or in the
+    same one. The kernel drops the lock if the holder dies. When ``timeout``
+    runs out ``acquire`` returns False and the context managers raise
+    ``FileLockTimeout``: callers re-check what the holder may have produced
+    instead of doing the guarded work without the lock.
+    """
+
+    def __init__(self, path: str, timeout: Optional[float] = None, poll_interval: float = 0.1):
+        self.path = path
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.acquired = False
+        self._fd: Optional[int] = None
+
+    def _try_lock(self) -> bool:
+        if fcntl is None:
+            return True
+        if self._fd is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def _deadline(self) -> Optional[float]:
+        return time.monotonic() + self.timeout if self.timeout is not None else None
+
+    def acquire(self) -> bool:
+        deadline = self._deadline()
+        while not self._try_lock():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(self.poll_interval)
+        self.acquired = True
+        return True
+
+    async def acquire_async(self) -> bool:
+        """Like ``acquire`` but waits without blocking the event loop"""
+        deadline = self._deadline()
+        while not self._try_lock():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(self.poll_interval)
+        self.acquired = True
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            if self.acquired and fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self.acquired = False
+
+    def _timed_out(self) -> FileLockTimeout:
+        self.release()
+        logger.warning(f"Timed out after {self.timeout}s waiting for lock {self.path}")
+        return FileLockTimeout(self.path)
+
+    def __enter__(self) -> "FileLock":
+        if not self.acquire():
+            raise self._timed_out()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    async def __aenter__(self) -> "FileLock":
+        if not await self.acquire_async():
+            raise self._timed_out()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
@@ -0,0 +1,206 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# Columns whose content defines a dataset for indicator purposes
+FINGERPRINT_COLUMNS = ('timestamp', 'close', 'volume')
+# Part of every key: bump when indicator definitions or the file layout change,
+# so persisted series from older code are never read back
+INDICATOR_CACHE_VERSION = 1
+
+
+class IndicatorCache:
+    """Memoizes indicator series keyed by (dataset fingerprint, indicator name, params).
+
+    Entries live in an in-memory LRU bounded by entry count and bytes; when
+    ``persist`` is enabled they are also written as ``.npy`` files so other
+    processes / restarts can reuse them. The files are evicted least recently
+    used first once they exceed ``max_disk_bytes``.
+    """
+
+    def __init__(self, max_entries: int = 256, cache_dir: Optional[str] = None, persist: bool = False,
+                 max_bytes: int = 512 * 1024 * 1024, max_disk_bytes: int = 2048 * 1024 * 1024):
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(0, int(max_bytes))
+        self.max_disk_bytes = max(0, int(max_disk_bytes))
+        self.cache_dir = cache_dir
+        self.persist = bool(persist and cache_dir)
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.current_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if self.persist:
+            os.makedirs(cache_dir or "", exist_ok=True)
+
+    @staticmethod
+    def fingerprint(df: pd.DataFrame, columns: Iterable[str] = FINGERPRINT_COLUMNS) -> str:
+        """Content hash of the given columns (missing columns are skipped)"""
+        digest = hashlib.md5()
+        digest.update(str(len(df)).encode())
+        for name in columns:
+            if name not in df.columns:
+                continue
+            series = df[name]
+            if pd.api.types.is_datetime64_any_dtype(series):
+                values = series.to_numpy(dtype='datetime64[ns]').view(np.int64)
+            else:
+                values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+            digest.update(name.encode())
+            digest.update(np.ascontiguousarray(values).tobytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def _key(fingerprint: str, name: str, params: Tuple[Any, ...]) -> str:
+        suffix = "_".join(str(p) for p in params)
+        key = f"v{INDICATOR_CACHE_VERSION}_{fingerprint}_{name}"
+        return f"{key}_{suffix}" if suffix else key
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir or "", f"{key}.npy")
+
+    def _remember(self, key: str, values: np.ndarray):
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.current_bytes -= previous.nbytes
+        if values.nbytes > self.max_bytes:
+            # Larger than the whole budget: hand it back without caching
+            return
+        self._entries[key] = values
+        self.current_bytes += values.nbytes
+        while len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= evicted.nbytes
+
+    def _evict_disk(self):
+        """Delete the least recently used files until the directory fits ``max_disk_bytes``"""
+        try:
+            files = [entry for entry in os.scandir(self.cache_dir or "") if entry.name.endswith('.npy')]
+            stats = [(entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in files]
+        except OSError:
+            return
+        total = sum(size for _, size, _ in stats)
+        for _, size, path in sorted(stats):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def get(self, fingerprint: str, name: str, params: Tuple[Any, ...] = ()) -> Optional[np.ndarray]:
+        key = self._key(fingerprint, name, params)
+        with self._lock:
+            values = self._entries.get(key)
+            if values is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return values
+
+        if self.persist:
+            path = self._disk_path(key)
+            if os.path.exists(path):
+                try:
+                    values = np.load(path, allow_pickle=False)
+                    values.setflags(write=False)
+                    # mtime is the disk LRU clock
+                    os.utime(path)
+                    with self._lock:
+                        self._remember(key, values)
+                        self.hits += 1
+                    return values
+                except Exception as e:
+                    print(f"⚠️ Indicator cache read failed for {key}: {e}")
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, fingerprint: str, name: str, params: Tuple[Any, ...], values: Any) -> np.ndarray:
+        key = self._key(fingerprint, name, params)
+        array = np.array(values, dtype=np.float64, copy=True)
+        # Cached arrays are shared between callers, so they must never be mutated
+        array.setflags(write=False)
+        with self._lock:
+            self._remember(key, array)
+
+        if self.persist:
+            try:
+                self._save_atomic(self._disk_path(key), array)
+                self._evict_disk()
+            except Exception as e:
+                print(f"⚠️ Indicator cache write failed for {key}: {e}")
+        return array
+
+    @staticmethod
+    def _save_atomic(path: str, array: np.ndarray):
+        """Write through a temp file + rename so readers in other processes never see a partial file"""
+        tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.save(f, array, allow_pickle=False)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get_or_compute(self, fingerprint: str, name: str, params: Tuple[Any, ...],
+                       compute: Callable[[], Any]) -> np.ndarray:
+        """Return the cached series or compute, store and return it"""
+        values = self.get(fingerprint, name, params)
+        if values is None:
+            values = self.put(fingerprint, name, params, compute())
+        return values
+
+    def clear(self, include_disk: bool = False):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = 0
+            self.misses = 0
+        if include_disk and self.cache_dir and os.path.isdir(self.cache_dir):
+            for file in os.listdir(self.cache_dir):
+                if file.endswith('.npy'):
+                    os.remove(os.path.join(self.cache_dir, file))
+
+    def get_cache_info(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'memory_mb': round(self.current_bytes / (1024 * 1024), 2),
+                'max_mb': round(self.max_bytes / (1024 * 1024), 2),
+                'max_disk_mb': round(self.max_disk_bytes / (1024 * 1024), 2),
+                'persist': self.persist,
+                'cache_dir': self.cache_dir
+            }
+
+
+_indicator_cache: Optional[IndicatorCache] = None
+_indicator_cache_lock = threading.Lock()
+
+
+def get_indicator_cache() -> IndicatorCache:
+    """Process-wide indicator cache so separate backtests share computed series"""
+    global _indicator_cache
+    with _indicator_cache_lock:
+        if _indicator_cache is None:
+            persist = os.getenv("INDICATOR_CACHE_PERSIST", "false").lower() in ("1", "true", "yes")
+            _indicator_cache = IndicatorCache(
+                max_entries=int(os.getenv("INDICATOR_CACHE_MAX_ENTRIES", "256")),
+                cache_dir=os.path.join(os.getcwd(), "cache", "indicators"),
+                persist=persist,
+                max_bytes=int(float(os.getenv("INDICATOR_CACHE_MAX_MB", "512")) * 1024 * 1024),
+                max_disk_bytes=int(float(os.getenv("INDICATOR_CACHE_DISK_MAX_MB", "2048")) * 1024 * 1024),
+            )
+        return _indicator_cache
@@ -0,0 +1,279 @@
+"""Offline import of Binance public kline archives into the KlineStore.
+
+Reads the monthly/daily ``<SYMBOL>-<interval>-<YYYY-MM[-DD]>.zip`` files
+published on data.binance.vision (or their extracted ``.csv``) from local
+disk and streams them into the store in open-time order, one chunk at a
+time, so memory stays bounded by the chunk size however many years are
+imported. Rows are validated on the way: repeated or out-of-order open
+times are dropped and counted, missing candles are reported as gaps.
+"""
+import os
+import re
+import time
+import zipfile
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.core.kline_store import INTERVAL_MS, KlineStore, Range, merge_ranges
+
+KLINE_ARCHIVE_COLUMNS = [
+    'timestamp', 'open', 'high', 'low', 'close', 'volume',
+    'close_time', 'quote_volume', 'trades', 'taker_base', 'taker_quote', 'ignore',
+]
+KLINE_ARCHIVE_DTYPES = {
+    'timestamp': np.int64, 'open': np.float64, 'high': np.float64, 'low': np.float64, 'close': np.float64,
+    'volume': np.float64, 'close_time': np.int64, 'quote_volume': np.float64, 'trades': np.int64,
+    'taker_base': np.float64, 'taker_quote': np.float64, 'ignore': np.float64,
+}
+ARCHIVE_CHUNK_ROWS = 200_000
+
+_ARCHIVE_NAME = re.compile(
+    r'^(?P<symbol>[A-Z0-9]+)-(?P<interval>[0-9]+[smhdwM])-(?P<year>\d{4})-(?P<month>\d{2})(?:-(?P<day>\d{2}))?'
+    r'\.(?:zip|csv)$'
+)
+# Spot archives switched to microsecond timestamps in 2025; ms values stay far below this
+_MICROSECOND_THRESHOLD = 10 ** 14
+# Gaps listed individually in a report (all of them are counted)
+_REPORTED_GAPS = 20
+
+
+class KlineArchive(NamedTuple):
+    path: str
+    symbol: str
+    interval: str
+    market_type: str
+    start_ms: int
+    end_ms: int
+
+
+def parse_archive_name(path: str, market_type: Optional[str] = None) -> Optional[KlineArchive]:
+    """Archive described by a Binance file name, or None if the name doesn't match.
+
+    The market type is taken from the data.binance.vision directory layout
+    (``.../futures/um/...``) unless given.
+    """
+    match = _ARCHIVE_NAME.match(os.path.basename(path))
+    if match is None:
+        return None
+    year, month = int(match['year']), int(match['month'])
+    if match['day']:
+        start = pd.Timestamp(year=year, month=month, day=int(match['day']))
+        end = start + pd.Timedelta(days=1)
+    else:
+        start = pd.Timestamp(year=year, month=month, day=1)
+        end = start + pd.offsets.MonthBegin(1)
+    if market_type is None:
+        parts = os.path.normpath(os.path.abspath(path)).split(os.sep)
+        market_type = 'futures' if 'futures' in parts else 'spot'
+    return KlineArchive(path, match['symbol'], match['interval'], market_type.lower(),
+                        start.value // 1_000_000, end.value // 1_000_000)
+
+
+def find_archives(paths: Iterable[str], market_type: Optional[str] = None) -> List[KlineArchive]:
+    """Archives among ``paths`` (files or directories, searched recursively)"""
+    found: List[KlineArchive] = []
+    for path in paths:
+        if os.path.isdir(path):
+            candidates = [os.path.join(root, name) for root, _, names in os.walk(path) for name in names]
+        else:
+            candidates = [path]
+        for candidate in sorted(candidates):
+            archive = parse_archive_name(candidate, market_type)
+            if archive is not None:
+                found.append(archive)
+    return found
+
+
+@contextmanager
+def _open_csv(path: str):
+    if path.endswith('.zip'):
+        with zipfile.ZipFile(path) as zf:
+            members = [name for name in zf.namelist() if name.endswith('.csv')]
+            if len(members) != 1:
+                raise ValueError(f"{path}: expected one CSV file in the archive, found {len(members)}")
+            with zf.open(members[0]) as f:
+                yield f
+    else:
+        with open(path, 'rb') as f:
+            yield f
+
+
+def read_archive(path: str, chunk_rows: int = ARCHIVE_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Rows of one archive in chunks of ``chunk_rows``, open times in ms"""
+    # Newer futures archives start with a header line, older ones and spot don't
+    with _open_csv(path) as f:
+        has_header = not f.readline()[:1].isdigit()
+
+    with _open_csv(path) as f:
+        reader = pd.read_csv(f, header=None, names=KLINE_ARCHIVE_COLUMNS, usecols=range(len(KLINE_ARCHIVE_COLUMNS)),
+                             dtype=KLINE_ARCHIVE_DTYPES, skiprows=1 if has_header else 0, chunksize=chunk_rows)
+        for chunk in reader:
+            for name in ('timestamp', 'close_time'):
+                values = chunk[name].to_numpy()
+                chunk[name] = np.where(values >= _MICROSECOND_THRESHOLD, values // 1000, values)
+            yield chunk
+
+
+class SeriesValidator:
+    """Checks the open times of one series as its archives stream past.
+
+    Keeps only the last accepted open time, so it works on any number of
+    chunks. Rows at or before it are dropped (duplicates / out of order).
+    Missing candles are counted inside the periods the archives claim; a
+    whole missing archive is not a gap, it is just not marked as covered.
+    With ``strict`` the first problem raises ``ValueError``.
+    """
+
+    def __init__(self, interval: str, strict: bool = False):
+        self.step = INTERVAL_MS[interval]
+        self.strict = strict
+        self.last_ms: Optional[int] = None
+        self.rows = 0
+        self.duplicates = 0
+        self.out_of_order = 0
+        self.gaps = 0
+        self.missing_candles = 0
+        self.gap_ranges: List[Range] = []
+
+    def _problem(self, message: str):
+        if self.strict:
+            raise ValueError(message)
+
+    def _gap(self, after_ms: int, next_ms: int):
+        self.gaps += 1
+        self.missing_candles += (next_ms - after_ms) // self.step - 1
+        if len(self.gap_ranges) < _REPORTED_GAPS:
+            self.gap_ranges.append((after_ms + self.step, next_ms))
+        self._problem(f"Gap: no candles from {pd.Timestamp(after_ms + self.step, unit='ms')} "
+                      f"to {pd.Timestamp(next_ms, unit='ms')}")
+
+    def start_archive(self, archive: KlineArchive):
+        # Candles before the archive's period belong to the previous (possibly missing) archive
+        if self.last_ms is None or self.last_ms < archive.start_ms - self.step:
+            self.last_ms = archive.start_ms - self.step
+
+    def check(self, opens: np.ndarray) -> np.ndarray:
+        """Mask of the rows to keep"""
+        if not len(opens):
+            return np.zeros(0, dtype=bool)
+        previous_max = np.maximum.accumulate(np.r_[self.last_ms, opens])[:-1]
+        keep = opens > previous_max
+        duplicates = int(np.count_nonzero(opens == previous_max))
+        out_of_order = int(np.count_nonzero(opens < previous_max))
+        if duplicates:
+            self.duplicates += duplicates
+            self._problem(f"{duplicates} duplicate candle(s)")
+        if out_of_order:
+            self.out_of_order += out_of_order
+            self._problem(f"{out_of_order} out-of-order candle(s)")
+
+        kept = opens[keep]
+        if len(kept):
+            previous = np.r_[self.last_ms, kept[:-1]]
+            for index in np.flatnonzero(kept - previous != self.step):
+                self._gap(int(previous[index]), int(kept[index]))
+            self.last_ms = int(kept[-1])
+        self.rows += len(kept)
+        return keep
+
+    def end_archive(self, end_ms: int):
+        if self.last_ms is not None and self.last_ms < end_ms - self.step:
+            self._gap(self.last_ms, end_ms)
+            self.last_ms = end_ms - self.step
+
+
+def _series_chunks(archives: List[KlineArchive], validator: SeriesValidator, cover_end: int,
+                   chunk_rows: int) -> Iterator[pd.DataFrame]:
+    for archive in archives:
+        print(f"📂 Importing {os.path.basename(archive.path)}")
+        validator.start_archive(archive)
+        for chunk in read_archive(archive.path, chunk_rows):
+            opens = chunk['timestamp'].to_numpy()
+            keep = validator.check(opens)
+            chunk = chunk[keep & (opens < cover_end)].reset_index(drop=True)
+            if chunk.empty:
+                continue
+            chunk['timestamp'] = pd.to_datetime(chunk['timestamp'], unit='ms')
+            yield chunk
+        validator.end_archive(min(archive.end_ms, cover_end))
+
+
+def _without_contained(archives: List[KlineArchive]) -> List[KlineArchive]:
+    """Drop archives whose period an earlier one already covers (daily files of an imported month)"""
+    kept: List[KlineArchive] = []
+    covered_until: Optional[int] = None
+    for archive in archives:
+        if covered_until is not None and archive.end_ms <= covered_until:
+            print(f"⏭️ Skipping {os.path.basename(archive.path)}: period already covered")
+            continue
+        kept.append(archive)
+        covered_until = archive.end_ms if covered_until is None else max(covered_until, archive.end_ms)
+    return kept
+
+
+def import_archives(paths: Iterable[str], store: KlineStore, market_type: Optional[str] = None,
+                    symbols: Optional[List[str]] = None, intervals: Optional[List[str]] = None,
+                    chunk_rows: int = ARCHIVE_CHUNK_ROWS, strict: bool = False,
+                    dry_run: bool = False) -> List[Dict[str, Any]]:
+    """Import every archive under ``paths``; returns one report per series.
+
+    Archives of a series are applied oldest first (a monthly file before the
+    daily files of the same month) and the periods they cover are marked as
+    downloaded, so backtests over them never hit the API. ``dry_run`` only
+    validates. In ``strict`` mode a series with any gap or duplicate is not
+    written; its report carries the reason in ``error`` and the other series
+    are still imported.
+    """
+    series: Dict[Tuple[str, str, str], List[KlineArchive]] = {}
+    for archive in find_archives(paths, market_type):
+        if symbols and archive.symbol not in symbols:
+            continue
+        if intervals and archive.interval not in intervals:
+            continue
+        if not store.supports(archive.interval):
+            print(f"⚠️ Skipping {os.path.basename(archive.path)}: interval {archive.interval} is not stored")
+            continue
+        series.setdefault((archive.market_type, archive.symbol, archive.interval), []).append(archive)
+
+    reports: List[Dict[str, Any]] = []
+    for (market, symbol, interval), archives in sorted(series.items()):
+        archives = _without_contained(sorted(archives, key=lambda a: (a.start_ms, -a.end_ms)))
+        step = INTERVAL_MS[interval]
+        # Archives only contain closed candles, but never claim the open one as covered
+        cover_end = (int(time.time() * 1000) // step) * step
+        ranges = merge_ranges([(a.start_ms, min(a.end_ms, cover_end)) for a in archives])
+        validator = SeriesValidator(interval, strict=strict)
+        chunks = _series_chunks(archives, validator, cover_end, chunk_rows)
+
+        error = None
+        stored_rows = None
+        try:
+            if dry_run:
+                for _ in chunks:
+                    pass
+            else:
+                stored_rows = store.import_sorted(symbol, interval, chunks, ranges, market_type=market)
+        except ValueError as e:
+            if not strict:
+                raise
+            error = str(e)
+
+        reports.append({
+            'symbol': symbol,
+            'interval': interval,
+            'market_type': market,
+            'archives': len(archives),
+            'rows': validator.rows,
+            'stored_rows': stored_rows,
+            'duplicates': validator.duplicates,
+            'out_of_order': validator.out_of_order,
+            'gaps': validator.gaps,
+            'missing_candles': validator.missing_candles,
+            'gap_ranges': validator.gap_ranges,
+            'ranges': [] if error else ranges,
+            'error': error,
+        })
+    return reports
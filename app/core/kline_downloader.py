@@ -0,0 +1,161 @@
+"""Concurrent downloader for the public Binance klines endpoint.
+
+Page start times are computed up front from the interval, so pages can be
+fetched in parallel (bounded by a semaphore) over one pooled HTTP client and
+reassembled in order. Every page takes its request weight from the shared
+Binance rate limiter first, so downloads stay within the per-IP budget
+together with all other Binance callers.
+"""
+import os
+import asyncio
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.core.binance_rate_limiter import get_binance_rate_limiter
+from app.core.kline_store import INTERVAL_MS
+
+KLINES_URLS = {
+    'spot': "https://api.binance.com/api/v3/klines",
+    'futures': "https://fapi.binance.com/fapi/v1/klines",
+}
+KLINES_PAGE_LIMIT = 1000
+KLINE_DOWNLOAD_CONCURRENCY = int(os.getenv("KLINE_DOWNLOAD_CONCURRENCY", "8"))
+KLINE_DOWNLOAD_RETRIES = int(os.getenv("KLINE_DOWNLOAD_RETRIES", "3"))
+
+# Request weight of one klines call with limit=1000 (spot: 2, futures: 5)
+KLINES_PAGE_WEIGHT = {'spot': 2, 'futures': 5}
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Long-lived pooled client for the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(10.0),
+            limits=httpx.Limits(max_connections=KLINE_DOWNLOAD_CONCURRENCY * 2,
+                                max_keepalive_connections=KLINE_DOWNLOAD_CONCURRENCY),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def close_http_client():
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def page_ranges(start_ms: int, end_ms: int, interval: str, limit: int = KLINES_PAGE_LIMIT) -> List[Tuple[int, int]]:
+    """Split [start_ms, end_ms) into pages of at most ``limit`` candles"""
+    span = INTERVAL_MS[interval] * limit
+    return [(page_start, min(page_start + span, end_ms)) for page_start in range(start_ms, end_ms, span)]
+
+
+async def _fetch_page(client: httpx.AsyncClient, market: str, params: Dict[str, Any]) -> Optional[List[list]]:
+    limiter = get_binance_rate_limiter()
+    for attempt in range(KLINE_DOWNLOAD_RETRIES + 1):
+        await limiter.acquire(market, KLINES_PAGE_WEIGHT[market])
+        try:
+            response = await client.get(KLINES_URLS[market], params=params)
+        except httpx.HTTPError as e:
+            print(f"⚠️ Kline page request failed: {e}")
+            await asyncio.sleep(0.5 * (attempt + 1))
+            continue
+        await limiter.observe(market, response.status_code, response.headers)
+        if response.status_code == 200:
+            return response.json()
+        if response.status_code in (418, 429):
+            # The limiter now holds every caller back until Binance allows requests again
+            print(f"⏳ Binance rate limit ({response.status_code}), retrying")
+            continue
+        print(f"❌ API error: {response.status_code}")
+        return None
+    return None
+
+
+async def _download_sequential(client: httpx.AsyncClient, market: str, symbol: str, interval: str,
+                               start_ms: int, end_ms: int) -> Tuple[List[list], bool]:
+    """Cursor paging for calendar intervals (1M) whose page bounds can't be precomputed"""
+    rows: List[list] = []
+    cursor = start_ms
+    while cursor < end_ms:
+        page = await _fetch_page(client, market, {
+            'symbol': symbol, 'interval': interval, 'startTime': cursor,
+            'endTime': end_ms - 1, 'limit': KLINES_PAGE_LIMIT,
+        })
+        if page is None:
+            return rows, False
+        if not page:
+            break
+        rows.extend(page)
+        cursor = page[-1][0] + 1
+    return rows, True
+
+
+async def download_klines(symbol: str, interval: str, start_ms: int, end_ms: int, market_type: str = "spot",
+                          client: Optional[httpx.AsyncClient] = None,
+                          concurrency: Optional[int] = None) -> Tuple[List[list], bool]:
+    """Raw kline rows with open time in [start_ms, end_ms), in order.
+
+    Returns the rows and whether the whole range was downloaded. On a failed
+    page only the pages before it are returned, marked incomplete, and the
+    pages after it are cancelled so they don't spend request weight.
+    """
+    market = 'futures' if market_type.lower() == 'futures' else 'spot'
+    client = client or get_http_client()
+    if interval not in INTERVAL_MS:
+        return await _download_sequential(client, market, symbol, interval, start_ms, end_ms)
+
+    pages = page_ranges(start_ms, end_ms, interval)
+    semaphore = asyncio.Semaphore(max(1, concurrency or KLINE_DOWNLOAD_CONCURRENCY))
+    tasks: List["asyncio.Task[Optional[List[list]]]"] = []
+    done = 0
+    failed_at = len(pages)
+
+    def stop_after(index: int):
+        # Pages after a failed one would be thrown away anyway
+        nonlocal failed_at
+        if index < failed_at:
+            failed_at = index
+            for task in tasks[index + 1:]:
+                task.cancel()
+
+    async def fetch(index: int, page_start: int, page_end: int) -> Optional[List[list]]:
+        nonlocal done
+        async with semaphore:
+            if index > failed_at:
+                return None
+            try:
+                page = await _fetch_page(client, market, {
+                    'symbol': symbol, 'interval': interval, 'startTime': page_start,
+                    'endTime': page_end - 1, 'limit': KLINES_PAGE_LIMIT,
+                })
+            except Exception:
+                stop_after(index)
+                raise
+        if page is None:
+            stop_after(index)
+            return None
+        done += 1
+        if done % 20 == 0 or done == len(pages):
+            print(f"📊 Progress: {done}/{len(pages)} pages ({symbol} {interval})")
+        return page
+
+    tasks.extend(asyncio.create_task(fetch(index, page_start, page_end))
+                 for index, (page_start, page_end) in enumerate(pages))
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    rows: List[list] = []
+    for page in results:
+        if isinstance(page, Exception):
+            raise page
+        if page is None or isinstance(page, BaseException):
+            # Failed, or cancelled after an earlier page failed
+            return rows, False
+        rows.extend(page)
+    return rows, True
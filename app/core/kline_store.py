@@ -0,0 +1,407 @@
+import os
+import json
+import shutil
+import time
+import asyncio
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.core.cache import CACHE_FILL_LOCK_TIMEOUT, ColumnDirWriter, write_column_dir, write_json_atomic
+from app.core.file_lock import LOCK_DIR_NAME, FileLock, FileLockTimeout
+from app.core.memory_cache import KlineMemoryCache, get_kline_memory_cache
+
+# Fixed-length Binance intervals in milliseconds (1M is calendar based and not stored here)
+INTERVAL_MS: Dict[str, int] = {
+    '1m': 60_000, '3m': 180_000, '5m': 300_000, '15m': 900_000, '30m': 1_800_000,
+    '1h': 3_600_000, '2h': 7_200_000, '4h': 14_400_000, '6h': 21_600_000, '8h': 28_800_000,
+    '12h': 43_200_000, '1d': 86_400_000, '3d': 259_200_000, '1w': 604_800_000,
+}
+
+# fetch(symbol, interval, start_ms, end_ms, market_type) -> (klines, complete)
+KlineFetcher = Callable[[str, str, int, int, str], Awaitable[Tuple[pd.DataFrame, bool]]]
+
+Range = Tuple[int, int]
+
+# Reads that race a concurrent directory swap are retried this often
+LOAD_ATTEMPTS = 3
+LOAD_RETRY_SECONDS = 0.05
+
+
+def merge_ranges(ranges: List[Range]) -> List[Range]:
+    """Sort and merge overlapping/adjacent half-open [start, end) ranges"""
+    merged: List[List[int]] = []
+    for start, end in sorted(r for r in ranges if r[1] > r[0]):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def missing_ranges(covered: List[Range], start: int, end: int) -> List[Range]:
+    """Parts of [start, end) not inside any covered range"""
+    gaps: List[Range] = []
+    cursor = start
+    for range_start, range_end in merge_ranges(covered):
+        if range_end <= cursor:
+            continue
+        if range_start >= end:
+            break
+        if range_start > cursor:
+            gaps.append((cursor, range_start))
+        cursor = max(cursor, range_end)
+        if cursor >= end:
+            break
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+def _timestamps_ms(df: pd.DataFrame) -> np.ndarray:
+    return pd.DatetimeIndex(df['timestamp']).asi8 // 1_000_000
+
+
+# Intervals up to 1d open on multiples of their length since the epoch, so they can be
+# rebuilt from any finer interval that divides them (3d/1w use other anchors)
+RESAMPLE_MAX_STEP = INTERVAL_MS['1d']
+
+# Columns summed when aggregating candles (open/high/low/close and times are handled separately)
+SUM_COLUMNS = ('volume', 'quote_volume', 'trades', 'taker_base', 'taker_quote')
+
+
+def resample_sources(interval: str) -> List[str]:
+    """Finer intervals ``interval`` can be built from, coarsest first"""
+    step = INTERVAL_MS.get(interval)
+    if step is None or step > RESAMPLE_MAX_STEP:
+        return []
+    return sorted((name for name, fine in INTERVAL_MS.items() if fine < step and step % fine == 0),
+                  key=lambda name: -INTERVAL_MS[name])
+
+
+def resample_klines(df: pd.DataFrame, interval: str) -> pd.DataFrame:
+    """Aggregate sorted finer candles into ``interval`` candles (Binance semantics).
+
+    open/high/low/close take first/max/min/last, volume, quote volume, trade
+    count and taker volumes are summed, close_time is the bucket's last ms.
+    """
+    step = INTERVAL_MS[interval]
+    if df.empty:
+        return df.iloc[0:0].copy()
+
+    opens = _timestamps_ms(df)
+    buckets = opens // step
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(df)]
+    bucket_open = buckets[starts] * step
+
+    out: Dict[str, Any] = {'timestamp': pd.to_datetime(bucket_open, unit='ms')}
+    for name in df.columns:
+        if name == 'timestamp':
+            continue
+        values = df[name].to_numpy()
+        if name == 'open':
+            out[name] = values[starts]
+        elif name == 'close':
+            out[name] = values[ends - 1]
+        elif name == 'high':
+            out[name] = np.maximum.reduceat(values, starts)
+        elif name == 'low':
+            out[name] = np.minimum.reduceat(values, starts)
+        elif name == 'close_time':
+            out[name] = (bucket_open + step - 1).astype(values.dtype)
+        elif name in SUM_COLUMNS:
+            out[name] = np.add.reduceat(values, starts)
+        else:
+            out[name] = values[ends - 1]
+    return pd.DataFrame(out)
+
+
+class KlineStore:
+    """Contiguous kline history per (market_type, symbol, interval).
+
+    Candles are kept sorted and de-duplicated in per-column ``.npy`` files,
+    together with the list of time ranges that were fully downloaded. Any
+    sub-range is served by slicing; only the uncovered gaps are fetched.
+    Unfinished candles (at or after the current open candle) are never stored.
+    """
+
+    _locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Lock]]" = weakref.WeakKeyDictionary()
+
+    def __init__(self, store_dir: str = "cache/klines", memory: Optional[KlineMemoryCache] = None):
+        self.store_dir = store_dir
+        self.memory = memory if memory is not None else get_kline_memory_cache()
+        os.makedirs(store_dir, exist_ok=True)
+
+    @staticmethod
+    def supports(interval: str) -> bool:
+        return interval in INTERVAL_MS
+
+    def _key(self, symbol: str, interval: str, market_type: str) -> str:
+        return f"{market_type.lower()}_{symbol.upper()}_{interval}"
+
+    def _data_path(self, key: str) -> str:
+        return os.path.join(self.store_dir, key)
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.store_dir, f"{key}_meta.json")
+
+    def _lock(self, key: str) -> asyncio.Lock:
+        locks = self._locks.setdefault(asyncio.get_running_loop(), {})
+        if key not in locks:
+            locks[key] = asyncio.Lock()
+        return locks[key]
+
+    def _file_lock(self, key: str) -> FileLock:
+        return FileLock(os.path.join(self.store_dir, LOCK_DIR_NAME, f"{key}.lock"), timeout=CACHE_FILL_LOCK_TIMEOUT)
+
+    def _read_meta(self, key: str) -> Dict[str, Any]:
+        try:
+            with open(self._meta_path(key), 'r') as f:
+                return json.load(f)
+        except Exception:
+            return {'ranges': [], 'columns': {}}
+
+    def covered_ranges(self, symbol: str, interval: str, market_type: str = "spot") -> List[Range]:
+        meta = self._read_meta(self._key(symbol, interval, market_type))
+        return [(int(start), int(end)) for start, end in meta.get('ranges', [])]
+
+    def clear(self):
+        """Remove every stored series"""
+        self.memory.clear()
+        for name in os.listdir(self.store_dir):
+            path = os.path.join(self.store_dir, name)
+            if name == LOCK_DIR_NAME:
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            elif name.endswith('.json'):
+                os.remove(path)
+
+    def _load(self, key: str, columns: Optional[List[str]] = None,
+              use_memory: bool = True) -> Optional[Dict[str, np.ndarray]]:
+        # Readers don't take the fill lock. A concurrent fill swaps the column
+        # directory with two renames (see replace_dir), so it can be missing for a
+        # moment, or a read can mix old and new files; both are retried.
+        for attempt in range(LOAD_ATTEMPTS):
+            meta = self._read_meta(key)
+            available = list(meta.get('columns', {}).keys())
+            if not available:
+                return None
+            names = [c for c in (columns or available) if c in available]
+            if 'timestamp' not in names:
+                names.insert(0, 'timestamp')
+
+            # Stored candles are final, so the series only changes when updated_at does
+            memory_key = ('klines', os.path.abspath(self.store_dir), key)
+            arrays = self.memory.get(memory_key, names, version=meta.get('updated_at')) if use_memory else None
+            if arrays is not None:
+                return arrays
+            try:
+                arrays = {
+                    name: np.load(os.path.join(self._data_path(key), f"{name}.npy"), mmap_mode='r',
+                                  allow_pickle=False)
+                    for name in names
+                }
+            except FileNotFoundError:
+                arrays = None
+            if arrays is not None and len({len(values) for values in arrays.values()}) == 1:
+                if use_memory:
+                    self.memory.put(memory_key, arrays, version=meta.get('updated_at'),
+                                    complete=len(names) == len(available))
+                return arrays
+            if attempt + 1 < LOAD_ATTEMPTS:
+                time.sleep(LOAD_RETRY_SECONDS)
+        return None
+
+    def read_range(self, symbol: str, interval: str, start_ms: int, end_ms: int, market_type: str = "spot",
+                   columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """Stored candles with open time in [start_ms, end_ms), regardless of coverage"""
+        arrays = self._load(self._key(symbol, interval, market_type), columns)
+        if arrays is None:
+            return None
+        timestamps_ms = arrays['timestamp'].astype('datetime64[ms]').astype(np.int64)
+        lo = int(np.searchsorted(timestamps_ms, start_ms, side='left'))
+        hi = int(np.searchsorted(timestamps_ms, end_ms, side='left'))
+        return pd.DataFrame({name: np.array(values[lo:hi]) for name, values in arrays.items()})
+
+    def _merge(self, key: str, frames: List[pd.DataFrame], ranges: List[Range]):
+        existing = self._load(key, use_memory=False)
+        parts = []
+        if existing is not None:
+            parts.append(pd.DataFrame({name: np.array(values) for name, values in existing.items()}))
+        parts.extend(frame for frame in frames if len(frame))
+
+        if parts:
+            merged = pd.concat(parts, ignore_index=True)
+            merged['timestamp'] = pd.to_datetime(merged['timestamp'])
+            # Newer downloads win over stored duplicates
+            merged = merged.drop_duplicates(subset='timestamp', keep='last').sort_values('timestamp', kind='stable')
+            dtypes = write_column_dir(self._data_path(key), merged.reset_index(drop=True))
+            rows = len(merged)
+        else:
+            dtypes = self._read_meta(key).get('columns', {})
+            rows = 0
+
+        meta = {
+            'ranges': [list(r) for r in merge_ranges(ranges)],
+            'columns': dtypes,
+            'rows': rows,
+            'updated_at': time.time(),
+        }
+        write_json_atomic(self._meta_path(key), meta)
+
+    def import_sorted(self, symbol: str, interval: str, chunks: Iterable[pd.DataFrame], ranges: List[Range],
+                      market_type: str = "spot") -> int:
+        """Stream candles into a series and mark ``ranges`` as covered; returns the stored row count.
+
+        ``chunks`` must be in open-time order without duplicates across
+        chunks. They are merged with the stored series one chunk at a time
+        (imported candles win over stored ones with the same open time), so
+        memory stays bounded by the chunk size. If iterating ``chunks``
+        raises, the stored series is left unchanged.
+        """
+        if not self.supports(interval):
+            raise ValueError(f"Interval {interval} is not supported by the kline store")
+
+        key = self._key(symbol, interval, market_type)
+        with self._file_lock(key):
+            existing = self._load(key, use_memory=False)
+            # Stored timestamps are datetime64[ns]; compare as int64 ns without copying the mmap
+            existing_ns = existing['timestamp'].view(np.int64) if existing is not None else np.empty(0, np.int64)
+            writer = ColumnDirWriter(self._data_path(key))
+            cursor = 0
+            try:
+                if existing is not None:
+                    # Fix the stored column order and dtypes before any imported rows
+                    writer.append({name: values[:0] for name, values in existing.items()})
+                for chunk in chunks:
+                    if chunk.empty:
+                        continue
+                    chunk_ns = pd.DatetimeIndex(chunk['timestamp']).asi8
+                    lo = int(np.searchsorted(existing_ns, chunk_ns[0], side='left'))
+                    hi = int(np.searchsorted(existing_ns, chunk_ns[-1], side='right'))
+                    if lo > cursor:
+                        writer.append({name: values[cursor:lo] for name, values in existing.items()})
+                    if hi > lo:
+                        stored = pd.DataFrame({name: np.array(values[lo:hi]) for name, values in existing.items()})
+                        chunk = pd.concat([stored, chunk[list(existing.keys())]], ignore_index=True)
+                        chunk['timestamp'] = pd.to_datetime(chunk['timestamp'])
+                        chunk = chunk.drop_duplicates(subset='timestamp', keep='last').sort_values(
+                            'timestamp', kind='stable')
+                    writer.append(chunk)
+                    cursor = max(cursor, hi)
+                if existing is not None and cursor < len(existing_ns):
+                    writer.append({name: values[cursor:] for name, values in existing.items()})
+            except BaseException:
+                writer.abort()
+                raise
+
+            meta = self._read_meta(key)
+            if writer.dtypes:
+                dtypes = writer.commit()
+            else:
+                writer.abort()
+                dtypes = meta.get('columns', {})
+            write_json_atomic(self._meta_path(key), {
+                'ranges': [list(r) for r in merge_ranges(
+                    [tuple(r) for r in meta.get('ranges', [])] + list(ranges))],
+                'columns': dtypes,
+                'rows': writer.rows,
+                'updated_at': time.time(),
+            })
+        return writer.rows
+
+    def _fill_from_finer(self, symbol: str, interval: str, market_type: str, gaps: List[Range],
+                         frames: List[pd.DataFrame], ranges: List[Range]) -> List[Range]:
+        """Resample what finer stored series cover; returns the gaps still to download.
+
+        Resampled candles are appended to ``frames`` and their ranges to
+        ``ranges`` so they are stored like downloaded ones.
+        """
+        step = INTERVAL_MS[interval]
+        for source in resample_sources(interval):
+            if not gaps:
+                break
+            source_ranges = self.covered_ranges(symbol, source, market_type)
+            if not source_ranges:
+                continue
+            filled: List[Range] = []
+            for gap_start, gap_end in gaps:
+                for covered_start, covered_end in source_ranges:
+                    # A bucket is only complete when the finer series covers all of it
+                    piece_start = gap_start if covered_start <= gap_start else -(-covered_start // step) * step
+                    piece_end = min(gap_end, (covered_end // step) * step)
+                    if piece_end <= piece_start:
+                        continue
+                    first_open = -(-piece_start // step) * step
+                    last_open_end = -(-piece_end // step) * step
+                    fine = self.read_range(symbol, source, first_open, last_open_end, market_type)
+                    if fine is None:
+                        continue
+                    frames.append(resample_klines(fine, interval))
+                    filled.append((piece_start, piece_end))
+            if filled:
+                print(f"🧮 Resampled {symbol} {interval} [{market_type}] from stored {source} candles")
+                ranges.extend(filled)
+                gaps = [gap for gap_start, gap_end in gaps for gap in missing_ranges(filled, gap_start, gap_end)]
+        return gaps
+
+    async def get_range(self, symbol: str, interval: str, start_ms: int, end_ms: int, fetch: KlineFetcher,
+                        market_type: str = "spot", columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """Candles in [start_ms, end_ms), downloading only the uncovered gaps.
+
+        Returns None when the interval is not supported or a gap could not be
+        fetched completely (successfully fetched gaps are still stored).
+        """
+        if not self.supports(interval):
+            return None
+
+        key = self._key(symbol, interval, market_type)
+        step = INTERVAL_MS[interval]
+        # Candles opening at or after this point may still change
+        final_end = (int(time.time() * 1000) // step) * step
+        cover_end = min(end_ms, final_end)
+
+        # In-process lock first, then the cross-process one: exactly one fetcher per series
+        try:
+            async with self._lock(key), self._file_lock(key):
+                ranges = self.covered_ranges(symbol, interval, market_type)
+                gaps = missing_ranges(ranges, start_ms, cover_end) if cover_end > start_ms else []
+                frames: List[pd.DataFrame] = []
+                complete = True
+                if gaps:
+                    # Reading and resampling finer series can touch millions of rows
+                    gaps = await asyncio.to_thread(self._fill_from_finer, symbol, interval, market_type, gaps,
+                                                   frames, ranges)
+                for gap_start, gap_end in gaps:
+                    print(f"📥 Kline store gap: {symbol} {interval} [{market_type}] "
+                          f"{pd.Timestamp(gap_start, unit='ms')} -> {pd.Timestamp(gap_end, unit='ms')}")
+                    df, gap_complete = await fetch(symbol, interval, gap_start, gap_end, market_type)
+                    if not gap_complete:
+                        complete = False
+                        break
+                    if len(df):
+                        opens = _timestamps_ms(df)
+                        df = df[(opens >= gap_start) & (opens < gap_end)]
+                    frames.append(df)
+                    ranges.append((gap_start, gap_end))
+
+                if frames:
+                    # Merging rewrites the whole series: keep it off the event loop
+                    await asyncio.to_thread(self._merge, key, frames, ranges)
+        except FileLockTimeout:
+            # Another process is still filling this series; serve what it already
+            # stored, but never download and write without the lock
+            ranges = self.covered_ranges(symbol, interval, market_type)
+            gaps = missing_ranges(ranges, start_ms, cover_end) if cover_end > start_ms else []
+            complete = not gaps
+
+        if not complete:
+            return None
+        if not gaps:
+            print(f"📦 Kline store hit: {symbol} {interval} [{market_type}]")
+        df = await asyncio.to_thread(self.read_range, symbol, interval, start_ms, end_ms, market_type, columns)
+        return df if df is not None else pd.DataFrame(columns=pd.Index(columns or ['timestamp']))
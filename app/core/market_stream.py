@@ -0,0 +1,342 @@
+"""WebSocket market-data ingestion for the live bots.
+
+A standalone process (``scripts/market_data_stream.py``) subscribes to the
+Binance kline and bookTicker streams of every symbol an active bot trades
+and mirrors them into Redis:
+
+* ``market:{market}:{SYMBOL}:{interval}:closed``: a list of the last
+  ``MARKET_STREAM_WINDOW`` closed candles ``[open_time, o, h, l, c, v]``
+* ``market:{market}:{SYMBOL}:{interval}:live``: the candle in progress
+* ``market:{market}:{SYMBOL}:ticker``: the last trade price, best bid/ask
+  and the time of the last update
+
+Each closed candle is also published on ``MARKET_CANDLE_CHANNEL``. Bot tasks
+call ``read_stream_snapshot`` and get the same ``{'price', 'closes'}`` shape
+as the REST fetch. When the stream data is missing, stale or has gaps they
+get ``None`` and fall back to REST. Live candle and ticker updates arrive
+many times a second, so they are coalesced in memory and written every
+``MARKET_STREAM_FLUSH_SECONDS``. Their keys expire, so a dead ingestion
+process can never feed bots old prices.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import websockets
+
+from app.core.kline_downloader import download_klines
+from app.core.kline_store import INTERVAL_MS
+from app.core.redis_client import get_redis_sync
+
+logger = logging.getLogger(__name__)
+
+MARKET_STREAM_URLS = {
+    'spot': os.getenv("MARKET_STREAM_SPOT_URL", "wss://stream.binance.com:9443"),
+    'futures': os.getenv("MARKET_STREAM_FUTURES_URL", "wss://fstream.binance.com"),
+}
+MARKET_STREAM_WINDOW = int(os.getenv("MARKET_STREAM_WINDOW", "500"))
+MARKET_STREAM_FLUSH_SECONDS = float(os.getenv("MARKET_STREAM_FLUSH_SECONDS", "0.5"))
+# Bots only trust stream prices younger than this
+MARKET_STREAM_MAX_AGE_SECONDS = float(os.getenv("MARKET_STREAM_MAX_AGE_SECONDS", "15"))
+# How often the ingestion process re-reads the set of symbols used by active bots
+MARKET_STREAM_REFRESH_SECONDS = float(os.getenv("MARKET_STREAM_REFRESH_SECONDS", "60"))
+# Streams per connection (futures allows 200, spot 1024)
+MARKET_STREAM_MAX_STREAMS = int(os.getenv("MARKET_STREAM_MAX_STREAMS", "200"))
+MARKET_CANDLE_CHANNEL = "market:candle_closed"
+
+_LIVE_TTL_SECONDS = 120
+_RECONNECT_MAX_SECONDS = 30.0
+
+# (market, SYMBOL, interval)
+StreamTarget = Tuple[str, str, str]
+Candle = List[Any]
+
+
+def normalize_symbol(symbol: str) -> str:
+    return symbol.replace('/', '').upper()
+
+
+def market_of(position_type: Optional[str]) -> str:
+    return 'futures' if (position_type or '').lower() == 'futures' else 'spot'
+
+
+def _key(market: str, symbol: str, *parts: str) -> str:
+    return ":".join(("market", market, symbol) + parts)
+
+
+def stream_names(targets: Iterable[StreamTarget]) -> List[str]:
+    """Combined-stream names for the targets: one kline stream each, one bookTicker per symbol"""
+    names: List[str] = []
+    for _, symbol, interval in sorted(set(targets)):
+        lower = symbol.lower()
+        for name in (f"{lower}@kline_{interval}", f"{lower}@bookTicker"):
+            if name not in names:
+                names.append(name)
+    return names
+
+
+class MarketStreamStore:
+    """Redis layout shared by the ingestion process (writer) and bot workers (reader)"""
+
+    def __init__(self, redis_client: Any = None, window: int = MARKET_STREAM_WINDOW):
+        self._redis = redis_client
+        self.window = window
+
+    @property
+    def redis(self):
+        return self._redis if self._redis is not None else get_redis_sync()
+
+    def replace_closed(self, market: str, symbol: str, interval: str, candles: List[Candle]):
+        key = _key(market, symbol, interval, 'closed')
+        pipe = self.redis.pipeline()
+        pipe.delete(key)
+        if candles:
+            pipe.rpush(key, *(json.dumps(c) for c in candles[-self.window:]))
+        pipe.execute()
+
+    def last_closed_open_time(self, market: str, symbol: str, interval: str) -> Optional[int]:
+        raw = self.redis.lindex(_key(market, symbol, interval, 'closed'), -1)
+        return int(json.loads(raw)[0]) if raw else None
+
+    def append_closed(self, market: str, symbol: str, interval: str, candle: Candle, reset: bool = False):
+        """Append a closed candle (``reset`` drops a window that would otherwise have a gap) and announce it"""
+        key = _key(market, symbol, interval, 'closed')
+        pipe = self.redis.pipeline()
+        if reset:
+            pipe.delete(key)
+        pipe.rpush(key, json.dumps(candle))
+        pipe.ltrim(key, -self.window, -1)
+        pipe.publish(MARKET_CANDLE_CHANNEL, json.dumps({
+            'market': market, 'symbol': symbol, 'interval': interval, 'candle': candle,
+        }))
+        pipe.execute()
+
+    def write_updates(self, live: Dict[StreamTarget, Candle], tickers: Dict[Tuple[str, str], Dict[str, Any]]):
+        pipe = self.redis.pipeline()
+        for (market, symbol, interval), candle in live.items():
+            pipe.set(_key(market, symbol, interval, 'live'), json.dumps(candle), ex=_LIVE_TTL_SECONDS)
+        for (market, symbol), ticker in tickers.items():
+            key = _key(market, symbol, 'ticker')
+            pipe.hset(key, mapping={k: v for k, v in ticker.items() if v is not None})
+            pipe.expire(key, _LIVE_TTL_SECONDS)
+        pipe.execute()
+
+    def read_snapshot(self, market: str, symbol: str, interval: str, limit: int,
+                      max_age_seconds: float = MARKET_STREAM_MAX_AGE_SECONDS) -> Optional[Dict[str, Any]]:
+        """Last price, ``limit`` closes and their open times (``limit - 1`` closed candles plus the live one), as REST returns them"""
+        step = INTERVAL_MS.get(interval)
+        if step is None or limit < 1:
+            return None
+        pipe = self.redis.pipeline()
+        pipe.hgetall(_key(market, symbol, 'ticker'))
+        pipe.get(_key(market, symbol, interval, 'live'))
+        if limit > 1:
+            pipe.lrange(_key(market, symbol, interval, 'closed'), -(limit - 1), -1)
+        results = pipe.execute()
+        ticker, live_raw = results[0], results[1]
+        closed_raw = results[2] if limit > 1 else []
+
+        if not ticker or 'price' not in ticker or not live_raw:
+            return None
+        now_ms = time.time() * 1000
+        max_age_ms = max_age_seconds * 1000
+        live = json.loads(live_raw)
+        # Stale if the stream went quiet or the live candle should already have closed
+        if now_ms - float(ticker.get('ts', 0)) > max_age_ms or now_ms > int(live[0]) + step + max_age_ms:
+            return None
+        closed = [json.loads(raw) for raw in closed_raw]
+        if len(closed) < limit - 1:
+            return None
+        # The window must run without gaps right up to the live candle
+        expected = int(live[0]) - step * len(closed)
+        for candle in closed:
+            if int(candle[0]) != expected:
+                return None
+            expected += step
+        candles = closed + [live]
+        return {'price': float(ticker['price']), 'closes': [float(c[4]) for c in candles],
+                'open_times': [int(c[0]) for c in candles]}
+
+
+_store: Optional[MarketStreamStore] = None
+
+
+def get_market_stream_store() -> MarketStreamStore:
+    global _store
+    if _store is None:
+        _store = MarketStreamStore()
+    return _store
+
+
+def read_stream_snapshot(symbol: str, position_type: Optional[str], interval: str,
+                         limit: int) -> Optional[Dict[str, Any]]:
+    """Market snapshot from the ingestion process, or ``None`` (fall back to REST)"""
+    try:
+        return get_market_stream_store().read_snapshot(market_of(position_type), normalize_symbol(symbol),
+                                                       interval, limit)
+    except Exception as e:
+        logger.warning(f"Market stream read failed for {symbol}: {e}")
+        return None
+
+
+def _candle(k: Dict[str, Any]) -> Candle:
+    return [int(k['t']), float(k['o']), float(k['h']), float(k['l']), float(k['c']), float(k['v'])]
+
+
+# seed(market, symbol, interval, window) -> closed candles, oldest first
+Seeder = Callable[[str, str, str, int], Any]
+
+
+async def rest_seed(market: str, symbol: str, interval: str, window: int) -> List[Candle]:
+    """Fill the window from the public klines endpoint (weight is paid once per (re)connect)"""
+    now_ms = int(time.time() * 1000)
+    step = INTERVAL_MS[interval]
+    current_open = now_ms - now_ms % step
+    rows, _ = await download_klines(symbol, interval, current_open - window * step, current_open, market)
+    return [[int(r[0]), float(r[1]), float(r[2]), float(r[3]), float(r[4]), float(r[5])] for r in rows]
+
+
+class MarketStreamService:
+    """Keeps the Redis market data of ``targets()`` current from Binance streams"""
+
+    def __init__(self, targets: Callable[[], Set[StreamTarget]], store: Optional[MarketStreamStore] = None,
+                 urls: Optional[Dict[str, str]] = None, seed: Optional[Seeder] = rest_seed,
+                 flush_seconds: float = MARKET_STREAM_FLUSH_SECONDS,
+                 refresh_seconds: float = MARKET_STREAM_REFRESH_SECONDS,
+                 max_streams: int = MARKET_STREAM_MAX_STREAMS):
+        self.targets = targets
+        self.store = store or get_market_stream_store()
+        self.urls = urls or MARKET_STREAM_URLS
+        self.seed = seed
+        self.flush_seconds = flush_seconds
+        self.refresh_seconds = refresh_seconds
+        self.max_streams = max(2, max_streams)
+        self._last_closed: Dict[StreamTarget, Optional[int]] = {}
+        self._live: Dict[StreamTarget, Candle] = {}
+        self._tickers: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    async def run(self, stop: Optional[asyncio.Event] = None):
+        """Stream until ``stop`` is set, reconnecting whenever the bots' symbol set changes"""
+        stop = stop or asyncio.Event()
+        while not stop.is_set():
+            current = await asyncio.to_thread(self.targets)
+            tasks = [asyncio.create_task(self._watch_targets(current, stop))]
+            if current:
+                print(f"📡 Streaming {len(current)} series: {', '.join(sorted(f'{m}:{s}:{i}' for m, s, i in current))}")
+                tasks.append(asyncio.create_task(self._flush_loop()))
+                tasks.extend(asyncio.create_task(self._connection(market, chunk))
+                             for market, chunk in self._connections(current))
+            try:
+                await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                await self.flush()
+
+    def _connections(self, targets: Set[StreamTarget]) -> List[Tuple[str, List[StreamTarget]]]:
+        connections: List[Tuple[str, List[StreamTarget]]] = []
+        for market in sorted({t[0] for t in targets}):
+            chunk: List[StreamTarget] = []
+            for target in sorted(t for t in targets if t[0] == market):
+                if len(stream_names(chunk + [target])) > self.max_streams:
+                    connections.append((market, chunk))
+                    chunk = []
+                chunk.append(target)
+            if chunk:
+                connections.append((market, chunk))
+        return connections
+
+    async def _watch_targets(self, current: Set[StreamTarget], stop: asyncio.Event):
+        while True:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=self.refresh_seconds)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                latest = await asyncio.to_thread(self.targets)
+            except Exception as e:
+                logger.warning(f"Could not refresh stream targets: {e}")
+                continue
+            if latest != current:
+                return
+
+    async def _connection(self, market: str, targets: List[StreamTarget]):
+        url = f"{self.urls[market]}/stream?streams={'/'.join(stream_names(targets))}"
+        delay = 1.0
+        while True:
+            try:
+                async with websockets.connect(url, max_queue=4096) as ws:
+                    if self.seed is not None:
+                        await self._seed_window(targets)
+                    delay = 1.0
+                    async for raw in ws:
+                        await self.handle_message(market, raw)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Binance also drops every connection after 24h
+                print(f"⚠️ {market} market stream disconnected: {e}; reconnecting in {delay:.0f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, _RECONNECT_MAX_SECONDS)
+
+    async def _seed_window(self, targets: List[StreamTarget]):
+        for market, symbol, interval in targets:
+            try:
+                candles = await self.seed(market, symbol, interval, self.store.window)  # type: ignore[misc]
+            except Exception as e:
+                logger.warning(f"Seeding {market} {symbol} {interval} failed: {e}")
+                continue
+            await asyncio.to_thread(self.store.replace_closed, market, symbol, interval, candles)
+            self._last_closed[(market, symbol, interval)] = int(candles[-1][0]) if candles else None
+
+    async def handle_message(self, market: str, raw: Any):
+        try:
+            message = json.loads(raw)
+        except (TypeError, ValueError):
+            return
+        data = message.get('data', message)
+        if not isinstance(data, dict):
+            return
+        if 'k' in data:
+            k = data['k']
+            symbol = str(k['s']).upper()
+            target = (market, symbol, str(k['i']))
+            candle = _candle(k)
+            self._live[target] = candle
+            self._tickers.setdefault((market, symbol), {}).update({'price': candle[4], 'ts': int(time.time() * 1000)})
+            if k.get('x'):
+                await self._closed(target, candle)
+        elif 'b' in data and 'a' in data and 's' in data:
+            # Quotes keep the ticker fresh; the price itself stays the last trade (kline close)
+            self._tickers.setdefault((market, str(data['s']).upper()), {}).update(
+                {'bid': float(data['b']), 'ask': float(data['a']), 'ts': int(time.time() * 1000)})
+
+    async def _closed(self, target: StreamTarget, candle: Candle):
+        market, symbol, interval = target
+        if target not in self._last_closed:
+            self._last_closed[target] = await asyncio.to_thread(self.store.last_closed_open_time, *target)
+        last = self._last_closed[target]
+        if last is not None and candle[0] <= last:
+            return  # already stored (replayed after a reconnect)
+        reset = last is not None and candle[0] != last + INTERVAL_MS.get(interval, 0)
+        await asyncio.to_thread(self.store.append_closed, market, symbol, interval, candle, reset)
+        self._last_closed[target] = candle[0]
+
+    async def flush(self):
+        live, tickers = self._live, self._tickers
+        self._live, self._tickers = {}, {}
+        if live or tickers:
+            try:
+                await asyncio.to_thread(self.store.write_updates, live, tickers)
+            except Exception as e:
+                logger.warning(f"Market stream flush failed: {e}")
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            await self.flush()
@@ -0,0 +1,140 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Hashable, Iterable, Optional
+
+import numpy as np
+
+
+class _Entry:
+    __slots__ = ('arrays', 'nbytes', 'version', 'expires_at', 'complete')
+
+    def __init__(self, version: Any, expires_at: Optional[datetime], complete: bool):
+        self.arrays: Dict[str, np.ndarray] = {}
+        self.nbytes = 0
+        self.version = version
+        self.expires_at = expires_at
+        self.complete = complete
+
+
+class KlineMemoryCache:
+    """Per-process LRU of kline column arrays, bounded by total bytes.
+
+    Sits in front of the on-disk caches so a worker serving the same
+    symbol/interval again skips file I/O and parsing. Arrays are stored
+    read-only and shared between callers. Entries carry an optional
+    ``version`` (a changed version on disk is a miss) and ``expires_at``
+    (the disk cache's freshness rule for recent end dates).
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max(0, int(max_bytes))
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _drop(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry.nbytes
+
+    def get(self, key: Hashable, columns: Optional[Iterable[str]] = None,
+            version: Any = None) -> Optional[Dict[str, np.ndarray]]:
+        """Cached arrays for ``columns`` (all columns when None), or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry.version != version or
+                                      (entry.expires_at is not None and datetime.now() >= entry.expires_at)):
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+
+            if entry is not None:
+                if columns is None:
+                    arrays = dict(entry.arrays) if entry.complete else None
+                else:
+                    names = list(columns)
+                    arrays = {name: entry.arrays[name] for name in names} if all(
+                        name in entry.arrays for name in names) else None
+                if arrays is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return arrays
+
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, arrays: Dict[str, np.ndarray], version: Any = None,
+            expires_at: Optional[datetime] = None, complete: bool = False):
+        """Remember ``arrays`` (copied into memory, read-only); columns merge into a same-version entry"""
+        incoming = {}
+        for name, values in arrays.items():
+            array = np.array(values, copy=True)
+            array.setflags(write=False)
+            incoming[name] = array
+        nbytes = sum(a.nbytes for a in incoming.values())
+        if nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                self._drop(key)
+                entry = _Entry(version, expires_at, complete)
+                self._entries[key] = entry
+            else:
+                entry.complete = entry.complete or complete
+            for name, array in incoming.items():
+                previous = entry.arrays.get(name)
+                if previous is not None:
+                    entry.nbytes -= previous.nbytes
+                    self.current_bytes -= previous.nbytes
+                entry.arrays[name] = array
+                entry.nbytes += array.nbytes
+                self.current_bytes += array.nbytes
+            self._entries.move_to_end(key)
+
+            while self.current_bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def get_cache_info(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'memory_mb': round(self.current_bytes / (1024 * 1024), 2),
+                'max_mb': round(self.max_bytes / (1024 * 1024), 2),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+_kline_memory_cache: Optional[KlineMemoryCache] = None
+_kline_memory_cache_lock = threading.Lock()
+
+
+def get_kline_memory_cache() -> KlineMemoryCache:
+    """Process-wide memory tier shared by every DataCache / KlineStore instance"""
+    global _kline_memory_cache
+    with _kline_memory_cache_lock:
+        if _kline_memory_cache is None:
+            max_mb = float(os.getenv("KLINE_MEMORY_CACHE_MAX_MB", "256"))
+            _kline_memory_cache = KlineMemoryCache(max_bytes=int(max_mb * 1024 * 1024))
+        return _kline_memory_cache
@@ -13,6 +13,7 @@ import asyncio
 import os
 import logging
 from app.core.cache_warmup_tasks import warmup_futures_symbols_cache, warmup_spot_symbols_cache
+from app.core.kline_downloader import close_http_client
 
 app = FastAPI(title="TradeBot API")
 
@@ -69,6 +70,11 @@ async def startup_warmup_spot_cache():
                 logger.warning(f"Startup warm-up spot symbols cache failed: {e}")
         asyncio.create_task(_do_warmup_spot())
 
+# Paylaşılan kline HTTP istemcisini kapat
+@app.on_event("shutdown")
+async def shutdown_kline_http_client():
+    await close_http_client()
+
 # SSE: Bot durumu akışı (temel)
 @app.get("/api/v1/bots/{bot_config_id}/status-stream")
 async def bot_status_stream(bot_config_id: int, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_active_user)):
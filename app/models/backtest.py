@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON, Text, LargeBinary
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 from app.db_base import Base
 
@@ -32,6 +32,8 @@ class Backtest(Base):
     # Detailed results (JSON)
     daily_results = Column(JSON, nullable=True)
     monthly_results = Column(JSON, nullable=True)
+    # Trade-by-trade log, compressed columnar blob (see app.services.trade_log_codec); loaded only on demand
+    trade_log = deferred(Column(LargeBinary, nullable=True))
 
     # Metadata
     test_mode = Column(String, nullable=False, default="true")  # "true" or "false"
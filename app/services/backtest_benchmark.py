@@ -0,0 +1,175 @@
+"""Offline benchmark of the backtest pipeline on synthetic data.
+
+Each (size, interval) case runs in a fresh worker process, so its peak RSS
+is its own. Inside the case the data is generated with a fixed seed and
+``prepare_indicators``, ``run_simulation``, ``calculate_daily_pnl`` and the
+whole ``run_backtest`` are timed separately (best of ``repeat`` runs, with
+a cold indicator cache every time). Results are plain JSON so they can be
+stored as a baseline and compared by ``compare_results``.
+"""
+import asyncio
+import contextlib
+import io
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.core.indicator_cache import IndicatorCache
+from app.core.kline_store import INTERVAL_MS
+from app.services.backtest_service import BACKTEST_KLINE_COLUMNS, BacktestService
+from app.services.synthetic_data import generate_klines
+
+BENCHMARK_SIZES = (10_000, 100_000, 1_000_000, 5_000_000)
+BENCHMARK_INTERVALS = ('1m', '15m')
+BENCHMARK_STAGES = ('generate', 'prepare_indicators', 'simulation', 'calculate_daily_pnl', 'run_backtest')
+# A stage only counts as regressed when it got slower by more than this share...
+DEFAULT_TIME_TOLERANCE = 0.25
+# ...and by at least this many seconds, so timer noise on tiny stages never fails the gate
+MIN_REGRESSION_SECONDS = 0.05
+DEFAULT_RSS_TOLERANCE = 0.25
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _best_time(func: Callable[[], Any], repeat: int) -> Tuple[float, Any]:
+    best = float('inf')
+    result = None
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def run_case(size: int, interval: str, model: str = "gbm", seed: int = 42, repeat: int = 3,
+             parameters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Time every stage for one data size/interval in the current process"""
+    # The service logs every step; keep the benchmark output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        service = BacktestService()
+    params, leverage = service._normalize_parameters(parameters, verbose=False)
+    stages: Dict[str, float] = {}
+    start = datetime(2015, 1, 1)
+
+    def fresh_context():
+        service._daily_calc_context = service._build_daily_context(params, leverage, 'spot', 'BENCHUSDT',
+                                                                   collect_trades=False, log_trades=False)
+
+    def prepare():
+        service.indicator_cache = IndicatorCache()
+        return service.prepare_indicators(klines, params['ema_fast'], params['ema_slow'], params['rsi_period'])
+
+    def simulate():
+        fresh_context()
+        return service.run_simulation(indicators, params['max_daily_trades'])
+
+    def daily_pnl():
+        fresh_context()
+        return service.calculate_daily_pnl(indicators.groupby(indicators['timestamp'].dt.date),
+                                           params['max_daily_trades'])
+
+    async def historical_data(*args, **kwargs):
+        return klines
+
+    def end_to_end():
+        service.indicator_cache = IndicatorCache()
+        end_date = (start + pd.Timedelta(milliseconds=size * INTERVAL_MS[interval])).strftime("%Y-%m-%d")
+        return asyncio.run(service.run_backtest('BENCHUSDT', interval, start.strftime("%Y-%m-%d"), end_date,
+                                                params, log_trades=False))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        stages['generate'], klines = _best_time(
+            lambda: generate_klines(size, interval, start=start, model=model, seed=seed,
+                                    columns=BACKTEST_KLINE_COLUMNS), repeat)
+        stages['prepare_indicators'], indicators = _best_time(prepare, repeat)
+        stages['simulation'], simulated = _best_time(simulate, repeat)
+        stages['calculate_daily_pnl'], _ = _best_time(daily_pnl, repeat)
+        service.get_historical_data = historical_data  # offline: serve the synthetic klines
+        stages['run_backtest'], _ = _best_time(end_to_end, repeat)
+
+    return {
+        'size': size,
+        'interval': interval,
+        'model': model,
+        'seed': seed,
+        'stages': {
+            name: {'seconds': round(seconds, 6), 'candles_per_second': round(size / seconds, 1) if seconds else None}
+            for name, seconds in stages.items()
+        },
+        'total_trades': int(simulated['total_trades']),
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+    }
+
+
+def run_benchmark(sizes=BENCHMARK_SIZES, intervals=BENCHMARK_INTERVALS, model: str = "gbm", seed: int = 42,
+                  repeat: int = 3, isolate: bool = True,
+                  progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """Run every size x interval case; ``isolate`` gives each its own process"""
+    cases: List[Dict[str, Any]] = []
+    for interval in intervals:
+        for size in sizes:
+            if isolate:
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                    case = pool.submit(run_case, size, interval, model, seed, repeat).result()
+            else:
+                case = run_case(size, interval, model, seed, repeat)
+            cases.append(case)
+            if progress is not None:
+                progress(case)
+
+    return {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+        },
+        'repeat': repeat,
+        'cases': cases,
+    }
+
+
+def _case_key(case: Dict[str, Any]) -> Tuple[int, str, str]:
+    return int(case['size']), str(case['interval']), str(case.get('model', 'gbm'))
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any],
+                    time_tolerance: float = DEFAULT_TIME_TOLERANCE,
+                    rss_tolerance: float = DEFAULT_RSS_TOLERANCE) -> List[Dict[str, Any]]:
+    """Regressions of ``current`` against ``baseline`` (cases missing from either side are skipped)"""
+    baseline_cases = {_case_key(case): case for case in baseline.get('cases', [])}
+    regressions: List[Dict[str, Any]] = []
+    for case in current.get('cases', []):
+        reference = baseline_cases.get(_case_key(case))
+        if reference is None:
+            continue
+        label = {'size': case['size'], 'interval': case['interval']}
+        for stage, timing in case['stages'].items():
+            previous = reference['stages'].get(stage)
+            if not previous or not previous.get('seconds'):
+                continue
+            seconds, before = float(timing['seconds']), float(previous['seconds'])
+            if seconds > before * (1 + time_tolerance) and seconds - before >= MIN_REGRESSION_SECONDS:
+                regressions.append({**label, 'metric': f"{stage}.seconds", 'baseline': before,
+                                    'current': seconds, 'change': round(seconds / before - 1, 3)})
+        rss, rss_before = case.get('peak_rss_mb'), reference.get('peak_rss_mb')
+        if rss and rss_before and rss > rss_before * (1 + rss_tolerance):
+            regressions.append({**label, 'metric': 'peak_rss_mb', 'baseline': rss_before,
+                                'current': rss, 'change': round(rss / rss_before - 1, 3)})
+    return regressions
@@ -0,0 +1,410 @@
+"""NumPy kernels for the backtest simulation.
+
+These functions operate on whole indicator columns instead of per-candle
+``pd.Series`` rows. They must stay bit-identical to the per-row rules in
+``BacktestService.check_entry_signal`` and the original daily loop;
+``tests/test_backtest_engine.py`` guards that equivalence.
+"""
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+SIGNAL_REQUIRED_COLUMNS = ('close', 'EMA_fast', 'EMA_slow', 'RSI', 'MACD', 'BB_middle', 'BB_upper', 'BB_lower')
+SIGNAL_OPTIONAL_COLUMNS = ('volume_ratio', 'trend_strength', 'volatility', 'volatility_ma')
+SIMULATION_COLUMNS = SIGNAL_REQUIRED_COLUMNS + SIGNAL_OPTIONAL_COLUMNS + ('high', 'low')
+
+NS_PER_DAY = 86_400 * 1_000_000_000
+
+ColumnSource = Union[pd.DataFrame, Mapping[str, np.ndarray]]
+
+
+def _float_column(data: ColumnSource, name: str) -> Optional[np.ndarray]:
+    if name not in data:
+        return None
+    return np.asarray(data[name], dtype=np.float64)
+
+
+def compute_entry_signals(data: ColumnSource, rsi_oversold: float = 35,
+                          rsi_overbought: float = 65) -> np.ndarray:
+    """Return a boolean array marking candles where the entry signal fires.
+
+    ``data`` is an indicator DataFrame or a mapping of column name to array.
+    Element ``i`` compares row ``i`` against row ``i - 1`` exactly like
+    ``check_entry_signal(df.iloc[i], df.iloc[i - 1])``; the first row never
+    fires because it has no previous candle.
+    """
+    close_values = _float_column(data, 'close')
+    n = 0 if close_values is None else len(close_values)
+    signals = np.zeros(n, dtype=bool)
+    if n < 2:
+        return signals
+
+    columns = {}
+    for name in SIGNAL_REQUIRED_COLUMNS:
+        values = _float_column(data, name)
+        if values is None:
+            return signals
+        columns[name] = values
+
+    # A candle pair is only evaluated when neither row has a NaN in a required column
+    nan_rows = np.zeros(n, dtype=bool)
+    for values in columns.values():
+        nan_rows |= np.isnan(values)
+    valid = ~(nan_rows[1:] | nan_rows[:-1])
+
+    close = columns['close']
+    ema_fast = columns['EMA_fast']
+    ema_slow = columns['EMA_slow']
+    rsi = columns['RSI']
+    macd = columns['MACD']
+    bb_mid = columns['BB_middle']
+    bb_up = columns['BB_upper']
+    bb_low = columns['BB_lower']
+
+    c_close, p_close = close[1:], close[:-1]
+    c_ema_fast, p_ema_fast = ema_fast[1:], ema_fast[:-1]
+    c_ema_slow, p_ema_slow = ema_slow[1:], ema_slow[:-1]
+    c_rsi, p_rsi = rsi[1:], rsi[:-1]
+    c_macd, p_macd = macd[1:], macd[:-1]
+
+    # Primary votes
+    trend_up = (c_close > c_ema_fast) & (c_ema_fast > c_ema_slow)
+    rsi_signal = (rsi_oversold <= c_rsi) & (c_rsi <= rsi_overbought)
+    macd_positive = c_macd > 0
+    bb_signal = (c_close > bb_mid[1:]) & (c_close < bb_up[1:])
+
+    volume_ratio = _float_column(data, 'volume_ratio')
+    if volume_ratio is not None:
+        # NaN compares False, which matches the per-row NaN guard
+        volume_surge = volume_ratio[1:] > 1.2
+    else:
+        volume_surge = np.zeros(n - 1, dtype=bool)
+
+    # Confirmation votes
+    trend_accelerating = (c_ema_fast - c_ema_slow) > (p_ema_fast - p_ema_slow)
+    rsi_rising = c_rsi > p_rsi
+    macd_rising = c_macd > p_macd
+    bb_expanding = (bb_up[1:] - bb_low[1:]) > (bb_up[:-1] - bb_low[:-1])
+    momentum = c_close > p_close * 1.0005
+
+    trend_strength = _float_column(data, 'trend_strength')
+    if trend_strength is not None:
+        strong_trend = trend_strength[1:] > 0.2
+    else:
+        strong_trend = np.zeros(n - 1, dtype=bool)
+
+    volatility = _float_column(data, 'volatility')
+    volatility_ma = _float_column(data, 'volatility_ma')
+    if volatility is not None and volatility_ma is not None:
+        c_vol, c_vol_ma = volatility[1:], volatility_ma[1:]
+        volatility_ok = np.where(np.isnan(c_vol) | np.isnan(c_vol_ma), True, c_vol < c_vol_ma)
+    else:
+        volatility_ok = np.ones(n - 1, dtype=bool)
+
+    primary_votes = (trend_up.astype(np.int8) + rsi_signal + macd_positive + bb_signal + volume_surge)
+    confirmation_votes = (trend_accelerating.astype(np.int8) + rsi_rising + macd_rising + bb_expanding
+                          + momentum + strong_trend + volatility_ok)
+
+    signals[1:] = valid & (primary_votes >= 3) & (confirmation_votes >= 2)
+    return signals
+
+
+EXIT_TAKE_PROFIT = "TP"
+EXIT_STOP_LOSS = "SL"
+EXIT_END_OF_DAY = "EOD"
+
+# First window scanned for an exit; it doubles on every miss so early exits stay
+# cheap while long holds still need only O(log n) NumPy calls.
+_EXIT_SCAN_CHUNK = 64
+
+
+def resolve_exit(high: np.ndarray, low: np.ndarray, close: np.ndarray, start: int, end: int,
+                 entry_price: float, take_profit: float, stop_loss: float,
+                 trailing_stop: float) -> Tuple[int, float, str]:
+    """Find the exit of a long position opened before bar ``start``.
+
+    Scans bars ``start .. end - 1`` with the same rules as the original
+    ``iterrows`` loop: the running high ratchets the trailing stop first, then
+    take profit is checked before the stop on the same bar.
+
+    Returns ``(exit_index, exit_price, exit_reason)``. Without a TP/SL hit the
+    position closes at the last bar's close (``EOD``); with no bars left the
+    index is ``-1`` and the entry price is returned.
+    """
+    take_profit_price = entry_price * (1 + take_profit / 100)
+    stop_loss_price = entry_price * (1 - stop_loss / 100)
+    trailing_factor = 1 - trailing_stop / 100
+
+    max_price = entry_price
+    pos = start
+    chunk = _EXIT_SCAN_CHUNK
+    while pos < end:
+        stop = min(end, pos + chunk)
+        window_high = high[pos:stop]
+        # fmax skips NaN highs, just like the scalar "high > max_price" update
+        running_max = np.fmax.accumulate(np.concatenate(([max_price], window_high)))[1:]
+        trailing_stop_price = running_max * trailing_factor
+
+        tp_hit = window_high >= take_profit_price
+        sl_hit = low[pos:stop] <= np.minimum(stop_loss_price, trailing_stop_price)
+        hit = tp_hit | sl_hit
+        if hit.any():
+            k = int(np.argmax(hit))
+            if tp_hit[k]:
+                return pos + k, float(take_profit_price), EXIT_TAKE_PROFIT
+            return pos + k, float(max(stop_loss_price, float(trailing_stop_price[k]))), EXIT_STOP_LOSS
+
+        max_price = float(running_max[-1])
+        pos = stop
+        chunk *= 2
+
+    if end > start:
+        return end - 1, float(close[end - 1]), EXIT_END_OF_DAY
+    return -1, float(entry_price), EXIT_END_OF_DAY
+
+
+def calculate_fee(position_size: float, is_entry: bool, maker_fee: float, taker_fee: float,
+                  slippage_bps: float) -> float:
+    """Commission plus slippage for one leg (taker on entry, maker on exit)."""
+    commission_rate = taker_fee if is_entry else maker_fee
+    commission = position_size * commission_rate
+    slippage_cost = position_size * (slippage_bps / 10000.0)
+    return float(commission + slippage_cost)
+
+
+def day_offsets(timestamps: Union[pd.Series, pd.DatetimeIndex]) -> Tuple[Optional[np.ndarray], np.ndarray, List[str]]:
+    """Group candles by calendar day without pandas groupby.
+
+    Returns ``(order, offsets, labels)``. ``order`` is ``None`` when the
+    candles are already grouped by day, otherwise the stable permutation that
+    groups them (NaT rows are dropped, as ``groupby`` does). Day ``d`` spans
+    ``offsets[d]:offsets[d + 1]`` of the reordered arrays and ``labels[d]`` is
+    its ``YYYY-MM-DD`` string.
+    """
+    index = pd.DatetimeIndex(timestamps)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+
+    day_numbers = index.asi8 // NS_PER_DAY
+    order: Optional[np.ndarray] = None
+    valid = ~np.asarray(index.isna())
+    if not valid.all():
+        order = np.flatnonzero(valid)
+        day_numbers = day_numbers[order]
+    if len(day_numbers) > 1 and (np.diff(day_numbers) < 0).any():
+        sort_order = np.argsort(day_numbers, kind='stable')
+        order = sort_order if order is None else order[sort_order]
+        day_numbers = day_numbers[sort_order]
+
+    unique_days = np.unique(day_numbers)
+    offsets = np.empty(len(unique_days) + 1, dtype=np.int64)
+    offsets[:-1] = np.searchsorted(day_numbers, unique_days, side='left')
+    offsets[-1] = len(day_numbers)
+    labels = [str(day) for day in unique_days.astype('datetime64[D]')]
+    return order, offsets, labels
+
+
+def frame_to_columns(df: pd.DataFrame, order: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """Contiguous float64 arrays for the simulation columns present in ``df``."""
+    columns: Dict[str, np.ndarray] = {}
+    for name in SIMULATION_COLUMNS:
+        if name in df.columns:
+            values = df[name].to_numpy(dtype=np.float64)
+            if order is not None:
+                values = values[order]
+            columns[name] = np.ascontiguousarray(values)
+    return columns
+
+
+def simulate_daily(columns: Mapping[str, np.ndarray], offsets: np.ndarray, day_labels: List[str],
+                   timestamps: Any, config: Dict[str, Any], max_daily_trades: int = 5,
+                   signals: Optional[np.ndarray] = None,
+                   progress_callback: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+    """Run the long-only daily strategy over contiguous column arrays.
+
+    ``offsets`` delimits the days (see ``day_offsets``) and ``timestamps`` is
+    any sequence indexable by row position whose items are only stringified
+    for the trade log. ``config`` holds the same keys as
+    ``BacktestService._daily_calc_context``. ``signals`` may be passed to
+    override the vectorized entry signals; the first candle of every day is
+    never an entry. Returns the same dict as ``calculate_daily_pnl``.
+    """
+    try:
+        max_daily_trades = int(max_daily_trades)
+    except (TypeError, ValueError):
+        max_daily_trades = 5
+    max_daily_trades = max(1, min(50, max_daily_trades))
+
+    current_capital = float(config.get('current_capital', 0.0))
+    daily_target = float(config.get('daily_target', 3.0))
+    max_daily_loss = float(config.get('max_daily_loss', 1.0))
+    risk_per_trade = float(config.get('risk_per_trade', 2.0))
+    stop_loss = float(config.get('stop_loss', 0.5))
+    take_profit = float(config.get('take_profit', 1.5))
+    trailing_stop = float(config.get('trailing_stop', 0.3))
+    maker_fee = float(config.get('maker_fee', 0.0002))
+    taker_fee = float(config.get('taker_fee', 0.0004))
+    slippage_bps = float(config.get('slippage_bps', 1.0))
+    market_type = str(config.get('market_type', 'spot')).lower()
+    leverage = int(config.get('leverage', 1))
+    collect_trades = bool(config.get('collect_trades', False))
+    log_trades = bool(config.get('log_trades', False))
+    symbol = str(config.get('symbol', 'SYMBOL'))
+    parameters = config.get('parameters', {})
+
+    close = np.asarray(columns['close'], dtype=np.float64)
+    high = np.asarray(columns['high'], dtype=np.float64)
+    low = np.asarray(columns['low'], dtype=np.float64)
+
+    if signals is None:
+        signals = compute_entry_signals(columns, parameters.get('rsi_oversold', 35),
+                                        parameters.get('rsi_overbought', 65))
+    signals = np.array(signals, dtype=bool)
+    # Each day starts fresh: its first candle has no same-day previous candle
+    signals[offsets[:-1][offsets[:-1] < len(signals)]] = False
+    signal_index = np.flatnonzero(signals)
+
+    daily_results: List[Dict[str, Any]] = []
+    monthly_results: Dict[str, Dict[str, float]] = {}
+    trade_log: List[Dict[str, Any]] = []
+    total_trades = 0
+    winning_trades = 0
+    losing_trades = 0
+    total_fees = 0.0
+    lev = max(leverage, 1)
+    n_days = len(offsets) - 1
+
+    for d in range(n_days):
+        day_start = int(offsets[d])
+        day_end = int(offsets[d + 1])
+        date = day_labels[d]
+        daily_pnl_pct = 0.0
+        daily_trades = 0
+
+        lo = np.searchsorted(signal_index, day_start, side='left')
+        hi = np.searchsorted(signal_index, day_end, side='left')
+        for i in signal_index[lo:hi]:
+            i = int(i)
+            if daily_trades >= max_daily_trades or daily_pnl_pct <= -max_daily_loss:
+                break
+
+            max_position_size = current_capital * (risk_per_trade / 100)
+            entry_price = float(close[i])
+            stop_loss_price = entry_price * (1 - stop_loss / 100)
+            risk_per_unit = entry_price - stop_loss_price
+            position_units = (max_position_size / risk_per_unit) if risk_per_unit > 0 else 0.0
+            position_value = position_units * entry_price
+
+            if market_type == "futures":
+                margin_required = position_value / lev
+            else:
+                margin_required = position_value
+
+            if margin_required > current_capital * 0.95:
+                margin_required = current_capital * 0.95
+                if market_type == "futures":
+                    position_value = margin_required * lev
+                else:
+                    position_value = margin_required
+                position_units = position_value / entry_price if entry_price else 0.0
+
+            entry_fee = calculate_fee(position_value, True, maker_fee, taker_fee, slippage_bps)
+            total_entry_cost = margin_required + entry_fee
+
+            if total_entry_cost > current_capital or position_units <= 0:
+                continue
+
+            current_capital -= total_entry_cost
+            total_fees += entry_fee
+
+            exit_index, exit_price, exit_reason = resolve_exit(
+                high, low, close, i + 1, day_end, entry_price, take_profit, stop_loss, trailing_stop
+            )
+
+            actual_units = float(position_value / entry_price) if entry_price else 0.0
+            position_exit_value = actual_units * exit_price
+
+            if log_trades:
+                if market_type == "futures":
+                    print(f"📈 Futures Entry: {actual_units:.6f} {symbol} @ ${entry_price:.4f} ({lev}x), Margin: ${margin_required:.2f}")
+                else:
+                    print(f"📈 Spot Entry: {actual_units:.6f} {symbol} @ ${entry_price:.4f}, Cost: ${total_entry_cost:.2f}")
+
+            exit_fee = calculate_fee(position_exit_value, False, maker_fee, taker_fee, slippage_bps)
+
+            if market_type == "futures":
+                pnl_raw = (exit_price - entry_price) * actual_units
+                net_proceeds = margin_required + pnl_raw - exit_fee
+            else:
+                net_proceeds = position_exit_value - exit_fee
+
+            current_capital += net_proceeds
+            total_fees += exit_fee
+
+            trade_pnl_usdt = net_proceeds - total_entry_cost
+            trade_pnl_percentage = ((exit_price - entry_price) / entry_price) * 100 if entry_price else 0.0
+            if market_type == "futures":
+                trade_pnl_percentage *= lev
+
+            if trade_pnl_usdt > 0:
+                winning_trades += 1
+            else:
+                losing_trades += 1
+
+            daily_pnl_pct += trade_pnl_percentage
+            daily_trades += 1
+            total_trades += 1
+
+            if log_trades:
+                print(f"📉 Exit: ${exit_price:.4f}, P&L: ${trade_pnl_usdt:.2f} ({trade_pnl_percentage:.2f}%), Capital: ${current_capital:.2f}")
+
+            if collect_trades:
+                entry_time = str(timestamps[i])
+                trade_log.append({
+                    'date': date,
+                    'side': 'LONG',
+                    'entry_time': entry_time,
+                    'exit_time': str(timestamps[exit_index]) if exit_index >= 0 else entry_time,
+                    'entry_price': round(float(entry_price), 8),
+                    'exit_price': round(float(exit_price), 8),
+                    'units': round(float(actual_units), 8),
+                    'pnl_usdt': round(float(trade_pnl_usdt), 6),
+                    'pnl_pct': round(float(trade_pnl_percentage), 6),
+                    'fees_entry': round(float(entry_fee), 6),
+                    'fees_exit': round(float(exit_fee), 6),
+                    'capital_after': round(float(current_capital), 6),
+                    'leverage': int(lev),
+                    'exit_reason': exit_reason
+                })
+
+            if daily_pnl_pct >= daily_target:
+                break
+
+        if daily_trades > 0:
+            daily_results.append({
+                'date': date,
+                'pnl_pct': daily_pnl_pct,
+                'trades': daily_trades,
+                'capital': current_capital
+            })
+
+            month = date[:7]
+            if month not in monthly_results:
+                monthly_results[month] = {'pnl_pct': 0.0, 'trades': 0}
+            monthly_results[month]['pnl_pct'] += daily_pnl_pct
+            monthly_results[month]['trades'] += daily_trades
+
+        if progress_callback is not None:
+            progress_callback(d + 1, n_days)
+
+    return {
+        'current_capital': current_capital,
+        'daily_results': daily_results,
+        'monthly_results': monthly_results,
+        'total_trades': total_trades,
+        'winning_trades': winning_trades,
+        'losing_trades': losing_trades,
+        'total_fees': total_fees,
+        'trade_log': trade_log
+    }
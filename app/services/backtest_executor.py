@@ -0,0 +1,236 @@
+"""Process-pool executor for independent backtest simulations.
+
+Indicator frames are published once into ``multiprocessing.shared_memory``
+blocks; tasks only carry a small descriptor plus the simulation config, so
+workers never unpickle kline arrays. Used by parameter sweeps, walk-forward
+folds and multi-symbol batches.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.services.backtest_engine import day_offsets, frame_to_columns, simulate_daily
+
+TIMESTAMP_COLUMN = '__timestamp__'
+
+# (dataset id, simulation config, max_daily_trades)
+SimulationTask = Tuple[int, Dict[str, Any], int]
+
+
+def _env_int(name: str) -> int:
+    try:
+        return int(os.getenv(name, "0"))
+    except ValueError:
+        return 0
+
+
+# Simulation processes allowed at once in this process, summed over all executors;
+# keeps concurrent sweeps on an API worker from starting cpu_count pools each
+BACKTEST_MAX_PROCESSES = _env_int("BACKTEST_MAX_PROCESSES") or min(4, os.cpu_count() or 1)
+
+
+def default_max_workers() -> int:
+    """Worker count from ``BACKTEST_MAX_WORKERS``, defaulting to ``BACKTEST_MAX_PROCESSES``"""
+    workers = _env_int("BACKTEST_MAX_WORKERS")
+    return workers if workers > 0 else BACKTEST_MAX_PROCESSES
+
+
+class _ProcessBudget:
+    """Process-wide count of simulation worker slots"""
+
+    def __init__(self, total: int):
+        self.total = max(1, total)
+        self._free = self.total
+        self._cond = threading.Condition()
+
+    def acquire(self, wanted: int) -> int:
+        """Wait for a free slot, then take up to ``wanted`` of the free ones"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._free > 0)
+            granted = min(max(1, wanted), self._free)
+            self._free -= granted
+            return granted
+
+    def release(self, slots: int):
+        with self._cond:
+            self._free = min(self.total, self._free + slots)
+            self._cond.notify_all()
+
+
+_process_budget = _ProcessBudget(BACKTEST_MAX_PROCESSES)
+
+
+class _Dataset:
+    """Day-grouped columns of one indicator frame, ready for ``simulate_daily``"""
+
+    def __init__(self, df: pd.DataFrame):
+        order, self.offsets, self.labels = day_offsets(df['timestamp'])
+        timestamps = pd.DatetimeIndex(df['timestamp'])
+        if order is not None:
+            timestamps = timestamps[order]
+        if timestamps.tz is not None:
+            self.tz: Optional[str] = str(timestamps.tz)
+            timestamps_ns = timestamps.tz_convert('UTC').tz_localize(None).asi8
+        else:
+            self.tz = None
+            timestamps_ns = timestamps.asi8
+        self.timestamps = timestamps
+        self.columns = frame_to_columns(df, order)
+        self.timestamps_ns = np.ascontiguousarray(timestamps_ns, dtype=np.int64)
+
+
+class _SharedDataset:
+    """Owner side of a dataset published into one shared memory block"""
+
+    def __init__(self, dataset: _Dataset):
+        arrays = dict(dataset.columns)
+        arrays[TIMESTAMP_COLUMN] = dataset.timestamps_ns
+        size = max(1, sum(a.nbytes for a in arrays.values()))
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+
+        layout: Dict[str, Tuple[int, int, str]] = {}
+        offset = 0
+        for name, values in arrays.items():
+            target = np.ndarray(values.shape, dtype=values.dtype, buffer=self.shm.buf, offset=offset)
+            target[:] = values
+            layout[name] = (offset, len(values), values.dtype.str)
+            offset += values.nbytes
+
+        # Everything a worker needs besides the block itself; cheap to pickle
+        self.descriptor = {
+            'shm_name': self.shm.name,
+            'layout': layout,
+            'offsets': dataset.offsets,
+            'labels': dataset.labels,
+            'tz': dataset.tz,
+        }
+
+    def close(self):
+        try:
+            self.shm.close()
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+# Worker-side state: attached blocks and the views built on them, per process
+_worker_untrack = False
+_worker_datasets: Dict[str, Tuple[shared_memory.SharedMemory, Dict[str, np.ndarray], pd.DatetimeIndex]] = {}
+
+
+def _init_worker(untrack: bool):
+    global _worker_untrack
+    _worker_untrack = untrack
+
+
+def _attach(descriptor: Dict[str, Any]) -> Tuple[Dict[str, np.ndarray], pd.DatetimeIndex]:
+    name = descriptor['shm_name']
+    cached = _worker_datasets.get(name)
+    if cached is None:
+        shm = shared_memory.SharedMemory(name=name)
+        if _worker_untrack:
+            # Spawned workers have their own resource tracker, which would unlink
+            # the owner's block when the worker exits
+            resource_tracker.unregister(shm._name, 'shared_memory')  # type: ignore[attr-defined]
+        columns: Dict[str, np.ndarray] = {}
+        for column, (offset, length, dtype) in descriptor['layout'].items():
+            view = np.ndarray((length,), dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+            view.setflags(write=False)
+            columns[column] = view
+        timestamps = pd.DatetimeIndex(columns.pop(TIMESTAMP_COLUMN).astype('datetime64[ns]'))
+        if descriptor['tz'] is not None:
+            timestamps = timestamps.tz_localize('UTC').tz_convert(descriptor['tz'])
+        cached = (shm, columns, timestamps)
+        _worker_datasets[name] = cached
+    return cached[1], cached[2]
+
+
+def _run_shared_task(descriptor: Dict[str, Any], config: Dict[str, Any], max_daily_trades: int) -> Dict[str, Any]:
+    columns, timestamps = _attach(descriptor)
+    return simulate_daily(columns, descriptor['offsets'], descriptor['labels'], timestamps,
+                          dict(config), max_daily_trades)
+
+
+class BacktestExecutor:
+    """Fan independent simulations out over a process pool.
+
+    Register each prepared indicator frame with ``add_dataset`` and pass
+    ``(dataset_id, config, max_daily_trades)`` tasks to ``run``. Results come
+    back in task order and match ``BacktestService.run_simulation``. With one
+    worker (or a single task) everything runs in-process without shared memory.
+    Pools share the process-wide ``BACKTEST_MAX_PROCESSES`` budget: an executor
+    waits for a free slot and may get fewer workers than it asked for.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max(1, int(max_workers)) if max_workers else default_max_workers()
+        self._datasets: List[_Dataset] = []
+        self._shared: Dict[int, _SharedDataset] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots = 0
+
+    def __enter__(self) -> "BacktestExecutor":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def add_dataset(self, df: pd.DataFrame) -> int:
+        self._datasets.append(_Dataset(df))
+        return len(self._datasets) - 1
+
+    def _shared_descriptor(self, dataset_id: int) -> Dict[str, Any]:
+        shared = self._shared.get(dataset_id)
+        if shared is None:
+            shared = _SharedDataset(self._datasets[dataset_id])
+            self._shared[dataset_id] = shared
+        return shared.descriptor
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Never fork: callers run in threads of the API process, and a forked child
+            # would inherit locks held by other threads (logging, DB pools) as locked
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            self._slots = _process_budget.acquire(self.max_workers)
+            try:
+                self._pool = ProcessPoolExecutor(max_workers=self._slots, mp_context=context,
+                                                 initializer=_init_worker, initargs=(True,))
+            except Exception:
+                _process_budget.release(self._slots)
+                self._slots = 0
+                raise
+        return self._pool
+
+    def _run_inline(self, task: SimulationTask) -> Dict[str, Any]:
+        dataset_id, config, max_daily_trades = task
+        dataset = self._datasets[dataset_id]
+        return simulate_daily(dataset.columns, dataset.offsets, dataset.labels, dataset.timestamps,
+                              dict(config), max_daily_trades)
+
+    def run(self, tasks: List[SimulationTask]) -> List[Dict[str, Any]]:
+        if self.max_workers <= 1 or len(tasks) <= 1:
+            return [self._run_inline(task) for task in tasks]
+
+        pool = self._get_pool()
+        futures = [
+            pool.submit(_run_shared_task, self._shared_descriptor(dataset_id), config, max_daily_trades)
+            for dataset_id, config, max_daily_trades in tasks
+        ]
+        return [future.result() for future in futures]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+            _process_budget.release(self._slots)
+            self._slots = 0
+        for shared in self._shared.values():
+            shared.close()
+        self._shared.clear()
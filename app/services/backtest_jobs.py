@@ -0,0 +1,206 @@
+import os
+import time
+import uuid
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from app.core.redis_client import get_redis_sync
+
+logger = logging.getLogger(__name__)
+
+# Job durumları
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+ACTIVE_JOB_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+
+BACKTEST_JOB_TTL_SECONDS = int(os.getenv("BACKTEST_JOB_TTL_SECONDS", str(24 * 3600)))
+BACKTEST_MAX_JOBS_PER_USER = int(os.getenv("BACKTEST_MAX_JOBS_PER_USER", "2"))
+# Celery hard time limit of a job; a job running longer was killed (limit, OOM, lost worker)
+BACKTEST_TASK_TIME_LIMIT = int(os.getenv("BACKTEST_TASK_TIME_LIMIT", "1800"))
+BACKTEST_JOB_STALE_GRACE_SECONDS = 60
+
+
+class BacktestJobLimitError(Exception):
+    """User already has the maximum number of queued/running backtest jobs"""
+
+
+class BacktestJobCancelled(Exception):
+    """Raised inside a running job when cancellation was requested"""
+
+
+def _job_key(job_id: str) -> str:
+    return f"backtest:job:{job_id}"
+
+
+def _result_key(job_id: str) -> str:
+    return f"backtest:job:{job_id}:result"
+
+
+def _cancel_key(job_id: str) -> str:
+    return f"backtest:job:{job_id}:cancel"
+
+
+def _user_active_key(user_id: int) -> str:
+    return f"backtest:jobs:user:{user_id}:active"
+
+
+def _save(job: Dict[str, Any]):
+    get_redis_sync().set(_job_key(job['id']), json.dumps(job), ex=BACKTEST_JOB_TTL_SECONDS)
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    raw = get_redis_sync().get(_job_key(job_id))
+    return json.loads(raw) if raw else None
+
+
+def _fail_if_stale(job: Dict[str, Any], now: Optional[float] = None) -> Dict[str, Any]:
+    """A job still "running" past the task time limit was killed without finishing; record it as failed"""
+    if job.get('status') != JOB_RUNNING:
+        return job
+    started_at = job.get('started_at') or job.get('updated_at') or 0
+    if (now or time.time()) - started_at <= BACKTEST_TASK_TIME_LIMIT + BACKTEST_JOB_STALE_GRACE_SECONDS:
+        return job
+    logger.warning(f"Backtest job {job['id']} exceeded the task time limit without finishing; marking failed")
+    return finish_job(job['id'], JOB_FAILED, error="Backtest işi yarıda kesildi (zaman sınırı veya worker hatası)") or job
+
+
+def get_user_job(job_id: str, user_id: int) -> Optional[Dict[str, Any]]:
+    """Job only if it belongs to the given user"""
+    job = get_job(job_id)
+    if job is None or job.get('user_id') != user_id:
+        return None
+    return _fail_if_stale(job)
+
+
+def active_job_ids(user_id: int) -> List[str]:
+    """Queued/running job ids of a user; finished, expired or killed ids are pruned"""
+    r = get_redis_sync()
+    key = _user_active_key(user_id)
+    active = []
+    for job_id in r.smembers(key):
+        job = get_job(job_id)
+        if job is not None:
+            job = _fail_if_stale(job)
+        if job is None or job.get('status') not in ACTIVE_JOB_STATUSES:
+            r.srem(key, job_id)
+        else:
+            active.append(job_id)
+    return active
+
+
+def create_job(user_id: int, request: Dict[str, Any], max_jobs: int = BACKTEST_MAX_JOBS_PER_USER) -> Dict[str, Any]:
+    """Register a queued job, enforcing the per-user concurrency limit"""
+    r = get_redis_sync()
+    active_job_ids(user_id)
+
+    job_id = uuid.uuid4().hex
+    key = _user_active_key(user_id)
+    # Reserve a slot first, then check: concurrent submits can only be over-rejected, never over-admitted
+    r.sadd(key, job_id)
+    r.expire(key, BACKTEST_JOB_TTL_SECONDS)
+    if r.scard(key) > max_jobs:
+        r.srem(key, job_id)
+        raise BacktestJobLimitError(f"En fazla {max_jobs} backtest aynı anda çalıştırılabilir")
+
+    now = time.time()
+    job = {
+        'id': job_id,
+        'user_id': user_id,
+        'status': JOB_QUEUED,
+        'progress': 0.0,
+        'stage': 'queued',
+        'request': request,
+        'task_id': None,
+        'backtest_id': None,
+        'error': None,
+        'created_at': now,
+        'updated_at': now,
+    }
+    _save(job)
+    return job
+
+
+def update_job(job_id: str, **fields: Any) -> Optional[Dict[str, Any]]:
+    job = get_job(job_id)
+    if job is None:
+        return None
+    job.update(fields)
+    job['updated_at'] = time.time()
+    _save(job)
+    return job
+
+
+def set_progress(job_id: str, progress: float, stage: str) -> Optional[Dict[str, Any]]:
+    return update_job(job_id, progress=round(max(0.0, min(1.0, progress)), 4), stage=stage)
+
+
+def finish_job(job_id: str, status: str, result: Optional[Dict[str, Any]] = None,
+               error: Optional[str] = None, backtest_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Move a job to a terminal status and free its concurrency slot"""
+    r = get_redis_sync()
+    fields: Dict[str, Any] = {'status': status, 'stage': status, 'error': error, 'backtest_id': backtest_id}
+    if status == JOB_COMPLETED:
+        fields['progress'] = 1.0
+    job = update_job(job_id, **fields)
+    if result is not None:
+        r.set(_result_key(job_id), json.dumps(result), ex=BACKTEST_JOB_TTL_SECONDS)
+    if job is not None:
+        r.srem(_user_active_key(job['user_id']), job_id)
+    r.delete(_cancel_key(job_id))
+    return job
+
+
+def get_job_result(job_id: str) -> Optional[Dict[str, Any]]:
+    raw = get_redis_sync().get(_result_key(job_id))
+    return json.loads(raw) if raw else None
+
+
+def request_cancel(job_id: str) -> Optional[Dict[str, Any]]:
+    """Flag a job for cancellation; queued jobs are cancelled right away"""
+    job = get_job(job_id)
+    if job is None or job.get('status') not in ACTIVE_JOB_STATUSES:
+        return job
+    get_redis_sync().set(_cancel_key(job_id), "1", ex=BACKTEST_JOB_TTL_SECONDS)
+    if job['status'] == JOB_QUEUED:
+        return finish_job(job_id, JOB_CANCELLED)
+    return update_job(job_id, stage='cancelling')
+
+
+def is_cancel_requested(job_id: str) -> bool:
+    try:
+        return bool(get_redis_sync().exists(_cancel_key(job_id)))
+    except Exception as e:
+        logger.warning(f"Backtest job cancel check failed for {job_id}: {e}")
+        return False
+
+
+class JobProgressReporter:
+    """``run_backtest`` progress callback that writes throttled progress and honours cancel.
+
+    Simulated days map to the ``start``..``end`` fraction of the job.
+    """
+
+    def __init__(self, job_id: str, start: float = 0.2, end: float = 0.95, min_step: float = 0.02,
+                 min_interval: float = 0.5):
+        self.job_id = job_id
+        self.start = start
+        self.end = end
+        self.min_step = min_step
+        self.min_interval = min_interval
+        self._last_progress = -1.0
+        self._last_time = 0.0
+
+    def __call__(self, done: int, total: int):
+        progress = self.start + (self.end - self.start) * (done / total if total else 1.0)
+        now = time.monotonic()
+        if done < total and (progress - self._last_progress < self.min_step or now - self._last_time < self.min_interval):
+            return
+        self._last_progress = progress
+        self._last_time = now
+        if is_cancel_requested(self.job_id):
+            raise BacktestJobCancelled(self.job_id)
+        set_progress(self.job_id, progress, 'simulating')
@@ -2,12 +2,8 @@ import os
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List, cast, Iterable, Tuple
+from typing import Dict, Any, Optional, List, cast, Iterable, Tuple, Callable
 from binance.client import Client as BinanceClient
-from ta.trend import SMAIndicator, EMAIndicator, MACD
-from ta.momentum import RSIIndicator
-from ta.volatility import BollingerBands
-from ta.utils import dropna
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 import asyncio
@@ -15,17 +11,50 @@ import httpx
 from fastapi import HTTPException
 from sqlalchemy import desc
 import json
+import itertools
 
+from app.core.binance_rate_limiter import get_binance_rate_limiter
 from app.core.cache import DataCache
+from app.core.file_lock import FileLockTimeout
+from app.core.indicator_cache import get_indicator_cache
+from app.core.kline_downloader import download_klines
+from app.core.kline_store import INTERVAL_MS, KlineStore
+from app.services.backtest_engine import (
+    calculate_fee,
+    compute_entry_signals,
+    day_offsets,
+    frame_to_columns,
+    simulate_daily,
+)
+from app.services.backtest_executor import BacktestExecutor, SimulationTask
+from app.services.indicator_kernels import IndicatorKernel
+from app.services.synthetic_data import generate_klines
+from app.services.trade_log_codec import decode_trade_log, encode_trade_log
 from app.models.api_key import ApiKey
 from app.core.crypto import decrypt_value
 from app.models.backtest import Backtest
 
+# Parameters that can be swept and metrics a sweep can be ranked by
+SWEEP_PARAMETERS = ('ema_fast', 'ema_slow', 'rsi_period', 'stop_loss', 'take_profit', 'trailing_stop', 'risk_per_trade')
+SWEEP_RANK_METRICS = ('total_return', 'sharpe', 'sortino', 'max_drawdown', 'profit_factor')
+SWEEP_MAX_COMBINATIONS = int(os.getenv("BACKTEST_SWEEP_MAX_COMBINATIONS", "500"))
+# Sweeps served inside an HTTP request run on the API worker, so they get a much smaller grid
+SWEEP_SYNC_MAX_COMBINATIONS = int(os.getenv("BACKTEST_SWEEP_SYNC_MAX_COMBINATIONS", "50"))
+
+# Kline fields needed by indicators and the simulation
+BACKTEST_KLINE_COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+# Price model and seed of the synthetic fallback data (see app/services/synthetic_data.py)
+SAMPLE_DATA_MODEL = os.getenv("SAMPLE_DATA_MODEL", "gbm")
+SAMPLE_DATA_SEED = int(os.getenv("SAMPLE_DATA_SEED", "42"))
+
 class BacktestService:
     def __init__(self, user_id: Optional[int] = None, db_session: Optional[AsyncSession] = None):
         # Use absolute path for cache directory
         cache_dir = os.path.join(os.getcwd(), "cache", "data")
         self.cache = DataCache(cache_dir=cache_dir)
+        self.indicator_cache = get_indicator_cache()
+        self.kline_store = KlineStore(os.path.join(os.getcwd(), "cache", "klines"))
         self.user_id = user_id
         self.db_session = db_session
 
@@ -86,8 +115,11 @@ class BacktestService:
             else:
                 # Try to get price without API key (public endpoint)
                 url = f"https://api.binance.com/api/v3/ticker/price?symbol={symbol}"
+                limiter = get_binance_rate_limiter()
+                await limiter.acquire('spot', 2)
                 async with httpx.AsyncClient(timeout=5.0) as client:
                     response = await client.get(url)
+                    await limiter.observe('spot', response.status_code, response.headers)
                     if response.status_code == 200:
                         data = response.json()
                         current_price = float(data['price'])
@@ -102,78 +134,60 @@ class BacktestService:
 
 
 
-    async def generate_sample_data(self, symbol: str, interval: str, start_date: str, end_date: str) -> pd.DataFrame:
-        """Generate sample data for testing when API keys are not available"""
-        print(f"📊 Generating sample data for {symbol} {interval}")
+    async def generate_sample_data(self, symbol: str, interval: str, start_date: str, end_date: str,
+                                   model: Optional[str] = None, seed: Optional[int] = None,
+                                   num_candles: Optional[int] = None) -> pd.DataFrame:
+        """Generate sample data for testing when API keys are not available.
+
+        Candles come from the vectorized generator in ``synthetic_data``;
+        ``model``/``seed`` default to SAMPLE_DATA_MODEL / SAMPLE_DATA_SEED and
+        ``num_candles`` overrides the count implied by the date range.
+        """
+        model = model or SAMPLE_DATA_MODEL
+        seed = SAMPLE_DATA_SEED if seed is None else seed
+        print(f"📊 Generating sample data for {symbol} {interval} ({model}, seed={seed})")
 
         start_dt = datetime.strptime(start_date, "%Y-%m-%d")
         end_dt = datetime.strptime(end_date, "%Y-%m-%d")
 
-        # Calculate number of candles based on interval
-        interval_minutes = {
-            '5m': 5, '15m': 15, '30m': 30,
-            '1h': 60, '4h': 240, '1d': 1440
-        }
-
-        minutes = interval_minutes.get(interval, 15)
-        total_minutes = int((end_dt - start_dt).total_seconds() / 60)
-        num_candles = total_minutes // minutes
-
-        # Generate realistic price data starting from current price
-        np.random.seed(42)  # For reproducible results
+        # Calendar intervals (1M) fall back to 15m candles like before
+        candle_interval = interval if interval in INTERVAL_MS else '15m'
+        if num_candles is None:
+            total_ms = int((end_dt - start_dt).total_seconds() * 1000)
+            num_candles = total_ms // INTERVAL_MS[candle_interval]
 
         # Get current/realistic base price dynamically
         base_price = await self.get_current_price(symbol)
         print(f"🚀 Starting simulation from ${base_price} for {num_candles} candles")
 
-        # Generate price series with trend and volatility
-        timestamps = []
-        prices = []
-        volumes = []
-
-        current_time = start_dt
-        current_price = base_price
-
-        for i in range(num_candles):
-            # Add some trend and random walk
-            trend = 0.0001 * np.sin(i * 0.01)  # Slight trending
-            noise = np.random.normal(0, 0.02)  # 2% volatility
-            price_change = trend + noise
-            current_price *= (1 + price_change)
-
-            # Generate OHLC
-            volatility = abs(np.random.normal(0, 0.01))
-            high = current_price * (1 + volatility)
-            low = current_price * (1 - volatility)
-            open_price = current_price + np.random.normal(0, 0.005) * current_price
-            close_price = current_price
-
-            # Ensure OHLC logic
-            high = max(high, open_price, close_price)
-            low = min(low, open_price, close_price)
-
-            # Generate volume
-            volume = np.random.uniform(1000, 10000)
-
-            timestamps.append(current_time)
-            prices.append([open_price, high, low, close_price, volume])
-
-            # Increment time
-            current_time += timedelta(minutes=minutes)
-
-        # Create DataFrame
-        df = pd.DataFrame(prices, columns=pd.Index(['open', 'high', 'low', 'close', 'volume']))
-        df['timestamp'] = timestamps
-
-        # Add additional columns to match Binance format
-        df['close_time'] = df['timestamp'] + timedelta(minutes=minutes-1)
-        df['quote_volume'] = df['volume'] * df['close']
-        df['trades'] = np.random.randint(100, 1000, len(df))
-        df['taker_base'] = df['volume'] * 0.6
-        df['taker_quote'] = df['quote_volume'] * 0.6
-        df['ignore'] = 0
+        return generate_klines(num_candles, candle_interval, start=start_dt, model=model, seed=seed,
+                               base_price=base_price)
 
-        return df
+    async def _download_public_klines(self, symbol: str, interval: str, start_time: int, end_time: int,
+                                      market_type: str = "spot") -> Tuple[pd.DataFrame, bool]:
+        """Page through the public klines endpoint for [start_time, end_time) in ms.
+
+        Pages are fetched concurrently over a pooled client (see kline_downloader).
+        Returns the klines and whether the whole range was downloaded; a failed
+        page returns only the pages before it, marked incomplete.
+        """
+        all_klines, complete = await download_klines(symbol, interval, start_time, end_time, market_type)
+        if not complete:
+            print(f"⚠️ Kline download incomplete: {len(all_klines)} candles received")
+
+        # DataFrame'i oluştur ve dönüştür
+        df = pd.DataFrame(all_klines, columns=pd.Index([
+            'timestamp', 'open', 'high', 'low', 'close', 'volume',
+            'close_time', 'quote_volume', 'trades', 'taker_base', 'taker_quote', 'ignore'
+        ]))
+
+        # Convert timestamp to datetime
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+
+        # Convert numeric columns to float
+        numeric_columns = ['open', 'high', 'low', 'close', 'volume']
+        df[numeric_columns] = df[numeric_columns].astype(float)
+        return df, complete
 
     async def get_historical_data_public(self, symbol: str, interval: str, start_date: str, end_date: str, market_type: str = "spot") -> pd.DataFrame:
         """Get historical data using public Binance API (no auth required).
@@ -184,55 +198,12 @@ class BacktestService:
             start_time = int(datetime.strptime(start_date, "%Y-%m-%d").timestamp() * 1000)
             end_time = int(datetime.strptime(end_date, "%Y-%m-%d").timestamp() * 1000)
 
-            all_klines = []
-            current_time = start_time
-
-            while current_time < end_time:
-                # Public Binance API endpoint by market type
-                url = "https://fapi.binance.com/fapi/v1/klines" if market_type.lower() == "futures" else "https://api.binance.com/api/v3/klines"
-                params = {
-                    'symbol': symbol,
-                    'interval': interval,
-                    'startTime': current_time,
-                    'limit': 1000
-                }
-
-                async with httpx.AsyncClient(timeout=httpx.Timeout(10.0)) as client:
-                    response = await client.get(url, params=params)
-                if response.status_code != 200:
-                    print(f"❌ API error: {response.status_code}")
-                    break
-
-                klines = response.json()
-                if not klines:
-                    break
-
-                all_klines.extend(klines)
-                current_time = klines[-1][0] + 1
-
-                print(f"📊 Progress: {datetime.fromtimestamp(current_time/1000).strftime('%Y-%m-%d')} ({len(all_klines)} candles)")
+            df, _ = await self._download_public_klines(symbol, interval, start_time, end_time, market_type)
 
-                # Rate limiting
-                await asyncio.sleep(0.1)  # 100ms delay
-
-            if not all_klines:
+            if df.empty:
                 print("⚠️ No data received, falling back to sample data")
                 return await self.generate_sample_data(symbol, interval, start_date, end_date)
 
-            # Create DataFrame
-            # DataFrame'i oluştur ve dönüştür
-            df = pd.DataFrame(all_klines, columns=pd.Index([
-                'timestamp', 'open', 'high', 'low', 'close', 'volume',
-                'close_time', 'quote_volume', 'trades', 'taker_base', 'taker_quote', 'ignore'
-            ]))
-
-            # Convert timestamp to datetime
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-
-            # Convert numeric columns to float
-            numeric_columns = ['open', 'high', 'low', 'close', 'volume']
-            df[numeric_columns] = df[numeric_columns].astype(float)
-
             print(f"✅ Public data downloaded: {len(df)} rows")
             return df
 
@@ -258,20 +229,52 @@ class BacktestService:
 
         print(f"📅 Using date range: {start_date} to {end_date}")
 
+        # Range-aware store first: overlapping requests only download the missing gaps
+        if self.kline_store.supports(interval):
+            try:
+                start_time = int(datetime.strptime(start_date, "%Y-%m-%d").timestamp() * 1000)
+                end_time = int(datetime.strptime(end_date, "%Y-%m-%d").timestamp() * 1000)
+                stored = await self.kline_store.get_range(symbol, interval, start_time, end_time,
+                                                          self._download_public_klines, market_type,
+                                                          columns=list(BACKTEST_KLINE_COLUMNS))
+                if stored is not None and not stored.empty:
+                    print(f"📦 Using kline store data: {len(stored)} rows")
+                    return stored
+            except Exception as e:
+                print(f"❌ Kline store failed: {e}")
+
         # Check cache first
         print(f"🔍 Checking cache for: {symbol} {interval} {start_date} to {end_date} [{market_type}]")
-        cached_data = self.cache.get_cached_data(symbol, interval, start_date, end_date, market_type)
+        # Only the kline fields the backtest uses are read from the columnar cache
+        cached_data = self.cache.get_cached_data(symbol, interval, start_date, end_date, market_type,
+                                                 columns=list(BACKTEST_KLINE_COLUMNS))
         if cached_data is not None:
             print(f"📦 Using cached data: {len(cached_data)} rows")
             return cached_data
         else:
             print(f"❌ Cache miss - downloading fresh data")
 
-        # Try public API first (no auth required)
+        # Try public API first (no auth required). Only one process downloads a
+        # given range; the others wait for it and then read its result.
         try:
-            df = await self.get_historical_data_public(symbol, interval, start_date, end_date, market_type)
-            # Cache the real data
-            self.cache.cache_data(df, symbol, interval, start_date, end_date, market_type)
+            try:
+                async with self.cache.fill_lock(symbol, interval, start_date, end_date, market_type):
+                    cached_data = self.cache.get_cached_data(symbol, interval, start_date, end_date, market_type,
+                                                             columns=list(BACKTEST_KLINE_COLUMNS))
+                    if cached_data is not None:
+                        print(f"📦 Using data cached by a concurrent request: {len(cached_data)} rows")
+                        return cached_data
+                    df = await self.get_historical_data_public(symbol, interval, start_date, end_date, market_type)
+                    # Cache the real data
+                    self.cache.cache_data(df, symbol, interval, start_date, end_date, market_type)
+            except FileLockTimeout:
+                # The filler is still busy: use its result if it landed, otherwise
+                # download for this request only and leave the cache to the lock holder
+                cached_data = self.cache.get_cached_data(symbol, interval, start_date, end_date, market_type,
+                                                         columns=list(BACKTEST_KLINE_COLUMNS))
+                if cached_data is not None:
+                    return cached_data
+                df = await self.get_historical_data_public(symbol, interval, start_date, end_date, market_type)
             return df
         except Exception as e:
             print(f"❌ Public API failed: {e}")
@@ -345,67 +348,87 @@ class BacktestService:
 
     def prepare_indicators(self, df: pd.DataFrame, ema_fast: int = 8, ema_slow: int = 21,
                           rsi_period: int = 7) -> pd.DataFrame:
-        """Add technical indicators to DataFrame"""
+        """Add technical indicators to DataFrame.
+
+        Indicators come from the NumPy kernels in ``indicator_kernels`` (same
+        values as the ``ta`` classes) and the NaN defaults are applied in
+        place on the arrays, so the frame is only assembled once at the end.
+        """
         try:
             print(f"📊 Preparing indicators for {len(df)} rows")
 
             # Create a copy to avoid modifying original data
             df_indicators = df.copy()
-
-            # EMA indicators
-            df_indicators['EMA_fast'] = EMAIndicator(cast(pd.Series, df_indicators['close']), ema_fast).ema_indicator()
-            df_indicators['EMA_slow'] = EMAIndicator(cast(pd.Series, df_indicators['close']), ema_slow).ema_indicator()
-
-            # RSI
-            df_indicators['RSI'] = RSIIndicator(cast(pd.Series, df_indicators['close']), rsi_period).rsi()
-
-            # MACD
-            macd = MACD(cast(pd.Series, df_indicators['close']))
-            df_indicators['MACD'] = macd.macd_diff()
-
-            # Bollinger Bands
-            bb = BollingerBands(cast(pd.Series, df_indicators['close']))
-            df_indicators['BB_upper'] = bb.bollinger_hband()
-            df_indicators['BB_middle'] = bb.bollinger_mavg()
-            df_indicators['BB_lower'] = bb.bollinger_lband()
+            close = df_indicators['close'].to_numpy(dtype=np.float64)
+            has_volume = 'volume' in df_indicators.columns and df_indicators['volume'].sum() > 0
+            kernel = IndicatorKernel(close, df_indicators['volume'].to_numpy(dtype=np.float64) if has_volume else None)
+
+            # Series are memoized per dataset content + indicator params, so only
+            # the ones missing from the cache are actually computed
+            fingerprint = self.indicator_cache.fingerprint(df_indicators)
+
+            def cached(name: str, params: Tuple[Any, ...], compute: Callable[[], np.ndarray]) -> np.ndarray:
+                values = self.indicator_cache.get_or_compute(fingerprint, name, params, compute)
+                return values.copy()
+
+            columns: Dict[str, Any] = {
+                'EMA_fast': cached('EMA', (ema_fast,), lambda: kernel.ema(ema_fast)),
+                'EMA_slow': cached('EMA', (ema_slow,), lambda: kernel.ema(ema_slow)),
+                'RSI': cached('RSI', (rsi_period,), lambda: kernel.rsi(rsi_period)),
+                'MACD': cached('MACD_diff', (12, 26, 9), lambda: kernel.macd_diff(12, 26, 9)),
+                'BB_upper': cached('BB_upper', (20, 2), lambda: kernel.bollinger('upper', 20, 2)),
+                'BB_middle': cached('BB_middle', (20, 2), lambda: kernel.bollinger('middle', 20, 2)),
+                'BB_lower': cached('BB_lower', (20, 2), lambda: kernel.bollinger('lower', 20, 2)),
+            }
 
             # Volume analysis (check if volume exists and has non-zero values)
-            if 'volume' in df_indicators.columns and df_indicators['volume'].sum() > 0:
-                df_indicators['volume_ma'] = df_indicators['volume'].rolling(window=20).mean()
-                df_indicators['volume_ratio'] = df_indicators['volume'] / df_indicators['volume_ma']
+            if has_volume:
+                volume_ma = cached('volume_ma', (20,), lambda: kernel.volume_ma(20))
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    volume_ratio = kernel.volume / volume_ma
                 # Fill division by zero or NaN with 1.0
-                df_indicators['volume_ratio'] = df_indicators['volume_ratio'].fillna(1.0)
-                df_indicators['volume_ratio'] = df_indicators['volume_ratio'].replace([np.inf, -np.inf], 1.0)
+                volume_ratio[~np.isfinite(volume_ratio)] = 1.0
+                columns['volume_ma'] = volume_ma
+                columns['volume_ratio'] = volume_ratio
             else:
-                df_indicators['volume_ma'] = 1000.0  # Default volume
-                df_indicators['volume_ratio'] = 1.0
+                columns['volume_ma'] = np.full(len(close), 1000.0)  # Default volume
+                columns['volume_ratio'] = np.ones(len(close))
 
             # Volatility
-            df_indicators['volatility'] = df_indicators['close'].pct_change().rolling(window=10).std()
-            df_indicators['volatility_ma'] = df_indicators['volatility'].rolling(window=20).mean()
+            columns['volatility'] = cached('volatility', (10,), lambda: kernel.volatility(10))
+            columns['volatility_ma'] = cached('volatility_ma', (10, 20), lambda: kernel.volatility_ma(10, 20))
 
             # Trend strength
-            df_indicators['trend_strength'] = abs(df_indicators['EMA_fast'] - df_indicators['EMA_slow']) / df_indicators['EMA_slow'] * 100
-
-            # Fill any remaining NaN or inf values
-            df_indicators = df_indicators.replace([np.inf, -np.inf], np.nan)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                trend_strength = np.abs(columns['EMA_fast'] - columns['EMA_slow'])
+                trend_strength /= columns['EMA_slow']
+            trend_strength *= 100
+            columns['trend_strength'] = trend_strength
+
+            # inf counts as missing everywhere, like df.replace([inf, -inf], nan)
+            for name in df_indicators.columns:
+                values = df_indicators[name]
+                if pd.api.types.is_float_dtype(values) and np.isinf(values.to_numpy()).any():
+                    df_indicators[name] = values.replace([np.inf, -np.inf], np.nan)
+            fill_close = df_indicators['close'].to_numpy(dtype=np.float64)
 
             # Fill NaN values with appropriate defaults
-            numeric_columns = ['EMA_fast', 'EMA_slow', 'RSI', 'MACD', 'BB_upper', 'BB_middle', 'BB_lower',
-                             'volume_ma', 'volume_ratio', 'volatility', 'volatility_ma', 'trend_strength']
-
-            for col in numeric_columns:
-                if col in df_indicators.columns:
-                    # For price-based indicators, use the close price as fallback
-                    if col.startswith(('EMA_', 'BB_')):
-                        df_indicators[col] = df_indicators[col].fillna(df_indicators['close'])
-                    # For RSI, use neutral value of 50
-                    elif col == 'RSI':
-                        df_indicators[col] = df_indicators[col].fillna(50.0)
-                    # For others, use 0 or appropriate default
-                    else:
-                        default_value = 1.0 if col in ['volume_ratio'] else 0.0
-                        df_indicators[col] = df_indicators[col].fillna(default_value)
+            for col, values in columns.items():
+                missing = ~np.isfinite(values)
+                if not missing.any():
+                    continue
+                # For price-based indicators, use the close price as fallback
+                if col.startswith(('EMA_', 'BB_')):
+                    np.copyto(values, fill_close, where=missing)
+                # For RSI, use neutral value of 50
+                elif col == 'RSI':
+                    values[missing] = 50.0
+                # For others, use 0 or appropriate default
+                else:
+                    values[missing] = 1.0 if col in ['volume_ratio'] else 0.0
+
+            for col, values in columns.items():
+                df_indicators[col] = values
 
             # Ensure we have minimum required rows after indicator calculation
             min_rows_needed = max(ema_slow, rsi_period, 20) + 10  # Add some buffer
@@ -414,8 +437,8 @@ class BacktestService:
                 print(f"⚠️ Warning: Only {len(df_indicators)} rows available, minimum {min_rows_needed} recommended")
 
             # Drop rows where critical indicators are still NaN (typically the first few rows)
-            critical_indicators = ['EMA_fast', 'EMA_slow', 'RSI']
-            df_clean = df_indicators.dropna(subset=critical_indicators)
+            critical = np.isnan(columns['EMA_fast']) | np.isnan(columns['EMA_slow']) | np.isnan(columns['RSI'])
+            df_clean = df_indicators[~critical] if critical.any() else df_indicators
 
             print(f"✅ Indicators prepared: {len(df_clean)} clean rows from {len(df)} original rows")
             print(f"📈 Sample indicators - EMA_fast: {df_clean['EMA_fast'].iloc[-1]:.4f}, RSI: {df_clean['RSI'].iloc[-1]:.2f}")
@@ -591,6 +614,21 @@ class BacktestService:
             print(f"❌ Error checking entry signal: {e}")
             return False
 
+    def _day_entry_signals(self, day_data: pd.DataFrame, rsi_oversold: float,
+                           rsi_overbought: float, signal_mode: str = "vectorized") -> np.ndarray:
+        """Entry signal flags for one day of candles.
+
+        ``signal_mode="row"`` evaluates ``check_entry_signal`` candle by candle and is
+        kept as the reference path for the vectorized engine.
+        """
+        if signal_mode == "row":
+            signals = np.zeros(len(day_data), dtype=bool)
+            for i in range(1, len(day_data)):
+                signals[i] = self.check_entry_signal(day_data.iloc[i], day_data.iloc[i - 1],
+                                                     rsi_oversold, rsi_overbought)
+            return signals
+        return compute_entry_signals(day_data, rsi_oversold, rsi_overbought)
+
     def calculate_fees(self, position_size: float, market_type: str = "spot", is_entry: bool = True,
                        maker_fee: Optional[float] = None, taker_fee: Optional[float] = None,
                        slippage_bps: Optional[float] = None) -> float:
@@ -610,226 +648,239 @@ class BacktestService:
         maker = default_maker if maker_fee is None else float(maker_fee)
         taker = default_taker if taker_fee is None else float(taker_fee)
         slip_bps = 1.0 if slippage_bps is None else float(slippage_bps)
-        slip_rate = slip_bps / 10000.0
-
-        commission_rate = taker if is_entry else maker
-        commission = position_size * commission_rate
-        slippage_cost = position_size * slip_rate
-        return float(commission + slippage_cost)
+        return calculate_fee(position_size, is_entry, maker, taker, slip_bps)
 
     def calculate_daily_pnl(
         self,
         daily_groups: Iterable[Tuple[Any, pd.DataFrame]],
         max_daily_trades: int = 5
     ) -> Dict[str, Any]:
-        """Iterate grouped daily data to apply risk rules and optional trade logging."""
+        """Apply risk rules and optional trade logging to already grouped daily data.
+
+        The day frames are flattened into arrays and run through the same NumPy core
+        as ``run_simulation``; ``signal_mode="row"`` in the context switches entry
+        signals to the per-row ``check_entry_signal`` reference path.
+        """
         context = self._daily_calc_context
         if context is None:
             raise RuntimeError("Daily calculation context not initialized")
 
-        try:
-            max_daily_trades = int(max_daily_trades)
-        except (TypeError, ValueError):
-            max_daily_trades = 5
-
-        max_daily_trades = max(1, min(50, max_daily_trades))
-
-        current_capital = float(context.get('current_capital', 0.0))
-        daily_target = float(context.get('daily_target', 3.0))
-        max_daily_loss = float(context.get('max_daily_loss', 1.0))
-        risk_per_trade = float(context.get('risk_per_trade', 2.0))
-        stop_loss = float(context.get('stop_loss', 0.5))
-        take_profit = float(context.get('take_profit', 1.5))
-        trailing_stop = float(context.get('trailing_stop', 0.3))
-        maker_fee = float(context.get('maker_fee', 0.0002))
-        taker_fee = float(context.get('taker_fee', 0.0004))
-        slippage_bps = float(context.get('slippage_bps', 1.0))
-        market_type = str(context.get('market_type', 'spot')).lower()
-        leverage = int(context.get('leverage', 1))
-        collect_trades = bool(context.get('collect_trades', False))
-        symbol = str(context.get('symbol', 'SYMBOL'))
         parameters = context.get('parameters', {})
+        signal_mode = str(context.get('signal_mode', 'vectorized'))
 
-        daily_results: List[Dict[str, Any]] = []
-        monthly_results: Dict[str, Dict[str, float]] = {}
-        trade_log: List[Dict[str, Any]] = []
-        total_trades = 0
-        winning_trades = 0
-        losing_trades = 0
-        total_fees = 0.0
-
+        frames: List[pd.DataFrame] = []
+        labels: List[str] = []
         for date, day_data in daily_groups:
-            daily_pnl_pct = 0.0
-            daily_trades = 0
-            day_data = day_data.reset_index(drop=True)
-
-            for i in range(1, len(day_data)):
-                if daily_trades >= max_daily_trades or daily_pnl_pct <= -max_daily_loss:
-                    break
-
-                current = day_data.iloc[i]
-                previous = day_data.iloc[i - 1]
-
-                if not self.check_entry_signal(current, previous,
-                                               parameters.get('rsi_oversold', 35),
-                                               parameters.get('rsi_overbought', 65)):
-                    continue
-
-                max_position_size = current_capital * (risk_per_trade / 100)
-                entry_price = float(current['close'])
-                stop_loss_price = entry_price * (1 - stop_loss / 100)
-                risk_per_unit = entry_price - stop_loss_price
-                position_units = (max_position_size / risk_per_unit) if risk_per_unit > 0 else 0.0
-                position_value = position_units * entry_price
-
-                if market_type == "futures":
-                    margin_required = position_value / max(leverage, 1)
-                else:
-                    margin_required = position_value
+            frames.append(day_data.reset_index(drop=True))
+            labels.append(str(date))
 
-                if margin_required > current_capital * 0.95:
-                    margin_required = current_capital * 0.95
-                    if market_type == "futures":
-                        position_value = margin_required * max(leverage, 1)
-                        position_units = position_value / entry_price if entry_price else 0.0
-                    else:
-                        position_value = margin_required
-                        position_units = position_value / entry_price if entry_price else 0.0
-
-                entry_fee = self.calculate_fees(position_value, market_type, is_entry=True,
-                                                maker_fee=maker_fee, taker_fee=taker_fee,
-                                                slippage_bps=slippage_bps)
-                total_entry_cost = margin_required + entry_fee
-
-                if total_entry_cost > current_capital or position_units <= 0:
-                    continue
+        lengths = [len(f) for f in frames]
+        offsets = np.zeros(len(frames) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(lengths)
+        flat = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=pd.Index(['close', 'high', 'low']))
 
-                current_capital -= total_entry_cost
-                total_fees += entry_fee
-
-                trailing_stop_price = entry_price * (1 - trailing_stop / 100)
-                max_price = entry_price
-                take_profit_price = entry_price * (1 + take_profit / 100)
-                stop_loss_price = entry_price * (1 - stop_loss / 100)
-
-                remaining_data = day_data.iloc[i + 1:]
-                exit_price = entry_price
-                exit_time = str(current['timestamp']) if 'timestamp' in current else str(date)
-                exit_reason = "EOD"
-                exit_found = False
-
-                for _, check_price in remaining_data.iterrows():
-                    if check_price['high'] > max_price:
-                        max_price = check_price['high']
-                        trailing_stop_price = max_price * (1 - trailing_stop / 100)
-
-                    if check_price['high'] >= take_profit_price:
-                        exit_price = float(take_profit_price)
-                        exit_time = str(check_price['timestamp']) if 'timestamp' in check_price else exit_time
-                        exit_reason = "TP"
-                        exit_found = True
-                        break
+        if 'timestamp' in flat.columns:
+            timestamps: Any = flat['timestamp'].to_numpy(dtype=object)
+        else:
+            timestamps = np.repeat(np.array(labels, dtype=object), lengths)
+
+        signals = None
+        if signal_mode == "row":
+            signals = np.concatenate([
+                self._day_entry_signals(frame, parameters.get('rsi_oversold', 35),
+                                        parameters.get('rsi_overbought', 65), signal_mode)
+                for frame in frames
+            ]) if frames else np.zeros(0, dtype=bool)
+
+        results = simulate_daily(frame_to_columns(flat), offsets, labels, timestamps, context,
+                                 max_daily_trades, signals=signals)
+        context['current_capital'] = results['current_capital']
+        return results
+
+    def run_simulation(self, df: pd.DataFrame, max_daily_trades: int = 5,
+                       progress_callback: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+        """Run the daily simulation on an indicator DataFrame using the current context.
+
+        Day boundaries come from ``searchsorted`` on day numbers, so no per-day
+        DataFrame or per-candle Series is ever built.
+        """
+        context = self._daily_calc_context
+        if context is None:
+            raise RuntimeError("Daily calculation context not initialized")
 
-                    if check_price['low'] <= min(stop_loss_price, trailing_stop_price):
-                        exit_price = float(max(stop_loss_price, trailing_stop_price))
-                        exit_time = str(check_price['timestamp']) if 'timestamp' in check_price else exit_time
-                        exit_reason = "SL"
-                        exit_found = True
-                        break
+        order, offsets, labels = day_offsets(df['timestamp'])
+        timestamps = pd.DatetimeIndex(df['timestamp'])
+        if order is not None:
+            timestamps = timestamps[order]
 
-                if not exit_found and len(remaining_data) > 0:
-                    last_row = day_data.iloc[-1]
-                    exit_price = float(last_row['close'])
-                    exit_time = str(last_row['timestamp']) if 'timestamp' in last_row else exit_time
+        results = simulate_daily(frame_to_columns(df, order), offsets, labels, timestamps, context,
+                                 max_daily_trades, progress_callback=progress_callback)
+        context['current_capital'] = results['current_capital']
+        return results
 
-                actual_units = float(position_value / entry_price) if entry_price else 0.0
-                position_exit_value = actual_units * exit_price
+    def _normalize_parameters(self, parameters: Optional[Dict[str, Any]], market_type: str = "spot",
+                              verbose: bool = True) -> Tuple[Dict[str, Any], int]:
+        """Sanitize strategy parameters and return them with the applied leverage."""
+        parameters = dict(parameters or {})
 
-                if market_type == "futures":
-                    print(f"📈 Futures Entry: {actual_units:.6f} {symbol} @ ${entry_price:.4f} ({max(leverage, 1)}x), Margin: ${margin_required:.2f}")
-                else:
-                    print(f"📈 Spot Entry: {actual_units:.6f} {symbol} @ ${entry_price:.4f}, Cost: ${total_entry_cost:.2f}")
+        parameters['initial_capital'] = float(parameters.get('initial_capital', 1000) or 1000)
+        parameters['daily_target'] = float(parameters.get('daily_target', 3.0) or 3.0)
+        parameters['max_daily_loss'] = float(parameters.get('max_daily_loss', 1.0) or 1.0)
+        parameters['stop_loss'] = float(parameters.get('stop_loss', 0.5) or 0.5)
+        parameters['take_profit'] = float(parameters.get('take_profit', 1.5) or 1.5)
+        parameters['trailing_stop'] = float(parameters.get('trailing_stop', 0.3) or 0.3)
+        parameters['risk_per_trade'] = float(parameters.get('risk_per_trade', 2.0) or 2.0)
 
-                exit_fee = self.calculate_fees(position_exit_value, market_type, is_entry=False,
-                                               maker_fee=maker_fee, taker_fee=taker_fee,
-                                               slippage_bps=slippage_bps)
+        leverage = int(parameters.get('leverage', 1) or 1)
 
-                if market_type == "futures":
-                    pnl_raw = (exit_price - entry_price) * actual_units
-                    net_proceeds = margin_required + pnl_raw - exit_fee
-                else:
-                    net_proceeds = position_exit_value - exit_fee
+        # Validate leverage for futures
+        if market_type.lower() == "futures":
+            if leverage < 1 or leverage > 125:
+                leverage = 10  # Default futures leverage
+            if verbose:
+                print(f"⚡ Futures trading with {leverage}x leverage")
+        else:
+            leverage = 1  # Spot always 1x
+            if verbose:
+                print(f"💰 Spot trading (no leverage)")
 
-                current_capital += net_proceeds
-                total_fees += exit_fee
+        # Technical indicator parameters
+        parameters['ema_fast'] = int(parameters.get('ema_fast', 8))
+        parameters['ema_slow'] = int(parameters.get('ema_slow', 21))
+        parameters['rsi_period'] = int(parameters.get('rsi_period', 7))
+        parameters['rsi_oversold'] = float(parameters.get('rsi_oversold', 35))
+        parameters['rsi_overbought'] = float(parameters.get('rsi_overbought', 65))
 
-                trade_pnl_usdt = net_proceeds - total_entry_cost
-                trade_pnl_percentage = ((exit_price - entry_price) / entry_price) * 100 if entry_price else 0.0
-                if market_type == "futures":
-                    trade_pnl_percentage *= max(leverage, 1)
+        # Fee & slippage parameters (overrides defaults)
+        default_maker = 0.0001 if market_type.lower() == "futures" else 0.0002
+        default_taker = 0.0004
+        parameters['maker_fee'] = float(parameters.get('maker_fee', default_maker))
+        parameters['taker_fee'] = float(parameters.get('taker_fee', default_taker))
+        parameters['slippage_bps'] = float(parameters.get('slippage_bps', 1.0))
 
-                if trade_pnl_usdt > 0:
-                    winning_trades += 1
-                else:
-                    losing_trades += 1
-
-                daily_pnl_pct += trade_pnl_percentage
-                daily_trades += 1
-                total_trades += 1
-
-                print(f"📉 Exit: ${exit_price:.4f}, P&L: ${trade_pnl_usdt:.2f} ({trade_pnl_percentage:.2f}%), Capital: ${current_capital:.2f}")
-
-                if collect_trades:
-                    trade_log.append({
-                        'date': str(date),
-                        'side': 'LONG',
-                        'entry_time': str(current['timestamp']) if 'timestamp' in current else str(date),
-                        'exit_time': exit_time,
-                        'entry_price': round(float(entry_price), 8),
-                        'exit_price': round(float(exit_price), 8),
-                        'units': round(float(actual_units), 8),
-                        'pnl_usdt': round(float(trade_pnl_usdt), 6),
-                        'pnl_pct': round(float(trade_pnl_percentage), 6),
-                        'fees_entry': round(float(entry_fee), 6),
-                        'fees_exit': round(float(exit_fee), 6),
-                        'capital_after': round(float(current_capital), 6),
-                        'leverage': int(max(leverage, 1)),
-                        'exit_reason': exit_reason
-                    })
+        try:
+            max_daily_trades = int(parameters.get('max_daily_trades', 5))
+        except (TypeError, ValueError):
+            max_daily_trades = 5
+        parameters['max_daily_trades'] = max(1, min(50, max_daily_trades))
 
-                if daily_pnl_pct >= daily_target:
-                    break
+        return parameters, leverage
 
-            if daily_trades > 0:
-                daily_results.append({
-                    'date': str(date),
-                    'pnl_pct': daily_pnl_pct,
-                    'trades': daily_trades,
-                    'capital': current_capital
-                })
+    @staticmethod
+    def _build_daily_context(parameters: Dict[str, Any], leverage: int, market_type: str, symbol: str,
+                             collect_trades: bool = False, log_trades: bool = False) -> Dict[str, Any]:
+        """Context consumed by ``run_simulation``/``calculate_daily_pnl`` from normalized parameters."""
+        return {
+            'current_capital': parameters['initial_capital'],
+            'daily_target': parameters['daily_target'],
+            'max_daily_loss': parameters['max_daily_loss'],
+            'risk_per_trade': parameters['risk_per_trade'],
+            'stop_loss': parameters['stop_loss'],
+            'take_profit': parameters['take_profit'],
+            'trailing_stop': parameters['trailing_stop'],
+            'maker_fee': parameters['maker_fee'],
+            'taker_fee': parameters['taker_fee'],
+            'slippage_bps': parameters['slippage_bps'],
+            'market_type': market_type,
+            'leverage': leverage,
+            'symbol': symbol,
+            'parameters': parameters,
+            'collect_trades': collect_trades,
+            'log_trades': log_trades
+        }
 
-                month = pd.to_datetime(str(date)).strftime('%Y-%m')
-                if month not in monthly_results:
-                    monthly_results[month] = {'pnl_pct': 0.0, 'trades': 0}
-                monthly_results[month]['pnl_pct'] += daily_pnl_pct
-                monthly_results[month]['trades'] += daily_trades
+    def _summarize_results(self, calc_results: Dict[str, Any], parameters: Dict[str, Any], leverage: int,
+                           symbol: str, interval: str, start_date: str, end_date: str,
+                           market_type: str, verbose: bool = True) -> Dict[str, Any]:
+        """Turn raw simulation output into the result payload returned by ``run_backtest``."""
+        initial_capital = float(parameters['initial_capital'])
+        current_capital = calc_results['current_capital']
+        daily_results = calc_results['daily_results']
+        monthly_results = calc_results['monthly_results']
+        total_trades = calc_results['total_trades']
+        winning_trades = calc_results['winning_trades']
+        losing_trades = calc_results['losing_trades']
+        total_fees = calc_results['total_fees']
+
+        # Calculate final results
+        total_return = (current_capital - initial_capital) / initial_capital * 100 if initial_capital else 0
+        win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
+        avg_profit = (current_capital - initial_capital) / total_trades if total_trades > 0 else 0
+
+        if verbose:
+            print(f"🔍 Final Calculations:")
+            print(f"   Initial Capital: ${initial_capital:.2f}")
+            print(f"   Final Capital: ${current_capital:.2f}")
+            print(f"   Net P&L: ${current_capital - initial_capital:.2f}")
+            print(f"   Total Trades: {total_trades}")
+            print(f"   Winning: {winning_trades}, Losing: {losing_trades}")
+            print(f"   Total Fees: ${total_fees:.2f}")
+            print(f"   Win Rate: {win_rate:.2f}%")
+            print(f"   Total Return: {total_return:.2f}%")
 
-        context['current_capital'] = current_capital
+        # Build equity curve from daily results (capital per day)
+        equity_curve = [float(x.get('capital', current_capital)) for x in daily_results] if daily_results else [float(current_capital)]
+
+        # Day-level returns for risk metrics
+        day_returns = [float(x.get('pnl_pct', 0)) for x in daily_results]
+
+        # Advanced metrics
+        max_drawdown = self._compute_max_drawdown(equity_curve)
+        sharpe = self._compute_sharpe(day_returns)
+        sortino = self._compute_sortino(day_returns)
+        profit_factor = self._compute_profit_factor([
+            # approximate trade PnLs from daily totals (coarse), could be refined to per-trade log
+            # keep signs in percentage * capital proxy not needed for PF scale, but consistency kept simple
+            float(x.get('pnl_pct', 0)) for x in daily_results
+        ])
+        cagr = self._compute_cagr(float(initial_capital), float(current_capital), start_date, end_date)
+
+        # Normalize parameters for output (ensure leverage reflects applied value)
+        parameters_out = dict(parameters)
+        try:
+            parameters_out['leverage'] = int(leverage)
+        except Exception:
+            parameters_out['leverage'] = leverage
 
-        return {
-            'current_capital': current_capital,
-            'daily_results': daily_results,
-            'monthly_results': monthly_results,
+        results: Dict[str, Any] = {
+            'initial_capital': initial_capital,
+            'final_capital': current_capital,
+            'total_return': total_return,
             'total_trades': total_trades,
             'winning_trades': winning_trades,
             'losing_trades': losing_trades,
+            'win_rate': win_rate,
             'total_fees': total_fees,
-            'trade_log': trade_log
+            'avg_profit': avg_profit,
+            'daily_results': daily_results,
+            'monthly_results': monthly_results,
+            'max_drawdown': max_drawdown,
+            'sharpe': sharpe,
+            'sortino': sortino,
+            'profit_factor': profit_factor,
+            'cagr': cagr,
+            'symbol': symbol,
+            'interval': interval,
+            'start_date': start_date,
+            'end_date': end_date,
+            'market_type': market_type,
+            'leverage': leverage,
+            'parameters': parameters_out,
+            'test_mode': self.test_mode
         }
+        return results
 
     async def run_backtest(self, symbol: str, interval: str, start_date: str, end_date: str,
-                    parameters: Dict[str, Any], market_type: str = "spot") -> Dict[str, Any]:
-        """Run complete backtest with leverage support for futures"""
+                    parameters: Dict[str, Any], market_type: str = "spot",
+                    progress_callback: Optional[Callable[[int, int], None]] = None,
+                    log_trades: bool = False) -> Dict[str, Any]:
+        """Run complete backtest with leverage support for futures.
+
+        Indicator preparation and the simulation run in a worker thread so the
+        event loop stays responsive. ``progress_callback(done_days, total_days)``
+        is called from that thread after every simulated day. Every entry and
+        exit is printed only with ``log_trades``.
+        """
         try:
             print(f"🚀 Starting {market_type} backtest for {symbol} {interval}")
             # Ensure client setup (so authenticated path can be used when possible)
@@ -837,181 +888,29 @@ class BacktestService:
             if self.test_mode:
                 print("🧪 Running in TEST MODE")
 
-            parameters = dict(parameters or {})
-
-            # Get parameters with sanitization
-            initial_capital = float(parameters.get('initial_capital', 1000) or 1000)
-            parameters['initial_capital'] = initial_capital
-
-            daily_target = float(parameters.get('daily_target', 3.0) or 3.0)
-            parameters['daily_target'] = daily_target
-
-            max_daily_loss = float(parameters.get('max_daily_loss', 1.0) or 1.0)
-            parameters['max_daily_loss'] = max_daily_loss
-
-            stop_loss = float(parameters.get('stop_loss', 0.5) or 0.5)
-            parameters['stop_loss'] = stop_loss
-
-            take_profit = float(parameters.get('take_profit', 1.5) or 1.5)
-            parameters['take_profit'] = take_profit
-
-            trailing_stop = float(parameters.get('trailing_stop', 0.3) or 0.3)
-            parameters['trailing_stop'] = trailing_stop
-
-            risk_per_trade = float(parameters.get('risk_per_trade', 2.0) or 2.0)
-            parameters['risk_per_trade'] = risk_per_trade
-
-            leverage = int(parameters.get('leverage', 1) or 1)
-
-            # Validate leverage for futures
-            if market_type.lower() == "futures":
-                if leverage < 1 or leverage > 125:
-                    leverage = 10  # Default futures leverage
-                print(f"⚡ Futures trading with {leverage}x leverage")
-            else:
-                leverage = 1  # Spot always 1x
-                print(f"💰 Spot trading (no leverage)")
-
-            # Technical indicator parameters
-            ema_fast = int(parameters.get('ema_fast', 8))
-            ema_slow = int(parameters.get('ema_slow', 21))
-            rsi_period = int(parameters.get('rsi_period', 7))
-            rsi_oversold = float(parameters.get('rsi_oversold', 35))
-            rsi_overbought = float(parameters.get('rsi_overbought', 65))
-
-            parameters['ema_fast'] = ema_fast
-            parameters['ema_slow'] = ema_slow
-            parameters['rsi_period'] = rsi_period
-            parameters['rsi_oversold'] = rsi_oversold
-            parameters['rsi_overbought'] = rsi_overbought
-
-            # Fee & slippage parameters (overrides defaults)
-            default_maker = 0.0001 if market_type.lower() == "futures" else 0.0002
-            default_taker = 0.0004
-            maker_fee = float(parameters.get('maker_fee', default_maker))
-            taker_fee = float(parameters.get('taker_fee', default_taker))
-            slippage_bps = float(parameters.get('slippage_bps', 1.0))
-
-            parameters['maker_fee'] = maker_fee
-            parameters['taker_fee'] = taker_fee
-            parameters['slippage_bps'] = slippage_bps
-
-            try:
-                max_daily_trades = int(parameters.get('max_daily_trades', 5))
-            except (TypeError, ValueError):
-                max_daily_trades = 5
-            max_daily_trades = max(1, min(50, max_daily_trades))
-            parameters['max_daily_trades'] = max_daily_trades
-
-            # Initialize variables
-            current_capital = initial_capital
+            parameters, leverage = self._normalize_parameters(parameters, market_type)
 
             # Get and prepare data
             df = await self.get_historical_data(symbol, interval, start_date, end_date, market_type)
-            df = self.prepare_indicators(df, ema_fast, ema_slow, rsi_period)
+            df = await asyncio.to_thread(self.prepare_indicators, df, parameters['ema_fast'],
+                                         parameters['ema_slow'], parameters['rsi_period'])
 
             print(f"📊 Data prepared: {len(df)} candles")
-            print(f"💰 Starting capital: ${current_capital:.2f}")
-
-            # Group by day for daily trading limits
-            daily_groups = df.groupby(df['timestamp'].dt.date)
-
-            self._daily_calc_context = {
-                'current_capital': current_capital,
-                'daily_target': daily_target,
-                'max_daily_loss': max_daily_loss,
-                'risk_per_trade': risk_per_trade,
-                'stop_loss': stop_loss,
-                'take_profit': take_profit,
-                'trailing_stop': trailing_stop,
-                'maker_fee': maker_fee,
-                'taker_fee': taker_fee,
-                'slippage_bps': slippage_bps,
-                'market_type': market_type,
-                'leverage': leverage,
-                'symbol': symbol,
-                'parameters': parameters,
-                'collect_trades': False
-            }
+            print(f"💰 Starting capital: ${parameters['initial_capital']:.2f}")
+
+            # The trade log is captured once here and persisted with the result for CSV export
+            self._daily_calc_context = self._build_daily_context(parameters, leverage, market_type, symbol,
+                                                                 collect_trades=True, log_trades=log_trades)
 
             try:
-                calc_results = self.calculate_daily_pnl(daily_groups, max_daily_trades)
+                calc_results = await asyncio.to_thread(self.run_simulation, df, parameters['max_daily_trades'],
+                                                       progress_callback)
             finally:
                 self._daily_calc_context = None
 
-            current_capital = calc_results['current_capital']
-            daily_results = calc_results['daily_results']
-            monthly_results = calc_results['monthly_results']
-            total_trades = calc_results['total_trades']
-            winning_trades = calc_results['winning_trades']
-            losing_trades = calc_results['losing_trades']
-            total_fees = calc_results['total_fees']
-
-            # Calculate final results
-            total_return = (current_capital - initial_capital) / initial_capital * 100 if initial_capital else 0
-            win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
-            avg_profit = (current_capital - initial_capital) / total_trades if total_trades > 0 else 0
-
-            print(f"🔍 Final Calculations:")
-            print(f"   Initial Capital: ${initial_capital:.2f}")
-            print(f"   Final Capital: ${current_capital:.2f}")
-            print(f"   Net P&L: ${current_capital - initial_capital:.2f}")
-            print(f"   Total Trades: {total_trades}")
-            print(f"   Winning: {winning_trades}, Losing: {losing_trades}")
-            print(f"   Total Fees: ${total_fees:.2f}")
-            print(f"   Win Rate: {win_rate:.2f}%")
-            print(f"   Total Return: {total_return:.2f}%")
-
-            # Build equity curve from daily results (capital per day)
-            equity_curve = [float(x.get('capital', current_capital)) for x in daily_results] if daily_results else [float(current_capital)]
-
-            # Day-level returns for risk metrics
-            day_returns = [float(x.get('pnl_pct', 0)) for x in daily_results]
-
-            # Advanced metrics
-            max_drawdown = self._compute_max_drawdown(equity_curve)
-            sharpe = self._compute_sharpe(day_returns)
-            sortino = self._compute_sortino(day_returns)
-            profit_factor = self._compute_profit_factor([
-                # approximate trade PnLs from daily totals (coarse), could be refined to per-trade log
-                # keep signs in percentage * capital proxy not needed for PF scale, but consistency kept simple
-                float(x.get('pnl_pct', 0)) for x in daily_results
-            ])
-            cagr = self._compute_cagr(float(initial_capital), float(current_capital), start_date, end_date)
-
-            # Normalize parameters for output (ensure leverage reflects applied value)
-            parameters_out = dict(parameters)
-            try:
-                parameters_out['leverage'] = int(leverage)
-            except Exception:
-                parameters_out['leverage'] = leverage
-
-            results: Dict[str, Any] = {
-                'initial_capital': initial_capital,
-                'final_capital': current_capital,
-                'total_return': total_return,
-                'total_trades': total_trades,
-                'winning_trades': winning_trades,
-                'losing_trades': losing_trades,
-                'win_rate': win_rate,
-                'total_fees': total_fees,
-                'avg_profit': avg_profit,
-                'daily_results': daily_results,
-                'monthly_results': monthly_results,
-                'max_drawdown': max_drawdown,
-                'sharpe': sharpe,
-                'sortino': sortino,
-                'profit_factor': profit_factor,
-                'cagr': cagr,
-                'symbol': symbol,
-                'interval': interval,
-                'start_date': start_date,
-                'end_date': end_date,
-                'market_type': market_type,
-                'leverage': leverage,
-                'parameters': parameters_out,
-                'test_mode': self.test_mode
-            }
+            results = self._summarize_results(calc_results, parameters, leverage, symbol, interval,
+                                              start_date, end_date, market_type)
+            results['trade_log'] = calc_results['trade_log']
 
             # Clean NaN values before returning
             cleaned_results = self.clean_nan_values(results)
@@ -1021,8 +920,213 @@ class BacktestService:
             print(f"❌ Backtest error: {e}")
             raise
 
+    def run_prepared_batch(self, jobs: List[Dict[str, Any]], max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Run many backtests on already loaded klines, in parallel where possible.
+
+        Each job holds ``data`` (raw kline DataFrame), ``parameters``, ``symbol``,
+        ``interval``, ``start_date``, ``end_date`` and ``market_type``. Indicators
+        are prepared once per (data, ema_fast, ema_slow, rsi_period) and shared
+        with the worker processes. Jobs with ``collect_trades`` also get their
+        ``trade_log``. Results are returned in job order, uncleaned.
+        """
+        prepared: List[Tuple[Dict[str, Any], Dict[str, Any], int]] = []
+        for job in jobs:
+            market_type = job.get('market_type', 'spot')
+            parameters, leverage = self._normalize_parameters(job.get('parameters'), market_type, verbose=False)
+            prepared.append((job, parameters, leverage))
+
+        with BacktestExecutor(max_workers) as executor:
+            dataset_ids: Dict[Tuple[int, int, int, int], int] = {}
+            tasks: List[SimulationTask] = []
+            for job, parameters, leverage in prepared:
+                key = (id(job['data']), parameters['ema_fast'], parameters['ema_slow'], parameters['rsi_period'])
+                if key not in dataset_ids:
+                    df_indicators = self.prepare_indicators(job['data'], *key[1:])
+                    dataset_ids[key] = executor.add_dataset(df_indicators)
+                config = self._build_daily_context(parameters, leverage, job.get('market_type', 'spot'),
+                                                   job['symbol'], collect_trades=bool(job.get('collect_trades')),
+                                                   log_trades=False)
+                tasks.append((dataset_ids[key], config, parameters['max_daily_trades']))
+
+            print(f"⚙️ Running {len(tasks)} simulations on {len(dataset_ids)} datasets with {executor.max_workers} workers")
+            calc_results = executor.run(tasks)
+
+        results = []
+        for calc, (job, parameters, leverage) in zip(calc_results, prepared):
+            result = self._summarize_results(calc, parameters, leverage, job['symbol'], job['interval'],
+                                             job['start_date'], job['end_date'], job.get('market_type', 'spot'),
+                                             verbose=False)
+            if job.get('collect_trades'):
+                result['trade_log'] = calc['trade_log']
+            results.append(result)
+        return results
+
+    async def run_backtest_batch(self, requests: List[Dict[str, Any]],
+                                 max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Run ``run_backtest``-style requests (multi-symbol, walk-forward folds...) as one batch.
+
+        Each request has ``symbol``, ``interval``, ``start_date``, ``end_date``,
+        ``parameters`` and optional ``market_type``. Klines are loaded once per
+        distinct data range; results come back in request order.
+        """
+        await self.setup_binance_client()
+        frames: Dict[Tuple[str, str, str, str, str], pd.DataFrame] = {}
+        jobs: List[Dict[str, Any]] = []
+        for request in requests:
+            market_type = request.get('market_type', 'spot')
+            data_key = (request['symbol'], request['interval'], request['start_date'], request['end_date'], market_type)
+            if data_key not in frames:
+                frames[data_key] = await self.get_historical_data(*data_key)
+            jobs.append({**request, 'market_type': market_type, 'data': frames[data_key]})
+
+        results = await asyncio.to_thread(self.run_prepared_batch, jobs, max_workers)
+        return [cast(Dict[str, Any], self.clean_nan_values(result)) for result in results]
+
+    @staticmethod
+    def expand_parameter_grid(grid: Dict[str, Any], max_combinations: int = SWEEP_MAX_COMBINATIONS) -> List[Dict[str, Any]]:
+        """Expand a sweep grid into parameter combinations.
+
+        Each key in ``SWEEP_PARAMETERS`` maps to a list of values, a single value, or a
+        range ``{"start", "stop", "step"}`` with an inclusive stop. Combinations where
+        ``ema_fast >= ema_slow`` are skipped.
+        """
+        if not grid:
+            raise ValueError("Sweep grid is empty")
+
+        axes: List[Tuple[str, List[Any]]] = []
+        for name, spec in grid.items():
+            if name not in SWEEP_PARAMETERS:
+                raise ValueError(f"Unsupported sweep parameter: {name}")
+            if isinstance(spec, dict):
+                try:
+                    start = float(spec['start'])
+                    stop = float(spec['stop'])
+                    step = float(spec.get('step', 1))
+                except (KeyError, TypeError, ValueError):
+                    raise ValueError(f"Range for {name} needs numeric start, stop and step")
+                if step <= 0 or stop < start:
+                    raise ValueError(f"Invalid range for {name}")
+                count = int(np.floor((stop - start) / step + 1e-9)) + 1
+                values: List[Any] = [round(start + k * step, 10) for k in range(count)]
+            elif isinstance(spec, (list, tuple)):
+                values = list(spec)
+            else:
+                values = [spec]
+            if not values:
+                raise ValueError(f"No values given for {name}")
+            if name in ('ema_fast', 'ema_slow', 'rsi_period'):
+                values = [int(v) for v in values]
+            else:
+                values = [float(v) for v in values]
+            axes.append((name, list(dict.fromkeys(values))))
+
+        total = 1
+        for _, values in axes:
+            total *= len(values)
+        if total > max_combinations:
+            raise ValueError(f"Sweep has {total} combinations, maximum is {max_combinations}")
+
+        names = [name for name, _ in axes]
+        combinations = []
+        for values in itertools.product(*(v for _, v in axes)):
+            combo = dict(zip(names, values))
+            ema_fast = combo.get('ema_fast')
+            ema_slow = combo.get('ema_slow')
+            if ema_fast is not None and ema_slow is not None and ema_fast >= ema_slow:
+                continue
+            combinations.append(combo)
+
+        if not combinations:
+            raise ValueError("Sweep grid has no valid combinations (ema_fast must be below ema_slow)")
+        return combinations
+
+    @staticmethod
+    def _sweep_sort_value(value: Any) -> float:
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return float('-inf')
+        return float('-inf') if np.isnan(value) else value
+
+    async def run_parameter_sweep(self, symbol: str, interval: str, start_date: str, end_date: str,
+                                  base_parameters: Dict[str, Any], grid: Dict[str, Any],
+                                  market_type: str = "spot", rank_by: str = "sharpe",
+                                  top_k: int = 3, max_workers: Optional[int] = None,
+                                  max_combinations: int = SWEEP_MAX_COMBINATIONS) -> Dict[str, Any]:
+        """Backtest every grid combination on a single data load and rank them.
+
+        Klines are fetched once and indicators are prepared once per distinct
+        (ema_fast, ema_slow, rsi_period); simulations run on ``BacktestExecutor``.
+        Returns a ranked metrics table plus the full results of the ``top_k``
+        best combinations for persisting. Those are simulated again with their
+        trade log, which is only worth collecting for the saved ones.
+        """
+        if rank_by not in SWEEP_RANK_METRICS:
+            raise ValueError(f"rank_by must be one of {', '.join(SWEEP_RANK_METRICS)}")
+
+        combinations = self.expand_parameter_grid(grid, max_combinations)
+        print(f"🧪 Parameter sweep: {len(combinations)} combinations for {symbol} {interval} [{market_type}]")
+
+        await self.setup_binance_client()
+        df = await self.get_historical_data(symbol, interval, start_date, end_date, market_type)
+
+        jobs = [{
+            'data': df,
+            'parameters': {**(base_parameters or {}), **combo},
+            'symbol': symbol,
+            'interval': interval,
+            'start_date': start_date,
+            'end_date': end_date,
+            'market_type': market_type
+        } for combo in combinations]
+        full_results = await asyncio.to_thread(self.run_prepared_batch, jobs, max_workers)
+
+        rows: List[Dict[str, Any]] = []
+        for result_index, (combo, result) in enumerate(zip(combinations, full_results)):
+            rows.append({
+                'parameters': combo,
+                'total_return': result['total_return'],
+                'sharpe': result['sharpe'],
+                'sortino': result['sortino'],
+                'max_drawdown': result['max_drawdown'],
+                'profit_factor': result['profit_factor'],
+                'win_rate': result['win_rate'],
+                'total_trades': result['total_trades'],
+                'result_index': result_index
+            })
+
+        rows.sort(key=lambda r: self._sweep_sort_value(r[rank_by]), reverse=True)
+        top_k = max(0, min(int(top_k), len(rows)))
+        top_jobs = []
+        for rank, row in enumerate(rows, start=1):
+            row['rank'] = rank
+            result_index = row.pop('result_index')
+            if rank <= top_k:
+                top_jobs.append({**jobs[result_index], 'collect_trades': True})
+        top_results = await asyncio.to_thread(self.run_prepared_batch, top_jobs, max_workers) if top_jobs else []
+
+        print(f"✅ Sweep finished: best {rank_by}={rows[0][rank_by] if rows else None}")
+
+        return cast(Dict[str, Any], self.clean_nan_values({
+            'symbol': symbol,
+            'interval': interval,
+            'start_date': start_date,
+            'end_date': end_date,
+            'market_type': market_type,
+            'rank_by': rank_by,
+            'combinations': len(rows),
+            'candles': len(df),
+            'results': rows,
+            'top_results': top_results
+        }))
+
     async def save_backtest_result(self, results: Dict[str, Any]) -> Optional[int]:
-        """Save backtest results to database"""
+        """Save backtest results to database.
+
+        A ``trade_log`` entry is popped from ``results`` and stored compressed,
+        so it is not echoed back in API responses.
+        """
+        trade_log = results.pop('trade_log', None)
         if not self.user_id or not self.db_session:
             print("⚠️ Cannot save backtest - no user or database session")
             return None
@@ -1046,6 +1150,7 @@ class BacktestService:
                 avg_profit=results['avg_profit'],
                 daily_results=results.get('daily_results'),
                 monthly_results=results.get('monthly_results'),
+                trade_log=encode_trade_log(trade_log) if trade_log is not None else None,
                 test_mode=str(results['test_mode']).lower(),
                 market_type=str(results.get('market_type', 'spot')).lower()
             )
@@ -1163,6 +1268,15 @@ class BacktestService:
             print(f"❌ Error getting backtest detail: {e}")
             raise HTTPException(status_code=500, detail=f"Failed to get backtest: {str(e)}")
 
+    async def get_backtest_trade_log(self, backtest_id: int, user_id: int,
+                                     db_session: AsyncSession) -> Optional[List[Dict[str, Any]]]:
+        """Stored trade log of a backtest, or None if it was saved without one"""
+        result = await db_session.execute(
+            select(Backtest.trade_log)
+            .where(Backtest.id == backtest_id, Backtest.user_id == user_id)
+        )
+        return decode_trade_log(result.scalar_one_or_none())
+
     async def delete_backtest(self, backtest_id: int, user_id: int, db_session: AsyncSession):
         """Delete a backtest"""
         try:
@@ -1213,72 +1327,20 @@ class BacktestService:
     ) -> List[Dict[str, Any]]:
         """Re-simulate backtest to generate a simple trade-by-trade log without persisting.
 
+        Only needed for backtests saved before the trade log was stored with the result.
+
         Returns a list of dict rows with keys: date, entry_time, exit_time, entry_price,
         exit_price, units, pnl_usdt, pnl_pct, fees_entry, fees_exit, capital_after.
         """
-        parameters = dict(parameters or {})
-
-        initial_capital = float(parameters.get('initial_capital', 1000) or 1000)
-        daily_target = float(parameters.get('daily_target', 3.0) or 3.0)
-        max_daily_loss = float(parameters.get('max_daily_loss', 1.0) or 1.0)
-        stop_loss = float(parameters.get('stop_loss', 0.5) or 0.5)
-        take_profit = float(parameters.get('take_profit', 1.5) or 1.5)
-        trailing_stop = float(parameters.get('trailing_stop', 0.3) or 0.3)
-        risk_per_trade = float(parameters.get('risk_per_trade', 2.0) or 2.0)
-
-        leverage = int(parameters.get('leverage', 1) or 1)
-        if market_type.lower() != "futures":
-            leverage = 1
-
-        ema_fast = int(parameters.get('ema_fast', 8))
-        ema_slow = int(parameters.get('ema_slow', 21))
-        rsi_period = int(parameters.get('rsi_period', 7))
-        rsi_oversold = float(parameters.get('rsi_oversold', 35))
-        rsi_overbought = float(parameters.get('rsi_overbought', 65))
-
-        default_maker = 0.0001 if market_type.lower() == "futures" else 0.0002
-        default_taker = 0.0004
-        maker_fee = float(parameters.get('maker_fee', default_maker))
-        taker_fee = float(parameters.get('taker_fee', default_taker))
-        slippage_bps = float(parameters.get('slippage_bps', 1.0))
-
-        try:
-            max_daily_trades = int(parameters.get('max_daily_trades', 5))
-        except (TypeError, ValueError):
-            max_daily_trades = 5
-        max_daily_trades = max(1, min(50, max_daily_trades))
-        parameters['max_daily_trades'] = max_daily_trades
-
-        current_capital = float(initial_capital)
+        parameters, leverage = self._normalize_parameters(parameters, market_type, verbose=False)
 
         df = await self.get_historical_data(symbol, interval, start_date, end_date, market_type)
-        df = self.prepare_indicators(df, ema_fast, ema_slow, rsi_period)
-        daily_groups = df.groupby(df['timestamp'].dt.date)
-
-        self._daily_calc_context = {
-            'current_capital': current_capital,
-            'daily_target': daily_target,
-            'max_daily_loss': max_daily_loss,
-            'risk_per_trade': risk_per_trade,
-            'stop_loss': stop_loss,
-            'take_profit': take_profit,
-            'trailing_stop': trailing_stop,
-            'maker_fee': maker_fee,
-            'taker_fee': taker_fee,
-            'slippage_bps': slippage_bps,
-            'market_type': market_type,
-            'leverage': leverage,
-            'symbol': symbol,
-            'parameters': {
-                **parameters,
-                'rsi_oversold': rsi_oversold,
-                'rsi_overbought': rsi_overbought
-            },
-            'collect_trades': True
-        }
+        df = self.prepare_indicators(df, parameters['ema_fast'], parameters['ema_slow'], parameters['rsi_period'])
 
+        self._daily_calc_context = self._build_daily_context(parameters, leverage, market_type, symbol,
+                                                             collect_trades=True, log_trades=False)
         try:
-            calc_results = self.calculate_daily_pnl(daily_groups, max_daily_trades)
+            calc_results = self.run_simulation(df, parameters['max_daily_trades'])
         finally:
             self._daily_calc_context = None
 
@@ -1296,8 +1358,12 @@ class BacktestService:
                 # Spot symbols
                 url = "https://api.binance.com/api/v3/exchangeInfo"
 
+            weight_class = 'futures' if market_type.lower() == "futures" else 'spot'
+            limiter = get_binance_rate_limiter()
+            await limiter.acquire(weight_class, 1 if weight_class == 'futures' else 20)
             async with httpx.AsyncClient(timeout=httpx.Timeout(10.0)) as client:
                 response = await client.get(url)
+            await limiter.observe(weight_class, response.status_code, response.headers)
             if response.status_code != 200:
                 print(f"❌ Failed to fetch symbols: {response.status_code}")
                 return self._get_fallback_symbols(market_type)
@@ -0,0 +1,291 @@
+"""NumPy kernels for the backtest indicator set.
+
+Replacements for the ``ta`` indicators used by ``prepare_indicators`` that
+work on contiguous float64 arrays and write into caller-provided output
+buffers. Intermediates shared by several indicators (EMAs, price changes,
+Bollinger statistics) are computed once per series by ``IndicatorKernel``.
+
+Values match ``ta``/pandas (``ewm(adjust=False)``, ``rolling``) to within
+floating point rounding; ``tests/test_indicator_kernels.py`` guards that.
+Inputs with NaN/inf after the leading NaN prefix are handed to pandas, whose
+missing-value rules the kernels do not replicate.
+"""
+import math
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Largest growth factor (as exp(x)) used inside one EWM block; keeps the
+# closed-form block solution well inside float64 range and precision
+_EWM_EXPONENT_BUDGET = 20.0
+# Rows per slice for the rolling statistics (bounds their temporaries)
+_ROLLING_CHUNK_ROWS = 1 << 16
+# Rows sharing one reference value inside a rolling-sum slice
+_ANCHOR_ROWS = 1024
+
+
+def _buffer(n: int, out: Optional[np.ndarray]) -> np.ndarray:
+    if out is None:
+        return np.empty(n, dtype=np.float64)
+    if out.shape != (n,) or out.dtype != np.float64:
+        raise ValueError("Output buffer must be a float64 array of the input length")
+    return out
+
+
+def _first_valid(values: np.ndarray) -> int:
+    """Index of the first non-NaN value, or -1 when the tail after it is not all finite"""
+    nan = np.isnan(values)
+    start = int(np.argmin(nan)) if len(values) else 0
+    if len(values) == 0 or nan[start]:
+        return len(values)
+    return start if np.isfinite(values[start:]).all() else -1
+
+
+def _ewm_recursion(values: np.ndarray, alpha: float, carry: float, out: np.ndarray):
+    """out[i] = (1 - alpha) * out[i - 1] + alpha * values[i], with out[-1] = carry.
+
+    Solved in closed form per block of ``block`` rows:
+    ``y[i] = phi**(i+1) * carry + phi**i * cumsum(alpha * x[k] / phi**k)``;
+    only the carry between blocks is a (short) Python loop.
+    """
+    n = len(values)
+    if n == 0:
+        return
+    phi = 1.0 - alpha
+    if phi <= 0.0:
+        out[:] = values
+        return
+    block = max(1, min(n, int(_EWM_EXPONENT_BUDGET / -math.log(phi)))) if phi < 1.0 else n
+    powers = phi ** np.arange(block, dtype=np.float64)
+    growth = alpha / powers
+    decay = powers * phi
+
+    full = n - n % block
+    if full:
+        blocks = out[:full].reshape(-1, block)
+        np.multiply(values[:full].reshape(-1, block), growth, out=blocks)
+        np.cumsum(blocks, axis=1, out=blocks)
+        blocks *= powers
+        step = phi ** block
+        carries = []
+        for end in blocks[:, -1].tolist():
+            carries.append(carry)
+            carry = step * carry + end
+        blocks += np.multiply.outer(np.asarray(carries), decay)
+    if full < n:
+        tail = out[full:]
+        np.multiply(values[full:], growth[:n - full], out=tail)
+        np.cumsum(tail, out=tail)
+        tail *= powers[:n - full]
+        tail += carry * decay[:n - full]
+
+
+def ewm_mean(values: np.ndarray, alpha: float, min_periods: int = 0,
+             out: Optional[np.ndarray] = None) -> np.ndarray:
+    """``pd.Series(values).ewm(alpha=alpha, adjust=False, min_periods=min_periods).mean()``
+
+    ``out`` may be ``values`` itself; the recursion only reads each input
+    before writing the same position.
+    """
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    n = len(values)
+    out = _buffer(n, out)
+    start = _first_valid(values)
+    if start < 0:
+        out[:] = pd.Series(values).ewm(alpha=alpha, adjust=False, min_periods=min_periods).mean().to_numpy()
+        return out
+
+    out[:start] = np.nan
+    if start < n:
+        out[start] = values[start]
+        _ewm_recursion(values[start + 1:], alpha, float(values[start]), out[start + 1:])
+        out[start:min(n, start + max(min_periods, 1) - 1)] = np.nan
+    return out
+
+
+def ema(values: np.ndarray, period: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """``ta`` EMAIndicator: span ``period``, NaN until ``period`` values were seen"""
+    return ewm_mean(values, 2.0 / (period + 1), period, out)
+
+
+def _window_sums(segment: np.ndarray, window: int, squares: bool) -> Tuple[np.ndarray, Optional[np.ndarray], np.ndarray]:
+    """Sums (and sums of squares) of every full window of ``segment``.
+
+    The segment is cut into overlapping rows of ``_ANCHOR_ROWS + window - 1``
+    values with their own cumulative sums, so rounding never accumulates over
+    the whole series. For squares each row is also shifted by its first value
+    (variance is shift-invariant) to avoid cancellation; sums are then
+    relative to the returned per-window reference, otherwise it is zero.
+    """
+    count = len(segment) - window + 1
+    rows = -(-count // _ANCHOR_ROWS)
+    width = _ANCHOR_ROWS + window - 1
+    padded = segment
+    if rows * _ANCHOR_ROWS + window - 1 > len(segment):
+        padded = np.concatenate([segment, np.zeros(rows * _ANCHOR_ROWS + window - 1 - len(segment))])
+    spans = np.lib.stride_tricks.sliding_window_view(padded, width)[::_ANCHOR_ROWS]
+    reference = spans[:, :1].copy() if squares else np.zeros((rows, 1))
+    deviations = spans - reference
+
+    cumulative = np.zeros((rows, width + 1))
+    np.cumsum(deviations, axis=1, out=cumulative[:, 1:])
+    sums = (cumulative[:, window:] - cumulative[:, :-window]).ravel()[:count]
+    square_sums = None
+    if squares:
+        np.square(deviations, out=deviations)
+        np.cumsum(deviations, axis=1, out=cumulative[:, 1:])
+        square_sums = (cumulative[:, window:] - cumulative[:, :-window]).ravel()[:count]
+    references = np.repeat(reference[:, 0], _ANCHOR_ROWS)[:count]
+    return sums, square_sums, references
+
+
+def _rolling(values: np.ndarray, window: int, out: np.ndarray, ddof: Optional[int]) -> np.ndarray:
+    """Rolling mean (``ddof`` None) or std into ``out``; NaN until a window has no leading NaN"""
+    n = len(values)
+    start = _first_valid(values)
+    first = start + window - 1
+    out[:min(n, first)] = np.nan
+    for batch in range(first, n, _ROLLING_CHUNK_ROWS):
+        end = min(n, batch + _ROLLING_CHUNK_ROWS)
+        sums, square_sums, references = _window_sums(values[batch - window + 1:end], window, ddof is not None)
+        target = out[batch:end]
+        if ddof is None:
+            np.divide(sums, window, out=target)
+            target += references
+        else:
+            # Sum of squared deviations from the window mean, shift-invariant
+            np.square(sums, out=sums)
+            sums /= window
+            np.subtract(square_sums, sums, out=target)
+            np.maximum(target, 0.0, out=target)
+            target /= window - ddof
+            np.sqrt(target, out=target)
+            # Windows of equal values are exactly 0, as in pandas, not rounding noise
+            segment = values[batch - window + 1:end]
+            moves = np.zeros(len(segment))
+            np.cumsum(np.abs(np.diff(segment)), out=moves[1:])
+            target[moves[window - 1:] == moves[:len(moves) - window + 1]] = 0.0
+    return out
+
+
+def rolling_mean(values: np.ndarray, window: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """``pd.Series(values).rolling(window).mean()``"""
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    out = _buffer(len(values), out)
+    if _first_valid(values) < 0:
+        out[:] = pd.Series(values).rolling(window).mean().to_numpy()
+        return out
+    return _rolling(values, window, out, None)
+
+
+def rolling_std(values: np.ndarray, window: int, ddof: int = 1, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """``pd.Series(values).rolling(window).std(ddof=ddof)``"""
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    out = _buffer(len(values), out)
+    if _first_valid(values) < 0:
+        out[:] = pd.Series(values).rolling(window).std(ddof=ddof).to_numpy()
+        return out
+    return _rolling(values, window, out, ddof)
+
+
+class IndicatorKernel:
+    """Indicators of one close (and volume) series, sharing intermediates.
+
+    Every method takes an optional preallocated ``out`` buffer. EMAs, the
+    price changes and the Bollinger mean/std are computed once and reused
+    by the indicators that need them.
+    """
+
+    def __init__(self, close: np.ndarray, volume: Optional[np.ndarray] = None):
+        self.close = np.ascontiguousarray(close, dtype=np.float64)
+        self.volume = None if volume is None else np.ascontiguousarray(volume, dtype=np.float64)
+        self.n = len(self.close)
+        self._emas: Dict[int, np.ndarray] = {}
+        self._diff: Optional[np.ndarray] = None
+        self._bollinger: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self._volatility: Dict[int, np.ndarray] = {}
+
+    def _ema(self, period: int) -> np.ndarray:
+        if period not in self._emas:
+            self._emas[period] = ema(self.close, period)
+        return self._emas[period]
+
+    def ema(self, period: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+        out = _buffer(self.n, out)
+        out[:] = self._ema(period)
+        return out
+
+    def _price_diff(self) -> np.ndarray:
+        if self._diff is None:
+            self._diff = np.empty(self.n)
+            self._diff[:1] = np.nan
+            np.subtract(self.close[1:], self.close[:-1], out=self._diff[1:])
+        return self._diff
+
+    def rsi(self, period: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """``ta`` RSIIndicator: Wilder smoothing (alpha = 1/period) of gains and losses"""
+        out = _buffer(self.n, out)
+        diff = self._price_diff()
+        gains = np.where(diff > 0, diff, 0.0)
+        losses = np.where(diff < 0, -diff, 0.0)
+        ewm_mean(gains, 1.0 / period, period, out=gains)
+        ewm_mean(losses, 1.0 / period, period, out=losses)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.divide(gains, losses, out=gains)
+            gains += 1
+            np.divide(100, gains, out=gains)
+            np.subtract(100, gains, out=out)
+        out[losses == 0] = 100.0
+        return out
+
+    def macd_diff(self, fast: int = 12, slow: int = 26, signal: int = 9,
+                  out: Optional[np.ndarray] = None) -> np.ndarray:
+        """``ta`` MACD.macd_diff: MACD line minus its signal EMA"""
+        out = _buffer(self.n, out)
+        macd = self._ema(fast) - self._ema(slow)
+        ema(macd, signal, out=out)
+        np.subtract(macd, out, out=out)
+        return out
+
+    def _bollinger_stats(self, window: int) -> Tuple[np.ndarray, np.ndarray]:
+        if window not in self._bollinger:
+            self._bollinger[window] = (rolling_mean(self.close, window), rolling_std(self.close, window, ddof=0))
+        return self._bollinger[window]
+
+    def bollinger(self, band: str, window: int = 20, deviations: float = 2,
+                  out: Optional[np.ndarray] = None) -> np.ndarray:
+        """``ta`` BollingerBands band: 'upper', 'middle' or 'lower'"""
+        out = _buffer(self.n, out)
+        mavg, mstd = self._bollinger_stats(window)
+        if band == 'middle':
+            out[:] = mavg
+        else:
+            np.multiply(mstd, deviations, out=out)
+            if band == 'upper':
+                np.add(mavg, out, out=out)
+            else:
+                np.subtract(mavg, out, out=out)
+        return out
+
+    def volume_ma(self, window: int = 20, out: Optional[np.ndarray] = None) -> np.ndarray:
+        if self.volume is None:
+            raise ValueError("No volume series")
+        return rolling_mean(self.volume, window, out)
+
+    def volatility(self, window: int = 10, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Rolling std (ddof=1) of close-to-close returns (``close.pct_change()``)"""
+        out = _buffer(self.n, out)
+        if window not in self._volatility:
+            returns = np.empty(self.n)
+            returns[:1] = np.nan
+            with np.errstate(divide='ignore', invalid='ignore'):
+                np.divide(self.close[1:], self.close[:-1], out=returns[1:])
+            returns[1:] -= 1
+            self._volatility[window] = rolling_std(returns, window, ddof=1)
+        out[:] = self._volatility[window]
+        return out
+
+    def volatility_ma(self, window: int = 10, ma_window: int = 20,
+                      out: Optional[np.ndarray] = None) -> np.ndarray:
+        return rolling_mean(self.volatility(window), ma_window, out)
@@ -0,0 +1,277 @@
+"""Incremental indicator state for the live bots.
+
+``IndicatorState`` holds the running EMA, RSI, MACD and Bollinger state of one
+close series. Each new closed candle costs O(1), whatever the indicator
+periods. After the same candles the values equal what ``prepare_indicators``
+(``indicator_kernels``/``ta``) computes, to within floating point rounding.
+``peek`` gives the values as if the candle still in progress had closed at
+the given price, without changing the state.
+
+The state is plain JSON and lives in Redis under one key per
+(market, symbol, interval, periods). ``advance_state`` feeds it only the
+candles it has not seen. It reports a gap when candles are missing, and the
+caller then reseeds the state from a longer history.
+"""
+import math
+import os
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.redis_client import read_json_sync, write_json_sync
+
+MACD_PERIODS = (12, 26, 9)
+BOLLINGER_WINDOW = 20
+BOLLINGER_DEVIATIONS = 2.0
+INDICATOR_STATE_TTL_SECONDS = int(os.getenv("INDICATOR_STATE_TTL_SECONDS", str(7 * 86_400)))
+_STATE_VERSION = 1
+
+NAN = float('nan')
+
+
+class _Ewm:
+    """``ewm(alpha, adjust=False, min_periods)`` of the values fed so far"""
+
+    __slots__ = ('alpha', 'min_periods', 'count', 'value')
+
+    def __init__(self, alpha: float, min_periods: int, count: int = 0, value: Optional[float] = None):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.count = count
+        self.value = value
+
+    def _next(self, x: float) -> float:
+        return x if self.value is None else (1.0 - self.alpha) * self.value + self.alpha * x
+
+    def update(self, x: float):
+        self.value = self._next(x)
+        self.count += 1
+
+    def current(self) -> float:
+        return self.value if self.value is not None and self.count >= self.min_periods else NAN
+
+    def peek(self, x: float) -> float:
+        return self._next(x) if self.count + 1 >= self.min_periods else NAN
+
+    def to_list(self) -> list:
+        return [self.count, self.value]
+
+
+def _span_ewm(period: int, state: Optional[list] = None) -> _Ewm:
+    """``ta`` EMA: span ``period``, NaN until ``period`` values were seen"""
+    return _Ewm(2.0 / (period + 1), period, *(state or ()))
+
+
+def _rsi_value(gain: float, loss: float) -> float:
+    if math.isnan(gain) or math.isnan(loss):
+        return NAN
+    if loss == 0:
+        return 100.0
+    return 100.0 - 100.0 / (1.0 + gain / loss)
+
+
+class _RollingStats:
+    """Mean and population std of the last ``window`` values.
+
+    Sums are kept relative to an anchor value and rebuilt from the window
+    every ``window`` updates. That bounds rounding drift, keeps the cost
+    amortized O(1), and gives exactly 0 for a constant window.
+    """
+
+    __slots__ = ('window', 'values', 'anchor', 'total', 'squares', 'since_refresh')
+
+    def __init__(self, window: int, values: Iterable[float] = ()):
+        self.window = window
+        self.values: deque = deque(values, maxlen=window)
+        self._refresh()
+
+    def _refresh(self):
+        self.anchor = self.values[0] if self.values else 0.0
+        shifted = [v - self.anchor for v in self.values]
+        self.total = math.fsum(shifted)
+        self.squares = math.fsum(d * d for d in shifted)
+        self.since_refresh = 0
+
+    def update(self, x: float):
+        dropped = self.values[0] if len(self.values) == self.window else None
+        self.values.append(x)
+        self.since_refresh += 1
+        if self.since_refresh >= self.window:
+            self._refresh()
+            return
+        d = x - self.anchor
+        self.total += d
+        self.squares += d * d
+        if dropped is not None:
+            d = dropped - self.anchor
+            self.total -= d
+            self.squares -= d * d
+
+    def _stats(self, total: float, squares: float) -> Tuple[float, float]:
+        n = self.window
+        mean = total / n
+        return self.anchor + mean, math.sqrt(max(squares / n - mean * mean, 0.0))
+
+    def current(self) -> Tuple[float, float]:
+        if len(self.values) < self.window:
+            return NAN, NAN
+        return self._stats(self.total, self.squares)
+
+    def peek(self, x: float) -> Tuple[float, float]:
+        if len(self.values) + 1 < self.window:
+            return NAN, NAN
+        d = x - self.anchor
+        total, squares = self.total + d, self.squares + d * d
+        if len(self.values) == self.window:
+            d = self.values[0] - self.anchor
+            total, squares = total - d, squares - d * d
+        return self._stats(total, squares)
+
+
+class IndicatorState:
+    """Running ``prepare_indicators`` set (EMA fast/slow, RSI, MACD diff, Bollinger) of one series"""
+
+    def __init__(self, ema_fast: int, ema_slow: int, rsi_period: int):
+        self.periods = (int(ema_fast), int(ema_slow), int(rsi_period))
+        fast_macd, slow_macd, signal = MACD_PERIODS
+        self.ema_fast = _span_ewm(self.periods[0])
+        self.ema_slow = _span_ewm(self.periods[1])
+        self.gain = _Ewm(1.0 / self.periods[2], self.periods[2])
+        self.loss = _Ewm(1.0 / self.periods[2], self.periods[2])
+        self.macd_fast = _span_ewm(fast_macd)
+        self.macd_slow = _span_ewm(slow_macd)
+        self.macd_signal = _span_ewm(signal)
+        self.bollinger = _RollingStats(BOLLINGER_WINDOW)
+        self.last_close: Optional[float] = None
+        self.last_open_time: Optional[int] = None
+        self.candles = 0
+
+    def _changes(self, x: float) -> Tuple[float, float]:
+        # The first change is NaN, which ta counts as a 0 gain and 0 loss
+        diff = NAN if self.last_close is None else x - self.last_close
+        return (diff if diff > 0 else 0.0), (-diff if diff < 0 else 0.0)
+
+    def update(self, close: float, open_time: Optional[int] = None):
+        """Feed one closed candle"""
+        gain, loss = self._changes(close)
+        self.ema_fast.update(close)
+        self.ema_slow.update(close)
+        self.gain.update(gain)
+        self.loss.update(loss)
+        self.macd_fast.update(close)
+        self.macd_slow.update(close)
+        # The signal EMA starts at the first defined MACD value
+        macd = self.macd_fast.current() - self.macd_slow.current()
+        if not math.isnan(macd):
+            self.macd_signal.update(macd)
+        self.bollinger.update(close)
+        self.last_close = close
+        self.candles += 1
+        if open_time is not None:
+            self.last_open_time = int(open_time)
+
+    def values(self) -> Dict[str, float]:
+        """Indicator values after the last closed candle (NaN while warming up)"""
+        macd = self.macd_fast.current() - self.macd_slow.current()
+        mean, std = self.bollinger.current()
+        return self._assemble(self.ema_fast.current(), self.ema_slow.current(),
+                              _rsi_value(self.gain.current(), self.loss.current()),
+                              macd - self.macd_signal.current(), mean, std)
+
+    def peek(self, close: float) -> Dict[str, float]:
+        """Values as if one more candle closed at ``close``; the state is not changed"""
+        gain, loss = self._changes(close)
+        macd = self.macd_fast.peek(close) - self.macd_slow.peek(close)
+        signal = NAN if math.isnan(macd) else self.macd_signal.peek(macd)
+        mean, std = self.bollinger.peek(close)
+        return self._assemble(self.ema_fast.peek(close), self.ema_slow.peek(close),
+                              _rsi_value(self.gain.peek(gain), self.loss.peek(loss)), macd - signal, mean, std)
+
+    @staticmethod
+    def _assemble(ema_fast: float, ema_slow: float, rsi: float, macd_diff: float, mean: float,
+                  std: float) -> Dict[str, float]:
+        return {
+            'EMA_fast': ema_fast, 'EMA_slow': ema_slow, 'RSI': rsi, 'MACD': macd_diff,
+            'BB_upper': mean + BOLLINGER_DEVIATIONS * std, 'BB_middle': mean,
+            'BB_lower': mean - BOLLINGER_DEVIATIONS * std,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'version': _STATE_VERSION,
+            'periods': list(self.periods),
+            'ewm': [e.to_list() for e in (self.ema_fast, self.ema_slow, self.gain, self.loss,
+                                          self.macd_fast, self.macd_slow, self.macd_signal)],
+            'window': list(self.bollinger.values),
+            'last_close': self.last_close,
+            'last_open_time': self.last_open_time,
+            'candles': self.candles,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> Optional["IndicatorState"]:
+        if not data or data.get('version') != _STATE_VERSION:
+            return None
+        state = cls(*data['periods'])
+        for ewm, (count, value) in zip((state.ema_fast, state.ema_slow, state.gain, state.loss,
+                                        state.macd_fast, state.macd_slow, state.macd_signal), data['ewm']):
+            ewm.count, ewm.value = int(count), value
+        # Rebuilding the sums from the window resets their rounding drift
+        state.bollinger = _RollingStats(BOLLINGER_WINDOW, data['window'])
+        state.last_close = data['last_close']
+        state.last_open_time = data['last_open_time']
+        state.candles = int(data['candles'])
+        return state
+
+
+def fill_missing(values: Dict[str, float], close: float) -> Dict[str, float]:
+    """``prepare_indicators`` defaults: price indicators -> close, RSI -> 50, MACD -> 0"""
+    filled = {}
+    for name, value in values.items():
+        if math.isfinite(value):
+            filled[name] = value
+        elif name.startswith(('EMA_', 'BB_')):
+            filled[name] = close
+        else:
+            filled[name] = 50.0 if name == 'RSI' else 0.0
+    return filled
+
+
+def advance_state(state: Optional[IndicatorState], periods: Tuple[int, int, int], open_times: List[int],
+                  closes: List[float], step: int) -> Tuple[IndicatorState, bool]:
+    """Feed the closed candles (all but the last, in-progress one) the state has not seen.
+
+    Returns the state and whether it was (re)built from these candles alone,
+    because there was none or candles between it and the data are missing.
+    """
+    closed = list(zip(open_times[:-1], closes[:-1]))
+    if state is not None and state.periods == tuple(periods) and state.last_open_time is not None:
+        new = [(t, c) for t, c in closed if t > state.last_open_time]
+        if not new or new[0][0] == state.last_open_time + step:
+            for open_time, close in new:
+                state.update(close, open_time)
+            return state, False
+    state = IndicatorState(*periods)
+    for open_time, close in closed:
+        state.update(close, open_time)
+    return state, True
+
+
+def seeded_state(periods: Tuple[int, int, int], closes: Iterable[float]) -> IndicatorState:
+    """State after the given closed candles (no open times, so it cannot be advanced later)"""
+    state = IndicatorState(*periods)
+    for close in closes:
+        state.update(float(close))
+    return state
+
+
+def indicator_state_key(market: str, symbol: str, interval: str, periods: Tuple[int, int, int]) -> str:
+    return f"indicators:{market}:{symbol}:{interval}:{'-'.join(str(p) for p in periods)}:v{_STATE_VERSION}"
+
+
+def load_state(key: str) -> Optional[IndicatorState]:
+    data = read_json_sync(key)
+    return IndicatorState.from_dict(data) if isinstance(data, dict) else None
+
+
+def save_state(key: str, state: IndicatorState) -> bool:
+    return write_json_sync(key, state.to_dict(), INDICATOR_STATE_TTL_SECONDS)
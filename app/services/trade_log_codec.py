@@ -0,0 +1,48 @@
+"""Compact storage format for per-trade backtest logs.
+
+The log is stored column-wise (one JSON list per field) and zlib-compressed,
+which keeps repeated values such as dates, sides and exit reasons cheap.
+"""
+import json
+import zlib
+from typing import Any, Dict, List, Optional
+
+TRADE_LOG_COLUMNS = (
+    "date", "side", "entry_time", "exit_time", "entry_price", "exit_price",
+    "units", "pnl_usdt", "pnl_pct", "fees_entry", "fees_exit", "capital_after", "leverage", "exit_reason"
+)
+TRADE_LOG_DEFAULTS: Dict[str, Any] = {
+    "side": "LONG",
+    "entry_price": 0,
+    "exit_price": 0,
+    "units": 0,
+    "pnl_usdt": 0,
+    "pnl_pct": 0,
+    "fees_entry": 0,
+    "fees_exit": 0,
+    "capital_after": 0,
+    "leverage": 1,
+    "exit_reason": "EOD",
+}
+
+_FORMAT_MAGIC = b"TLZ1"
+
+
+def encode_trade_log(trade_log: List[Dict[str, Any]]) -> bytes:
+    """Trade rows -> compressed columnar blob"""
+    columns = {
+        name: [row.get(name, TRADE_LOG_DEFAULTS.get(name)) for row in trade_log]
+        for name in TRADE_LOG_COLUMNS
+    }
+    payload = json.dumps({"rows": len(trade_log), "columns": columns}, separators=(",", ":"))
+    return _FORMAT_MAGIC + zlib.compress(payload.encode("utf-8"), 6)
+
+
+def decode_trade_log(blob: Optional[bytes]) -> Optional[List[Dict[str, Any]]]:
+    """Compressed blob -> trade rows; ``None`` when nothing usable is stored"""
+    if not blob or not bytes(blob[:len(_FORMAT_MAGIC)]) == _FORMAT_MAGIC:
+        return None
+    payload = json.loads(zlib.decompress(bytes(blob[len(_FORMAT_MAGIC):])).decode("utf-8"))
+    columns = payload["columns"]
+    names = [name for name in TRADE_LOG_COLUMNS if name in columns]
+    return [dict(zip(names, values)) for values in zip(*(columns[name] for name in names))] if names else []
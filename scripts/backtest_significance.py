@@ -1,7 +1,8 @@
 import asyncio
+import itertools
 import statistics
 import random
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 
 from app.services.backtest_service import BacktestService
 
@@ -48,25 +49,30 @@ def bootstrap_daily_returns(day_returns: List[float], n_iter: int = 2000) -> Dic
     }
 
 async def walk_forward(symbol: str, interval: str, start_date: str, split_date: str, end_date: str,
-                       base_params: Dict[str, Any], market_type: str = "spot") -> Dict[str, Any]:
+                       base_params: Dict[str, Any], market_type: str = "spot",
+                       max_workers: Optional[int] = None) -> Dict[str, Any]:
     # Small grid for EMA/RSI tuning on training period
     ema_fast_grid = [8, 10, 12]
     ema_slow_grid = [21, 26, 30]
     rsi_period_grid = [7, 14]
 
-    # Train (optimize Sharpe)
+    # Train (optimize Sharpe): the whole grid runs as one batch on one data load
+    grid = list(itertools.product(ema_fast_grid, ema_slow_grid, rsi_period_grid))
+    requests = []
+    for ef, es, rp in grid:
+        params = dict(base_params)
+        params.update({"ema_fast": ef, "ema_slow": es, "rsi_period": rp})
+        requests.append({"symbol": symbol, "interval": interval, "start_date": start_date,
+                         "end_date": split_date, "parameters": params, "market_type": market_type})
+    train_results = await BacktestService().run_backtest_batch(requests, max_workers=max_workers)
+
     best = None
     best_sharpe = -1e9
-    for ef in ema_fast_grid:
-        for es in ema_slow_grid:
-            for rp in rsi_period_grid:
-                params = dict(base_params)
-                params.update({"ema_fast": ef, "ema_slow": es, "rsi_period": rp})
-                train_res = await run_backtest_once(symbol, interval, start_date, split_date, params, market_type)
-                sharpe = float(train_res.get("sharpe", 0.0))
-                if sharpe > best_sharpe:
-                    best_sharpe = sharpe
-                    best = {"ema_fast": ef, "ema_slow": es, "rsi_period": rp, "train": train_res}
+    for (ef, es, rp), train_res in zip(grid, train_results):
+        sharpe = float(train_res.get("sharpe", 0.0))
+        if sharpe > best_sharpe:
+            best_sharpe = sharpe
+            best = {"ema_fast": ef, "ema_slow": es, "rsi_period": rp, "train": train_res}
 
     # Test with best params
     test_params = dict(base_params)
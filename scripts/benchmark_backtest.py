@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Backtest motoru için çevrimdışı benchmark (sentetik, seed'li veri).
+
+Kullanım:
+  python scripts/benchmark_backtest.py [--sizes 10000,100000,1000000,5000000]
+      [--intervals 1m,15m] [--repeat 3] [--output benchmark.json]
+      [--baseline benchmarks/backtest_baseline.json] [--save-baseline]
+
+Her boyut/interval kombinasyonu ayrı bir süreçte çalışır; aşama süreleri
+(prepare_indicators, simulation, calculate_daily_pnl, run_backtest),
+saniyedeki mum sayısı ve tepe RSS ölçülür. --baseline verilirse sonuçlar
+baseline ile karşılaştırılır; tolerans aşılırsa ya da baseline dosyası yoksa
+çıkış kodu 1 olur (deploy öncesi regresyon kapısı). Repoda baseline yoktur:
+deploy donanımıyla aynı sınıftaki makinede --save-baseline ile kaydedilmelidir
+(--baseline verilmezse varsayılan yola yazılır).
+"""
+import argparse
+import json
+import os
+import sys
+
+from app.services.backtest_benchmark import (
+    BENCHMARK_INTERVALS,
+    BENCHMARK_SIZES,
+    BENCHMARK_STAGES,
+    DEFAULT_RSS_TOLERANCE,
+    DEFAULT_TIME_TOLERANCE,
+    compare_results,
+    run_benchmark,
+)
+from app.services.synthetic_data import SYNTHETIC_MODELS
+
+DEFAULT_BASELINE = os.path.join("benchmarks", "backtest_baseline.json")
+
+
+def _csv(value: str):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _print_case(case):
+    timings = "  ".join(
+        f"{stage}={case['stages'][stage]['seconds']:.3f}s" for stage in BENCHMARK_STAGES if stage in case['stages'])
+    throughput = case['stages']['run_backtest']['candles_per_second'] or 0
+    print(f"⏱️ {case['size']:>9} x {case['interval']:<4} {timings}  "
+          f"{throughput:,.0f} candles/s  peak RSS {case['peak_rss_mb']:.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the backtest engine on synthetic data")
+    parser.add_argument("--sizes", type=_csv, default=[str(s) for s in BENCHMARK_SIZES])
+    parser.add_argument("--intervals", type=_csv, default=list(BENCHMARK_INTERVALS))
+    parser.add_argument("--model", choices=sorted(SYNTHETIC_MODELS), default="gbm")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the fastest is kept")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    parser.add_argument("--baseline", default=None,
+                        help=f"Compare against this baseline and fail on regressions (default path: {DEFAULT_BASELINE})")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--time-tolerance", type=float, default=DEFAULT_TIME_TOLERANCE)
+    parser.add_argument("--rss-tolerance", type=float, default=DEFAULT_RSS_TOLERANCE)
+    parser.add_argument("--no-isolate", action="store_true", help="Run all cases in this process")
+    args = parser.parse_args()
+
+    results = run_benchmark(sizes=[int(s) for s in args.sizes], intervals=args.intervals, model=args.model,
+                            seed=args.seed, repeat=args.repeat, isolate=not args.no_isolate,
+                            progress=_print_case)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+    if args.save_baseline:
+        path = args.baseline or DEFAULT_BASELINE
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Baseline saved to {path}")
+        return
+
+    if args.baseline is None:
+        return
+    if not os.path.exists(args.baseline):
+        # A gate without a reference must not pass
+        print(f"❌ No baseline at {args.baseline}; run with --save-baseline on the deploy hardware class first")
+        sys.exit(1)
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare_results(results, baseline, args.time_tolerance, args.rss_tolerance)
+    if not regressions:
+        print("✅ No regressions against baseline")
+        return
+    for r in regressions:
+        print(f"❌ {r['size']} x {r['interval']} {r['metric']}: {r['baseline']} -> {r['current']} "
+              f"({r['change']:+.0%})")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
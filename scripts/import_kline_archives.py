@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Binance public kline arşivlerini (data.binance.vision) kline store'a aktarır.
+
+Kullanım:
+  python scripts/import_kline_archives.py ARŞİV_DİZİNİ [...] [--store-dir cache/klines]
+      [--market-type spot|futures] [--symbol BTCUSDT] [--interval 15m]
+      [--chunk-rows 200000] [--strict] [--dry-run]
+
+Aylık/günlük ZIP veya CSV dosyaları parça parça okunur, boşluk ve tekrar
+kontrolünden geçirilip store'a yazılır; kapsanan dönemler indirilmiş sayılır.
+İnternet erişimi olmayan backtest sunucularını dosya paylaşımından doldurmak
+için kullanılır. Market tipi verilmezse dizin yolundan çıkarılır
+(.../futures/um/... -> futures).
+"""
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+from app.core.kline_archive import ARCHIVE_CHUNK_ROWS, import_archives
+from app.core.kline_store import KlineStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import Binance kline archive files into the kline store")
+    parser.add_argument("paths", nargs="+", help="Archive files or directories (searched recursively)")
+    parser.add_argument("--store-dir", default=os.path.join(os.getcwd(), "cache", "klines"))
+    parser.add_argument("--market-type", choices=["spot", "futures"], default=None)
+    parser.add_argument("--symbol", action="append", dest="symbols", help="Only import this symbol (repeatable)")
+    parser.add_argument("--interval", action="append", dest="intervals", help="Only import this interval (repeatable)")
+    parser.add_argument("--chunk-rows", type=int, default=ARCHIVE_CHUNK_ROWS)
+    parser.add_argument("--strict", action="store_true",
+                        help="Skip a series on any gap or duplicate (other series are still imported; exit code 1)")
+    parser.add_argument("--dry-run", action="store_true", help="Validate only, write nothing")
+    args = parser.parse_args()
+
+    try:
+        reports = import_archives(
+            args.paths, KlineStore(args.store_dir), market_type=args.market_type,
+            symbols=[s.upper() for s in args.symbols] if args.symbols else None,
+            intervals=args.intervals, chunk_rows=args.chunk_rows, strict=args.strict, dry_run=args.dry_run,
+        )
+    except ValueError as e:
+        print(f"❌ Import aborted: {e}")
+        sys.exit(1)
+
+    if not reports:
+        print("⚠️ No kline archives found")
+        return
+    failed = [report for report in reports if report['error']]
+    for report in reports:
+        if report['error']:
+            print(f"❌ {report['symbol']} {report['interval']} [{report['market_type']}]: not imported, {report['error']}")
+            continue
+        print(f"✅ {report['symbol']} {report['interval']} [{report['market_type']}]: "
+              f"{report['archives']} archives, {report['rows']} candles imported, "
+              f"{report['duplicates']} duplicates, {report['out_of_order']} out of order, "
+              f"{report['gaps']} gaps ({report['missing_candles']} missing candles)")
+        for gap_start, gap_end in report['gap_ranges']:
+            print(f"   ⚠️ gap {pd.Timestamp(gap_start, unit='ms')} -> {pd.Timestamp(gap_end, unit='ms')}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Canlı botlar için WebSocket piyasa verisi servisi.
+
+Kullanım:
+  python scripts/market_data_stream.py [--symbol BTCUSDT --market spot]
+      [--interval 1m] [--no-seed]
+
+Aktif botların kullandığı her sembol için Binance kline ve bookTicker
+akışlarına abone olur. Kapanmış mumların kayan penceresini ve son fiyatı
+Redis'e yazar; her mum kapanışında olay yayınlar. Bot görevleri bu veriyi
+okur ve piyasa verisi için REST'e yalnızca veri eksik/bayatsa başvurur.
+Sembol listesi MARKET_STREAM_REFRESH_SECONDS aralıkla veritabanından
+yenilenir. --symbol verilirse yalnızca verilen semboller izlenir.
+"""
+import argparse
+import asyncio
+import signal
+from typing import Set
+
+from app.core.bot_tasks import BOT_EVALUATION_INTERVAL, SyncSessionLocal
+from app.core.market_stream import MarketStreamService, StreamTarget, market_of, normalize_symbol, rest_seed
+from app.models.bot_config import BotConfig
+
+
+def active_bot_targets() -> Set[StreamTarget]:
+    with SyncSessionLocal() as session:
+        rows = session.query(BotConfig.symbol, BotConfig.position_type).filter(BotConfig.is_active.is_(True)).all()
+    return {(market_of(position_type), normalize_symbol(symbol), BOT_EVALUATION_INTERVAL) for symbol, position_type in rows}
+
+
+async def run(args):
+    if args.symbols:
+        fixed = {(args.market, normalize_symbol(s), args.interval) for s in args.symbols}
+        targets = lambda: fixed  # noqa: E731
+    else:
+        targets = active_bot_targets
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    service = MarketStreamService(targets, seed=None if args.no_seed else rest_seed)
+    print("🚀 Market data stream started")
+    await service.run(stop)
+    print("👋 Market data stream stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream Binance market data for active bots into Redis")
+    parser.add_argument("--symbol", action="append", dest="symbols", help="Stream this symbol instead of active bots (repeatable)")
+    parser.add_argument("--market", choices=["spot", "futures"], default="spot", help="Market of --symbol")
+    parser.add_argument("--interval", default=BOT_EVALUATION_INTERVAL, help="Kline interval of --symbol")
+    parser.add_argument("--no-seed", action="store_true", help="Do not fill the candle window over REST on connect")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
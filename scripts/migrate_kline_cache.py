@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Eski CSV kline cache kayıtlarını sütunsal (.npy) formata dönüştürür.
+
+Kullanım:
+  python scripts/migrate_kline_cache.py [--cache-dir cache/data]
+
+Not: Dönüştürme okuma sırasında da otomatik yapılır; bu script tüm cache'i
+tek seferde dönüştürmek içindir.
+"""
+import argparse
+import os
+
+from app.core.cache import DataCache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate CSV kline cache entries to columnar .npy files")
+    parser.add_argument("--cache-dir", default=os.path.join(os.getcwd(), "cache", "data"))
+    args = parser.parse_args()
+
+    migrated = DataCache(cache_dir=args.cache_dir).migrate_csv_cache()
+    print(f"Migrated entries: {migrated}")
+
+
+if __name__ == "__main__":
+    main()
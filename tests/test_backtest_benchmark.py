@@ -0,0 +1,31 @@
+import copy
+
+from app.services.backtest_benchmark import BENCHMARK_STAGES, compare_results, run_benchmark
+
+
+def test_benchmark_case_reports_every_stage(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    results = run_benchmark(sizes=(3000,), intervals=('15m',), repeat=1, isolate=False)
+
+    [case] = results['cases']
+    assert (case['size'], case['interval']) == (3000, '15m')
+    assert set(case['stages']) == set(BENCHMARK_STAGES)
+    assert all(stage['seconds'] > 0 and stage['candles_per_second'] > 0 for stage in case['stages'].values())
+    assert case['peak_rss_mb'] > 0
+    assert results['environment']['numpy']
+
+
+def test_compare_results_flags_slower_stages_and_memory():
+    baseline = {'cases': [{
+        'size': 1000, 'interval': '1m', 'model': 'gbm', 'peak_rss_mb': 100.0,
+        'stages': {'simulation': {'seconds': 1.0}, 'generate': {'seconds': 0.001}},
+    }]}
+    current = copy.deepcopy(baseline)
+    assert compare_results(current, baseline) == []
+
+    current['cases'][0]['stages']['simulation']['seconds'] = 1.5
+    current['cases'][0]['stages']['generate']['seconds'] = 0.004  # 4x slower but within timer noise
+    current['cases'][0]['peak_rss_mb'] = 200.0
+    regressions = compare_results(current, baseline)
+    assert {r['metric'] for r in regressions} == {'simulation.seconds', 'peak_rss_mb'}
+    assert compare_results(current, baseline, time_tolerance=1.0, rss_tolerance=1.5) == []
@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.backtest_engine import compute_entry_signals, resolve_exit
+from app.services.backtest_service import BacktestService
+
+
+def _synthetic_klines(rows: int = 3000, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.004, rows)))
+    spread = np.abs(rng.normal(0, 0.003, rows)) * close
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2024-01-01', periods=rows, freq='15min'),
+        'open': close * (1 + rng.normal(0, 0.001, rows)),
+        'high': close + spread,
+        'low': close - spread,
+        'close': close,
+        'volume': rng.uniform(1000, 10000, rows),
+    })
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return BacktestService()
+
+
+@pytest.fixture
+def indicators(service):
+    df = service.prepare_indicators(_synthetic_klines())
+    # Sprinkle NaNs so the per-row NaN guards are exercised too
+    df.loc[df.index[50:53], 'MACD'] = np.nan
+    df.loc[df.index[400], 'RSI'] = np.nan
+    df.loc[df.index[900:905], 'volatility_ma'] = np.nan
+    df.loc[df.index[1200], 'volume_ratio'] = np.nan
+    return df
+
+
+def _context(parameters=None, **overrides):
+    context = {
+        'current_capital': 1000.0,
+        'daily_target': 3.0,
+        'max_daily_loss': 1.0,
+        'risk_per_trade': 2.0,
+        'stop_loss': 0.5,
+        'take_profit': 1.5,
+        'trailing_stop': 0.3,
+        'maker_fee': 0.0002,
+        'taker_fee': 0.0004,
+        'slippage_bps': 1.0,
+        'market_type': 'spot',
+        'leverage': 1,
+        'symbol': 'TESTUSDT',
+        'parameters': parameters or {'rsi_oversold': 35, 'rsi_overbought': 65},
+        'collect_trades': True,
+    }
+    context.update(overrides)
+    return context
+
+
+@pytest.mark.parametrize("rsi_bounds", [(35, 65), (20, 80)])
+def test_vectorized_signals_match_row_path(service, indicators, rsi_bounds):
+    rsi_oversold, rsi_overbought = rsi_bounds
+    df = indicators.reset_index(drop=True)
+
+    expected = np.zeros(len(df), dtype=bool)
+    for i in range(1, len(df)):
+        expected[i] = service.check_entry_signal(df.iloc[i], df.iloc[i - 1], rsi_oversold, rsi_overbought)
+
+    vectorized = compute_entry_signals(df, rsi_oversold, rsi_overbought)
+    assert expected.any()
+    np.testing.assert_array_equal(vectorized, expected)
+
+
+def test_vectorized_signals_missing_column(indicators):
+    df = indicators.drop(columns=['MACD'])
+    assert not compute_entry_signals(df).any()
+
+
+@pytest.mark.parametrize("market_type,leverage", [("spot", 1), ("futures", 10)])
+def test_daily_pnl_signal_modes_are_identical(service, indicators, market_type, leverage):
+    results = {}
+    for mode in ("row", "vectorized"):
+        service._daily_calc_context = _context(market_type=market_type, leverage=leverage, signal_mode=mode)
+        daily_groups = indicators.groupby(indicators['timestamp'].dt.date)
+        results[mode] = service.calculate_daily_pnl(daily_groups, max_daily_trades=5)
+
+    assert results['row']['total_trades'] > 0
+    assert results['vectorized'] == results['row']
+
+
+def _reference_exit(high, low, close, start, end, entry_price, take_profit, stop_loss, trailing_stop):
+    """Scalar copy of the original iterrows exit loop."""
+    trailing_stop_price = entry_price * (1 - trailing_stop / 100)
+    max_price = entry_price
+    take_profit_price = entry_price * (1 + take_profit / 100)
+    stop_loss_price = entry_price * (1 - stop_loss / 100)
+    for j in range(start, end):
+        if high[j] > max_price:
+            max_price = high[j]
+            trailing_stop_price = max_price * (1 - trailing_stop / 100)
+        if high[j] >= take_profit_price:
+            return j, float(take_profit_price), "TP"
+        if low[j] <= min(stop_loss_price, trailing_stop_price):
+            return j, float(max(stop_loss_price, trailing_stop_price)), "SL"
+    if end > start:
+        return end - 1, float(close[end - 1]), "EOD"
+    return -1, float(entry_price), "EOD"
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_resolve_exit_matches_reference_loop(seed):
+    rng = np.random.default_rng(seed)
+    rows = 2000
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.0005, rows)))
+    spread = np.abs(rng.normal(0, 0.0008, rows)) * close
+    high = close + spread
+    low = close - spread
+    # Wide bars that cross both TP and SL exercise the TP-before-SL ordering
+    wide = rng.choice(rows, 20, replace=False)
+    high[wide] *= 1.03
+    low[wide] *= 0.97
+    high[rng.choice(rows, 5, replace=False)] = np.nan
+
+    for trailing_stop in (0.05, 0.3, 5.0):
+        for start in rng.choice(rows, 40, replace=False):
+            start = int(start)
+            end = int(min(rows, start + rng.integers(0, 1500)))
+            entry_price = float(close[start - 1]) if start > 0 else float(close[0])
+            args = (high, low, close, start, end, entry_price, 1.5, 0.5, trailing_stop)
+            assert resolve_exit(*args) == _reference_exit(*args)
+
+
+def test_resolve_exit_same_bar_prefers_take_profit():
+    high = np.array([100.0, 103.0])
+    low = np.array([100.0, 97.0])
+    close = np.array([100.0, 100.0])
+    assert resolve_exit(high, low, close, 1, 2, 100.0, 1.5, 0.5, 0.3) == (1, 100.0 * (1 + 1.5 / 100), "TP")
+    assert resolve_exit(high, low, close, 2, 2, 100.0, 1.5, 0.5, 0.3) == (-1, 100.0, "EOD")
+
+
+@pytest.mark.parametrize("shuffle", [False, True])
+def test_run_simulation_matches_groupby_row_path(service, indicators, shuffle):
+    df = indicators
+    if shuffle:
+        # Out-of-order input must still be grouped like groupby(dt.date) does
+        df = df.sample(frac=1.0, random_state=3)
+
+    service._daily_calc_context = _context(signal_mode="row")
+    expected = service.calculate_daily_pnl(df.groupby(df['timestamp'].dt.date), max_daily_trades=3)
+
+    service._daily_calc_context = _context()
+    actual = service.run_simulation(df, max_daily_trades=3)
+
+    assert expected['total_trades'] > 0
+    assert actual == expected
+    assert service._daily_calc_context['current_capital'] == expected['current_capital']
+
+
+def test_trades_are_printed_only_when_asked(service, indicators, capsys):
+    service._daily_calc_context = _context()
+    quiet = service.run_simulation(indicators, max_daily_trades=3)
+    assert quiet['total_trades'] > 0
+    assert 'Entry:' not in capsys.readouterr().out
+
+    service._daily_calc_context = _context(log_trades=True)
+    service.run_simulation(indicators, max_daily_trades=3)
+    assert capsys.readouterr().out.count('Entry:') == quiet['total_trades']
@@ -0,0 +1,97 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.backtest_executor import BacktestExecutor, _ProcessBudget
+from app.services.backtest_service import BacktestService
+
+
+def _synthetic_klines(rows: int = 3000, seed: int = 5, tz=None) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.004, rows)))
+    spread = np.abs(rng.normal(0, 0.003, rows)) * close
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2024-01-01', periods=rows, freq='15min', tz=tz),
+        'open': close,
+        'high': close + spread,
+        'low': close - spread,
+        'close': close,
+        'volume': rng.uniform(1000, 10000, rows),
+    })
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return BacktestService()
+
+
+def _config(service, **overrides):
+    parameters, leverage = service._normalize_parameters({'initial_capital': 1000, **overrides}, 'spot', verbose=False)
+    context = service._build_daily_context(parameters, leverage, 'spot', 'TESTUSDT', collect_trades=True,
+                                           log_trades=False)
+    return context, parameters['max_daily_trades']
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_executor_matches_run_simulation(service, max_workers):
+    frames = [
+        service.prepare_indicators(_synthetic_klines()),
+        # Shuffled, tz-aware input exercises the day reordering and timestamp round trip
+        service.prepare_indicators(_synthetic_klines(seed=9, tz='UTC')).sample(frac=1.0, random_state=1),
+    ]
+    configs = [_config(service, stop_loss=sl, take_profit=tp) for sl, tp in ((0.5, 1.5), (1.0, 2.0))]
+
+    expected = []
+    tasks = []
+    with BacktestExecutor(max_workers) as executor:
+        for df in frames:
+            dataset_id = executor.add_dataset(df)
+            for config, max_daily_trades in configs:
+                service._daily_calc_context = dict(config)
+                expected.append(service.run_simulation(df, max_daily_trades))
+                tasks.append((dataset_id, config, max_daily_trades))
+        results = executor.run(tasks)
+
+    assert any(r['total_trades'] for r in expected)
+    assert results == expected
+
+
+async def test_batch_loads_each_range_once(service, monkeypatch):
+    calls = []
+
+    async def fake_historical_data(symbol, interval, start_date, end_date, market_type="spot"):
+        calls.append((symbol, start_date, end_date))
+        return _synthetic_klines(seed=len(symbol))
+
+    monkeypatch.setattr(service, "get_historical_data", fake_historical_data)
+    requests = [
+        {'symbol': symbol, 'interval': '15m', 'start_date': '2024-01-01', 'end_date': '2024-02-01',
+         'parameters': {'ema_fast': ema_fast}}
+        for symbol in ('AAAUSDT', 'BBBBUSDT') for ema_fast in (5, 8)
+    ]
+    results = await service.run_backtest_batch(requests, max_workers=2)
+
+    assert len(calls) == 2
+    assert [r['symbol'] for r in results] == ['AAAUSDT', 'AAAUSDT', 'BBBBUSDT', 'BBBBUSDT']
+    single = await service.run_backtest('BBBBUSDT', '15m', '2024-01-01', '2024-02-01', {'ema_fast': 8})
+    assert results[3]['final_capital'] == single['final_capital']
+    assert results[3]['sharpe'] == single['sharpe']
+
+
+def test_process_budget_caps_concurrent_workers():
+    budget = _ProcessBudget(4)
+    assert budget.acquire(3) == 3
+    # Only one slot is left; a second executor gets a smaller pool instead of cpu_count more processes
+    assert budget.acquire(8) == 1
+
+    granted = []
+    waiter = threading.Thread(target=lambda: granted.append(budget.acquire(2)))
+    waiter.start()
+    waiter.join(0.1)
+    assert waiter.is_alive() and granted == []
+    budget.release(3)
+    waiter.join(5)
+    assert granted == [2]
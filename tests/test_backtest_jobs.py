@@ -0,0 +1,181 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from app import database
+from app.main import app
+from app.services import backtest_jobs
+from app.services.backtest_service import BacktestService
+from app.core import backtest_tasks
+
+
+class FakeRedis:
+    """In-memory stand-in for the handful of Redis commands the job store uses"""
+
+    def __init__(self):
+        self.values = {}
+        self.sets = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    def delete(self, key):
+        self.values.pop(key, None)
+        self.sets.pop(key, None)
+
+    def exists(self, key):
+        return int(key in self.values or key in self.sets)
+
+    def expire(self, key, seconds):
+        return True
+
+    def sadd(self, key, member):
+        self.sets.setdefault(key, set()).add(member)
+
+    def srem(self, key, member):
+        self.sets.get(key, set()).discard(member)
+
+    def smembers(self, key):
+        return set(self.sets.get(key, set()))
+
+    def scard(self, key):
+        return len(self.sets.get(key, set()))
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(backtest_jobs, "get_redis_sync", lambda: redis)
+    return redis
+
+
+def _klines(rows: int = 2000) -> pd.DataFrame:
+    rng = np.random.default_rng(3)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.004, rows)))
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2024-01-01', periods=rows, freq='15min'),
+        'open': close,
+        'high': close * 1.004,
+        'low': close * 0.996,
+        'close': close,
+        'volume': rng.uniform(1000, 10000, rows),
+    })
+
+
+def _request():
+    return {'symbol': 'TESTUSDT', 'interval': '15m', 'start_date': '2024-01-01', 'end_date': '2024-01-20',
+            'market_type': 'spot', 'parameters': {'max_daily_trades': 5}}
+
+
+def test_per_user_limit_and_slot_release(fake_redis):
+    first = backtest_jobs.create_job(1, _request(), max_jobs=2)
+    backtest_jobs.create_job(1, _request(), max_jobs=2)
+    with pytest.raises(backtest_jobs.BacktestJobLimitError):
+        backtest_jobs.create_job(1, _request(), max_jobs=2)
+    # Other users are not affected
+    backtest_jobs.create_job(2, _request(), max_jobs=2)
+
+    backtest_jobs.finish_job(first['id'], backtest_jobs.JOB_FAILED, error="boom")
+    backtest_jobs.create_job(1, _request(), max_jobs=2)
+    assert len(backtest_jobs.active_job_ids(1)) == 2
+
+
+def test_killed_running_jobs_free_their_slots(fake_redis):
+    stale = backtest_jobs.create_job(1, _request(), max_jobs=2)
+    fresh = backtest_jobs.create_job(1, _request(), max_jobs=2)
+    # The worker running ``stale`` died long ago without reporting back
+    started = time.time() - backtest_jobs.BACKTEST_TASK_TIME_LIMIT - backtest_jobs.BACKTEST_JOB_STALE_GRACE_SECONDS - 1
+    backtest_jobs.update_job(stale['id'], status=backtest_jobs.JOB_RUNNING, started_at=started)
+    backtest_jobs.update_job(fresh['id'], status=backtest_jobs.JOB_RUNNING, started_at=time.time())
+
+    backtest_jobs.create_job(1, _request(), max_jobs=2)
+    assert fresh['id'] in backtest_jobs.active_job_ids(1)
+    job = backtest_jobs.get_user_job(stale['id'], 1)
+    assert job['status'] == backtest_jobs.JOB_FAILED and job['error']
+
+
+def test_running_job_stops_on_cancel(fake_redis):
+    job = backtest_jobs.create_job(1, _request())
+    backtest_jobs.update_job(job['id'], status=backtest_jobs.JOB_RUNNING)
+    reporter = backtest_jobs.JobProgressReporter(job['id'], min_interval=0.0)
+
+    reporter(5, 10)
+    assert backtest_jobs.get_job(job['id'])['progress'] == pytest.approx(0.575)
+
+    backtest_jobs.request_cancel(job['id'])
+    with pytest.raises(backtest_jobs.BacktestJobCancelled):
+        reporter(10, 10)
+
+
+def test_task_runs_job_and_stores_result(fake_redis, tmp_path, monkeypatch):
+    # The test database URL is relative; pin it before moving the data cache into tmp_path
+    monkeypatch.setattr(database, "DATABASE_URL", f"sqlite+aiosqlite:///{os.path.abspath('test.db')}")
+    monkeypatch.chdir(tmp_path)
+
+    async def fake_historical_data(self, *args, **kwargs):
+        return _klines()
+
+    monkeypatch.setattr(BacktestService, "get_historical_data", fake_historical_data)
+    job = backtest_jobs.create_job(1, _request())
+
+    assert backtest_tasks.run_backtest_job(job['id']) == backtest_jobs.JOB_COMPLETED
+    finished = backtest_jobs.get_job(job['id'])
+    assert finished['status'] == backtest_jobs.JOB_COMPLETED
+    assert finished['progress'] == 1.0
+    result = backtest_jobs.get_job_result(job['id'])
+    assert result['symbol'] == 'TESTUSDT'
+    assert result['id'] == finished['backtest_id']
+    assert backtest_jobs.active_job_ids(1) == []
+
+
+async def test_job_routes(fake_redis, monkeypatch):
+    queued = []
+
+    class FakeTask:
+        id = "task-1"
+
+    monkeypatch.setattr(backtest_tasks.run_backtest_job, "apply_async", lambda args: queued.append(args) or FakeTask())
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        headers = {}
+        for email in ("jobs1@example.com", "jobs2@example.com"):
+            await ac.post("/api/v1/auth/register", json={"email": email, "password": "Str0ngP@ssword!"})
+            login = await ac.post("/api/v1/auth/login", json={"email": email, "password": "Str0ngP@ssword!"})
+            headers[email] = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        owner = headers["jobs1@example.com"]
+
+        resp = await ac.post("/api/v1/backtest/jobs", json=_request(), headers=owner)
+        assert resp.status_code == 202
+        job_id = resp.json()["data"]["id"]
+        assert queued == [[job_id]]
+
+        resp = await ac.get(f"/api/v1/backtest/jobs/{job_id}", headers=owner)
+        assert resp.json()["data"]["status"] == "queued"
+        resp = await ac.get(f"/api/v1/backtest/jobs/{job_id}/result", headers=owner)
+        assert resp.status_code == 409
+        resp = await ac.get(f"/api/v1/backtest/jobs/{job_id}", headers=headers["jobs2@example.com"])
+        assert resp.status_code == 404
+
+        resp = await ac.post(f"/api/v1/backtest/jobs/{job_id}/cancel", headers=owner)
+        assert resp.json()["data"]["status"] == "cancelled"
+
+        bad = dict(_request(), parameters={'max_daily_trades': 99})
+        resp = await ac.post("/api/v1/backtest/jobs", json=bad, headers=owner)
+        assert resp.status_code == 422
+
+
+def test_backtest_tasks_use_their_own_queue():
+    from app.core.celery_app import BACKTEST_QUEUE, celery_app
+
+    route = celery_app.amqp.router.route({}, backtest_tasks.run_backtest_job.name)
+    assert route['queue'].name == BACKTEST_QUEUE
+    route = celery_app.amqp.router.route({}, 'app.core.bot_tasks.run_bot_task_for_all')
+    assert route['queue'].name != BACKTEST_QUEUE
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from app.main import app
+from app.services.backtest_service import BacktestService
+
+
+def _synthetic_klines(rows: int = 4000, seed: int = 11) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.004, rows)))
+    spread = np.abs(rng.normal(0, 0.003, rows)) * close
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2024-01-01', periods=rows, freq='15min'),
+        'open': close,
+        'high': close + spread,
+        'low': close - spread,
+        'close': close,
+        'volume': rng.uniform(1000, 10000, rows),
+    })
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    svc = BacktestService()
+    klines = _synthetic_klines()
+    calls = []
+
+    async def fake_historical_data(*args, **kwargs):
+        calls.append(args)
+        return klines.copy()
+
+    monkeypatch.setattr(svc, "get_historical_data", fake_historical_data)
+    svc.data_calls = calls
+    return svc
+
+
+def test_expand_parameter_grid_ranges_and_filters():
+    combos = BacktestService.expand_parameter_grid({
+        'ema_fast': [8, 21],
+        'ema_slow': [21],
+        'stop_loss': {'start': 0.5, 'stop': 1.0, 'step': 0.25},
+    })
+    assert [c['stop_loss'] for c in combos] == [0.5, 0.75, 1.0]
+    assert all(c['ema_fast'] == 8 for c in combos)
+
+    with pytest.raises(ValueError):
+        BacktestService.expand_parameter_grid({'leverage': [1, 2]})
+    with pytest.raises(ValueError):
+        BacktestService.expand_parameter_grid({'ema_fast': list(range(1, 30)), 'take_profit': list(range(1, 30))},
+                                              max_combinations=100)
+
+
+async def test_sweep_loads_data_once_and_matches_single_runs(service):
+    grid = {'ema_fast': [5, 8], 'stop_loss': [0.5, 1.0], 'take_profit': [1.0, 2.0]}
+    sweep = await service.run_parameter_sweep('TESTUSDT', '15m', '2024-01-01', '2024-02-10',
+                                              {'initial_capital': 1000}, grid, rank_by='total_return', top_k=2)
+
+    assert len(service.data_calls) == 1
+    assert sweep['combinations'] == 8
+    returns = [row['total_return'] for row in sweep['results']]
+    assert returns == sorted(returns, reverse=True)
+    assert [row['rank'] for row in sweep['results']] == list(range(1, 9))
+    assert len(sweep['top_results']) == 2
+
+    best = sweep['results'][0]
+    single = await service.run_backtest('TESTUSDT', '15m', '2024-01-01', '2024-02-10',
+                                        {'initial_capital': 1000, **best['parameters']})
+    assert single['total_return'] == best['total_return']
+    assert single['sharpe'] == best['sharpe']
+    assert sweep['top_results'][0]['final_capital'] == single['final_capital']
+    # Saved rows carry their own trade log instead of being re-simulated for trades.csv
+    assert sweep['top_results'][0]['trade_log'] == single['trade_log']
+    assert all(len(r['trade_log']) == r['total_trades'] for r in sweep['top_results'])
+
+
+async def test_sweep_respects_combination_limit(service):
+    grid = {'ema_fast': [5, 8], 'stop_loss': [0.5, 1.0], 'take_profit': [1.0, 2.0]}
+    with pytest.raises(ValueError, match="maximum is 4"):
+        await service.run_parameter_sweep('TESTUSDT', '15m', '2024-01-01', '2024-02-10',
+                                          {'initial_capital': 1000}, grid, max_combinations=4)
+    # Rejected before any data is loaded
+    assert service.data_calls == []
+
+
+async def test_sweep_route_validates_base_and_grid_parameters():
+    request = {'symbol': 'TESTUSDT', 'interval': '15m', 'start_date': '2024-01-01', 'end_date': '2024-02-01',
+               'parameters': {'leverage': 500}, 'grid': {'ema_fast': [5, 8]}}
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        await ac.post("/api/v1/auth/register", json={"email": "sweep@example.com", "password": "Str0ngP@ssword!"})
+        login = await ac.post("/api/v1/auth/login", json={"email": "sweep@example.com", "password": "Str0ngP@ssword!"})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        resp = await ac.post("/api/v1/backtest/sweep", json=request, headers=headers)
+        assert resp.status_code == 422
+        assert 'leverage' in resp.json()['detail']
+
+        request['parameters'] = {}
+        request['grid'] = {'stop_loss': [0.5, 150]}
+        resp = await ac.post("/api/v1/backtest/sweep", json=request, headers=headers)
+        assert resp.status_code == 422
+        assert 'stop_loss' in resp.json()['detail']
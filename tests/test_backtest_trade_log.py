@@ -0,0 +1,93 @@
+import csv
+import io
+
+import numpy as np
+import pandas as pd
+from httpx import AsyncClient, ASGITransport
+
+from app.main import app
+from app.core.cache import DataCache
+from app.services import backtest_service as backtest_service_module
+from app.services.backtest_service import BacktestService
+from app.services.trade_log_codec import TRADE_LOG_COLUMNS, decode_trade_log, encode_trade_log
+
+
+def _klines(rows: int = 3000) -> pd.DataFrame:
+    rng = np.random.default_rng(17)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.004, rows)))
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2024-01-01', periods=rows, freq='15min'),
+        'open': close,
+        'high': close * 1.004,
+        'low': close * 0.996,
+        'close': close,
+        'volume': rng.uniform(1000, 10000, rows),
+    })
+
+
+def test_trade_log_codec_round_trip():
+    rows = [
+        {'date': '2024-01-01', 'side': 'LONG', 'entry_time': '2024-01-01 00:15:00', 'exit_time': '2024-01-01 01:00:00',
+         'entry_price': 100.5, 'exit_price': 101.25, 'units': 0.5, 'pnl_usdt': 0.3, 'pnl_pct': 0.75,
+         'fees_entry': 0.01, 'fees_exit': 0.01, 'capital_after': 1000.3, 'leverage': 1, 'exit_reason': 'TP'},
+    ] * 50
+    blob = encode_trade_log(rows)
+    assert decode_trade_log(blob) == rows
+    assert len(blob) < len(repr(rows)) / 10
+    assert decode_trade_log(encode_trade_log([])) == []
+    assert decode_trade_log(None) is None
+
+
+async def test_trades_csv_is_read_from_storage(tmp_path, monkeypatch):
+    async def fake_historical_data(self, *args, **kwargs):
+        return _klines()
+
+    async def no_resimulation(self, *args, **kwargs):
+        raise AssertionError("trade log should come from storage")
+
+    monkeypatch.setattr(BacktestService, "get_historical_data", fake_historical_data)
+    monkeypatch.setattr(BacktestService, "generate_trade_log", no_resimulation)
+    monkeypatch.setattr(backtest_service_module, "DataCache", lambda cache_dir: DataCache(str(tmp_path)))
+    monkeypatch.chdir(tmp_path)
+
+    request = {'symbol': 'TESTUSDT', 'interval': '15m', 'start_date': '2024-01-01', 'end_date': '2024-02-01',
+               'market_type': 'spot', 'parameters': {'initial_capital': 1000}}
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        await ac.post("/api/v1/auth/register", json={"email": "tradelog@example.com", "password": "Str0ngP@ssword!"})
+        login = await ac.post("/api/v1/auth/login", json={"email": "tradelog@example.com", "password": "Str0ngP@ssword!"})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        resp = await ac.post("/api/v1/backtest/run", json=request, headers=headers)
+        assert resp.status_code == 200
+        data = resp.json()["data"]
+        assert 'trade_log' not in data
+        assert data['total_trades'] > 0
+
+        resp = await ac.get(f"/api/v1/backtest/download/{data['id']}/trades.csv", headers=headers)
+        assert resp.status_code == 200
+        rows = list(csv.reader(io.StringIO(resp.text)))
+
+    assert rows[0] == list(TRADE_LOG_COLUMNS)
+    assert len(rows) - 1 == data['total_trades']
+    assert rows[-1][TRADE_LOG_COLUMNS.index('capital_after')] == str(round(data['final_capital'], 6))
+
+
+async def test_regenerated_trade_log_matches_the_backtest(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    async def fake_historical_data(self, *args, **kwargs):
+        return _klines()
+
+    monkeypatch.setattr(BacktestService, "get_historical_data", fake_historical_data)
+    # Out of range leverage is normalized the same way on both paths
+    parameters = {'initial_capital': 1000, 'leverage': 500}
+    service = BacktestService()
+    result = await service.run_backtest('TESTUSDT', '15m', '2024-01-01', '2024-02-01', parameters,
+                                        market_type='futures', log_trades=False)
+    trade_log = await service.generate_trade_log('TESTUSDT', '15m', '2024-01-01', '2024-02-01', parameters,
+                                                 market_type='futures')
+
+    assert len(trade_log) == len(result['trade_log']) > 0
+    assert {row['leverage'] for row in trade_log} == {10}
+    assert trade_log[-1]['capital_after'] == result['trade_log'][-1]['capital_after']
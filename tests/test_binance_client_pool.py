@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+from app.core import binance_client_pool
+from app.core.binance_client_pool import BinanceClientPool, api_key_version
+
+
+class FakeClient:
+    def __init__(self):
+        self.closed = False
+        self.time_synced_at = None
+        self.syncs = 0
+
+    def sync_time(self):
+        self.syncs += 1
+        self.time_synced_at = binance_client_pool.time.monotonic()
+        return True
+
+    def close(self):
+        self.closed = True
+
+
+def test_client_is_reused_until_key_is_rotated():
+    pool = BinanceClientPool()
+    built = []
+
+    def factory():
+        built.append(FakeClient())
+        return built[-1]
+
+    first = pool.get(1, "v1", factory)
+    assert pool.get(1, "v1", factory) is first
+    assert len(built) == 1 and first.syncs == 1
+
+    rotated = pool.get(1, "v2", factory)
+    assert rotated is not first and first.closed
+    assert len(pool) == 1
+
+
+def test_idle_and_overflow_clients_are_closed(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(binance_client_pool.time, 'monotonic', lambda: clock[0])
+    pool = BinanceClientPool(idle_seconds=60, max_size=2, time_sync_seconds=0)
+
+    a = pool.get(1, "v", FakeClient)
+    b = pool.get(2, "v", FakeClient)
+    pool.get(1, "v", lambda: None)  # touch 1, so 2 is least recently used
+    c = pool.get(3, "v", FakeClient)
+    assert b.closed and not a.closed and not c.closed
+
+    clock[0] += 61
+    d = pool.get(4, "v", FakeClient)
+    assert a.closed and c.closed and not d.closed
+    assert len(pool) == 1
+
+
+def test_invalidate_and_time_resync(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(binance_client_pool.time, 'monotonic', lambda: clock[0])
+    pool = BinanceClientPool(idle_seconds=0, time_sync_seconds=100)
+
+    client = pool.get(7, "v", FakeClient)
+    clock[0] += 50
+    pool.get(7, "v", FakeClient)
+    assert client.syncs == 1
+    clock[0] += 60
+    pool.get(7, "v", FakeClient)
+    assert client.syncs == 2
+
+    assert pool.invalidate(7) and client.closed
+    assert not pool.invalidate(7)
+
+
+def test_api_key_version_tracks_ciphertexts():
+    key = SimpleNamespace(encrypted_api_key="a", encrypted_secret_key="b")
+    assert api_key_version(key) == api_key_version(SimpleNamespace(encrypted_api_key="a", encrypted_secret_key="b"))
+    assert api_key_version(key) != api_key_version(SimpleNamespace(encrypted_api_key="a", encrypted_secret_key="c"))
@@ -0,0 +1,91 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import binance_client, binance_rate_limiter
+from app.core.binance_client import BinanceClientWrapper
+from app.core.binance_rate_limiter import BinanceRateLimiter, bucket_params, used_weight_from_headers
+
+
+class DownRedis:
+    def register_script(self, source):
+        raise ConnectionError("redis down")
+
+
+def test_bucket_never_exceeds_minute_budget():
+    budget, capacity, rate = bucket_params(6000)
+    # A full burst plus one minute of refill stays within our share of the limit
+    assert capacity + rate * 60_000 == pytest.approx(budget)
+    assert budget < 6000
+
+
+def test_used_weight_header_parsing():
+    assert used_weight_from_headers({'X-MBX-USED-WEIGHT-1M': '123'}) == 123
+    assert used_weight_from_headers({'x-mbx-used-weight-1m': '7,8'}) == 7
+    assert used_weight_from_headers({}) is None
+
+
+def test_local_fallback_spends_burst_then_waits():
+    limiter = BinanceRateLimiter(redis_client=DownRedis())
+    _, capacity, _ = bucket_params(binance_rate_limiter.BINANCE_WEIGHT_LIMITS['futures'])
+    for _ in range(int(capacity // 5)):
+        assert limiter.try_acquire('futures', 5) == 0
+    assert limiter.try_acquire('futures', 5) > 0
+    # Spot has its own bucket
+    assert limiter.try_acquire('spot', 5) == 0
+
+
+def test_reported_usage_and_bans_hold_back_callers():
+    limiter = BinanceRateLimiter(redis_client=DownRedis())
+    budget, _, _ = bucket_params(binance_rate_limiter.BINANCE_WEIGHT_LIMITS['spot'])
+
+    # Another host spent most of the shared IP budget
+    limiter.observe_sync('spot', 200, {'X-MBX-USED-WEIGHT-1M': str(int(budget) - 1)})
+    assert limiter.try_acquire('spot', 10) > 0
+
+    limiter.observe_sync('futures', 429, {'Retry-After': '120'})
+    assert limiter.try_acquire('futures', 1) >= 60
+
+
+def test_wrapper_takes_endpoint_weight_and_reports_usage(monkeypatch):
+    calls = []
+
+    class StubLimiter:
+        def acquire_sync(self, endpoint_class, weight):
+            calls.append(('acquire', endpoint_class, weight))
+
+        def observe_sync(self, endpoint_class, status_code=None, headers=None):
+            calls.append(('observe', endpoint_class, status_code))
+
+    monkeypatch.setattr(binance_client, "get_binance_rate_limiter", lambda: StubLimiter())
+
+    class FakeClient:
+        response = SimpleNamespace(status_code=200, headers={'X-MBX-USED-WEIGHT-1M': '40'})
+
+        def get_account(self):
+            return {'balances': [{'asset': 'USDT', 'free': '12.5'}]}
+
+        def futures_position_information(self, symbol):
+            return [{'symbol': symbol, 'leverage': '3'}]
+
+    wrapper = BinanceClientWrapper.__new__(BinanceClientWrapper)
+    wrapper.client = FakeClient()
+
+    assert wrapper.get_balance('USDT') == 12.5
+    assert wrapper.get_leverage('BTCUSDT') == 3
+    assert calls == [
+        ('acquire', 'spot', 20), ('observe', 'spot', 200),
+        ('acquire', 'futures', 5), ('observe', 'futures', 200),
+    ]
+
+
+def test_wrapper_construction_sends_no_unmetered_request(monkeypatch):
+    created = {}
+
+    def fake_client(**kwargs):
+        created.update(kwargs)
+        return SimpleNamespace(session=None)
+
+    monkeypatch.setattr(binance_client, "Client", fake_client)
+    BinanceClientWrapper('key', 'secret', testnet=True)
+    assert created['ping'] is False
@@ -0,0 +1,198 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401
+from app.core import bot_tasks
+from app.db_base import Base
+from app.models.bot_config import BotConfig
+from app.models.bot_state import BotState
+from app.models.user import User
+
+RISING = [100.0 + i for i in range(40)]
+STEP = 60_000
+
+
+class FakeMarketClient:
+    def __init__(self, closes):
+        self.closes = closes
+        self.calls = []
+
+    def get_current_price(self, symbol):
+        self.calls.append(('price', symbol))
+        return self.closes[-1]
+
+    def get_futures_price(self, symbol):
+        self.calls.append(('futures_price', symbol))
+        return self.closes[-1]
+
+    def _klines(self, limit):
+        start = max(len(self.closes) - limit, 0)
+        return [[i * STEP, c, c, c, c, 1.0] for i, c in enumerate(self.closes[start:], start=start)]
+
+    def get_historical_klines(self, symbol, interval, limit=100):
+        self.calls.append(('klines', symbol, interval, limit))
+        return self._klines(limit)
+
+    def get_futures_klines(self, symbol, interval, limit=100):
+        self.calls.append(('futures_klines', symbol, interval, limit))
+        return self._klines(limit)
+
+
+@pytest.fixture
+def indicator_store(monkeypatch):
+    """Indicator states kept in a dict instead of Redis"""
+    store = {}
+    monkeypatch.setattr(bot_tasks, 'load_indicator_state', lambda key: store.get(key))
+    monkeypatch.setattr(bot_tasks, 'save_indicator_state', lambda key, state: store.__setitem__(key, state))
+    return store
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch, indicator_store):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bots.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(bot_tasks, 'SyncSessionLocal', factory)
+    # No market data stream: groups fall back to REST
+    monkeypatch.setattr(bot_tasks, 'read_stream_snapshot', lambda *args: None)
+    with factory() as session:
+        session.add(User(id=1, email="bots@example.com", hashed_password="x"))
+        session.commit()
+    return factory
+
+
+def _add_bot(factory, bot_id, symbol="BTCUSDT", position_type="spot", strategy="ema", **custom):
+    with factory() as session:
+        session.add(BotConfig(
+            id=bot_id, user_id=1, name=f"bot {bot_id}", symbol=symbol, timeframe="1h", is_active=True,
+            stop_loss_perc=1, take_profit_perc=2, ema_fast=8, ema_slow=21, rsi_period=7,
+            rsi_oversold=35, rsi_overbought=65, strategy=strategy, position_type=position_type, **custom,
+        ))
+        session.add(BotState(id=bot_id))
+        session.commit()
+
+
+def test_bots_are_grouped_by_symbol_and_position_type(session_factory, monkeypatch):
+    _add_bot(session_factory, 1)
+    _add_bot(session_factory, 2)
+    _add_bot(session_factory, 3, symbol="ETHUSDT")
+    _add_bot(session_factory, 4, position_type="futures")
+    dispatched = []
+    monkeypatch.setattr(bot_tasks.run_bot_group_task, 'delay', lambda *args: dispatched.append(args))
+
+    bot_tasks.run_bot_task_for_all()
+
+    assert sorted(dispatched) == sorted([
+        ("BTCUSDT", "spot", "1m", [1, 2]),
+        ("ETHUSDT", "spot", "1m", [3]),
+        ("BTCUSDT", "futures", "1m", [4]),
+    ])
+
+
+def test_group_fetches_once_and_dispatches_signals(session_factory, monkeypatch):
+    # A rising series: EMA fast > slow and RSI 100 -> BUY unless overbought is above 100
+    _add_bot(session_factory, 1)
+    _add_bot(session_factory, 2, custom_ema_slow=30)
+    _add_bot(session_factory, 3, custom_rsi_overbought=101)
+    _add_bot(session_factory, 4, strategy="simple")
+    client = FakeMarketClient(RISING)
+    orders = []
+    monkeypatch.setattr(bot_tasks.run_bot_task, 'delay', lambda *args: orders.append(args))
+
+    result = bot_tasks._run_bot_group("BTCUSDT", "spot", "1m", [1, 2, 3, 4], client=client)
+
+    # One price and one klines request for the whole group; cold indicator states are seeded from history
+    assert client.calls == [('price', 'BTCUSDT'), ('klines', 'BTCUSDT', '1m', bot_tasks.INDICATOR_SEED_CANDLES)]
+    assert [bot_id for bot_id, _, _ in orders] == [3]
+    assert orders[0][1] == {'price': RISING[-1], 'closes': RISING, 'open_times': [i * STEP for i in range(40)]}
+    assert orders[0][2]['RSI'] == 100.0
+    assert orders[0][2]['EMA_fast'] > orders[0][2]['EMA_slow']
+    assert "4 bots evaluated, 1 signals" in result
+    with session_factory() as session:
+        statuses = {s.id: s.status for s in session.query(BotState).all()}
+    assert statuses[1] == statuses[2] == "waiting (no signal)"
+    assert statuses[4] == "waiting (simple disabled in prod)"
+
+
+def test_warm_states_fetch_only_recent_candles(session_factory, indicator_store, monkeypatch):
+    _add_bot(session_factory, 1, custom_rsi_overbought=101)
+    _add_bot(session_factory, 2, custom_ema_slow=30, custom_rsi_overbought=101)
+    orders = []
+    monkeypatch.setattr(bot_tasks.run_bot_task, 'delay', lambda *args: orders.append(args))
+    closes = [100.0 + ((i * 7) % 11) - i * 0.3 for i in range(80)]
+
+    bot_tasks._run_bot_group("BTCUSDT", "spot", "1m", [1, 2], client=FakeMarketClient(closes[:60]))
+    assert len(indicator_store) == 2
+    client = FakeMarketClient(closes[:62])
+    bot_tasks._run_bot_group("BTCUSDT", "spot", "1m", [1, 2], client=client)
+
+    # Two more candles closed: only the last few are read and fed to the stored states
+    assert client.calls == [('price', 'BTCUSDT'), ('klines', 'BTCUSDT', '1m', bot_tasks.INDICATOR_UPDATE_CANDLES)]
+    for state in indicator_store.values():
+        assert state.last_open_time == 60 * STEP
+        assert state.to_dict() == bot_tasks.seeded_state(state.periods, closes[:61]).to_dict() | {
+            'last_open_time': 60 * STEP}
+    # The dispatched values equal a full recomputation over the same closes
+    assert sorted(bot_id for bot_id, _, _ in orders[2:]) == [1, 2]
+    for bot_id, _, indicators in orders[2:]:
+        params = {**bot_tasks._ema_params(object()), 'rsi_overbought': 101}
+        if bot_id == 2:
+            params['ema_slow'] = 30
+        _, ema_fast, ema_slow, rsi = bot_tasks.evaluate_ema_signal(params, closes[:62])
+        assert indicators == {'EMA_fast': pytest.approx(ema_fast, rel=1e-12),
+                              'EMA_slow': pytest.approx(ema_slow, rel=1e-12), 'RSI': pytest.approx(rsi, rel=1e-12)}
+
+
+def test_missed_candles_reseed_the_state(session_factory, indicator_store, monkeypatch):
+    _add_bot(session_factory, 1)
+    monkeypatch.setattr(bot_tasks.run_bot_task, 'delay', lambda *args: None)
+    bot_tasks._run_bot_group("BTCUSDT", "spot", "1m", [1], client=FakeMarketClient(RISING[:30]))
+
+    client = FakeMarketClient(RISING)
+    bot_tasks._run_bot_group("BTCUSDT", "spot", "1m", [1], client=client)
+
+    # The recent candles do not connect to the stored state, so the history is fetched again
+    assert [call[-1] for call in client.calls if call[0] == 'klines'] == [
+        bot_tasks.INDICATOR_UPDATE_CANDLES, bot_tasks.INDICATOR_SEED_CANDLES]
+    (state,) = indicator_store.values()
+    assert state.candles == 39 and state.last_open_time == 38 * STEP
+
+
+def test_group_prefers_stream_snapshot(session_factory, monkeypatch):
+    _add_bot(session_factory, 1, custom_rsi_overbought=101)
+    client = FakeMarketClient(RISING)
+    snapshot = {'price': RISING[-1], 'closes': RISING[-22:], 'open_times': [i * STEP for i in range(18, 40)]}
+    monkeypatch.setattr(bot_tasks, 'read_stream_snapshot', lambda *args: snapshot)
+    orders = []
+    monkeypatch.setattr(bot_tasks.run_bot_task, 'delay', lambda *args: orders.append(args))
+
+    bot_tasks._run_bot_group("BTCUSDT", "spot", "1m", [1], client=client)
+
+    assert client.calls == []
+    assert [(bot_id, market) for bot_id, market, _ in orders] == [(1, snapshot)]
+
+
+def test_group_market_failure_marks_bots(session_factory, monkeypatch):
+    _add_bot(session_factory, 1)
+    client = FakeMarketClient(RISING)
+    client.get_current_price = lambda symbol: None
+    monkeypatch.setattr(bot_tasks.run_bot_task, 'delay', lambda *args: pytest.fail("no orders expected"))
+
+    bot_tasks._run_bot_group("BTCUSDT", "spot", "1m", [1], client=client)
+
+    with session_factory() as session:
+        state = session.get(BotState, 1)
+        assert state.status == "error (price fetch)"
+        assert state.last_error_message == "Fiyat alınamadı"
+
+
+def test_live_price_prefers_stream_then_rest(monkeypatch):
+    client = FakeMarketClient(RISING)
+    monkeypatch.setattr(bot_tasks, 'read_stream_snapshot', lambda *args: {'price': 321.5})
+    assert bot_tasks.fetch_live_price(client, "BTCUSDT", "spot") == 321.5
+    assert client.calls == []
+
+    monkeypatch.setattr(bot_tasks, 'read_stream_snapshot', lambda *args: None)
+    assert bot_tasks.fetch_live_price(client, "BTCUSDT", "spot") == RISING[-1]
+    assert client.calls == [('price', 'BTCUSDT')]
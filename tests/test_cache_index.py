@@ -0,0 +1,76 @@
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.core import cache as cache_module
+from app.core import cache_index
+from app.core.cache import DataCache
+from app.core.memory_cache import KlineMemoryCache
+
+
+def _frame(rows: int = 2000) -> pd.DataFrame:
+    close = np.linspace(100.0, 110.0, rows)
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2024-01-01', periods=rows, freq='15min'),
+        'open': close, 'high': close + 1, 'low': close - 1, 'close': close,
+        'volume': np.ones(rows),
+    })
+
+
+RANGES = [('2024-01-01', '2024-02-01'), ('2024-02-01', '2024-03-01'), ('2024-03-01', '2024-04-01')]
+
+
+def test_quota_evicts_least_recently_used_ranges(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_index, "TOUCH_RESOLUTION_SECONDS", 0.0)
+    df = _frame()
+    entry_bytes = 6 * df['close'].nbytes + 6 * 128  # 6 .npy columns plus headers
+
+    cache = DataCache(str(tmp_path), memory=KlineMemoryCache(), max_bytes=int(entry_bytes * 3.5))
+    for start, end in RANGES:
+        cache.cache_data(df, 'BTCUSDT', '15m', start, end)
+        time.sleep(0.01)
+    assert cache.get_cache_info()['total_files'] == 3
+
+    # Touch the oldest entry, then overflow the quota
+    assert cache.get_cached_data('BTCUSDT', '15m', *RANGES[0]) is not None
+    time.sleep(0.01)
+    cache.cache_data(df, 'ETHUSDT', '15m', '2024-01-01', '2024-02-01')
+
+    assert not cache.is_cached('BTCUSDT', '15m', *RANGES[1])
+    assert cache.is_cached('BTCUSDT', '15m', *RANGES[0])
+    assert cache.is_cached('ETHUSDT', '15m', '2024-01-01', '2024-02-01')
+    evicted_key = cache._get_cache_key('BTCUSDT', '15m', *RANGES[1])
+    assert not os.path.exists(os.path.join(str(tmp_path), evicted_key))
+    info = cache.get_cache_info()
+    assert info['total_files'] == 3
+    assert info['total_size_mb'] * 1024 * 1024 <= cache.max_bytes
+
+
+def test_info_and_lookups_do_not_scan_directory(tmp_path, monkeypatch):
+    cache = DataCache(str(tmp_path), memory=KlineMemoryCache())
+    cache.cache_data(_frame(), 'BTCUSDT', '15m', *RANGES[0])
+
+    def no_scan(*args, **kwargs):
+        raise AssertionError("directory scanned")
+
+    monkeypatch.setattr(cache_module.os, "listdir", no_scan)
+    info = cache.get_cache_info()
+    assert info['cached_symbols'] == ['BTCUSDT']
+    assert info['cache_entries'][0]['rows'] == 2000
+    assert info['cache_entries'][0]['size_bytes'] > 0
+    assert cache.is_cached('BTCUSDT', '15m', *RANGES[0])
+
+
+def test_existing_entries_are_indexed_on_first_use(tmp_path):
+    source = tmp_path / "old"
+    DataCache(str(source), memory=KlineMemoryCache()).cache_data(_frame(), 'SOLUSDT', '15m', *RANGES[0])
+
+    # A cache directory created before the index existed
+    target = tmp_path / "copied"
+    shutil.copytree(source, target, ignore=shutil.ignore_patterns("index.sqlite3*"))
+    cache = DataCache(str(target), memory=KlineMemoryCache())
+    assert cache.get_cache_info()['cached_symbols'] == ['SOLUSDT']
+    assert cache.get_cached_data('SOLUSDT', '15m', *RANGES[0], columns=['close']) is not None
@@ -0,0 +1,81 @@
+import asyncio
+import multiprocessing
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.core.cache import DataCache, write_column_dir
+from app.core.file_lock import FileLock, FileLockTimeout
+from app.services import backtest_service as backtest_service_module
+from app.services.backtest_service import BacktestService
+
+
+def _frame(start: str, rows: int = 100) -> pd.DataFrame:
+    close = np.arange(rows, dtype=float)
+    return pd.DataFrame({
+        'timestamp': pd.date_range(start, periods=rows, freq='1D'),
+        'open': close, 'high': close, 'low': close, 'close': close, 'volume': close,
+    })
+
+
+def test_rewrite_swaps_entry_without_leftovers(tmp_path):
+    path = os.path.join(str(tmp_path), 'entry')
+    write_column_dir(path, _frame('2024-01-01'))
+    write_column_dir(path, _frame('2025-01-01', rows=50))
+
+    assert os.listdir(str(tmp_path)) == ['entry']
+    timestamps = np.load(os.path.join(path, 'timestamp.npy'))
+    assert len(timestamps) == 50 and timestamps[0] == np.datetime64('2025-01-01')
+
+
+def _hold_lock(path, locked, release):
+    with FileLock(path):
+        locked.set()
+        release.wait(10)
+
+
+def test_file_lock_excludes_other_processes(tmp_path):
+    path = os.path.join(str(tmp_path), '.locks', 'key.lock')
+    ctx = multiprocessing.get_context('fork')
+    locked, release = ctx.Event(), ctx.Event()
+    holder = ctx.Process(target=_hold_lock, args=(path, locked, release))
+    holder.start()
+    try:
+        assert locked.wait(10)
+        lock = FileLock(path, timeout=0.2)
+        assert not lock.acquire()
+        lock.release()
+        # As a context manager the guarded work must not run without the lock
+        with pytest.raises(FileLockTimeout):
+            with FileLock(path, timeout=0.2):
+                pytest.fail("entered without the lock")
+    finally:
+        release.set()
+        holder.join(10)
+
+    with FileLock(path, timeout=1) as lock:
+        assert lock.acquired
+
+
+async def test_concurrent_misses_download_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(backtest_service_module, "DataCache", lambda cache_dir: DataCache(str(tmp_path)))
+    downloads = []
+
+    async def slow_download(self, symbol, interval, start_date, end_date, market_type="spot"):
+        downloads.append(symbol)
+        await asyncio.sleep(0.3)
+        return _frame(start_date, rows=12)
+
+    monkeypatch.setattr(BacktestService, "get_historical_data_public", slow_download)
+
+    # Calendar interval: served by DataCache rather than the kline store
+    services = [BacktestService() for _ in range(4)]
+    results = await asyncio.gather(*(
+        service.get_historical_data('BTCUSDT', '1M', '2023-01-01', '2024-01-01') for service in services))
+
+    assert downloads == ['BTCUSDT']
+    for result in results:
+        assert len(result) == 12
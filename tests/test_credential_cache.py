@@ -0,0 +1,90 @@
+import queue
+import time
+
+from app.core import binance_client_pool, credential_cache
+from app.core.credential_cache import API_KEY_INVALIDATION_CHANNEL, CredentialCache, Credentials
+
+
+class FakePubSub:
+    def __init__(self, messages):
+        self.messages = messages
+        self.channels = []
+
+    def subscribe(self, channel):
+        self.channels.append(channel)
+
+    def listen(self):
+        while True:
+            yield self.messages.get()
+
+    def close(self):
+        pass
+
+
+class FakeRedis:
+    def __init__(self):
+        self.messages = queue.Queue()
+        self.pubsubs = []
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        self.pubsubs.append(FakePubSub(self.messages))
+        return self.pubsubs[-1]
+
+    def publish(self, data):
+        self.messages.put({'type': 'message', 'channel': API_KEY_INVALIDATION_CHANNEL, 'data': data})
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_credentials_are_cached_until_ttl(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(credential_cache.time, 'monotonic', lambda: clock[0])
+    cache = CredentialCache(ttl_seconds=60, listen=False)
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return Credentials(5, "v1", "key", "secret")
+
+    first = cache.get(5, loader)
+    assert cache.get(5, loader) is first and len(loads) == 1
+    clock[0] += 61
+    cache.get(5, loader)
+    assert len(loads) == 2
+
+    # Missing keys are not cached
+    assert cache.get(6, lambda: None) is None
+    assert len(cache) == 1
+    assert "secret" not in repr(first) and "key'" not in repr(first)
+
+
+def test_published_change_drops_credentials_and_client(monkeypatch):
+    redis = FakeRedis()
+    pool = binance_client_pool.BinanceClientPool()
+    monkeypatch.setattr(binance_client_pool, '_pool', pool)
+    cache = CredentialCache(ttl_seconds=300, redis_client=redis)
+
+    class Client:
+        time_synced_at = 0.0
+        closed = False
+
+        def sync_time(self):
+            return True
+
+        def close(self):
+            self.closed = True
+
+    client = pool.get(5, "v1", Client)
+    cache.get(5, lambda: Credentials(5, "v1", "key", "secret"))
+    _wait_for(lambda: redis.pubsubs and redis.pubsubs[0].channels == [API_KEY_INVALIDATION_CHANNEL])
+    cache.get(5, lambda: Credentials(5, "v1", "key", "secret"))
+
+    redis.publish("5")
+    _wait_for(lambda: len(cache) == 0)
+    _wait_for(lambda: client.closed)
+    assert len(pool) == 0
@@ -0,0 +1,66 @@
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from app.core.cache import DataCache
+
+
+def _binance_frame(rows: int = 500) -> pd.DataFrame:
+    rng = np.random.default_rng(1)
+    close = 100.0 + np.cumsum(rng.normal(0, 0.5, rows))
+    timestamps = pd.date_range('2024-01-01', periods=rows, freq='1min')
+    return pd.DataFrame({
+        'timestamp': timestamps,
+        'open': close,
+        'high': close + 0.5,
+        'low': close - 0.5,
+        'close': close,
+        'volume': rng.uniform(1, 10, rows),
+        'close_time': (timestamps.asi8 // 1_000_000) + 59_999,
+        # Binance returns these as strings
+        'quote_volume': [f"{v:.8f}" for v in close * 3],
+        'trades': rng.integers(1, 100, rows),
+        'ignore': ['0'] * rows,
+    })
+
+
+def test_columnar_round_trip_keeps_types_and_mmaps(tmp_path):
+    cache = DataCache(str(tmp_path))
+    df = _binance_frame()
+    cache.cache_data(df, 'BTCUSDT', '1m', '2024-01-01', '2024-01-02')
+
+    cached = cache.get_cached_data('BTCUSDT', '1m', '2024-01-01', '2024-01-02')
+    assert cached['timestamp'].dtype == 'datetime64[ns]'
+    assert cached['close_time'].dtype == np.int64
+    assert cached['quote_volume'].dtype == np.float64
+    pd.testing.assert_frame_equal(cached[['timestamp', 'open', 'close', 'volume', 'trades']],
+                                  df[['timestamp', 'open', 'close', 'volume', 'trades']].astype({'trades': np.int64}))
+
+    columns = cache.get_cached_columns('BTCUSDT', '1m', '2024-01-01', '2024-01-02', columns=['close', 'missing'])
+    assert list(columns) == ['close']
+    assert isinstance(columns['close'], np.memmap)
+    assert not columns['close'].flags.writeable
+
+
+def test_legacy_csv_entries_are_migrated(tmp_path):
+    cache = DataCache(str(tmp_path))
+    df = _binance_frame()
+    for day in ('01', '02'):
+        key = cache._get_cache_key('ETHUSDT', '1m', f'2024-01-{day}', '2024-01-03', 'spot')
+        df.to_csv(os.path.join(str(tmp_path), f"{key}.csv"), index=False)
+        with open(os.path.join(str(tmp_path), f"{key}_meta.json"), 'w') as f:
+            json.dump({'symbol': 'ETHUSDT', 'interval': '1m', 'cached_at': datetime.now().isoformat(), 'rows': len(df)}, f)
+
+    # Lazily on first read...
+    cached = cache.get_cached_data('ETHUSDT', '1m', '2024-01-01', '2024-01-03', columns=['timestamp', 'close'])
+    assert list(cached.columns) == ['timestamp', 'close']
+    np.testing.assert_allclose(cached['close'], df['close'])
+    assert cached['timestamp'].dtype == 'datetime64[ns]'
+
+    # ...or in bulk
+    assert cache.migrate_csv_cache() == 1
+    assert not any(f.endswith('.csv') for f in os.listdir(str(tmp_path)))
+    assert cache.get_cached_data('ETHUSDT', '1m', '2024-01-02', '2024-01-03') is not None
@@ -0,0 +1,106 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.core.indicator_cache import IndicatorCache
+from app.services.backtest_service import BacktestService
+
+
+def _klines(rows: int = 500, seed: int = 11) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.004, rows)))
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2024-01-01', periods=rows, freq='15min'),
+        'open': close,
+        'high': close * 1.002,
+        'low': close * 0.998,
+        'close': close,
+        'volume': rng.uniform(1000, 10000, rows),
+    })
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    service = BacktestService()
+    service.indicator_cache = IndicatorCache(max_entries=64)
+    return service
+
+
+def test_cached_indicators_match_fresh_computation(service):
+    df = _klines()
+    first = service.prepare_indicators(df, 8, 21, 7)
+    misses = service.indicator_cache.misses
+
+    # Only the new RSI period is missing; EMA, MACD, BB, volume and volatility are reused
+    second = service.prepare_indicators(df, 8, 21, 14)
+    assert service.indicator_cache.misses == misses + 1
+
+    service.indicator_cache = IndicatorCache(max_entries=64)
+    fresh = service.prepare_indicators(df, 8, 21, 14)
+    pd.testing.assert_frame_equal(second, fresh)
+    pd.testing.assert_frame_equal(first.drop(columns=['RSI']), fresh.drop(columns=['RSI']))
+
+
+def test_changed_data_gets_new_fingerprint(service):
+    df = _klines()
+    service.prepare_indicators(df)
+    hits = service.indicator_cache.hits
+
+    changed = df.copy()
+    changed.loc[changed.index[-1], 'close'] *= 1.01
+    assert IndicatorCache.fingerprint(changed) != IndicatorCache.fingerprint(df)
+    service.prepare_indicators(changed)
+    assert service.indicator_cache.hits == hits
+
+
+def test_lru_eviction_and_disk_persistence(tmp_path):
+    cache = IndicatorCache(max_entries=2, cache_dir=str(tmp_path / "indicators"), persist=True)
+    for period in (5, 6, 7):
+        cache.put("fp", "EMA", (period,), np.arange(3, dtype=float) * period)
+    assert cache.get_cache_info()['entries'] == 2
+
+    # Evicted from memory but still on disk
+    reloaded = IndicatorCache(max_entries=2, cache_dir=str(tmp_path / "indicators"), persist=True)
+    np.testing.assert_array_equal(reloaded.get("fp", "EMA", (5,)), [0.0, 5.0, 10.0])
+    assert IndicatorCache(max_entries=2).get("fp", "EMA", (5,)) is None
+
+
+def test_memory_and_disk_are_bounded_by_bytes(tmp_path):
+    row_bytes = 100 * 8
+    cache = IndicatorCache(max_entries=64, cache_dir=str(tmp_path), persist=True,
+                           max_bytes=2 * row_bytes, max_disk_bytes=3 * row_bytes + 3 * 128)
+    for period in range(5):
+        cache.put("fp", "EMA", (period,), np.full(100, float(period)))
+        # Distinct mtimes so the disk LRU order is deterministic
+        os.utime(cache._disk_path(cache._key("fp", "EMA", (period,))), (period, period))
+
+    assert cache.get_cache_info()['entries'] == 2
+    assert cache.current_bytes == 2 * row_bytes
+    # The oldest files were evicted; every name carries the format version
+    files = sorted(os.listdir(tmp_path))
+    assert files == [f"v1_fp_EMA_{period}.npy" for period in (2, 3, 4)]
+
+    # Larger than the memory budget: returned but not kept
+    cache.put("fp", "RSI", (14,), np.zeros(1000))
+    assert cache.current_bytes <= cache.max_bytes
+
+
+def test_interrupted_write_leaves_no_partial_file(tmp_path, monkeypatch):
+    cache = IndicatorCache(cache_dir=str(tmp_path), persist=True)
+    cache.put("fp", "EMA", (5,), np.arange(3, dtype=float))
+
+    def failing_save(file, array, allow_pickle=False):
+        file.write(b"\x93NUMPY partial")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(np, "save", failing_save)
+    cache.put("fp", "EMA", (5,), np.arange(3, dtype=float) * 2)
+    cache.put("fp", "EMA", (6,), np.arange(3, dtype=float))
+
+    # The previous file is intact and no temp or half written file is left behind
+    assert sorted(os.listdir(tmp_path)) == ["v1_fp_EMA_5.npy"]
+    reloaded = IndicatorCache(cache_dir=str(tmp_path), persist=True)
+    np.testing.assert_array_equal(reloaded.get("fp", "EMA", (5,)), [0.0, 1.0, 2.0])
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import pytest
+from ta.momentum import RSIIndicator
+from ta.trend import EMAIndicator, MACD
+from ta.volatility import BollingerBands
+
+from app.core.indicator_cache import IndicatorCache
+from app.services.backtest_service import BacktestService
+from app.services.indicator_kernels import IndicatorKernel, ewm_mean, rolling_mean, rolling_std
+from app.services.synthetic_data import generate_klines
+
+RTOL = 1e-9
+
+
+def _assert_close(actual, expected, scale=None):
+    expected = np.asarray(expected, dtype=np.float64)
+    np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected))
+    # Relative to the price scale, so indicators that cross zero (MACD) are compared fairly
+    if scale is None:
+        scale = float(np.abs(expected[~np.isnan(expected)]).max(initial=1.0))
+    atol = RTOL * scale
+    np.testing.assert_allclose(actual, expected, rtol=RTOL, atol=atol)
+
+
+@pytest.mark.parametrize('rows', [3, 30, 5000, 150_000])
+def test_kernel_matches_ta(rows):
+    df = generate_klines(rows, '1m', model='jump_diffusion', seed=rows)
+    close = df['close']
+    kernel = IndicatorKernel(close.to_numpy(), df['volume'].to_numpy())
+    scale = float(close.abs().max())
+
+    for period in (5, 8, 21, 50):
+        _assert_close(kernel.ema(period), EMAIndicator(close, period).ema_indicator())
+    for period in (7, 14):
+        _assert_close(kernel.rsi(period), RSIIndicator(close, period).rsi())
+    _assert_close(kernel.macd_diff(), MACD(close).macd_diff(), scale)
+    bands = BollingerBands(close)
+    _assert_close(kernel.bollinger('upper'), bands.bollinger_hband())
+    _assert_close(kernel.bollinger('middle'), bands.bollinger_mavg())
+    _assert_close(kernel.bollinger('lower'), bands.bollinger_lband())
+    _assert_close(kernel.volume_ma(), df['volume'].rolling(20).mean())
+    volatility = close.pct_change().rolling(10).std()
+    _assert_close(kernel.volatility(), volatility)
+    _assert_close(kernel.volatility_ma(), volatility.rolling(20).mean())
+
+
+def test_missing_values_and_output_buffers():
+    values = np.r_[np.nan, np.nan, np.linspace(1.0, 2.0, 50)]
+    out = np.empty_like(values)
+    assert ewm_mean(values, 0.3, 4, out=out) is out
+    _assert_close(out, pd.Series(values).ewm(alpha=0.3, adjust=False, min_periods=4).mean())
+    _assert_close(rolling_std(values, 5, ddof=0), pd.Series(values).rolling(5).std(ddof=0))
+
+    # NaN/inf inside the series goes through pandas
+    holes = np.linspace(1.0, 2.0, 40)
+    holes[[10, 11, 25]] = [np.nan, np.inf, np.nan]
+    series = pd.Series(holes)
+    _assert_close(ewm_mean(holes, 0.2, 3), series.ewm(alpha=0.2, adjust=False, min_periods=3).mean())
+    _assert_close(rolling_mean(holes, 4), series.rolling(4).mean())
+
+    # Flat stretches have exactly zero deviation, not rounding noise
+    flat = np.r_[np.full(30, 101.25), np.linspace(101.25, 103.0, 30)]
+    assert (rolling_std(flat, 10)[9:30] == 0.0).all()
+    assert (rolling_mean(np.zeros(25), 20)[19:] == 0.0).all()
+
+    with pytest.raises(ValueError):
+        ewm_mean(values, 0.3, out=np.empty(3))
+
+
+def _reference_indicators(df, ema_fast, ema_slow, rsi_period):
+    """The former ta/pandas implementation of prepare_indicators"""
+    out = df.copy()
+    close = out['close']
+    out['EMA_fast'] = EMAIndicator(close, ema_fast).ema_indicator()
+    out['EMA_slow'] = EMAIndicator(close, ema_slow).ema_indicator()
+    out['RSI'] = RSIIndicator(close, rsi_period).rsi()
+    out['MACD'] = MACD(close).macd_diff()
+    bands = BollingerBands(close)
+    out['BB_upper'] = bands.bollinger_hband()
+    out['BB_middle'] = bands.bollinger_mavg()
+    out['BB_lower'] = bands.bollinger_lband()
+    out['volume_ma'] = out['volume'].rolling(window=20).mean()
+    out['volume_ratio'] = (out['volume'] / out['volume_ma']).fillna(1.0).replace([np.inf, -np.inf], 1.0)
+    out['volatility'] = close.pct_change().rolling(window=10).std()
+    out['volatility_ma'] = out['volatility'].rolling(window=20).mean()
+    out['trend_strength'] = abs(out['EMA_fast'] - out['EMA_slow']) / out['EMA_slow'] * 100
+    out = out.replace([np.inf, -np.inf], np.nan)
+    for col in ('EMA_fast', 'EMA_slow', 'BB_upper', 'BB_middle', 'BB_lower'):
+        out[col] = out[col].fillna(out['close'])
+    out['RSI'] = out['RSI'].fillna(50.0)
+    for col in ('MACD', 'volume_ma', 'volatility', 'volatility_ma', 'trend_strength'):
+        out[col] = out[col].fillna(0.0)
+    return out.dropna(subset=['EMA_fast', 'EMA_slow', 'RSI'])
+
+
+def test_prepare_indicators_matches_former_implementation(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    service = BacktestService()
+    service.indicator_cache = IndicatorCache()
+    df = generate_klines(20_000, '15m', model='regime_switching', seed=9,
+                         columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    df.loc[500:520, 'volume'] = 0.0
+
+    result = service.prepare_indicators(df, 8, 21, 7)
+    expected = _reference_indicators(df, 8, 21, 7)
+
+    assert list(result.columns) == list(expected.columns)
+    assert result.index.equals(expected.index)
+    for col in expected.columns[1:]:
+        _assert_close(result[col].to_numpy(), expected[col], scale=float(df['close'].max()))
@@ -0,0 +1,103 @@
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from app.core.kline_archive import import_archives, parse_archive_name
+from app.core.kline_store import KlineStore
+
+STEP = 3_600_000  # 1h
+DAY = 86_400_000
+T0 = int(pd.Timestamp('2024-01-01').value // 1_000_000)
+
+
+def _rows(opens, microseconds: bool = False) -> str:
+    scale = 1000 if microseconds else 1
+    lines = []
+    for open_ms in opens:
+        price = 100 + (open_ms - T0) / STEP
+        lines.append(f"{open_ms * scale},{price},{price + 1},{price - 1},{price},10.5,"
+                     f"{(open_ms + STEP - 1) * scale},1050.0,42,5.0,500.0,0")
+    return "\n".join(lines) + "\n"
+
+
+def _write_zip(path, body: str, header: bool = False):
+    if header:
+        body = "open_time,open,high,low,close,volume,close_time,quote_volume,count," \
+               "taker_buy_volume,taker_buy_quote_volume,ignore\n" + body
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(path, 'w') as zf:
+        zf.writestr(path.name.replace('.zip', '.csv'), body)
+
+
+def _day(day: int):
+    return list(range(T0 + day * DAY, T0 + (day + 1) * DAY, STEP))
+
+
+def test_parse_archive_name():
+    monthly = parse_archive_name('/data/futures/um/monthly/klines/BTCUSDT/1h/BTCUSDT-1h-2024-02.zip')
+    assert (monthly.symbol, monthly.interval, monthly.market_type) == ('BTCUSDT', '1h', 'futures')
+    assert monthly.end_ms - monthly.start_ms == 29 * DAY
+    daily = parse_archive_name('ETHUSDT-15m-2024-01-31.csv')
+    assert daily.market_type == 'spot' and daily.end_ms - daily.start_ms == DAY
+    assert parse_archive_name('notes.zip') is None
+
+
+def test_import_streams_validates_and_covers(tmp_path):
+    root = tmp_path / 'archives' / 'spot' / 'daily' / 'klines' / 'BTCUSDT' / '1h'
+    # Day 0 has a duplicated row, day 1 a missing candle and a header, day 2 microsecond timestamps
+    day0 = _day(0)
+    _write_zip(root / 'BTCUSDT-1h-2024-01-01.zip', _rows(day0[:5] + [day0[4]] + day0[5:]))
+    day1 = _day(1)
+    _write_zip(root / 'BTCUSDT-1h-2024-01-02.zip', _rows(day1[:10] + day1[11:]), header=True)
+    _write_zip(root / 'BTCUSDT-1h-2024-01-03.zip', _rows(_day(2), microseconds=True))
+
+    store = KlineStore(str(tmp_path / 'store'))
+    [report] = import_archives([str(tmp_path / 'archives')], store, chunk_rows=7)
+
+    assert report['archives'] == 3
+    assert report['rows'] == 3 * 24 - 1
+    assert report['duplicates'] == 1
+    assert report['gaps'] == 1 and report['missing_candles'] == 1
+    assert report['gap_ranges'] == [(day1[10], day1[11])]
+    assert store.covered_ranges('BTCUSDT', '1h') == [(T0, T0 + 3 * DAY)]
+
+    df = store.read_range('BTCUSDT', '1h', T0, T0 + 3 * DAY)
+    assert len(df) == 3 * 24 - 1
+    assert df['timestamp'].is_monotonic_increasing and df['timestamp'].is_unique
+    assert df['timestamp'].iloc[-1] == pd.Timestamp(T0 + 3 * DAY - STEP, unit='ms')
+    assert df['close_time'].iloc[-1] == T0 + 3 * DAY - 1
+    assert df['close'].iloc[0] == 100.0
+
+
+def test_import_merges_with_stored_series(tmp_path):
+    store = KlineStore(str(tmp_path / 'store'))
+    archives = tmp_path / 'archives'
+    _write_zip(archives / 'BTCUSDT-1h-2024-01-02.zip', _rows(_day(1)))
+    import_archives([str(archives)], store)
+
+    # A monthly archive later fills the rest of the month around the stored day
+    opens = list(range(T0, T0 + 31 * DAY, STEP))
+    _write_zip(archives / 'BTCUSDT-1h-2024-01.zip', _rows(opens))
+    [report] = import_archives([str(archives / 'BTCUSDT-1h-2024-01.zip')], store, chunk_rows=100)
+
+    assert report['gaps'] == 0
+    assert store.covered_ranges('BTCUSDT', '1h') == [(T0, T0 + 31 * DAY)]
+    df = store.read_range('BTCUSDT', '1h', T0, T0 + 31 * DAY)
+    assert len(df) == len(opens)
+    assert np.array_equal(df['timestamp'].to_numpy(), pd.to_datetime(opens, unit='ms').to_numpy())
+
+
+def test_strict_import_skips_only_the_failed_series(tmp_path):
+    store = KlineStore(str(tmp_path / 'store'))
+    day0 = _day(0)
+    _write_zip(tmp_path / 'BTCUSDT-1h-2024-01-01.zip', _rows(day0[:3] + day0[4:]))
+    _write_zip(tmp_path / 'ETHUSDT-1h-2024-01-01.zip', _rows(day0))
+
+    reports = {r['symbol']: r for r in import_archives([str(tmp_path)], store, strict=True)}
+
+    assert reports['BTCUSDT']['error'] and reports['BTCUSDT']['ranges'] == []
+    assert store.covered_ranges('BTCUSDT', '1h') == []
+    assert store.read_range('BTCUSDT', '1h', T0, T0 + DAY) is None
+    assert reports['ETHUSDT']['error'] is None
+    assert store.covered_ranges('ETHUSDT', '1h') == [(T0, T0 + DAY)]
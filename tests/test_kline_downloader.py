@@ -0,0 +1,114 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core import kline_downloader
+from app.core.kline_downloader import download_klines, page_ranges
+
+STEP = 60_000  # 1m
+T0 = 1_704_067_200_000  # 2024-01-01
+
+
+def _kline(open_ms: int) -> list:
+    return [open_ms, "1", "2", "0.5", "1.5", "10", open_ms + STEP - 1, "15", 3, "5", "7", "0"]
+
+
+class RecordingLimiter:
+    def __init__(self):
+        self.acquired = []
+        self.observed = []
+
+    async def acquire(self, endpoint_class, weight):
+        self.acquired.append((endpoint_class, weight))
+
+    async def observe(self, endpoint_class, status_code=None, headers=None):
+        self.observed.append((endpoint_class, status_code))
+
+
+@pytest.fixture(autouse=True)
+def limiter(monkeypatch):
+    recording = RecordingLimiter()
+    monkeypatch.setattr(kline_downloader, "get_binance_rate_limiter", lambda: recording)
+    return recording
+
+
+class FakeBinance:
+    """Serves 1m klines and records how many requests were in flight"""
+
+    def __init__(self, fail_start=None, rate_limit_once=False):
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.fail_start = fail_start
+        self.rate_limit_once = rate_limit_once
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        start = int(request.url.params['startTime'])
+        end = int(request.url.params['endTime'])
+        limit = int(request.url.params['limit'])
+        self.requests.append(start)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            self.in_flight -= 1
+        if self.rate_limit_once:
+            self.rate_limit_once = False
+            return httpx.Response(429, headers={'Retry-After': '0'})
+        if start == self.fail_start:
+            return httpx.Response(500)
+        first = -(-start // STEP) * STEP
+        opens = range(first, min(end + 1, first + limit * STEP), STEP)
+        return httpx.Response(200, json=[_kline(o) for o in opens], headers={'x-mbx-used-weight-1m': '10'})
+
+
+def test_page_ranges_cover_range_without_overlap():
+    pages = page_ranges(T0, T0 + 2500 * STEP, '1m')
+    assert pages == [(T0, T0 + 1000 * STEP), (T0 + 1000 * STEP, T0 + 2000 * STEP), (T0 + 2000 * STEP, T0 + 2500 * STEP)]
+    assert page_ranges(T0, T0, '1m') == []
+
+
+async def test_pages_are_fetched_concurrently_and_reassembled_in_order(limiter):
+    server = FakeBinance()
+    async with httpx.AsyncClient(transport=httpx.MockTransport(server)) as client:
+        rows, complete = await download_klines('BTCUSDT', '1m', T0, T0 + 5500 * STEP, client=client, concurrency=4)
+
+    assert complete
+    assert [row[0] for row in rows] == list(range(T0, T0 + 5500 * STEP, STEP))
+    assert len(server.requests) == 6
+    assert 1 < server.max_in_flight <= 4
+    assert limiter.acquired == [('spot', 2)] * 6
+
+
+async def test_failed_page_returns_ordered_prefix_as_incomplete():
+    server = FakeBinance(fail_start=T0 + 2000 * STEP)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(server)) as client:
+        rows, complete = await download_klines('BTCUSDT', '1m', T0, T0 + 4000 * STEP, client=client)
+
+    assert not complete
+    assert [row[0] for row in rows] == list(range(T0, T0 + 2000 * STEP, STEP))
+
+
+async def test_pages_after_a_failed_page_are_cancelled():
+    server = FakeBinance(fail_start=T0 + 1000 * STEP)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(server)) as client:
+        rows, complete = await download_klines('BTCUSDT', '1m', T0, T0 + 10_000 * STEP, client=client,
+                                               concurrency=2)
+
+    assert not complete
+    assert len(rows) == 1000
+    # Only the pages already in flight when the failure arrived were requested
+    assert max(server.requests) <= T0 + 2000 * STEP
+    assert len(server.requests) < 10
+
+
+async def test_rate_limited_page_is_retried(limiter):
+    server = FakeBinance(rate_limit_once=True)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(server)) as client:
+        rows, complete = await download_klines('BTCUSDT', '1m', T0, T0 + 10 * STEP, client=client)
+
+    assert complete and len(rows) == 10
+    assert server.requests == [T0, T0]
+    assert limiter.observed == [('spot', 429), ('spot', 200)]
@@ -0,0 +1,175 @@
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from app.core import kline_store as kline_store_module
+from app.core.file_lock import FileLock
+from app.core.kline_store import KlineStore, merge_ranges, missing_ranges
+from app.services.backtest_service import BacktestService
+
+STEP = 900_000  # 15m
+DAY = 86_400_000
+T0 = int(pd.Timestamp('2024-01-01').value // 1_000_000)
+
+
+def _candles(start_ms: int, end_ms: int) -> pd.DataFrame:
+    opens = np.arange(-(-start_ms // STEP) * STEP, end_ms, STEP, dtype=np.int64)
+    close = 100.0 + np.sin(opens / 1e8)
+    return pd.DataFrame({
+        'timestamp': pd.to_datetime(opens, unit='ms'),
+        'open': close, 'high': close + 1, 'low': close - 1, 'close': close,
+        'volume': (opens // STEP % 97).astype(float),
+        'close_time': opens + STEP - 1,
+        'quote_volume': [str(v) for v in close],
+        'trades': 1, 'taker_base': 0.5, 'taker_quote': '0.5', 'ignore': '0',
+    })
+
+
+class FakeFetcher:
+    def __init__(self, fail: bool = False):
+        self.calls = []
+        self.fail = fail
+
+    async def __call__(self, symbol, interval, start_ms, end_ms, market_type):
+        self.calls.append((start_ms, end_ms))
+        if self.fail:
+            return _candles(start_ms, start_ms + 10 * STEP), False
+        # Overshoot past end_ms like a full API page would; the store must trim it
+        return _candles(start_ms, end_ms + 5 * STEP), True
+
+
+def test_range_helpers():
+    assert merge_ranges([(5, 8), (0, 3), (3, 4), (7, 10)]) == [(0, 4), (5, 10)]
+    assert missing_ranges([(10, 20), (30, 40)], 0, 50) == [(0, 10), (20, 30), (40, 50)]
+    assert missing_ranges([(0, 100)], 10, 20) == []
+
+
+async def test_overlapping_requests_fetch_only_gaps(tmp_path):
+    store = KlineStore(str(tmp_path))
+    fetch = FakeFetcher()
+
+    first = await store.get_range('BTCUSDT', '15m', T0 + 10 * DAY, T0 + 20 * DAY, fetch)
+    assert fetch.calls == [(T0 + 10 * DAY, T0 + 20 * DAY)]
+    assert len(first) == 10 * DAY // STEP
+
+    # Sub-range: served from disk
+    inner = await store.get_range('BTCUSDT', '15m', T0 + 12 * DAY, T0 + 15 * DAY, fetch, columns=['timestamp', 'close'])
+    assert len(fetch.calls) == 1
+    assert list(inner.columns) == ['timestamp', 'close']
+
+    # Wider range: only the head and tail gaps are downloaded
+    wide = await store.get_range('BTCUSDT', '15m', T0 + 5 * DAY, T0 + 25 * DAY, fetch)
+    assert fetch.calls[1:] == [(T0 + 5 * DAY, T0 + 10 * DAY), (T0 + 20 * DAY, T0 + 25 * DAY)]
+    expected = _candles(T0 + 5 * DAY, T0 + 25 * DAY)
+    pd.testing.assert_series_equal(wide['timestamp'], expected['timestamp'])
+    np.testing.assert_array_equal(wide['close'], expected['close'])
+    assert wide['quote_volume'].dtype == np.float64
+    assert store.covered_ranges('BTCUSDT', '15m') == [(T0 + 5 * DAY, T0 + 25 * DAY)]
+
+    # Other markets are stored separately
+    await store.get_range('BTCUSDT', '15m', T0 + 12 * DAY, T0 + 15 * DAY, fetch, market_type='futures')
+    assert len(fetch.calls) == 4
+
+
+async def test_incomplete_fetch_is_not_marked_covered(tmp_path):
+    store = KlineStore(str(tmp_path))
+    assert await store.get_range('BTCUSDT', '15m', T0, T0 + DAY, FakeFetcher(fail=True)) is None
+    assert store.covered_ranges('BTCUSDT', '15m') == []
+    assert await store.get_range('BTCUSDT', '1M', T0, T0 + DAY, FakeFetcher()) is None
+
+
+async def test_service_reuses_store_for_overlapping_backtests(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fetch = FakeFetcher()
+    service = BacktestService()
+    monkeypatch.setattr(service, "_download_public_klines", fetch)
+
+    def to_ms(day: str) -> int:
+        return int(datetime.strptime(day, "%Y-%m-%d").timestamp() * 1000)
+
+    first = await service.get_historical_data('BTCUSDT', '15m', '2024-01-01', '2024-06-30')
+    second = await service.get_historical_data('BTCUSDT', '15m', '2024-01-01', '2024-05-31')
+    assert fetch.calls == [(to_ms('2024-01-01'), to_ms('2024-06-30'))]
+    assert list(second.columns) == ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+    pd.testing.assert_frame_equal(second, first.iloc[:len(second)])
+
+
+async def test_coarser_intervals_are_resampled_from_stored_candles(tmp_path):
+    store = KlineStore(str(tmp_path))
+    fetch = FakeFetcher()
+    await store.get_range('BTCUSDT', '15m', T0, T0 + 10 * DAY, fetch)
+    fine = store.read_range('BTCUSDT', '15m', T0, T0 + 10 * DAY)
+
+    hourly = await store.get_range('BTCUSDT', '1h', T0 + DAY, T0 + 3 * DAY, fetch)
+    assert len(fetch.calls) == 1
+    expected = fine.set_index('timestamp').loc[pd.Timestamp(T0 + DAY, unit='ms'):].resample('1h').agg({
+        'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum',
+        'quote_volume': 'sum', 'trades': 'sum', 'taker_base': 'sum', 'taker_quote': 'sum'})[:48]
+    assert len(hourly) == 48
+    for name in expected.columns:
+        np.testing.assert_allclose(hourly[name].to_numpy(dtype=float), expected[name].to_numpy(dtype=float))
+    assert (hourly['close_time'] == _timestamps(hourly) + 3_600_000 - 1).all()
+    assert store.covered_ranges('BTCUSDT', '1h') == [(T0 + DAY, T0 + 3 * DAY)]
+
+    # Only the part the 15m series doesn't cover is downloaded
+    await store.get_range('BTCUSDT', '4h', T0 + 8 * DAY, T0 + 12 * DAY, fetch)
+    assert fetch.calls[1:] == [(T0 + 10 * DAY, T0 + 12 * DAY)]
+    assert store.covered_ranges('BTCUSDT', '4h') == [(T0 + 8 * DAY, T0 + 12 * DAY)]
+
+
+def _timestamps(df: pd.DataFrame) -> np.ndarray:
+    return pd.DatetimeIndex(df['timestamp']).asi8 // 1_000_000
+
+
+async def test_read_retries_while_series_is_swapped(tmp_path):
+    store = KlineStore(str(tmp_path))
+    await store.get_range('BTCUSDT', '15m', T0, T0 + DAY, FakeFetcher())
+    store.memory.clear()
+
+    # A concurrent fill has moved the old directory aside and not yet renamed the new one in
+    path = store._data_path(store._key('BTCUSDT', '15m', 'spot'))
+    os.replace(path, f"{path}.old")
+    threading.Timer(0.02, os.replace, (f"{path}.old", path)).start()
+
+    df = store.read_range('BTCUSDT', '15m', T0, T0 + DAY)
+    assert df is not None and len(df) == DAY // STEP
+
+
+async def test_lock_timeout_never_fetches(tmp_path, monkeypatch):
+    store = KlineStore(str(tmp_path))
+    await store.get_range('BTCUSDT', '15m', T0, T0 + DAY, FakeFetcher())
+    monkeypatch.setattr(kline_store_module, 'CACHE_FILL_LOCK_TIMEOUT', 0.1)
+    fetch = FakeFetcher()
+    # Another filler holds the series lock for longer than the timeout
+    with FileLock(store._file_lock(store._key('BTCUSDT', '15m', 'spot')).path):
+        covered = await store.get_range('BTCUSDT', '15m', T0, T0 + DAY, fetch)
+        uncovered = await store.get_range('BTCUSDT', '15m', T0, T0 + 2 * DAY, fetch)
+
+    assert fetch.calls == []
+    assert len(covered) == DAY // STEP
+    assert uncovered is None
+
+
+async def test_disk_work_does_not_block_the_event_loop(tmp_path, monkeypatch):
+    store = KlineStore(str(tmp_path))
+    merge = store._merge
+
+    def slow_merge(*args):
+        time.sleep(0.2)
+        merge(*args)
+
+    monkeypatch.setattr(store, '_merge', slow_merge)
+    ticks = []
+
+    async def ticker():
+        for _ in range(10):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(store.get_range('BTCUSDT', '15m', T0, T0 + DAY, FakeFetcher()), ticker())
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.15
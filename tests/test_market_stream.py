@@ -0,0 +1,154 @@
+import asyncio
+import json
+import time
+
+import pytest
+import websockets
+
+from app.core.market_stream import MARKET_CANDLE_CHANNEL, MarketStreamService, MarketStreamStore, stream_names
+
+STEP = 60_000
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+class FakeRedis:
+    """The subset of redis-py (decode_responses=True) the market store uses"""
+
+    def __init__(self):
+        self.data = {}
+        self.published = []
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def rpush(self, key, *values):
+        self.data.setdefault(key, []).extend(values)
+
+    def ltrim(self, key, start, end):
+        items = self.data.get(key, [])
+        self.data[key] = items[start:] if end == -1 else items[start:end + 1]
+
+    def lrange(self, key, start, end):
+        items = self.data.get(key, [])
+        return items[max(0, len(items) + start) if start < 0 else start:]
+
+    def lindex(self, key, index):
+        items = self.data.get(key, [])
+        return items[index] if items else None
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def hset(self, key, mapping):
+        self.data.setdefault(key, {}).update({k: str(v) for k, v in mapping.items()})
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def expire(self, key, seconds):
+        pass
+
+    def publish(self, channel, message):
+        self.published.append((channel, json.loads(message)))
+
+
+def _current_open():
+    now = int(time.time() * 1000)
+    return now - now % STEP
+
+
+def _kline(open_ms, close, closed):
+    return json.dumps({'stream': 'btcusdt@kline_1m', 'data': {'e': 'kline', 's': 'BTCUSDT', 'k': {
+        't': open_ms, 'T': open_ms + STEP - 1, 's': 'BTCUSDT', 'i': '1m', 'o': close, 'h': close,
+        'l': close, 'c': close, 'v': '1.0', 'x': closed}}})
+
+
+def test_stream_names_share_book_ticker():
+    assert stream_names([('spot', 'BTCUSDT', '1m'), ('spot', 'BTCUSDT', '5m')]) == [
+        'btcusdt@kline_1m', 'btcusdt@bookTicker', 'btcusdt@kline_5m']
+
+
+@pytest.mark.asyncio
+async def test_service_ingests_fake_stream_into_snapshot():
+    opened = _current_open()
+    paths = []
+
+    async def handler(ws):
+        paths.append(ws.request.path)
+        for i in (4, 3, 2, 1):  # the first one repeats the last seeded candle
+            await ws.send(_kline(opened - i * STEP, str(100 + 10 - i), True))
+        await ws.send(_kline(opened, "110.5", False))
+        await ws.send(json.dumps({'stream': 'btcusdt@bookTicker',
+                                  'data': {'u': 1, 's': 'BTCUSDT', 'b': '110.4', 'B': '1', 'a': '110.6', 'A': '1'}}))
+        await ws.wait_closed()
+
+    async def seed(market, symbol, interval, window):
+        return [[opened - i * STEP, 0, 0, 0, float(100 + 10 - i), 0] for i in (6, 5, 4)]
+
+    redis = FakeRedis()
+    store = MarketStreamStore(redis, window=10)
+    async with websockets.serve(handler, "127.0.0.1", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        service = MarketStreamService(lambda: {('spot', 'BTCUSDT', '1m')}, store=store,
+                                      urls={'spot': f"ws://127.0.0.1:{port}"}, seed=seed, flush_seconds=0.01)
+        stop = asyncio.Event()
+        task = asyncio.create_task(service.run(stop))
+        snapshot = None
+        for _ in range(300):
+            snapshot = store.read_snapshot('spot', 'BTCUSDT', '1m', limit=7)
+            if snapshot is not None:
+                break
+            await asyncio.sleep(0.01)
+        stop.set()
+        await asyncio.wait_for(task, 5)
+
+    assert paths == ['/stream?streams=btcusdt@kline_1m/btcusdt@bookTicker']
+    assert snapshot == {'price': 110.5, 'closes': [104.0, 105.0, 106.0, 107.0, 108.0, 109.0, 110.5],
+                        'open_times': [opened - i * STEP for i in range(6, -1, -1)]}
+    assert redis.hgetall('market:spot:BTCUSDT:ticker')['bid'] == '110.4'
+    # Seeded candles are not announced, the replayed one is not stored twice
+    assert [event['candle'][0] for channel, event in redis.published if channel == MARKET_CANDLE_CHANNEL] == [
+        opened - 3 * STEP, opened - 2 * STEP, opened - STEP]
+
+
+def test_snapshot_rejects_gaps_and_stale_data():
+    redis = FakeRedis()
+    store = MarketStreamStore(redis, window=10)
+    opened = _current_open()
+    store.replace_closed('spot', 'BTCUSDT', '1m', [[opened - i * STEP, 0, 0, 0, 1.0, 0] for i in (3, 2, 1)])
+    store.write_updates({('spot', 'BTCUSDT', '1m'): [opened, 0, 0, 0, 2.0, 0]},
+                        {('spot', 'BTCUSDT'): {'price': 2.0, 'ts': int(time.time() * 1000)}})
+    assert store.read_snapshot('spot', 'BTCUSDT', '1m', limit=4) == {
+        'price': 2.0, 'closes': [1.0, 1.0, 1.0, 2.0], 'open_times': [opened - i * STEP for i in (3, 2, 1, 0)]}
+    # More history than the window holds
+    assert store.read_snapshot('spot', 'BTCUSDT', '1m', limit=5) is None
+
+    # A missing candle right before the live one
+    store.append_closed('spot', 'BTCUSDT', '1m', [opened + STEP, 0, 0, 0, 1.0, 0])
+    store.write_updates({('spot', 'BTCUSDT', '1m'): [opened + 3 * STEP, 0, 0, 0, 2.0, 0]}, {})
+    assert store.read_snapshot('spot', 'BTCUSDT', '1m', limit=2) is None
+
+    # A ticker nobody has updated for a while
+    store.write_updates({('spot', 'BTCUSDT', '1m'): [opened, 0, 0, 0, 2.0, 0]},
+                        {('spot', 'BTCUSDT'): {'ts': int(time.time() * 1000) - 60_000}})
+    assert store.read_snapshot('spot', 'BTCUSDT', '1m', limit=1) is None
@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from app.core import cache as cache_module
+from app.core.cache import DataCache, cache_expiry
+from app.core.memory_cache import KlineMemoryCache
+
+
+def _frame(rows: int = 1000, start: str = '2024-01-01') -> pd.DataFrame:
+    close = np.linspace(100.0, 110.0, rows)
+    return pd.DataFrame({
+        'timestamp': pd.date_range(start, periods=rows, freq='15min'),
+        'open': close, 'high': close + 1, 'low': close - 1, 'close': close,
+        'volume': np.arange(rows, dtype=float),
+    })
+
+
+def test_lru_is_bounded_by_bytes():
+    memory = KlineMemoryCache(max_bytes=2 * 8000)
+    for key in ('a', 'b'):
+        memory.put(key, {'close': np.zeros(1000)}, complete=True)
+    assert memory.get('a') is not None  # 'a' is now most recently used
+
+    memory.put('c', {'close': np.zeros(1000)}, complete=True)
+    assert memory.get('b') is None
+    assert memory.get('a') is not None and memory.get('c') is not None
+    # Larger than the whole budget: not cached at all
+    memory.put('huge', {'close': np.zeros(5000)})
+    assert memory.get('huge') is None
+
+    info = memory.get_cache_info()
+    assert info['evictions'] == 1
+    assert info['entries'] == 2
+    assert (info['hits'], info['misses']) == (3, 2)
+
+
+def test_columns_versions_and_read_only_arrays():
+    memory = KlineMemoryCache()
+    memory.put('k', {'timestamp': np.arange(3), 'close': np.ones(3)}, version=1)
+    assert memory.get('k', version=1) is None  # partial entry can't serve "all columns"
+    arrays = memory.get('k', ['close'], version=1)
+    assert not arrays['close'].flags.writeable
+    assert memory.get('k', ['volume'], version=1) is None
+
+    memory.put('k', {'volume': np.ones(3)}, version=1)
+    assert set(memory.get('k', ['close', 'volume'], version=1)) == {'close', 'volume'}
+    assert memory.get('k', ['close'], version=2) is None
+    assert memory.get_cache_info()['expirations'] == 1
+
+
+def test_recent_ranges_expire_like_disk_cache():
+    now = datetime(2024, 6, 10, 12)
+    assert cache_expiry(now, '2024-06-10', now) == now + timedelta(hours=24)
+    assert cache_expiry(now, '2024-06-09', now) == now + timedelta(hours=24)
+    assert cache_expiry(now, '2024-05-01', now) is None
+
+
+def test_data_cache_serves_repeats_from_memory(tmp_path, monkeypatch):
+    memory = KlineMemoryCache()
+    cache = DataCache(str(tmp_path), memory=memory)
+    df = _frame()
+    cache.cache_data(df, 'BTCUSDT', '15m', '2024-01-01', '2024-01-11')
+    columns = ['timestamp', 'close']
+
+    first = cache.get_cached_data('BTCUSDT', '15m', '2024-01-01', '2024-01-11', columns=columns)
+
+    def no_disk(*args, **kwargs):
+        raise AssertionError("should be served from memory")
+
+    monkeypatch.setattr(cache_module.np, "load", no_disk)
+    second = DataCache(str(tmp_path), memory=memory).get_cached_data(
+        'BTCUSDT', '15m', '2024-01-01', '2024-01-11', columns=columns)
+    pd.testing.assert_frame_equal(first, second)
+    monkeypatch.undo()
+
+    # Rewriting an entry drops the in-memory copy
+    cache.cache_data(_frame(start='2024-01-02'), 'BTCUSDT', '15m', '2024-01-01', '2024-01-11')
+    third = cache.get_cached_data('BTCUSDT', '15m', '2024-01-01', '2024-01-11', columns=columns)
+    assert third['timestamp'].iloc[0] == pd.Timestamp('2024-01-02')
+
+    # Recent end dates get the same 24h freshness window as on disk
+    today = datetime.now().strftime("%Y-%m-%d")
+    cache.cache_data(df, 'BTCUSDT', '15m', '2024-01-01', today)
+    cache.get_cached_data('BTCUSDT', '15m', '2024-01-01', today, columns=columns)
+    key = cache._memory_key(cache._get_cache_key('BTCUSDT', '15m', '2024-01-01', today))
+    assert memory._entries[key].expires_at is not None
@@ -0,0 +1,98 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.services.indicator_kernels import IndicatorKernel
+from app.services.streaming_indicators import IndicatorState, advance_state, fill_missing
+from app.services.synthetic_data import generate_klines
+
+RTOL = 1e-9
+STEP = 60_000
+NAMES = ('EMA_fast', 'EMA_slow', 'RSI', 'MACD', 'BB_upper', 'BB_middle', 'BB_lower')
+
+
+def _expected(close, periods):
+    ema_fast, ema_slow, rsi_period = periods
+    kernel = IndicatorKernel(close)
+    return {
+        'EMA_fast': kernel.ema(ema_fast), 'EMA_slow': kernel.ema(ema_slow), 'RSI': kernel.rsi(rsi_period),
+        'MACD': kernel.macd_diff(12, 26, 9), 'BB_upper': kernel.bollinger('upper', 20, 2),
+        'BB_middle': kernel.bollinger('middle', 20, 2), 'BB_lower': kernel.bollinger('lower', 20, 2),
+    }
+
+
+def _assert_matches(values, expected, row, scale):
+    for name in NAMES:
+        want = expected[name][row]
+        if np.isnan(want):
+            assert np.isnan(values[name]), (name, row)
+        else:
+            # Relative to the price scale, so indicators that cross zero (MACD) are compared fairly
+            assert values[name] == pytest.approx(want, rel=RTOL, abs=RTOL * scale), (name, row)
+
+
+@pytest.mark.parametrize('periods', [(8, 21, 7), (5, 50, 14)])
+def test_incremental_state_matches_kernels(periods):
+    close = generate_klines(400, '1m', model='jump_diffusion', seed=7)['close'].to_numpy()
+    expected = _expected(close, periods)
+    scale = float(np.abs(close).max())
+
+    state = IndicatorState(*periods)
+    for row, price in enumerate(close):
+        # Peeking at the live candle gives the values it would have once closed
+        _assert_matches(state.peek(float(price)), expected, row, scale)
+        state.update(float(price), row * STEP)
+        _assert_matches(state.values(), expected, row, scale)
+
+
+def test_constant_series_has_flat_bands():
+    state = IndicatorState(8, 21, 7)
+    for row in range(60):
+        state.update(100.0, row * STEP)
+    values = state.values()
+    assert values['BB_upper'] == values['BB_middle'] == values['BB_lower'] == 100.0
+    assert values['RSI'] == 100.0
+    assert values['MACD'] == 0.0
+
+
+def test_round_trip_continues_identically():
+    close = generate_klines(300, '1m', model='gbm', seed=3)['close'].to_numpy()
+    state = IndicatorState(8, 21, 7)
+    for row, price in enumerate(close[:150]):
+        state.update(float(price), row * STEP)
+    restored = IndicatorState.from_dict(json.loads(json.dumps(state.to_dict())))
+    for row, price in enumerate(close[150:], start=150):
+        state.update(float(price), row * STEP)
+        restored.update(float(price), row * STEP)
+    for name in NAMES:
+        assert restored.values()[name] == pytest.approx(state.values()[name], rel=1e-12)
+    assert restored.last_open_time == state.last_open_time == 299 * STEP
+
+
+def test_advance_feeds_new_closed_candles_and_detects_gaps():
+    close = [100.0 + (i % 5) for i in range(40)]
+    times = [i * STEP for i in range(40)]
+    # The last candle is still open and must not enter the state
+    state, rebuilt = advance_state(None, (8, 21, 7), times[:30], close[:30], STEP)
+    assert rebuilt and state.candles == 29 and state.last_open_time == times[28]
+
+    state, rebuilt = advance_state(state, (8, 21, 7), times[27:33], close[27:33], STEP)
+    assert not rebuilt and state.candles == 32 and state.last_open_time == times[31]
+    reference = IndicatorState(8, 21, 7)
+    for t, c in zip(times[:32], close[:32]):
+        reference.update(c, t)
+    assert state.to_dict() == reference.to_dict()
+
+    # Candles 32..35 were missed: rebuilt from the given data alone
+    state, rebuilt = advance_state(state, (8, 21, 7), times[36:40], close[36:40], STEP)
+    assert rebuilt and state.candles == 3
+
+
+def test_fill_missing_uses_prepare_indicators_defaults():
+    state = IndicatorState(8, 21, 7)
+    state.update(100.0, 0)
+    values = fill_missing(state.peek(101.0), 101.0)
+    assert values['EMA_fast'] == values['BB_middle'] == 101.0
+    assert values['RSI'] == 50.0
+    assert values['MACD'] == 0.0
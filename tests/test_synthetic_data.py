@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.synthetic_data import SYNTHETIC_MODELS, generate_klines
+
+
+@pytest.mark.parametrize('model', sorted(SYNTHETIC_MODELS))
+def test_models_produce_consistent_candles(model):
+    df = generate_klines(5000, '1m', model=model, seed=7)
+
+    assert len(df) == 5000
+    assert (df['high'] >= df[['open', 'close']].max(axis=1)).all()
+    assert (df['low'] <= df[['open', 'close']].min(axis=1)).all()
+    assert (df['low'] > 0).all() and (df['volume'] > 0).all()
+    assert np.array_equal(df['open'].to_numpy()[1:], df['close'].to_numpy()[:-1])
+    assert (df['timestamp'].diff().dropna() == pd.Timedelta(minutes=1)).all()
+    assert (df['close_time'] == df['timestamp'].astype('int64') // 1_000_000 + 59_999).all()
+
+
+def test_seed_makes_output_deterministic():
+    a = generate_klines(1000, '15m', model='jump_diffusion', seed=1)
+    b = generate_klines(1000, '15m', model='jump_diffusion', seed=1)
+    c = generate_klines(1000, '15m', model='jump_diffusion', seed=2)
+    pd.testing.assert_frame_equal(a, b)
+    assert not np.allclose(a['close'], c['close'])
+
+    # Restricting the columns does not change the values
+    subset = generate_klines(1000, '15m', model='jump_diffusion', seed=1, columns=['timestamp', 'close'])
+    assert list(subset.columns) == ['timestamp', 'close']
+    assert np.array_equal(subset['close'], a['close'])
+
+
+def test_mean_reverting_stays_near_base_price():
+    df = generate_klines(200_000, '1h', model='mean_reverting', seed=3, base_price=50.0, reversion=20.0)
+    log_price = np.log(df['close'].to_numpy() / 50.0)
+    assert abs(log_price.mean()) < 0.2
+    assert log_price.std() < 0.5
+
+
+def test_unknown_model_is_rejected():
+    with pytest.raises(ValueError):
+        generate_klines(10, '1m', model='nope')